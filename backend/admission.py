@@ -0,0 +1,171 @@
+"""
+SAFE-Triage AI - Rate Limiting & Admission Control
+Backpressure for the expensive endpoints (/ai-triage, /transcribe) so a
+surge degrades them instead of slowing everything down together:
+
+- token buckets per client and one global bucket (the Gemini quota);
+- an admission controller that also sheds load when too many calls are in
+  flight (queue depth) or recent calls have been too slow.
+
+A refused /ai-triage call is answered with the rule engine's result; a
+refused /transcribe call gets 429 with Retry-After. /triage never goes
+through admission. Bounding in-flight AI calls below the worker threadpool
+size also keeps threads free for it.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+
+class TokenBucket:
+    """`rate` tokens per second, holding at most `burst`."""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.clock = clock
+        self.tokens = burst
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill(self.clock())
+            if self.tokens < tokens:
+                return False
+            self.tokens -= tokens
+            return True
+
+    def refund(self, tokens: float = 1.0):
+        with self._lock:
+            self.tokens = min(self.burst, self.tokens + tokens)
+
+    def retry_after(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` are available."""
+        with self._lock:
+            self._refill(self.clock())
+            missing = tokens - self.tokens
+        return max(0.0, missing / self.rate) if self.rate > 0 else float("inf")
+
+
+class Rejected(Exception):
+    """Raised by AdmissionController.admit; `reason` is one of the REASONS."""
+
+    def __init__(self, reason: str, retry_after: float = 1.0):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """
+    Per-client and global token buckets plus load shedding on queue depth
+    (`max_in_flight` concurrent calls) and latency (mean duration of calls
+    finished in the last `latency_window` seconds above `max_latency`).
+    Latency samples expire, so a shed endpoint is retried after the window.
+    """
+
+    REASONS = ("client_rate", "global_rate", "queue_full", "slow")
+
+    def __init__(self, name: str, client_rate: float = 0.5, client_burst: float = 5,
+                 global_rate: float = 5.0, global_burst: float = 20, max_in_flight: int = 16,
+                 max_latency: float = 8.0, latency_window: float = 30.0, max_clients: int = 10_000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.client_rate = client_rate
+        self.client_burst = client_burst
+        self.max_in_flight = max_in_flight
+        self.max_latency = max_latency
+        self.latency_window = latency_window
+        self.max_clients = max_clients
+        self.clock = clock
+        self.global_bucket = TokenBucket(global_rate, global_burst, clock)
+        self._clients: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._latencies = deque()  # (finished at, seconds)
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self.stats = {"admitted": 0, **{f"rejected_{r}": 0 for r in self.REASONS}}
+
+    @classmethod
+    def from_env(cls, name: str, prefix: str, **defaults) -> "AdmissionController":
+        """Settings from <prefix>_CLIENT_RATE, _CLIENT_BURST, _GLOBAL_RATE, _GLOBAL_BURST,
+        _MAX_IN_FLIGHT, _MAX_LATENCY (rates in calls per second)."""
+        def setting(key, cast):
+            value = os.getenv(f"{prefix}_{key.upper()}")
+            return cast(value) if value is not None else defaults.get(key)
+
+        options = {
+            "client_rate": setting("client_rate", float), "client_burst": setting("client_burst", float),
+            "global_rate": setting("global_rate", float), "global_burst": setting("global_burst", float),
+            "max_in_flight": setting("max_in_flight", int), "max_latency": setting("max_latency", float),
+        }
+        return cls(name, **{k: v for k, v in options.items() if v is not None})
+
+    def _client_bucket(self, client_id: str) -> TokenBucket:
+        # Caller holds self._lock; least recently seen clients are forgotten (= full bucket)
+        bucket = self._clients.get(client_id)
+        if bucket is None:
+            bucket = TokenBucket(self.client_rate, self.client_burst, self.clock)
+            self._clients[client_id] = bucket
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+        else:
+            self._clients.move_to_end(client_id)
+        return bucket
+
+    def _mean_latency(self, now: float) -> Optional[float]:
+        while self._latencies and self._latencies[0][0] < now - self.latency_window:
+            self._latencies.popleft()
+        if not self._latencies:
+            return None
+        return sum(seconds for _, seconds in self._latencies) / len(self._latencies)
+
+    def _reject(self, reason: str, retry_after: float):
+        self.stats[f"rejected_{reason}"] += 1
+        raise Rejected(reason, retry_after)
+
+    def admit(self, client_id: str):
+        """Take a slot for one call or raise Rejected. Pair with release()."""
+        with self._lock:
+            now = self.clock()
+            if self._in_flight >= self.max_in_flight:
+                self._reject("queue_full", 1.0)
+            latency = self._mean_latency(now)
+            if latency is not None and latency > self.max_latency:
+                self._reject("slow", self._latencies[0][0] + self.latency_window - now)
+            client = self._client_bucket(client_id)
+            if not client.try_acquire():
+                self._reject("client_rate", client.retry_after())
+            if not self.global_bucket.try_acquire():
+                client.refund()
+                self._reject("global_rate", self.global_bucket.retry_after())
+            self._in_flight += 1
+            self.stats["admitted"] += 1
+
+    def release(self, seconds: float):
+        """Free the slot taken by admit(); `seconds` is how long the call took."""
+        with self._lock:
+            self._in_flight -= 1
+            self._latencies.append((self.clock(), seconds))
+
+    @contextmanager
+    def slot(self, client_id: str):
+        """admit() ... release() around the expensive call."""
+        self.admit(client_id)
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.release(self.clock() - start)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return dict(self.stats, in_flight=self._in_flight, clients=len(self._clients),
+                        mean_latency=self._mean_latency(self.clock()))
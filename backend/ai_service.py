@@ -1,12 +1,46 @@
 import os
 import json
+import hashlib
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+from .coalescing import SingleFlight, CoalesceTimeout
+from .circuit_breaker import CircuitOpenError, breakers
+
 load_dotenv()
 
+def canonical_patient_key(patient_data: dict, tenant: str = None, examples: list = None) -> str:
+    """
+    Stable key for the fields that shape the AI prompt, so double-submits and
+    duplicate registrations of the same patient map to the same key. The
+    tenant and the few-shot examples are part of it: another hospital's
+    prompt must not answer this one's.
+    """
+    complaint = " ".join(str(patient_data.get("chief_complaint_text") or "").lower().split())
+    vitals = {k: v for k, v in (patient_data.get("vitals") or {}).items() if v is not None}
+    gender = patient_data.get("gender")
+    canonical = {
+        "age": patient_data.get("age"),
+        "gender": getattr(gender, "value", gender),
+        "complaint": complaint,
+        "vitals": vitals,
+        "tenant": tenant,
+        "examples": hashlib.sha256(
+            json.dumps(examples or [], sort_keys=True, ensure_ascii=False, default=str).encode("utf-8")
+        ).hexdigest(),
+    }
+    raw = json.dumps(canonical, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
 class AIService:
     def __init__(self):
+        # Concurrent identical requests share one Gemini call
+        self.coalescer = SingleFlight(
+            wait_timeout=float(os.getenv("AI_COALESCE_WAIT_SECONDS", "30"))
+        )
+        # Per-call Gemini timeout; repeated failures open the breaker and later calls fail fast
+        self.timeout = float(os.getenv("AI_TIMEOUT_SECONDS", "15"))
+        self.breaker = breakers.get("gemini-triage")
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             print("Warning: GEMINI_API_KEY not found in environment variables.")
@@ -15,7 +49,7 @@ class AIService:
             genai.configure(api_key=api_key)
             self.model = genai.GenerativeModel('gemini-2.5-flash')
 
-    def analyze_triage(self, patient_data: dict):
+    def analyze_triage(self, patient_data: dict, examples: list = None, tenant: str = None):
         if not self.model:
             return {
                 "error": "AI Service not configured (Missing API Key). Using Standard Protocol.",
@@ -25,6 +59,28 @@ class AIService:
                 "red_flags": []
             }
 
+        try:
+            result, _shared = self.coalescer.do(
+                canonical_patient_key(patient_data, tenant, examples), self._analyze, patient_data, examples
+            )
+            return result
+        except CoalesceTimeout as e:
+            print(f"AI Error: {e}")
+            return {
+                "error": "AI Analysis Timed Out",
+                "reasoning": "AI Service busy. Please use standard protocol.",
+                "reasoning_ar": "خدمة الذكاء الاصطناعي مشغولة."
+            }
+
+    def _analyze(self, patient_data: dict, examples: list = None):
+        # Similar past patients and the level they were finally given, as calibration
+        past_cases = ""
+        if examples:
+            lines = "\n".join(
+                f"        - Age {case.get('age')}: {case.get('complaint')} -> Level {case.get('triage_level')}"
+                for case in examples
+            )
+            past_cases = f"\n        Similar past cases at this hospital (final triage level):\n{lines}\n"
         prompt = f"""
         You are an expert ER doctor in an Egyptian hospital. Analyze the patient and respond in JSON only.
         
@@ -33,7 +89,7 @@ class AIService:
         Gender: {patient_data.get('gender')}
         Complaint: {patient_data.get('chief_complaint_text')}
         Vitals: {json.dumps(patient_data.get('vitals'))}
-        
+        {past_cases}
         Format Requirement:
         {{
             "symptoms": ["list of extracted symptoms"],
@@ -48,10 +104,19 @@ class AIService:
         """
 
         try:
-            response = self.model.generate_content(prompt)
+            response = self.breaker.call(
+                self.model.generate_content, prompt, request_options={"timeout": self.timeout}
+            )
             # Clean response if it contains markdown code blocks
             text = response.text.replace("```json", "").replace("```", "").strip()
             return json.loads(text)
+        except CircuitOpenError as e:
+            print(f"AI Error: {e}")
+            return {
+                "error": "AI Service Unavailable",
+                "reasoning": "AI Service unavailable. Please use standard protocol.",
+                "reasoning_ar": "خدمة الذكاء الاصطناعي غير متاحة حالياً."
+            }
         except Exception as e:
             print(f"AI Error: {e}")
             return {
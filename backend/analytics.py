@@ -0,0 +1,227 @@
+"""
+SAFE-Triage AI - Triage Analytics Rollups
+Hourly aggregates maintained incrementally on every triage write, so the
+dashboard reads a few hundred rollup rows instead of scanning `patients`.
+
+Usage:
+    python -m backend.analytics backfill      # rebuild rollups from existing patients
+"""
+import argparse
+import json
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import delete, func, select, text, update
+from sqlalchemy.orm import Session
+
+from .database import engine as default_bind
+from .sql_models import ComplaintCategoryRollup, TriageHourlyRollup
+
+
+def hour_bucket(at: Optional[datetime] = None) -> datetime:
+    """Truncate to the hour, naive UTC (matches SQLite CURRENT_TIMESTAMP)."""
+    if at is None:
+        at = datetime.now(timezone.utc)
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return at.replace(minute=0, second=0, microsecond=0)
+
+
+def _upsert(db: Session, model, keys: Dict, increments: Dict):
+    """INSERT ... ON CONFLICT DO UPDATE SET col = col + n (SQLite & PostgreSQL)."""
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    stmt = insert(model).values(**keys, **increments)
+    table = model.__table__
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(keys),
+        set_={col: table.c[col] + stmt.excluded[col] for col in increments},
+    )
+    db.execute(stmt)
+
+
+def record_triage(db: Session, level: int, red_flags: List[str], categories: Iterable[str],
+                  rule_level: Optional[int] = None, ai_level: Optional[int] = None,
+                  at: Optional[datetime] = None):
+    """
+    Add one triage decision to the rollups. Runs inside the caller's
+    transaction so rollups commit (or roll back) with the patient row.
+    """
+    record_triages(db, [(level, red_flags, categories, rule_level, ai_level)], at=at)
+
+
+def record_triages(db: Session, decisions: Iterable[Tuple], at: Optional[datetime] = None):
+    """
+    record_triage for (level, red_flags, categories, rule_level, ai_level)
+    decisions made together: one upsert per rollup row they touch.
+    """
+    bucket = hour_bucket(at)
+    hourly: Dict[int, Counter] = defaultdict(Counter)
+    by_category = Counter()
+    for level, red_flags, categories, rule_level, ai_level in decisions:
+        compared = rule_level is not None and ai_level is not None
+        counts = hourly[int(level)]
+        counts["patient_count"] += 1
+        counts["red_flag_count"] += 1 if red_flags else 0
+        counts["ai_count"] += 1 if ai_level is not None else 0
+        counts["compared_count"] += 1 if compared else 0
+        counts["agree_count"] += 1 if compared and int(rule_level) == int(ai_level) else 0
+        by_category.update(set(categories))
+    for level, counts in hourly.items():
+        _upsert(db, TriageHourlyRollup, {"hour": bucket, "triage_level": level}, dict(counts))
+    for category, count in by_category.items():
+        _upsert(db, ComplaintCategoryRollup, {"hour": bucket, "category": category}, {"patient_count": count})
+
+
+def dashboard(db: Session, hours: int = 24, top: int = 5, now: Optional[datetime] = None) -> Dict:
+    """Dashboard summary for the last `hours`, read from rollups only."""
+    since = hour_bucket(now) - timedelta(hours=hours - 1)
+    rows = db.execute(
+        select(TriageHourlyRollup).where(TriageHourlyRollup.hour >= since)
+        .order_by(TriageHourlyRollup.hour)
+    ).scalars().all()
+
+    series = {}
+    totals = Counter()
+    for row in rows:
+        key = row.hour.isoformat()
+        entry = series.setdefault(key, {"hour": key, "total": 0, "by_level": {}, "red_flags": 0})
+        entry["total"] += row.patient_count
+        entry["red_flags"] += row.red_flag_count
+        entry["by_level"][str(row.triage_level)] = row.patient_count
+        totals["patients"] += row.patient_count
+        totals["red_flags"] += row.red_flag_count
+        totals["ai"] += row.ai_count
+        totals["compared"] += row.compared_count
+        totals["agree"] += row.agree_count
+        totals[f"level_{row.triage_level}"] += row.patient_count
+    for entry in series.values():
+        entry["red_flag_rate"] = round(entry["red_flags"] / entry["total"], 4) if entry["total"] else 0.0
+
+    categories = db.execute(
+        select(ComplaintCategoryRollup.category, func.sum(ComplaintCategoryRollup.patient_count).label("n"))
+        .where(ComplaintCategoryRollup.hour >= since)
+        .group_by(ComplaintCategoryRollup.category)
+        .order_by(text("n DESC"))
+        .limit(top)
+    ).all()
+
+    patients = totals["patients"]
+    return {
+        "since": since.isoformat(),
+        "hours": hours,
+        "total_patients": patients,
+        "by_level": {str(level): totals[f"level_{level}"] for level in range(1, 6)},
+        "red_flag_rate": round(totals["red_flags"] / patients, 4) if patients else 0.0,
+        "ai_rule_agreement": {
+            "compared": totals["compared"],
+            "agree": totals["agree"],
+            "rate": round(totals["agree"] / totals["compared"], 4) if totals["compared"] else None,
+        },
+        "top_complaint_categories": [{"category": c, "count": int(n)} for c, n in categories],
+        "hourly": list(series.values()),
+    }
+
+
+# ============ BACKFILL ============
+
+def _json_list(value):
+    if isinstance(value, str):
+        value = json.loads(value)
+    return value or []
+
+
+def backfill(bind=None, min_id: Optional[int] = None, nlp=None, chunk_size: int = 50_000,
+             max_id: Optional[int] = None) -> int:
+    """
+    Build rollups from rows already in `patients`. With `min_id` (and `max_id`),
+    only rows in that id range are added (after a bulk import); otherwise the
+    rollup patient counts are rebuilt from scratch. Returns the number of patients rolled up.
+
+    A rebuild scans `patients` inside its write transaction, with writers
+    locked out until it commits, so a triage committed meanwhile is neither
+    wiped from the rollups nor missed by the scan.
+    """
+    from .nlp.processor import NLPProcessor
+
+    bind = bind or default_bind
+    nlp = nlp or NLPProcessor()
+    hourly = defaultdict(Counter)
+    by_category = Counter()
+    category_cache = {}
+    processed = 0
+
+    query = "SELECT id, triage_level, triage_red_flags, chief_complaint, created_at FROM patients"
+    params = {}
+    if min_id is not None:
+        query += " WHERE id >= :min_id"
+        params["min_id"] = min_id
+        if max_id is not None:
+            query += " AND id <= :max_id"
+            params["max_id"] = max_id
+    with Session(bind) as db, db.begin():
+        if min_id is None:
+            if bind.dialect.name == "postgresql":
+                db.execute(text("LOCK TABLE patients IN SHARE MODE"))  # Blocks writers until commit
+            # AI/rule agreement is only known at write time, so a rebuild
+            # resets the counts derived from `patients` and keeps the rest.
+            # On SQLite this first write takes the database write lock.
+            db.execute(update(TriageHourlyRollup).values(patient_count=0, red_flag_count=0))
+            db.execute(delete(ComplaintCategoryRollup))
+        result = db.execute(text(query), params, execution_options={"yield_per": chunk_size})
+        for row in result:
+            if row.triage_level is None:
+                continue
+            created = row.created_at
+            if isinstance(created, str):
+                created = datetime.fromisoformat(created.replace("T", " ").split("+")[0])
+            bucket = hour_bucket(created or datetime.now(timezone.utc))
+            counts = hourly[(bucket, int(row.triage_level))]
+            counts["patient_count"] += 1
+            counts["red_flag_count"] += 1 if _json_list(row.triage_red_flags) else 0
+
+            complaint = row.chief_complaint or ""
+            categories = category_cache.get(complaint)
+            if categories is None:
+                if len(category_cache) >= 100_000:
+                    category_cache.clear()
+                categories = category_cache[complaint] = nlp.extract_symptoms(complaint)
+            for category in categories:
+                by_category[(bucket, category)] += 1
+            processed += 1
+
+        for (bucket, level), counts in hourly.items():
+            _upsert(db, TriageHourlyRollup, {"hour": bucket, "triage_level": level}, {
+                "patient_count": counts["patient_count"],
+                "red_flag_count": counts["red_flag_count"],
+                "ai_count": 0, "compared_count": 0, "agree_count": 0,
+            })
+        for (bucket, category), count in by_category.items():
+            _upsert(db, ComplaintCategoryRollup, {"hour": bucket, "category": category}, {"patient_count": count})
+        if min_id is None:
+            # Hours whose patients are gone would show up as zero counts
+            db.execute(delete(TriageHourlyRollup).where(TriageHourlyRollup.patient_count == 0))
+    return processed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SAFE-Triage analytics rollups")
+    sub = parser.add_subparsers(dest="command", required=True)
+    bf = sub.add_parser("backfill", help="Rebuild hourly rollups from the patients table")
+    bf.add_argument("--min-id", type=int, help="Only add patients with id >= MIN_ID (no rebuild)")
+    bf.add_argument("--max-id", type=int, help="With --min-id: and id <= MAX_ID")
+    args = parser.parse_args(argv)
+
+    if args.command == "backfill":
+        from . import migrations
+        migrations.upgrade(default_bind)
+        count = backfill(min_id=args.min_id, max_id=args.max_id)
+        print(f"Rolled up {count} patients")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+"""
+SAFE-Triage AI - Audio Preprocessing
+Shrinks voice recordings before they are uploaded to Gemini for
+transcription: downmix to mono, resample to 16 kHz (anti-aliased), trim
+silence with an energy-based voice-activity detector, then write 16-bit WAV
+or - when ffmpeg is installed - FLAC / Opus.
+
+Everything streams in ~1 s chunks, so memory stays flat however long the
+recording. WAV input is decoded here (stdlib `wave` + numpy); other
+containers (the browser's WebM/Opus) are decoded by ffmpeg when available
+and otherwise passed through untouched with their real MIME type.
+
+Settings: AUDIO_PREPROCESS (1), AUDIO_CODEC (auto | wav | flac | opus).
+"""
+import hashlib
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from collections import deque
+from typing import Iterator, NamedTuple, Optional
+
+import numpy as np
+
+TARGET_RATE = 16_000
+CHUNK_SECONDS = 1.0
+FRAME_MS = 30
+PAD_MS = 300  # Audio kept before and after each voiced stretch
+MIN_SPEECH_DB = -50.0  # Never "speech" below this level (dBFS)
+SPEECH_MARGIN_DB = 12.0  # Speech is this far above the tracked noise floor
+NOISE_RISE_DB = 0.05  # Per frame: the noise floor drops at once, rises slowly
+
+PREPROCESS = os.getenv("AUDIO_PREPROCESS", "1").lower() in ("1", "true", "yes")
+CODEC = os.getenv("AUDIO_CODEC", "auto")
+
+# (extension, MIME type) of each output codec; ffmpeg encoder arguments
+CODECS = {
+    "wav": (".wav", "audio/wav"),
+    "flac": (".flac", "audio/flac"),
+    "opus": (".ogg", "audio/ogg"),
+}
+FFMPEG_ENCODERS = {
+    "flac": ["-c:a", "flac", "-compression_level", "5"],
+    "opus": ["-c:a", "libopus", "-b:a", "24k", "-application", "voip"],
+}
+
+# Bumped whenever resampling/VAD output changes, so old content hashes stop matching
+PCM_HASH_VERSION = b"pcm16-v2"
+
+# Leading bytes of the containers browsers and phones produce
+MAGIC = [
+    (0, b"RIFF", "audio/wav"), (0, b"\x1aE\xdf\xa3", "audio/webm"), (0, b"OggS", "audio/ogg"),
+    (0, b"fLaC", "audio/flac"), (0, b"ID3", "audio/mpeg"), (4, b"ftyp", "audio/mp4"),
+]
+
+
+def sniff_mime(path: str) -> str:
+    with open(path, "rb") as f:
+        head = f.read(12)
+    for offset, magic, mime in MAGIC:
+        if head[offset:offset + len(magic)] == magic:
+            if mime == "audio/wav" and head[8:12] != b"WAVE":
+                continue
+            return mime
+    if head[:2] in (b"\xff\xfb", b"\xff\xf3", b"\xff\xf2"):
+        return "audio/mpeg"
+    return "application/octet-stream"
+
+
+def ffmpeg_available() -> bool:
+    return shutil.which("ffmpeg") is not None
+
+
+def resolve_codec(codec: str = CODEC) -> str:
+    if codec == "auto":
+        return "flac" if ffmpeg_available() else "wav"
+    if codec not in CODECS:
+        raise ValueError(f"Unknown audio codec '{codec}' (expected auto, {', '.join(CODECS)})")
+    if codec != "wav" and not ffmpeg_available():
+        raise RuntimeError(f"{codec} output requires ffmpeg")
+    return codec
+
+
+# ============ DECODING ============
+
+def _pcm_to_float(raw: bytes, sample_width: int, channels: int) -> np.ndarray:
+    """Interleaved PCM bytes -> float32 mono in [-1, 1] (channels averaged)."""
+    if sample_width == 1:
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        value = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        samples = (np.where(value >= 1 << 23, value - (1 << 24), value) / float(1 << 23)).astype(np.float32)
+    elif sample_width == 4:
+        samples = (np.frombuffer(raw, dtype="<i4") / float(1 << 31)).astype(np.float32)
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {sample_width} bytes")
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples
+
+
+def iter_wav(path: str, chunk_seconds: float = CHUNK_SECONDS):
+    """(sample rate, iterator of float32 mono chunks) for a PCM WAV file."""
+    reader = wave.open(path, "rb")
+    rate, width, channels = reader.getframerate(), reader.getsampwidth(), reader.getnchannels()
+    frames_per_chunk = max(1, int(rate * chunk_seconds))
+
+    def chunks():
+        with reader:
+            while True:
+                raw = reader.readframes(frames_per_chunk)
+                if not raw:
+                    return
+                yield _pcm_to_float(raw, width, channels)
+
+    return rate, chunks()
+
+
+def iter_ffmpeg(path: str, rate: int = TARGET_RATE, chunk_seconds: float = CHUNK_SECONDS) -> Iterator[np.ndarray]:
+    """Decode any container ffmpeg understands to float32 mono at `rate`."""
+    proc = subprocess.Popen(
+        ["ffmpeg", "-v", "error", "-i", path, "-f", "s16le", "-ac", "1", "-ar", str(rate), "pipe:1"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+    )
+    chunk_bytes = int(rate * chunk_seconds) * 2
+    try:
+        while True:
+            raw = proc.stdout.read(chunk_bytes)
+            if not raw:
+                break
+            yield np.frombuffer(raw[: len(raw) // 2 * 2], dtype="<i2").astype(np.float32) / 32768.0
+    finally:
+        proc.stdout.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f"ffmpeg could not decode {path}")
+
+
+# ============ RESAMPLING ============
+
+def lowpass_kernel(cutoff_hz: float, rate: int, taps: int = 63) -> np.ndarray:
+    """Windowed-sinc (Blackman) low-pass FIR with unit DC gain."""
+    n = np.arange(taps) - (taps - 1) / 2
+    kernel = np.sinc(2 * cutoff_hz / rate * n) * np.blackman(taps)
+    return (kernel / kernel.sum()).astype(np.float32)
+
+
+class StreamingResampler:
+    """
+    Downsample chunk by chunk: FIR low-pass below the new Nyquist frequency,
+    then linear interpolation at the output sample positions. Filter history
+    and the fractional read position carry over between chunks, so the
+    output does not depend on how the input was chunked.
+    """
+
+    def __init__(self, src_rate: int, dst_rate: int = TARGET_RATE, taps: int = 63):
+        self.src_rate = src_rate
+        self.dst_rate = min(dst_rate, src_rate)  # Upsampling adds nothing for ASR
+        self.step = src_rate / self.dst_rate
+        self.kernel = lowpass_kernel(0.45 * self.dst_rate, src_rate, taps) if self.step > 1 else None
+        self._history = np.zeros(taps - 1, dtype=np.float32)
+        self._buffer = np.zeros(0, dtype=np.float32)
+        self._position = 0.0  # Of the next output sample, relative to _buffer[0]
+
+    def process(self, chunk: np.ndarray) -> np.ndarray:
+        if self.kernel is None:
+            return chunk
+        padded = np.concatenate([self._history, chunk])
+        self._history = padded[-len(self._history):]
+        filtered = np.convolve(padded, self.kernel, mode="valid").astype(np.float32)
+        buf = np.concatenate([self._buffer, filtered])
+        span = len(buf) - 1 - self._position
+        count = int(np.ceil(span / self.step)) if span > 0 else 0
+        positions = self._position + np.arange(count) * self.step
+        index = positions.astype(np.int64)
+        frac = (positions - index).astype(np.float32)
+        out = buf[index] * (1 - frac) + buf[np.minimum(index + 1, len(buf) - 1)] * frac
+        next_position = self._position + count * self.step
+        keep_from = min(int(next_position), len(buf))
+        self._buffer = buf[keep_from:]
+        self._position = next_position - keep_from
+        return out
+
+
+# ============ VOICE ACTIVITY ============
+
+class VoiceActivityTrimmer:
+    """
+    Energy VAD on 30 ms frames against an adaptive noise floor. Voiced frames
+    are kept with PAD_MS of context on each side; longer silences are cut.
+    """
+
+    def __init__(self, rate: int, frame_ms: int = FRAME_MS, pad_ms: int = PAD_MS,
+                 min_speech_db: float = MIN_SPEECH_DB, margin_db: float = SPEECH_MARGIN_DB):
+        self.frame = max(1, rate * frame_ms // 1000)
+        self.pad_frames = max(1, pad_ms // frame_ms)
+        self.min_speech_db = min_speech_db
+        self.margin_db = margin_db
+        self.noise_db: Optional[float] = None
+        self.voiced_frames = 0
+        self._leftover = np.zeros(0, dtype=np.float32)
+        self._pending = deque(maxlen=self.pad_frames)
+        self._hangover = 0
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        samples = np.concatenate([self._leftover, samples])
+        whole = len(samples) // self.frame * self.frame
+        self._leftover = samples[whole:]
+        frames = samples[:whole].reshape(-1, self.frame)
+        levels = 10 * np.log10(np.mean(frames.astype(np.float64) ** 2, axis=1) + 1e-12)
+        kept = []
+        for frame, level in zip(frames, levels):
+            if self.noise_db is None:
+                # A recording can start mid-speech: never seed the floor above MIN_SPEECH_DB
+                self.noise_db = min(level, self.min_speech_db)
+            elif level < self.noise_db:
+                self.noise_db = level
+            else:
+                self.noise_db += NOISE_RISE_DB
+            if level > max(self.min_speech_db, self.noise_db + self.margin_db):
+                self.voiced_frames += 1
+                kept.extend(self._pending)
+                self._pending.clear()
+                kept.append(frame)
+                self._hangover = self.pad_frames
+            elif self._hangover > 0:
+                kept.append(frame)
+                self._hangover -= 1
+            else:
+                self._pending.append(frame)
+        return np.concatenate(kept) if kept else np.zeros(0, dtype=np.float32)
+
+    def flush(self) -> np.ndarray:
+        """The partial last frame, if it belongs to a voiced stretch."""
+        tail = self._leftover if self._hangover > 0 else np.zeros(0, dtype=np.float32)
+        self._leftover = np.zeros(0, dtype=np.float32)
+        return tail
+
+
+# ============ ENCODING ============
+
+def _to_pcm16(samples: np.ndarray) -> bytes:
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+class _WavSink:
+    def __init__(self, path: str, rate: int):
+        self._writer = wave.open(path, "wb")
+        self._writer.setnchannels(1)
+        self._writer.setsampwidth(2)
+        self._writer.setframerate(rate)
+
+    def write(self, pcm: bytes):
+        self._writer.writeframes(pcm)
+
+    def close(self):
+        self._writer.close()
+
+
+class _FfmpegSink:
+    """Raw PCM piped into an ffmpeg encoder (FLAC / Opus)."""
+
+    def __init__(self, path: str, rate: int, codec: str):
+        self._proc = subprocess.Popen(
+            ["ffmpeg", "-v", "error", "-y", "-f", "s16le", "-ar", str(rate), "-ac", "1", "-i", "pipe:0",
+             *FFMPEG_ENCODERS[codec], path],
+            stdin=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        )
+
+    def write(self, pcm: bytes):
+        self._proc.stdin.write(pcm)
+
+    def close(self):
+        self._proc.stdin.close()
+        if self._proc.wait() != 0:
+            raise RuntimeError("ffmpeg encoding failed")
+
+
+# ============ PIPELINE ============
+
+class PreprocessResult(NamedTuple):
+    path: str
+    mime_type: str
+    input_bytes: int
+    output_bytes: int
+    input_seconds: float
+    output_seconds: float
+    elapsed: float  # Preprocessing wall time
+    trimmed: bool  # False when no speech was found and the whole recording was kept
+    content_hash: str  # Of the normalized PCM: equal for the same recording in any container/codec
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.input_bytes - self.output_bytes
+
+
+def _readable_wav(path: str) -> bool:
+    try:
+        with wave.open(path, "rb"):
+            return True
+    except (wave.Error, EOFError):
+        return False  # Float or compressed WAV: left to ffmpeg
+
+
+def _source(path: str, mime: str):
+    """(sample rate, float32 mono chunks) or None when the format cannot be decoded here."""
+    if mime == "audio/wav" and _readable_wav(path):
+        return iter_wav(path)
+    if ffmpeg_available():
+        return TARGET_RATE, iter_ffmpeg(path)
+    return None
+
+
+def _run(path: str, mime: str, open_sink, vad: bool):
+    """
+    Stream the recording through resampler (+ VAD) into a sink.
+    Returns (input s, output s, voiced?, SHA-256 of the output PCM).
+    """
+    rate, chunks = _source(path, mime)
+    resampler = StreamingResampler(rate)
+    trimmer = VoiceActivityTrimmer(resampler.dst_rate) if vad else None
+    sink = open_sink(resampler.dst_rate)
+    digest = hashlib.sha256(PCM_HASH_VERSION + str(resampler.dst_rate).encode())
+    in_samples = out_samples = 0
+
+    def emit(samples):
+        nonlocal out_samples
+        pcm = _to_pcm16(samples)
+        out_samples += len(samples)
+        digest.update(pcm)
+        sink.write(pcm)
+
+    try:
+        for chunk in chunks:
+            in_samples += len(chunk)
+            samples = resampler.process(chunk)
+            emit(trimmer.process(samples) if trimmer is not None else samples)
+        if trimmer is not None:
+            emit(trimmer.flush())
+    finally:
+        sink.close()
+    voiced = trimmer is None or trimmer.voiced_frames > 0
+    return in_samples / rate, out_samples / resampler.dst_rate, voiced, digest.hexdigest()
+
+
+def preprocess(path: str, codec: str = CODEC, vad: bool = True,
+               out_dir: Optional[str] = None) -> Optional[PreprocessResult]:
+    """
+    Write a compact copy of the recording at `path` for transcription.
+    Returns None when the format cannot be decoded (no ffmpeg for non-WAV
+    input); the caller then sends the original. The caller deletes
+    result.path.
+    """
+    start = time.perf_counter()
+    mime = sniff_mime(path)
+    if not ((mime == "audio/wav" and _readable_wav(path)) or ffmpeg_available()):
+        return None
+    codec = resolve_codec(codec)
+    suffix, out_mime = CODECS[codec]
+    fd, out_path = tempfile.mkstemp(suffix=suffix, dir=out_dir)
+    os.close(fd)
+
+    def open_sink(rate):
+        return _WavSink(out_path, rate) if codec == "wav" else _FfmpegSink(out_path, rate, codec)
+
+    try:
+        in_seconds, out_seconds, voiced, content_hash = _run(path, mime, open_sink, vad)
+        if not voiced:
+            # No speech detected: keep the whole recording rather than send nothing
+            in_seconds, out_seconds, _, content_hash = _run(path, mime, open_sink, vad=False)
+    except Exception:
+        os.unlink(out_path)
+        raise
+    return PreprocessResult(
+        out_path, out_mime, os.path.getsize(path), os.path.getsize(out_path),
+        in_seconds, out_seconds, time.perf_counter() - start, trimmed=voiced, content_hash=content_hash,
+    )
+
+
+def file_hash(path: str, mime_type: str) -> str:
+    """Content hash of a recording that could not be decoded (sent as-is): its bytes."""
+    digest = hashlib.sha256(b"file:" + mime_type.encode())
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# ============ METRICS ============
+
+class AudioStats:
+    """Bytes saved by preprocessing and transcription latency with and without it."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._bytes = {"recordings": 0, "input_bytes": 0, "output_bytes": 0,
+                       "input_seconds": 0.0, "output_seconds": 0.0, "preprocess_seconds": 0.0}
+        self._latency = {"raw": [0, 0.0], "preprocessed": [0, 0.0]}  # [count, total seconds]
+
+    def record_preprocess(self, result: PreprocessResult):
+        with self._lock:
+            for key, value in (("recordings", 1), ("input_bytes", result.input_bytes),
+                               ("output_bytes", result.output_bytes), ("input_seconds", result.input_seconds),
+                               ("output_seconds", result.output_seconds), ("preprocess_seconds", result.elapsed)):
+                self._bytes[key] += value
+
+    def record_transcription(self, mode: str, seconds: float):
+        with self._lock:
+            self._latency[mode][0] += 1
+            self._latency[mode][1] += seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            snapshot = dict(self._bytes)
+            snapshot["bytes_saved"] = snapshot["input_bytes"] - snapshot["output_bytes"]
+            snapshot["transcription_latency"] = {
+                mode: {"count": count, "mean_seconds": total / count if count else None}
+                for mode, (count, total) in self._latency.items()
+            }
+        return snapshot
+
+
+stats = AudioStats()
@@ -0,0 +1,560 @@
+"""
+SAFE-Triage AI - Triage Audit Log
+Append-only, event-sourced record of every triage decision (input, engine
+and lexicon versions, result, raw AI output), kept out of the hot `patients`
+table.
+
+Storage layout (AUDIT_LOG_DIR, default ./audit_log):
+    segment-00000001.log.gz   closed segments, gzip-compressed after rotation
+    segment-00000002.log      the active segment
+    index.sqlite              (seq, patient, tenant, time) -> (segment, offset)
+
+A segment is MAGIC followed by length-prefixed records:
+    <u32 payload length> <u32 crc32(payload)> <1-byte codec> <payload>
+Payloads are msgpack (codec "M"); when msgpack is not installed they are
+compact JSON (codec "J") and readers accept both.
+
+Writers only enqueue: encoding, writes, fsync (every AUDIT_FSYNC_SECONDS) and
+compression happen on a background thread, so /triage does not wait on disk.
+A failed write or fsync (disk full) is counted and the writer moves on to a
+fresh segment; while the writer cannot keep up or is down, records that do
+not fit the queue within AUDIT_QUEUE_TIMEOUT seconds go to stderr as JSON
+lines instead of blocking triage, and /health reports the log degraded.
+Segments are never modified after they are written; a record torn by a crash
+can only be the last one of a segment and is skipped by readers.
+
+Usage:
+    python -m backend.audit_log stats
+    python -m backend.audit_log show --patient 42
+    python -m backend.audit_log replay --since 2026-01-01    # re-score with the current rules
+"""
+import argparse
+import atexit
+import gzip
+import json
+import mmap
+import os
+import queue
+import re
+import shutil
+import sqlite3
+import struct
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .logic.triage_engine import TriageEngine
+from .nlp.processor import NLPProcessor
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; records fall back to compact JSON
+    msgpack = None
+
+MAGIC = b"STAUDIT1"
+RECORD_HEADER = struct.Struct("<IIc")  # payload length, crc32, codec
+SEGMENT_RE = re.compile(r"^segment-(\d{8})\.log(\.gz)?$")
+INDEX_FILE = "index.sqlite"
+
+
+class AuditCorruption(Exception):
+    """A record in the middle of a segment failed its checksum."""
+
+
+def encode(record: dict) -> Tuple[bytes, bytes]:
+    if msgpack is not None:
+        return b"M", msgpack.packb(record, use_bin_type=True, default=str)
+    return b"J", json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+
+def decode(codec: bytes, payload) -> dict:
+    if codec == b"M":
+        if msgpack is None:
+            raise RuntimeError("Reading msgpack audit records requires msgpack (pip install msgpack)")
+        return msgpack.unpackb(payload, raw=False)
+    return json.loads(bytes(payload))
+
+
+def segment_name(number: int, compressed: bool = False) -> str:
+    return f"segment-{number:08d}.log" + (".gz" if compressed else "")
+
+
+def _open_index(directory: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(os.path.join(directory, INDEX_FILE), check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE IF NOT EXISTS audit_index (seq INTEGER PRIMARY KEY, patient_id INTEGER, "
+                 "tenant TEXT, ts REAL, segment INTEGER, offset INTEGER)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_audit_patient ON audit_index (patient_id, ts)")
+    conn.execute("CREATE INDEX IF NOT EXISTS ix_audit_ts ON audit_index (ts)")
+    return conn
+
+
+# ============ WRITER ============
+
+class _Flush:
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+class AuditLog:
+    def __init__(self, directory: str, segment_bytes: int = 64 << 20, fsync_interval: float = 1.0,
+                 queue_size: int = 100_000, compress: bool = True, queue_timeout: float = 2.0):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.compress = compress
+        self.queue_timeout = queue_timeout
+        os.makedirs(directory, exist_ok=True)
+        self._queue: "queue.Queue" = queue.Queue(maxsize=queue_size)
+        self._compressor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="audit-gzip")
+        self.stats = {"appended": 0, "written": 0, "bytes": 0, "fsyncs": 0, "segments": 0,
+                      "compressed": 0, "queue_full_waits": 0, "errors": 0, "lost": 0, "stderr_fallbacks": 0}
+        self.last_error: Optional[str] = None
+        self._failing = False  # Set by a failed write/fsync, cleared by the next successful fsync
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def from_env(cls) -> Optional["AuditLog"]:
+        if os.getenv("AUDIT_LOG", "1").lower() in ("0", "false", "no"):
+            return None
+        return cls(
+            os.getenv("AUDIT_LOG_DIR", "audit_log"),
+            segment_bytes=int(float(os.getenv("AUDIT_SEGMENT_MB", "64")) * (1 << 20)),
+            fsync_interval=float(os.getenv("AUDIT_FSYNC_SECONDS", "1.0")),
+            queue_timeout=float(os.getenv("AUDIT_QUEUE_TIMEOUT", "2.0")),
+        )
+
+    # ---- producer side (request threads) ----
+
+    def append(self, record: dict):
+        """Enqueue one event; waits at most queue_timeout when the writer is far behind."""
+        if self._closed:
+            raise RuntimeError("Audit log is closed")
+        record.setdefault("ts", time.time())
+        try:
+            if not self._thread.is_alive():
+                raise queue.Full
+            try:
+                self._queue.put_nowait(record)
+            except queue.Full:
+                self.stats["queue_full_waits"] += 1
+                self._queue.put(record, timeout=self.queue_timeout)
+        except queue.Full:
+            # Never drop a medicolegal record silently, never block triage on it either
+            self._to_stderr(record)
+            return
+        self.stats["appended"] += 1
+
+    def _to_stderr(self, record: dict):
+        self.stats["stderr_fallbacks"] += 1
+        self._failing = True
+        line = json.dumps({"audit": record}, ensure_ascii=False, separators=(",", ":"), default=str)
+        print(line, file=sys.stderr, flush=True)
+
+    def record_decision(self, patient_input: dict, result: dict, *, patient_id: Optional[int] = None,
+                        tenant: Optional[str] = None, endpoint: str = "triage",
+                        ai_output: Optional[dict] = None, thresholds: Optional[dict] = None):
+        self.append({
+            "patient_id": patient_id,
+            "tenant": tenant,
+            "endpoint": endpoint,
+            "input": patient_input,
+            "result": result,
+            "ai_output": ai_output,
+            "rules_version": TriageEngine.RULES_VERSION,
+            "lexicon_version": NLPProcessor.LEXICON_VERSION,
+            "thresholds": thresholds or {},
+        })
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Block until everything appended so far is written, fsynced and indexed."""
+        marker = _Flush()
+        try:
+            self._queue.put(marker, timeout=timeout)
+        except queue.Full:
+            return False
+        return marker.done.wait(timeout)
+
+    def close(self, timeout: float = 10.0):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            print("[AUDIT] Writer did not drain the queue before shutdown", file=sys.stderr)
+        self._thread.join(timeout)
+        self._compressor.shutdown(wait=True)
+
+    def health(self) -> dict:
+        """ok: the writer is alive and nothing failed (or went to stderr) since its last fsync."""
+        alive = self._thread.is_alive() or self._closed
+        return {"ok": alive and not self._failing, "writer_alive": self._thread.is_alive(),
+                "last_error": self.last_error, "queue_depth": self._queue.qsize(),
+                "stderr_fallbacks": self.stats["stderr_fallbacks"], "lost": self.stats["lost"]}
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, queue_depth=self._queue.qsize(), healthy=self.health()["ok"])
+
+    # ---- writer thread ----
+
+    def _run(self):
+        self._index = _open_index(self.directory)
+        self._seq = self._index.execute("SELECT COALESCE(MAX(seq), 0) FROM audit_index").fetchone()[0]
+        existing = sorted({int(m.group(1)) for m in map(SEGMENT_RE.match, os.listdir(self.directory)) if m})
+        if existing:
+            # Records written after the last index commit still own their seq numbers
+            reader = AuditReader(self.directory)
+            try:
+                for _, record in reader.iter_segment(reader._segment_path(existing[-1])):
+                    self._seq = max(self._seq, record.get("seq", 0))
+            except (AuditCorruption, OSError, ValueError) as e:
+                print(f"[AUDIT] Could not scan the last segment: {e}")
+        # A restart never appends to an old segment; leftovers of a crash get compressed
+        for number in existing:
+            self._schedule_compression(number)
+        self._segment = (existing[-1] if existing else 0)
+        self._file = None
+        try:
+            self._open_segment()
+        except OSError as e:
+            self._failed("open segment", e)
+        pending_rows: List[tuple] = []
+        last_sync = time.monotonic()
+        while True:
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                item = None
+            stop = item is _STOP
+            flush = isinstance(item, _Flush)
+            batch = []
+            if item is not None and not stop and not flush:
+                batch = [item]
+                while len(batch) < 1000:
+                    try:
+                        nxt = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if nxt is _STOP or isinstance(nxt, _Flush):
+                        stop, flush = nxt is _STOP, isinstance(nxt, _Flush)
+                        item = nxt
+                        break
+                    batch.append(nxt)
+            try:
+                for record in batch:
+                    self._write(record, pending_rows)
+                if stop or flush or time.monotonic() - last_sync >= self.fsync_interval:
+                    self._sync(pending_rows)
+                    last_sync = time.monotonic()
+            except Exception as e:  # Whatever happens, the writer thread must keep draining the queue
+                self._failed("writer", e)
+            if flush:
+                item.done.set()
+            if stop:
+                self._close_file()
+                if self.compress:
+                    # Inline: at interpreter exit the executor no longer accepts work
+                    self._compress(self._segment)
+                self._index.close()
+                return
+
+    def _open_segment(self):
+        self._segment += 1
+        segment = open(os.path.join(self.directory, segment_name(self._segment)), "wb")
+        try:
+            segment.write(MAGIC)
+        except OSError:
+            segment.close()
+            raise
+        self._file = segment
+        self._segment_size = len(MAGIC)
+        self.stats["segments"] += 1
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError as e:
+                self._failed("close", e)
+            self._file = None
+
+    def _failed(self, action: str, error: Exception):
+        self.stats["errors"] += 1
+        self.last_error = f"{action}: {error}"
+        self._failing = True
+        print(f"[AUDIT] {action} failed: {error}", file=sys.stderr)
+
+    def _recover(self, pending_rows: List[tuple]):
+        """After a failed write/fsync: the unsynced records of the segment may be gone, so they
+        leave the index; later records go to a fresh segment."""
+        self.stats["lost"] += len(pending_rows)
+        pending_rows.clear()
+        self._close_file()
+        try:
+            self._open_segment()
+        except OSError as e:
+            self._failed("open segment", e)
+            time.sleep(min(self.fsync_interval, 1.0))  # Disk still failing: do not spin
+
+    def _write(self, record: dict, pending_rows: List[tuple]):
+        try:
+            self._seq += 1
+            record["seq"] = self._seq
+            codec, payload = encode(record)
+            data = RECORD_HEADER.pack(len(payload), zlib.crc32(payload), codec) + payload
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"[AUDIT] Could not encode record: {e}")
+            return
+        for _ in range(2):  # Once more on a fresh segment after a failed write
+            if self._file is None:
+                self._recover(pending_rows)
+                if self._file is None:
+                    continue
+            offset = self._segment_size
+            try:
+                self._file.write(data)
+                break
+            except OSError as e:
+                self._failed("write", e)
+                self._recover(pending_rows)
+        else:
+            self._to_stderr(record)
+            return
+        self._segment_size += len(data)
+        pending_rows.append((self._seq, record.get("patient_id"), record.get("tenant"), record["ts"],
+                             self._segment, offset))
+        self.stats["written"] += 1
+        self.stats["bytes"] += len(data)
+        if self._segment_size >= self.segment_bytes and self._sync(pending_rows):
+            self._close_file()
+            self._schedule_compression(self._segment)
+            try:
+                self._open_segment()
+            except OSError as e:
+                self._failed("open segment", e)
+
+    def _sync(self, pending_rows: List[tuple]) -> bool:
+        if self._file is None:
+            return False
+        try:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+        except OSError as e:
+            self._failed("fsync", e)
+            self._recover(pending_rows)
+            return False
+        if pending_rows:
+            # Index rows only point at fsynced data
+            try:
+                self._index.executemany("INSERT OR REPLACE INTO audit_index VALUES (?, ?, ?, ?, ?, ?)", pending_rows)
+                self._index.commit()
+            except sqlite3.Error as e:
+                # The records are on disk; only lookups by patient miss them
+                self._failed("index", e)
+                pending_rows.clear()
+                return True
+            pending_rows.clear()
+        self.stats["fsyncs"] += 1
+        self._failing = False
+        return True
+
+    def _schedule_compression(self, number: int):
+        if self.compress and os.path.exists(os.path.join(self.directory, segment_name(number))):
+            self._compressor.submit(self._compress, number)
+
+    def _compress(self, number: int):
+        src = os.path.join(self.directory, segment_name(number))
+        dst = os.path.join(self.directory, segment_name(number, compressed=True))
+        try:
+            with open(src, "rb") as f_in, open(dst + ".tmp", "wb") as f_out:
+                with gzip.GzipFile(fileobj=f_out, mode="wb", compresslevel=6, mtime=0) as gz:
+                    shutil.copyfileobj(f_in, gz, 1 << 20)
+                f_out.flush()
+                os.fsync(f_out.fileno())
+            os.replace(dst + ".tmp", dst)
+            os.unlink(src)
+            self.stats["compressed"] += 1
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"[AUDIT] Could not compress {src}: {e}")
+
+
+# ============ READER ============
+
+def _parse(buf, start: int, path: str) -> Iterator[Tuple[int, bytes, memoryview]]:
+    """(offset, codec, payload) for each complete record in buf[start:]; stops at a torn tail."""
+    view = memoryview(buf)
+    try:
+        pos, end = start, len(buf)
+        while pos + RECORD_HEADER.size <= end:
+            length, crc, codec = RECORD_HEADER.unpack_from(buf, pos)
+            body = pos + RECORD_HEADER.size
+            if body + length > end:
+                return
+            if zlib.crc32(view[body:body + length]) != crc:
+                raise AuditCorruption(f"Checksum mismatch in {path} at offset {pos}")
+            yield pos, codec, view[body:body + length]
+            pos = body + length
+    finally:
+        # The mapping can only be closed once no views of it are left
+        view.release()
+
+
+class AuditReader:
+    """Streams segments via mmap (compressed ones are inflated from the mapping in 1 MB steps)."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def segments(self) -> List[Tuple[int, str]]:
+        found: Dict[int, str] = {}
+        for name in os.listdir(self.directory):
+            m = SEGMENT_RE.match(name)
+            if m and (int(m.group(1)) not in found or not m.group(2)):
+                # Prefer the plain file while both exist (compression just finished)
+                found[int(m.group(1))] = os.path.join(self.directory, name)
+        return sorted(found.items())
+
+    def _segment_path(self, number: int) -> str:
+        plain = os.path.join(self.directory, segment_name(number))
+        return plain if os.path.exists(plain) else plain + ".gz"
+
+    def iter_segment(self, path: str) -> Iterator[Tuple[int, dict]]:
+        """(offset, record) for every complete record of one segment."""
+        with open(path, "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if path.endswith(".gz"):
+                    yield from self._iter_compressed(mm, path)
+                    return
+                if mm[:len(MAGIC)] != MAGIC:
+                    raise AuditCorruption(f"{path} is not an audit segment")
+                for offset, codec, payload in _parse(mm, len(MAGIC), path):
+                    yield offset, decode(codec, payload)
+                    payload.release()
+
+    def _iter_compressed(self, mm, path: str) -> Iterator[Tuple[int, dict]]:
+        inflater = zlib.decompressobj(wbits=31)
+        buf = bytearray()
+        base = 0  # Offset of buf[0] in the uncompressed segment
+        started = False
+        for pos in range(0, len(mm), 1 << 20):
+            buf += inflater.decompress(mm[pos:pos + (1 << 20)])
+            if not started:
+                if len(buf) < len(MAGIC):
+                    continue
+                if bytes(buf[:len(MAGIC)]) != MAGIC:
+                    raise AuditCorruption(f"{path} is not an audit segment")
+                del buf[:len(MAGIC)]
+                base, started = len(MAGIC), True
+            consumed = 0
+            for offset, codec, payload in _parse(buf, 0, path):
+                yield base + offset, decode(codec, payload)
+                consumed = offset + RECORD_HEADER.size + len(payload)
+                payload.release()
+            del buf[:consumed]
+            base += consumed
+
+    def iter_records(self, since: Optional[float] = None, until: Optional[float] = None) -> Iterator[dict]:
+        """All records in write order, optionally limited to [since, until) (epoch seconds)."""
+        first_segment = 0
+        if since is not None and os.path.exists(os.path.join(self.directory, INDEX_FILE)):
+            with sqlite3.connect(os.path.join(self.directory, INDEX_FILE)) as conn:
+                row = conn.execute("SELECT MIN(segment) FROM audit_index WHERE ts >= ?", (since,)).fetchone()
+            first_segment = row[0] if row and row[0] is not None else 0
+        for number, path in self.segments():
+            if number < first_segment:
+                continue
+            for _, record in self.iter_segment(path):
+                ts = record.get("ts", 0)
+                if (since is None or ts >= since) and (until is None or ts < until):
+                    yield record
+
+    def for_patient(self, patient_id: int, tenant: Optional[str] = None) -> List[dict]:
+        """Every decision recorded for a patient, oldest first, located through the index."""
+        query = "SELECT segment, offset FROM audit_index WHERE patient_id = ?"
+        params: list = [patient_id]
+        if tenant is not None:
+            query += " AND tenant = ?"
+            params.append(tenant)
+        with sqlite3.connect(os.path.join(self.directory, INDEX_FILE)) as conn:
+            rows = conn.execute(query + " ORDER BY seq", params).fetchall()
+        wanted: Dict[int, set] = {}
+        for segment, offset in rows:
+            wanted.setdefault(segment, set()).add(offset)
+        records = []
+        for segment, offsets in sorted(wanted.items()):
+            path = self._segment_path(segment)
+            if path.endswith(".gz"):
+                records.extend(r for off, r in self.iter_segment(path) if off in offsets)
+                continue
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for offset in sorted(offsets):
+                    _, codec, payload = next(_parse(mm, offset, path))
+                    records.append(decode(codec, payload))
+                    payload.release()
+        return sorted(records, key=lambda r: r["seq"])
+
+
+# ============ CLI ============
+
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    if value is None:
+        return None
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect and replay the triage audit log")
+    parser.add_argument("command", choices=["stats", "show", "replay"])
+    parser.add_argument("--dir", default=os.getenv("AUDIT_LOG_DIR", "audit_log"))
+    parser.add_argument("--patient", type=int, help="show: one patient's decisions")
+    parser.add_argument("--tenant")
+    parser.add_argument("--since", help="ISO time (UTC if no offset)")
+    parser.add_argument("--until", help="ISO time (UTC if no offset)")
+    parser.add_argument("--engine", default="backend.logic.triage_engine:TriageEngine",
+                        help="replay: engine to re-score with, as module:Class")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    reader = AuditReader(args.dir)
+    since, until = _parse_time(args.since), _parse_time(args.until)
+    start = time.perf_counter()
+    if args.command == "stats":
+        count = sum(1 for _ in reader.iter_records(since, until))
+        sizes = sum(os.path.getsize(p) for _, p in reader.segments())
+        print(f"{count} records in {len(reader.segments())} segments ({sizes / 1e6:.1f} MB) "
+              f"read in {time.perf_counter() - start:.2f}s")
+    elif args.command == "show":
+        records = (reader.for_patient(args.patient, args.tenant) if args.patient is not None
+                   else reader.iter_records(since, until))
+        for record in records:
+            print(json.dumps(record, ensure_ascii=False, default=str))
+    else:
+        from .replay import ConfusionMatrix, chunked, parallel_score
+        matrix = ConfusionMatrix()
+        records = chunked(reader.iter_records(since, until), 500)
+        for record, level in parallel_score(records, lambda r: r["input"], args.engine, args.workers):
+            matrix.add(int(record["result"]["level"]), level)
+        print(matrix.format("Recorded decision", f"Replayed {args.engine}"))
+        print(f"{matrix.total + matrix.skipped} records in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
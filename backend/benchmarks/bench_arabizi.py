@@ -0,0 +1,52 @@
+"""
+SAFE-Triage AI - Arabizi Transliteration Benchmark
+Cost of the Franco-Arabic stage: English complaints with the stage on vs off
+(should be the same - cached fast path), and throughput on Arabizi
+complaints. Single process, so rates are per core.
+
+Usage:
+    python -m backend.benchmarks.bench_arabizi --complaints 20000
+"""
+import argparse
+import random
+
+from ..nlp.processor import NLPProcessor
+from .bench_nlp import measure, synthetic_complaints
+
+ARABIZI_TEMPLATES = [
+    "3andi da2 fe sedri men {n} sa3at", "mesh 2ader atnafes", "sedri bywga3ni awy",
+    "batni btwga3ni w baraga3", "3andi so5onia gamda", "3andi sodaa3 w dow5a",
+    "wa2a3t mn 3ala el sellem", "ana 7amel w ta3bana", "mo8ma 3aleh fe el beit", "dahri bywga3ni",
+]
+
+
+def synthetic_arabizi(n: int, seed: int = 13):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield f"{rng.choice(ARABIZI_TEMPLATES).format(n=rng.randint(1, 9))} #{i}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark Arabizi transliteration overhead")
+    parser.add_argument("--complaints", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    english = [t for t in synthetic_complaints(args.complaints * 3) if t.isascii()][: args.complaints]
+    arabizi = list(synthetic_arabizi(args.complaints))
+    with_stage, without_stage = NLPProcessor(), NLPProcessor(arabizi=False)
+
+    def run(nlp):
+        def analyze(text):
+            nlp.extract_symptoms(text)
+            nlp.detect_danger_keywords(text)
+        return analyze
+
+    # Best of 3 passes: token caches are warm, as in steady-state traffic
+    measure("english, arabizi stage off", english, run(without_stage), repeat=3)
+    measure("english, arabizi stage on", english, run(with_stage), repeat=3)
+    measure("arabizi complaints", arabizi, run(with_stage), repeat=3)
+    measure("transliteration only", arabizi, with_stage.arabizi.transliterate, repeat=3)
+
+
+if __name__ == "__main__":
+    main()
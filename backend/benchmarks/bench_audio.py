@@ -0,0 +1,79 @@
+"""
+SAFE-Triage AI - Audio Preprocessing Benchmark
+Synthetic 48 kHz stereo WAV recordings (speech-like bursts between pauses
+and background noise, as a browser records them): preprocessing speed, bytes
+saved and the upload time they stand for on a slow hospital uplink. With
+--transcribe (needs GEMINI_API_KEY) each recording is also sent to Gemini
+raw and preprocessed to compare end-to-end transcription latency.
+
+Usage:
+    python -m backend.benchmarks.bench_audio --seconds 60 --uplink-kbps 1000
+"""
+import argparse
+import os
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from .. import audio
+
+
+def synthetic_recording(path: str, seconds: float, rate: int = 48_000, speech_share: float = 0.4, seed: int = 5):
+    """Voiced bursts (harmonics with a syllable envelope) separated by pauses, written in 1 s chunks."""
+    rng = np.random.default_rng(seed)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        t0 = 0
+        for _ in range(int(seconds)):
+            t = (t0 + np.arange(rate)) / rate
+            samples = 0.002 * rng.standard_normal(rate)
+            if rng.random() < speech_share:
+                pitch = rng.uniform(100, 220)
+                voice = sum(np.sin(2 * np.pi * pitch * k * t) / k for k in range(1, 12))
+                samples += 0.15 * voice * (0.5 + 0.5 * np.sin(2 * np.pi * 4 * t))
+            pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+            w.writeframes(np.repeat(pcm, 2).tobytes())
+            t0 += rate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark audio preprocessing before transcription")
+    parser.add_argument("--seconds", type=float, default=60)
+    parser.add_argument("--recordings", type=int, default=3)
+    parser.add_argument("--uplink-kbps", type=float, default=1000, help="Upload bandwidth for the estimate")
+    parser.add_argument("--codec", default="auto", choices=["auto", *audio.CODECS])
+    parser.add_argument("--transcribe", action="store_true", help="Also time Gemini on raw vs preprocessed")
+    args = parser.parse_args(argv)
+
+    asr = None
+    if args.transcribe:
+        from ..medasr_service import medasr_service as asr
+
+    def upload_seconds(size):
+        return size * 8 / (args.uplink_kbps * 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(args.recordings):
+            source = os.path.join(tmp, f"recording_{i}.wav")
+            synthetic_recording(source, args.seconds, seed=i)
+            result = audio.preprocess(source, codec=args.codec, out_dir=tmp)
+            print(f"[{i}] {result.input_bytes / 1e6:6.2f} MB -> {result.output_bytes / 1e6:5.2f} MB "
+                  f"({result.output_bytes / result.input_bytes:5.1%}), {result.input_seconds:.0f}s -> "
+                  f"{result.output_seconds:.1f}s of audio, preprocessing {result.elapsed:.2f}s "
+                  f"({result.input_seconds / result.elapsed:,.0f}x realtime), upload at "
+                  f"{args.uplink_kbps:.0f} kbit/s {upload_seconds(result.input_bytes):.1f}s -> {upload_seconds(result.output_bytes):.1f}s")
+            if asr is not None:
+                for label, path, mime in (("raw", source, "audio/wav"),
+                                          ("preprocessed", result.path, result.mime_type)):
+                    start = time.perf_counter()
+                    ok = asr.transcribe(path, mime)["success"]
+                    print(f"    transcription {label:<13} {time.perf_counter() - start:6.2f}s  success={ok}")
+            os.unlink(result.path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+SAFE-Triage AI - Audit Log Benchmark
+Latency the audit log adds to a triage decision (rule evaluation alone vs
+evaluation + audit append), writer throughput including fsync and segment
+compression, and replay speed of the mmap reader.
+
+Usage:
+    python -m backend.benchmarks.bench_audit_log --decisions 50000 --segment-mb 4
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from ..audit_log import AuditLog, AuditReader
+from ..logic.triage_engine import TriageEngine
+from ..models import PatientInput
+
+COMPLAINTS = ["ألم في الصدر من الصبح", "chest pain radiating to left arm", "كحة وسخونية",
+              "sprained ankle", "ضيق في التنفس", "headache since yesterday"]
+
+
+def _percentiles(samples):
+    ordered = sorted(samples)
+    return (statistics.median(ordered) * 1e6, ordered[int(len(ordered) * 0.99)] * 1e6)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the triage audit log")
+    parser.add_argument("--decisions", type=int, default=50_000)
+    parser.add_argument("--segment-mb", type=float, default=4)
+    parser.add_argument("--fsync-seconds", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    engine = TriageEngine()
+    patients = [PatientInput(age=20 + i % 60, gender="male" if i % 2 else "female",
+                             chief_complaint_text=COMPLAINTS[i % len(COMPLAINTS)],
+                             vitals={"hr": 70 + i % 70, "spo2": 90 + i % 10})
+                for i in range(1000)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        log = AuditLog(tmp, segment_bytes=int(args.segment_mb * (1 << 20)), fsync_interval=args.fsync_seconds)
+        plain, audited = [], []
+        start = time.perf_counter()
+        for i in range(args.decisions):
+            patient = patients[i % len(patients)]
+            t0 = time.perf_counter()
+            result = engine.evaluate(patient)
+            t1 = time.perf_counter()
+            log.record_decision(patient.model_dump(mode="json"), result.model_dump(mode="json"),
+                                patient_id=i, tenant="default")
+            t2 = time.perf_counter()
+            plain.append(t1 - t0)
+            audited.append(t2 - t0)
+        enqueued = time.perf_counter() - start
+        log.close()
+        drained = time.perf_counter() - start
+
+        p50, p99 = _percentiles(plain)
+        a50, a99 = _percentiles(audited)
+        stats = log.snapshot()
+        size = sum(os.path.getsize(os.path.join(tmp, n)) for n in os.listdir(tmp) if n.startswith("segment-"))
+        print(f"Decision latency   rules only p50 {p50:7.1f}us p99 {p99:7.1f}us | "
+              f"+ audit p50 {a50:7.1f}us p99 {a99:7.1f}us")
+        print(f"Writer             {args.decisions} records enqueued in {enqueued:.2f}s, on disk after "
+              f"{drained:.2f}s ({args.decisions / drained:,.0f}/s), {stats['fsyncs']} fsyncs, "
+              f"{stats['segments']} segments")
+        print(f"Storage            {stats['bytes'] / 1e6:.1f} MB written -> {size / 1e6:.1f} MB compressed "
+              f"({stats['bytes'] / args.decisions:.0f} B/record)")
+
+        reader = AuditReader(tmp)
+        start = time.perf_counter()
+        count = sum(1 for _ in reader.iter_records())
+        elapsed = time.perf_counter() - start
+        print(f"Replay             {count} records in {elapsed:.2f}s ({count / elapsed:,.0f}/s)")
+        start = time.perf_counter()
+        history = reader.for_patient(args.decisions // 2)
+        print(f"Patient lookup     {len(history)} record(s) in {(time.perf_counter() - start) * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+SAFE-Triage AI - Binary Triage Benchmark
+CPU per patient for JSON /triage against binary /triage/binary, in two parts:
+
+    codec     decode + TriageEngine.evaluate + encode, no HTTP or storage:
+              json.loads + PatientInput + FastAPI's response encoding
+              against binary_triage records
+    endpoint  the full requests through the in-process client on a scratch
+              SQLite database (saving and auditing included), less the cost
+              of a request to GET /; binary sent one patient per request and
+              in batches
+
+Usage:
+    python -m backend.benchmarks.bench_binary_triage --patients 2000 --batch 32
+"""
+import argparse
+import importlib
+import json
+import os
+import tempfile
+import time
+
+from ..scenarios import random_patients
+
+
+def _cpu_per(fn, items):
+    start = time.process_time()
+    for item in items:
+        fn(item)
+    return (time.process_time() - start) / len(items)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark binary against JSON triage")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--batch", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'patients.db')}"
+        os.environ["AUDIT_LOG_DIR"] = os.path.join(tmp, "audit")
+        app_module = importlib.import_module("backend.main")
+        from fastapi.encoders import jsonable_encoder
+        from fastapi.testclient import TestClient
+
+        from .. import binary_triage
+        from ..models import PatientInput, TriageResult
+
+        app_module.send_critical_alert = lambda *a, **k: None
+        engine = app_module.tenants.registry.get().engine
+        patients = random_patients(args.patients, seed=9)
+        json_bodies = [json.dumps(p).encode() for p in patients]
+        binary_bodies = [binary_triage.encode_patients([p]) for p in patients]
+
+        def via_json(body):
+            result = engine.evaluate(PatientInput(**json.loads(body)))
+            # What response_model=TriageResult does with the returned model
+            return json.dumps(jsonable_encoder(TriageResult.model_validate(result.model_dump()))).encode()
+
+        def via_binary(body):
+            patients = binary_triage.decode_patients(body)
+            return binary_triage.encode_results([engine.evaluate(patients[0])], [None])
+
+        engine_only = _cpu_per(engine.evaluate, [binary_triage.decode_patients(b)[0] for b in binary_bodies])
+        json_cpu, binary_cpu = _cpu_per(via_json, json_bodies), _cpu_per(via_binary, binary_bodies)
+        json_bytes = sum(map(len, json_bodies)) / len(patients)
+        binary_bytes = sum(map(len, binary_bodies)) / len(patients)
+        print(f"Codec, {args.patients:,} patients (TriageEngine.evaluate alone {engine_only * 1e6:6.0f} µs)")
+        print(f"{'':<10} {'µs/patient':>11} {'overhead µs':>12} {'request B':>10} {'response B':>11}")
+        print(f"{'json':<10} {json_cpu * 1e6:>11.0f} {(json_cpu - engine_only) * 1e6:>12.0f} {json_bytes:>10.0f} "
+              f"{sum(len(via_json(b)) for b in json_bodies[:200]) / 200:>11.0f}")
+        print(f"{'binary':<10} {binary_cpu * 1e6:>11.0f} {(binary_cpu - engine_only) * 1e6:>12.0f} {binary_bytes:>10.0f} "
+              f"{sum(len(via_binary(b)) for b in binary_bodies[:200]) / 200:>11.0f}")
+
+        client = TestClient(app_module.app)
+        headers = {"Content-Type": binary_triage.BINARY_MEDIA_TYPE}
+        overhead = _cpu_per(lambda _: client.get("/"), range(300))
+        batches = [binary_triage.encode_patients(patients[i:i + args.batch])
+                   for i in range(0, len(patients), args.batch)]
+        modes = [
+            ("json", lambda body: client.post("/triage", content=body, headers={"Content-Type": "application/json"}),
+             json_bodies, 1),
+            ("binary", lambda body: client.post("/triage/binary", content=body, headers=headers), binary_bodies, 1),
+            (f"binary x{args.batch}", lambda body: client.post("/triage/binary", content=body, headers=headers),
+             batches, args.batch),
+        ]
+        print(f"\nEndpoint (less {overhead * 1e3:.2f} ms per request for GET /)")
+        print(f"{'':<12} {'CPU ms/patient':>15}")
+        baseline = None
+        for name, send, bodies, per_request in modes:
+            cpu = _cpu_per(send, bodies)
+            per_patient = max(0.0, cpu - overhead) / per_request
+            line = f"{name:<12} {per_patient * 1e3:>15.3f}"
+            if baseline is None:
+                baseline = per_patient
+            else:
+                line += f"   {per_patient / baseline - 1:+.0%}"
+            print(line)
+        app_module.vitals_ingest.close()
+        app_module.audit_log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+SAFE-Triage AI - Bulk Import / Export Benchmark
+Loads N synthetic patients into a scratch SQLite database, exports them in
+every format and re-imports the exports. Target: 1M rows in under a minute.
+
+Usage:
+    python -m backend.benchmarks.bench_bulk_io --rows 1000000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+
+from ..database import Base
+from .. import bulk_io
+
+COMPLAINTS = [
+    "chest pain radiating to arm", "صدري بيوجعني", "stomach pain and vomiting",
+    "وقعت من السلم وايدي وارمة", "fever and sore throat", "عندي سخونية",
+    "cut on hand, needs stitches", "short of breath", "مغص شديد", "runny nose",
+]
+
+
+def synthetic_rows(n, seed=7):
+    rng = random.Random(seed)
+    for i in range(n):
+        yield {
+            "id": i + 1, "name": "Unknown", "age": rng.randint(1, 90),
+            "gender": rng.choice(["male", "female"]),
+            "vitals_hr": rng.randint(50, 140), "vitals_rr": rng.randint(10, 30),
+            "vitals_spo2": rng.randint(88, 100), "vitals_temp": round(rng.uniform(35.5, 40), 1),
+            "vitals_sbp": rng.randint(80, 190), "vitals_dbp": rng.randint(50, 110),
+            "vitals_gcs": 15, "vitals_pain_score": rng.randint(0, 10),
+            "chief_complaint": rng.choice(COMPLAINTS), "triage_level": rng.randint(1, 5),
+            "triage_color": "#eab308", "triage_label_en": "Urgent (Level 3)",
+            "triage_label_ar": "عاجل (مستوى ٣)", "triage_reasoning": '["reason"]',
+            "triage_red_flags": "[]", "created_at": "2025-01-01T08:00:00",
+        }
+
+
+def timed(label, rows, fn):
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {rows:>10,} rows  {elapsed:7.2f}s  {rows / elapsed:>12,.0f} rows/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--chunk-size", type=int, default=bulk_io.DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bind = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(bind)
+
+        seed_csv = os.path.join(tmp, "seed.csv")
+        with open(seed_csv, "w", newline="", encoding="utf-8") as f:
+            import csv
+            writer = csv.DictWriter(f, fieldnames=bulk_io.EXPORT_COLUMNS)
+            writer.writeheader()
+            writer.writerows(synthetic_rows(args.rows))
+
+        timed("import csv (executemany)", args.rows,
+              lambda: bulk_io.import_patients(seed_csv, bind=bind, chunk_size=args.chunk_size,
+                                               update_rollups=False))
+
+        formats = ["csv", "sqlite"] + (["parquet", "arrow"] if bulk_io.pa is not None else [])
+        for fmt in formats:
+            ext = "db" if fmt == "sqlite" else fmt
+            path = os.path.join(tmp, f"export.{ext}")
+            timed(f"export {fmt}", args.rows,
+                  lambda: bulk_io.export_patients(path, fmt, bind=bind, chunk_size=args.chunk_size))
+            print(f"{'':<28} {os.path.getsize(path) / 1e6:10.1f} MB on disk")
+
+            target = create_engine(f"sqlite:///{os.path.join(tmp, f'import_{fmt}.db')}")
+            Base.metadata.create_all(target)
+            timed(f"import {fmt}", args.rows,
+                  lambda: bulk_io.import_patients(path, fmt, bind=target, chunk_size=args.chunk_size,
+                                                  update_rollups=False))
+            target.dispose()
+
+
+if __name__ == "__main__":
+    main()
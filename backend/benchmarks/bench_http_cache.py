@@ -0,0 +1,123 @@
+"""
+SAFE-Triage AI - Dashboard Polling Benchmark
+A room of dashboards polling GET /patients while patients keep arriving,
+against the app on a scratch SQLite database. Each dashboard polls the
+first page in three ways:
+
+    plain        full body, no validators, no compression
+    gzip         compressed body, no validators
+    conditional  compressed body, If-None-Match with the last ETag (304 when unchanged)
+
+Reports bytes on the wire and CPU per poll, less the cost of a request to
+GET / through the same in-process client. Also times encoding a page of
+ORM rows with FastAPI's encoder against orjson.
+
+Usage:
+    python -m backend.benchmarks.bench_http_cache --dashboards 30 --rounds 40
+"""
+import argparse
+import importlib
+import json
+import os
+import tempfile
+import time
+
+COMPLAINTS = ["chest pain", "صدري بيوجعني", "headache", "كحة وسخونية", "abdominal pain", "ضيق في التنفس"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark conditional GETs and compression for /patients")
+    parser.add_argument("--dashboards", type=int, default=30)
+    parser.add_argument("--rounds", type=int, default=40, help="Poll rounds (every dashboard polls once per round)")
+    parser.add_argument("--arrival-every", type=int, default=4, help="One new patient every N rounds")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'patients.db')}"
+        os.environ["AUDIT_LOG_DIR"] = os.path.join(tmp, "audit")
+        app_module = importlib.import_module("backend.main")
+        from fastapi.encoders import jsonable_encoder
+        from fastapi.testclient import TestClient
+        from sqlalchemy import select
+
+        from .. import crud, http_cache
+        from ..models import PatientInput
+        from ..sql_models import Patient
+
+        app_module.send_critical_alert = lambda *a, **k: None
+        tenant = app_module.tenants.registry.get()
+        engine = tenant.engine
+
+        def arrive(i):
+            patient = PatientInput(age=20 + i % 60, gender="female" if i % 2 else "male",
+                                   chief_complaint_text=COMPLAINTS[i % len(COMPLAINTS)],
+                                   vitals={"hr": 70 + i % 50, "rr": 16, "spo2": 97, "sbp": 120})
+            result = engine.evaluate(patient).model_dump()
+            with tenant.SessionLocal() as db:
+                tenant.patients.put([crud.create_patient_record(db, patient, result)])
+
+        for i in range(max(args.limit, 200)):
+            arrive(i)
+        client = TestClient(app_module.app)
+        params = {"limit": args.limit}
+
+        with tenant.SessionLocal() as db:
+            rows = db.scalars(select(Patient).order_by(Patient.id.desc()).limit(args.limit)).all()
+        repeats = 200
+        start = time.perf_counter()
+        for _ in range(repeats):
+            json.dumps(jsonable_encoder(rows)).encode()
+        fastapi_time = (time.perf_counter() - start) / repeats
+        start = time.perf_counter()
+        for _ in range(repeats):
+            http_cache.dumps([app_module.PatientRecord.from_row(row).as_dict() for row in rows])
+        orjson_time = (time.perf_counter() - start) / repeats
+        print(f"Encode {args.limit} ORM rows: jsonable_encoder + json {fastapi_time * 1e3:6.2f} ms, "
+              f"records + {'orjson' if http_cache.orjson else 'json'} {orjson_time * 1e3:6.2f} ms")
+
+        start = time.process_time()
+        for _ in range(repeats):
+            client.get("/")
+        overhead = (time.process_time() - start) / repeats
+
+        print(f"{args.dashboards} dashboards x {args.rounds} rounds, one arrival every {args.arrival_every} rounds")
+        print(f"{'mode':<12} {'polls':>7} {'200s':>6} {'304s':>6} {'bytes/poll':>11} {'CPU ms/poll':>12}")
+        arrivals = 1000
+        baseline = None
+        for mode in ("plain", "gzip", "conditional"):
+            etags = [None] * args.dashboards
+            sent = full = not_modified = 0
+            cpu = 0.0
+            for round_no in range(args.rounds):
+                if round_no % args.arrival_every == 0:
+                    arrive(arrivals)
+                    arrivals += 1
+                for d in range(args.dashboards):
+                    headers = {"Accept-Encoding": "identity" if mode == "plain" else "gzip"}
+                    if mode == "conditional" and etags[d]:
+                        headers["If-None-Match"] = etags[d]
+                    start = time.process_time()
+                    response = client.get("/patients", params=params, headers=headers)
+                    cpu += time.process_time() - start
+                    sent += int(response.headers.get("content-length", len(response.content)))
+                    if response.status_code == 304:
+                        not_modified += 1
+                    else:
+                        full += 1
+                        etags[d] = response.headers.get("ETag")
+            polls = args.dashboards * args.rounds
+            cpu = max(0.0, cpu - overhead * polls)
+            line = (f"{mode:<12} {polls:>7,} {full:>6,} {not_modified:>6,} {sent / polls:>11,.0f} "
+                    f"{cpu / polls * 1e3:>12.3f}")
+            if baseline is None:
+                baseline = (sent, cpu)
+            else:
+                line += f"   bytes {sent / baseline[0] - 1:+.0%}, CPU {cpu / baseline[1] - 1:+.0%}"
+            print(line)
+        app_module.vitals_ingest.close()
+        app_module.audit_log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+SAFE-Triage AI - Vitals Ingest Benchmark
+HL7v2 and FHIR parse throughput, then end-to-end re-triage: generated
+monitor traffic for a ward of patients in a scratch SQLite database goes
+through the MLLP listener (or straight into the micro-batcher with
+--no-network) until every observation is applied.
+
+Usage:
+    python -m backend.benchmarks.bench_ingest --messages 20000 --patients 500
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from ..ingest import generator
+from ..ingest.fhir import parse_document
+from ..ingest.hl7 import parse_message
+from ..ingest.server import MLLPServer
+from ..ingest.service import VitalsIngest
+from ..logic.triage_engine import TriageEngine
+from ..sql_models import Patient
+from ..tenants import DEFAULT_TENANT, Tenant, TenantConfig, TenantRegistry
+
+COMPLAINTS = ["chest pain", "صدري بيوجعني", "headache", "كحة وسخونية", "abdominal pain", "ضيق في التنفس"]
+
+
+def rate(label, count, unit, elapsed):
+    print(f"{label:<30} {count:>9,} {unit:<13} {elapsed:7.2f}s  {count / elapsed:>11,.0f} {unit}/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark HL7v2/FHIR vitals ingest")
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--patients", type=int, default=500)
+    parser.add_argument("--max-batch", type=int, default=1000)
+    parser.add_argument("--max-delay-ms", type=float, default=50)
+    parser.add_argument("--no-network", action="store_true", help="Skip the MLLP listener")
+    args = parser.parse_args(argv)
+
+    ward = generator.Ward(list(range(1, args.patients + 1)))
+    readings = list(ward.readings(args.messages))
+    messages = [generator.oru_message(pid, vitals, f"B{i}") for i, (pid, vitals) in enumerate(readings)]
+    per_message = len(generator.MDC)
+
+    start = time.perf_counter()
+    parsed = [parse_message(m) for m in messages]
+    rate("HL7v2 parse", len(messages) * per_message, "observations", time.perf_counter() - start)
+    bundles = [generator.fhir_bundle(readings[i:i + 50]) for i in range(0, len(readings), 50)]
+    start = time.perf_counter()
+    fhir_count = sum(len(parse_document(b)[0]) for b in bundles)
+    rate("FHIR parse", fhir_count, "observations", time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bind = create_engine(f"sqlite:///{os.path.join(tmp, 'ingest.db')}")
+        tenant = Tenant(DEFAULT_TENANT, TenantConfig(), bind=bind, engine=TriageEngine())
+        rng = random.Random(3)
+        with Session(bind) as db:
+            db.add_all(Patient(id=i, age=rng.randint(1, 90), gender=rng.choice(["male", "female"]),
+                               chief_complaint=rng.choice(COMPLAINTS), vitals={}, triage_level=5)
+                       for i in range(1, args.patients + 1))
+            db.commit()
+        ingest = VitalsIngest(TenantRegistry(default=tenant), max_batch=args.max_batch,
+                              max_delay=args.max_delay_ms / 1000)
+
+        start = time.perf_counter()
+        if args.no_network:
+            for message in parsed:
+                while not ingest.submit(DEFAULT_TENANT, message.observations):
+                    time.sleep(0.01)
+        else:
+            async def run():
+                server = MLLPServer(ingest)
+                listener = await server.start("127.0.0.1", 0)
+                try:
+                    return await generator.send_mllp("127.0.0.1", listener.sockets[0].getsockname()[1], messages)
+                finally:
+                    await server.stop()
+            report = asyncio.run(run())
+            print(f"{'MLLP acknowledged':<30} {report['messages']:>9,} {'messages':<13} "
+                  f"{report['seconds']:7.2f}s  {report['per_second']:>11,.0f} messages/s  {report['acks']}")
+        ingest.flush(timeout=600)
+        rate("Applied and re-triaged", ingest.stats["observations"], "observations", time.perf_counter() - start)
+        batcher = ingest.batcher.stats
+        print(f"{batcher['batches']} batches (largest {batcher['largest_batch']}), "
+              f"{ingest.stats['reevaluated']:,} re-evaluations, {ingest.stats['escalations']:,} escalations")
+        ingest.close()
+        tenant.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+SAFE-Triage AI - NLP Matching Benchmark
+Throughput of NLPProcessor (symptom extraction + danger keywords) on a
+synthetic stream of unique English/Arabic complaints, a share of them with
+typos, against the previous one-regex-per-term scan. Single process, so the
+rate is per core. Target: 10k complaints/s.
+
+Usage:
+    python -m backend.benchmarks.bench_nlp --complaints 50000
+"""
+import argparse
+import random
+import re
+import sys
+import time
+
+from ..nlp.processor import NLPProcessor
+
+TEMPLATES = [
+    "chest pain radiating to left arm", "shortness of breath since {n} days", "fever and sore throat",
+    "fell from stairs, swollen ankle", "cut on hand, needs stitches", "stomach pain and vomiting",
+    "headache and dizziness for {n} hours", "runny nose and cough", "seizure at home {n} minutes ago",
+    "burning urination and flank pain", "lower back pain after lifting", "rash and itching all over",
+    "صدري بيوجعني من {n} ساعات", "مش قادر اتنفس", "وقعت من السلم وايدي وارمة", "عندي سخونية من {n} يوم",
+    "مغص شديد وترجيع", "مغمى عليه في البيت", "صداع جامد ودوخة", "ضهري بيوجعني",
+]
+FILLERS = ["", "patient says", "mother reports", "since morning", "بقاله", "من امبارح", "very bad", "جامد"]
+KEYBOARD = "qwertyuiopasdfghjklzxcvbnm"
+
+
+def add_typo(text: str, rng: random.Random) -> str:
+    words = text.split()
+    i = rng.randrange(len(words))
+    w = words[i]
+    if len(w) > 4:
+        j = rng.randrange(1, len(w) - 1)
+        op = rng.random()
+        if op < 0.4:
+            w = w[:j] + w[j + 1] + w[j] + w[j + 2:]
+        elif op < 0.8:
+            w = w[:j] + w[j + 1:]
+        else:
+            w = w[:j] + rng.choice(KEYBOARD) + w[j:]
+    words[i] = w
+    return " ".join(words)
+
+
+def synthetic_complaints(n: int, typo_rate: float = 0.3, seed: int = 11):
+    rng = random.Random(seed)
+    for i in range(n):
+        text = rng.choice(TEMPLATES).format(n=rng.randint(1, 9))
+        if rng.random() < typo_rate:
+            text = add_typo(text, rng)
+        yield f"{rng.choice(FILLERS)} {text} #{i}".strip()
+
+
+def legacy_scan(nlp: NLPProcessor, text: str):
+    """The pre-index implementation: one regex search per lexicon term."""
+    text_lower = text.lower()
+    symptoms = []
+    for category, keywords in nlp.concepts.items():
+        for kw in keywords:
+            if re.search(r'\b' + re.escape(kw.lower()) + r'\b', text_lower) or kw in text:
+                symptoms.append(category)
+                break
+    danger = [t for t in nlp.danger_terms
+              if re.search(r'\b' + re.escape(t.lower()) + r'\b', text_lower) or t in text]
+    return symptoms, danger
+
+
+def measure(label: str, texts, fn, repeat: int = 1) -> float:
+    """Best of `repeat` timed passes over the texts."""
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for text in texts:
+            fn(text)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    rate = len(texts) / elapsed
+    print(f"{label:<32} {len(texts):>8,} complaints  {elapsed:7.2f}s  {rate:>10,.0f}/s")
+    return rate
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark lexicon matching throughput")
+    parser.add_argument("--complaints", type=int, default=50_000)
+    parser.add_argument("--typo-rate", type=float, default=0.3)
+    parser.add_argument("--min-rate", type=float, default=10_000,
+                        help="Exit non-zero when the indexed matcher is slower (complaints/s)")
+    parser.add_argument("--skip-legacy", action="store_true")
+    args = parser.parse_args(argv)
+
+    texts = list(synthetic_complaints(args.complaints, args.typo_rate))
+    nlp = NLPProcessor()
+
+    def indexed(text):
+        nlp.extract_symptoms(text)
+        nlp.detect_danger_keywords(text)
+
+    rate = measure("indexed (exact + fuzzy)", texts, indexed)
+    if not args.skip_legacy:
+        legacy = texts[: max(1, len(texts) // 10)]
+        measure("legacy regex scan", legacy, lambda t: legacy_scan(nlp, t))
+        typo_texts = [t for t in texts[:5000] if legacy_scan(nlp, t) != (nlp.extract_symptoms(t), nlp.detect_danger_keywords(t))]
+        print(f"Complaints matched differently thanks to typo tolerance: {len(typo_texts)} of {min(5000, len(texts))}")
+    return rate >= args.min_rate
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,76 @@
+"""
+SAFE-Triage AI - Pediatric Vital-Sign Centile Benchmark
+Startup cost of building the monthly centile tables, per-lookup cost of the
+scalar and vectorized forms, and single vs batch triage of children.
+
+Usage:
+    python -m backend.benchmarks.bench_pediatric_vitals --patients 20000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from ..logic import pediatric_vitals
+from ..logic.pediatric_vitals import HEART_RATE, CentileTable
+from ..logic.triage_engine import TriageEngine
+from ..models import PatientInput
+
+COMPLAINTS = ["كحة وسخونية", "fever and cough", "ترجيع واسهال", "runny nose", "fell and cut my hand, bleeding wound"]
+
+
+def per_item(label, count, elapsed):
+    print(f"{label:<36} {count:>9,}  {elapsed:8.4f}s  {elapsed / count * 1e9:>10,.0f} ns each")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark pediatric centile lookups")
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--patients", type=int, default=20_000)
+    args = parser.parse_args(argv)
+
+    builds = 100
+    start = time.perf_counter()
+    for _ in range(builds):
+        CentileTable(pediatric_vitals.CENTILES, pediatric_vitals.band_midpoints(pediatric_vitals.HEART_RATE_BANDS))
+        CentileTable(pediatric_vitals.CENTILES, pediatric_vitals.band_midpoints(pediatric_vitals.RESP_RATE_BANDS))
+        CentileTable(pediatric_vitals.SBP_CENTILES, pediatric_vitals.SBP_KNOTS)
+    per_item("Build HR + RR + SBP tables", builds, time.perf_counter() - start)
+
+    rng = np.random.default_rng(5)
+    ages = rng.uniform(0, 14, args.lookups)
+    age_list = ages.tolist()
+    start = time.perf_counter()
+    for age in age_list:
+        HEART_RATE.value(90, age)
+    per_item("Scalar lookup", args.lookups, time.perf_counter() - start)
+    start = time.perf_counter()
+    HEART_RATE.values(90, ages)
+    per_item("Vectorized lookup", args.lookups, time.perf_counter() - start)
+
+    engine = TriageEngine()
+    start = time.perf_counter()
+    for age in age_list[:args.patients]:
+        engine._pediatric_limits(age)
+    per_item("All limits for one child", args.patients, time.perf_counter() - start)
+    start = time.perf_counter()
+    engine._pediatric_limits_batch(ages[:args.patients])
+    per_item("All limits, batch", args.patients, time.perf_counter() - start)
+
+    patients = [PatientInput(age=round(float(age), 2), gender="male", chief_complaint_text=COMPLAINTS[i % len(COMPLAINTS)],
+                             vitals={"hr": int(rng.normal(130, 25)), "rr": int(rng.normal(30, 10)),
+                                     "sbp": int(rng.normal(100, 12)), "spo2": 97, "temp": 38.2})
+                for i, age in enumerate(age_list[:args.patients])]
+    start = time.perf_counter()
+    single = [engine.evaluate(p) for p in patients]
+    per_item("Triage children, one by one", len(patients), time.perf_counter() - start)
+    start = time.perf_counter()
+    batch = engine.evaluate_batch(patients)
+    per_item("Triage children, evaluate_batch", len(patients), time.perf_counter() - start)
+    assert [r.level for r in single] == [r.level for r in batch]
+    levels = np.bincount([int(r.level) for r in batch], minlength=6)[1:]
+    print("Levels 1-5:", ", ".join(f"{count:,}" for count in levels))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+SAFE-Triage AI - Complaint Search Benchmark
+Fills a scratch SQLite database with N synthetic patients (the FTS index is
+maintained by the insert triggers), then times ranked FTS5 searches against
+the LIKE scan they replace.
+
+Usage:
+    python -m backend.benchmarks.bench_search --rows 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from .. import database, migrations, search
+from ..sql_models import Patient
+
+COMPLAINTS = [
+    "chest pain radiating to arm", "صدري بيوجعني", "stomach pain and vomiting", "وقعت من السلم وايدي وارمة",
+    "fever and sore throat", "عندي سخونية", "cut on hand, needs stitches", "short of breath", "مغص شديد",
+    "runny nose", "ضربة شمس ودوخة", "إغماء في الشغل", "headache and blurred vision", "كحة وسخونية",
+    "back pain after lifting", "وجع في الضهر", "burn on forearm from boiling water", "ترجيع واسهال",
+]
+RARE = ["snake bite on the ankle", "لدغة عقرب في الرجل", "لدغة ثعبان", "dog bite, deep wound"]
+QUERIES = ["snake bite", "لدغه عقرب", "كل حالات ضربة الشمس", "chest pain", "وجع الضهر", "burn forearm"]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark FTS5 complaint search")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(3)
+    start_day = datetime.utcnow() - timedelta(minutes=args.rows * 0.5)  # One arrival every 30 s up to now
+    with tempfile.TemporaryDirectory() as tmp:
+        bind = database.create_bind(f"sqlite:///{os.path.join(tmp, 'search.db')}")
+        migrations.upgrade(bind)
+
+        start = time.perf_counter()
+        with bind.begin() as conn:
+            raw = conn.connection.driver_connection
+            batch = []
+            for i in range(args.rows):
+                complaint = rng.choice(RARE) if rng.random() < 0.002 else rng.choice(COMPLAINTS)
+                created = start_day + timedelta(minutes=i * 0.5)
+                batch.append((complaint, rng.randint(1, 5), created.isoformat(sep=" ")))
+                if len(batch) == 50_000:
+                    raw.executemany("INSERT INTO patients (chief_complaint, triage_level, created_at) VALUES (?, ?, ?)",
+                                    batch)
+                    batch = []
+            raw.executemany("INSERT INTO patients (chief_complaint, triage_level, created_at) VALUES (?, ?, ?)", batch)
+        elapsed = time.perf_counter() - start
+        print(f"Insert with FTS triggers   {args.rows:>10,} rows  {elapsed:7.2f}s  {args.rows / elapsed:>10,.0f} rows/s")
+
+        start = time.perf_counter()
+        search.rebuild(bind)
+        print(f"Rebuild index              {args.rows:>10,} rows  {time.perf_counter() - start:7.2f}s")
+        print(f"Database size              {os.path.getsize(os.path.join(tmp, 'search.db')) / 1e6:10.1f} MB")
+
+        print(f"\n{'query':<24} {'hits':>7} {'FTS5 ms':>9} {'LIKE ms':>9}")
+        with Session(bind) as db:
+            for query in QUERIES:
+                timings = []
+                for _ in range(args.repeats):
+                    start = time.perf_counter()
+                    results = search.search_patients(db, query, limit=20)["results"]
+                    timings.append(time.perf_counter() - start)
+                terms = search.query_terms(query)
+                # The scan a search box would otherwise run, on the raw text (no Arabic folding)
+                like = select(Patient.id).where(*[Patient.chief_complaint.like(f"%{t}%") for t in terms])
+                start = time.perf_counter()
+                scanned = db.execute(like.order_by(Patient.created_at.desc()).limit(20)).all()
+                like_time = time.perf_counter() - start
+                print(f"{query:<24} {len(results):>7} {statistics.median(timings) * 1e3:>9.2f} "
+                      f"{like_time * 1e3:>9.1f}   (LIKE found {len(scanned)})")
+            start = time.perf_counter()
+            recent = search.search_patients(db, "chest pain", days=30, limit=20)["results"]
+            print(f"{'chest pain, 30 days':<24} {len(recent):>7} {(time.perf_counter() - start) * 1e3:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+SAFE-Triage AI - Similar Case Benchmark
+Builds the similar-case index over N synthetic distinct complaints (template
+phrases with varying body parts, durations and patient details), then times
+incremental adds and top-k lookups.
+
+Usage:
+    python -m backend.benchmarks.bench_similar_cases --complaints 100000
+"""
+import argparse
+import random
+import statistics
+import time
+
+from ..patient_cache import PatientRecord
+from ..similar_cases import SimilarCases
+
+TEMPLATES = [
+    "{part} pain since {n} days", "وجع في {part_ar} من {n} ايام", "fell and hurt {part}, swelling",
+    "لدغة {animal} في {part_ar}", "fever {n} days with {symptom}", "سخونية و{symptom_ar} من امبارح",
+    "burn on {part} from {cause}", "cut on {part} needs stitches", "{symptom} after eating", "دوخة و{symptom_ar}",
+]
+WORDS = {
+    "part": ["chest", "head", "back", "left arm", "right knee", "ankle", "hand", "abdomen", "neck", "foot"],
+    "part_ar": ["الصدر", "البطن", "الضهر", "الرجل", "الايد", "الراس", "الركبة", "الرقبة"],
+    "animal": ["عقرب", "ثعبان", "كلب", "قطة"],
+    "symptom": ["vomiting", "cough", "rash", "diarrhea", "headache", "shortness of breath"],
+    "symptom_ar": ["ترجيع", "كحة", "اسهال", "صداع", "ضيق تنفس", "طفح"],
+    "cause": ["boiling water", "oil", "fire", "a heater"],
+}
+QUERIES = ["لدغة عقرب في الرجل", "chest pain since 2 days", "سخونيه وكحه", "burn on hand from oil", "knee swelling"]
+
+
+def complaint(rng, i):
+    text = rng.choice(TEMPLATES).format(n=rng.randint(1, 9), **{k: rng.choice(v) for k, v in WORDS.items()})
+    return f"{text} #{i}"  # Keeps every complaint distinct, the index's worst case
+
+
+def record(patient_id, text):
+    row = PatientRecord()
+    for name in PatientRecord.__slots__:
+        setattr(row, name, None)
+    row.id, row.chief_complaint, row.triage_level, row.age = patient_id, text, 3, 40
+    return row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark similar-case lookups")
+    parser.add_argument("--complaints", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(11)
+    texts = [complaint(rng, i) for i in range(args.complaints)]
+    index = SimilarCases(dim=args.dim, max_texts=args.complaints + 1)
+    index._loaded = True  # Filled through add() instead of a database
+
+    start = time.perf_counter()
+    for i, text in enumerate(texts):
+        index.add(record(i, text))
+    elapsed = time.perf_counter() - start
+    print(f"Index {args.complaints:,} complaints   {elapsed:7.2f}s  {elapsed / args.complaints * 1e6:7.1f} µs/add  "
+          f"matrix {args.complaints * args.dim * 4 / 1e6:.0f} MB")
+
+    print(f"\n{'query':<28} {'ms (median)':>12} {'ms (p95)':>9}  best match")
+    for query in QUERIES:
+        timings = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            cases = index.query(query, args.k)
+            timings.append(time.perf_counter() - start)
+        timings.sort()
+        print(f"{query:<28} {statistics.median(timings) * 1e3:>12.2f} {timings[int(len(timings) * 0.95)] * 1e3:>9.2f}"
+              f"  {cases[0]['chief_complaint']} ({cases[0]['similarity']})")
+
+
+if __name__ == "__main__":
+    main()
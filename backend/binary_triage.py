@@ -0,0 +1,212 @@
+"""
+SAFE-Triage AI - Binary Triage Protocol
+Compact msgpack records for POST /triage/binary, for kiosks and HIS
+integrations that triage at high volume. JSON parsing, PatientInput
+validation and the response_model round trip cost more CPU than the
+rules themselves; here a patient is one positional msgpack array, and a
+result is level, resource counts, early-warning scores and numeric reason
+codes instead of the Arabic display strings (GET /triage/binary/codes
+serves the code tables once).
+
+Request body (media type BINARY_MEDIA_TYPE): a msgpack array of up to
+MAX_RECORDS patients, each
+
+    [age, gender (0 male, 1 female),
+     history flags (1 cardiac, 2 stroke, 4 immunocompromised),
+     [8 vitals in VITALS order, nil: not measured], complaint]
+
+Response body: a msgpack array with, per patient,
+
+    [patient id (nil: not stored), level, confidence (CONFIDENCE index),
+     [resources in RESOURCE_TYPES order], [NEWS2, qSOFA, PEWS] (nil: not scored),
+     [reason codes], [red flag codes]]   (codes from REASONS)
+
+msgpack is the codec the audit log already uses; without it installed the
+endpoint answers 501.
+"""
+import math
+from typing import Dict, List, Optional, Tuple
+
+from .models import RESOURCE_TYPES, Gender, PatientInput, TriageResult, Vitals
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; /triage/binary is unavailable without it
+    msgpack = None
+
+BINARY_MEDIA_TYPE = "application/vnd.safe-triage.v2+msgpack"
+VERSION = 2
+MAX_RECORDS = 256
+
+GENDERS = (Gender.MALE, Gender.FEMALE)
+VITALS = ("hr", "rr", "spo2", "temp", "sbp", "dbp", "gcs", "pain_score")
+INT_VITALS = frozenset(("hr", "rr", "sbp", "dbp", "gcs", "pain_score"))
+VITAL_DEFAULTS = {name: field.default for name, field in Vitals.model_fields.items()}
+VITAL_RANGES = {"gcs": (3, 15), "pain_score": (0, 10)}  # Vitals Field(ge=, le=)
+CONFIDENCE = ("High", "Medium", "Low")
+
+# Reason and red flag strings of TriageEngine, by leading text (Arabic, as the engine writes them).
+# Code 0 is any string not listed here, e.g. from a newer engine.
+REASONS: Tuple[Tuple[int, str, Tuple[str, ...]], ...] = (
+    (1, "Critical respiratory rate", ("معدل التنفس خطير",)),
+    (2, "Critical heart rate", ("النبض خطير",)),
+    (3, "Critical oxygen saturation", ("نسبة الأكسجين خطيرة",)),
+    (4, "Critical consciousness level (GCS)", ("مستوى الوعي خطير",)),
+    (5, "Critical blood pressure", ("ضغط الدم خطير",)),
+    (6, "Critical temperature", ("درجة الحرارة خطيرة",)),
+    (7, "Critical keywords in complaint", ("كلمات حرجة", "حالة حرجة")),
+    (8, "Severe pain", ("ألم شديد",)),
+    (9, "Altered mental status", ("تغير في الوعي",)),
+    (10, "Tachycardia", ("تسارع النبض", "تسارع نبض")),
+    (11, "Bradycardia", ("بطء النبض", "بطء نبض")),
+    (12, "Tachypnea", ("سرعة التنفس", "سرعة تنفس")),
+    (13, "Bradypnea", ("بطء التنفس", "بطء تنفس")),
+    (14, "Low oxygen saturation", ("نقص الأكسجين", "نقص أكسجين")),
+    (15, "High blood pressure", ("ارتفاع الضغط", "ارتفاع ضغط")),
+    (16, "Low blood pressure", ("انخفاض الضغط",)),
+    (17, "Fever", ("حمى",)),
+    (18, "Hypothermia", ("انخفاض حرارة",)),
+    (19, "Abnormal vital signs", ("علامات حيوية غير طبيعية",)),
+    (20, "High-risk symptoms", ("أعراض خطيرة",)),
+    (21, "Needs multiple resources", ("يحتاج تقريباً",)),
+    (22, "Needs one resource", ("يحتاج مورد واحد",)),
+    (23, "Needs no acute resources", ("لا يحتاج موارد",)),
+)
+_PREFIXES = [(prefix, code) for code, _, prefixes in REASONS for prefix in prefixes]
+
+
+class BinaryFormatError(ValueError):
+    pass
+
+
+def available() -> bool:
+    return msgpack is not None
+
+
+def _require_msgpack():
+    if msgpack is None:
+        raise RuntimeError("Binary triage requires msgpack (pip install msgpack)")
+
+
+def _is_number(value) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+# ============ REQUESTS ============
+
+def _vital(name: str, value, index: int):
+    if value is None:
+        return VITAL_DEFAULTS[name]
+    if not _is_number(value) or not math.isfinite(value):
+        raise BinaryFormatError(f"record {index}: {name} must be a finite number")
+    if name in INT_VITALS:
+        if value != int(value):
+            raise BinaryFormatError(f"record {index}: {name} must be a whole number")
+        value = int(value)
+    else:
+        value = float(value)
+    low, high = VITAL_RANGES.get(name, (None, None))
+    if low is not None and not low <= value <= high:
+        raise BinaryFormatError(f"record {index}: {name} must be between {low} and {high}")
+    return value
+
+
+def _patient(record, index: int) -> PatientInput:
+    if not isinstance(record, list) or len(record) != 5:
+        raise BinaryFormatError(f"record {index}: expected [age, gender, flags, vitals, complaint]")
+    age, gender, flags, vitals, complaint = record
+    if not _is_number(age) or not math.isfinite(age) or age < 0:
+        raise BinaryFormatError(f"record {index}: invalid age")
+    if type(gender) is not int or gender not in (0, 1):
+        raise BinaryFormatError(f"record {index}: invalid gender {gender!r}")
+    if type(flags) is not int or not 0 <= flags <= 7:
+        raise BinaryFormatError(f"record {index}: invalid history flags")
+    if not isinstance(vitals, list) or len(vitals) != len(VITALS):
+        raise BinaryFormatError(f"record {index}: expected {len(VITALS)} vitals")
+    if not isinstance(complaint, str):
+        raise BinaryFormatError(f"record {index}: complaint must be a string")
+    values = {name: _vital(name, value, index) for name, value in zip(VITALS, vitals)}
+    return PatientInput.model_construct(
+        age=float(age), gender=GENDERS[gender], chief_complaint_text=complaint, vitals=Vitals.model_construct(**values),
+        history_cardiac=bool(flags & 1), history_stroke=bool(flags & 2), immuno_compromised=bool(flags & 4),
+    )
+
+
+def decode_patients(body: bytes) -> List[PatientInput]:
+    """Patients from a request body, checked field by field instead of by pydantic validation."""
+    _require_msgpack()
+    try:
+        records = msgpack.unpackb(body, raw=False, use_list=True)
+    except msgpack.ExtraData:
+        raise BinaryFormatError("trailing bytes after the last record")
+    except (ValueError, msgpack.UnpackException) as e:
+        raise BinaryFormatError(f"body is not valid msgpack ({e})")
+    if not isinstance(records, list):
+        raise BinaryFormatError("body must be an array of records")
+    if not 1 <= len(records) <= MAX_RECORDS:
+        raise BinaryFormatError(f"record count must be between 1 and {MAX_RECORDS}")
+    return [_patient(record, index) for index, record in enumerate(records)]
+
+
+def encode_patients(patients: List[dict]) -> bytes:
+    """Request body for PatientInput-shaped dicts (clients, tests, benchmarks)."""
+    _require_msgpack()
+    records = []
+    for patient in patients:
+        vitals = patient.get("vitals") or {}
+        flags = sum(bit for bit, name in ((1, "history_cardiac"), (2, "history_stroke"), (4, "immuno_compromised"))
+                    if patient.get(name))
+        records.append([patient["age"], GENDERS.index(Gender(patient["gender"])), flags,
+                        [vitals.get(name) for name in VITALS], patient["chief_complaint_text"]])
+    return msgpack.packb(records, use_bin_type=True)
+
+
+# ============ RESULTS ============
+
+def reason_code(text: str) -> int:
+    for prefix, code in _PREFIXES:
+        if text.startswith(prefix):
+            return code
+    return 0
+
+
+def encode_results(results: List[TriageResult], patient_ids: List[Optional[int]]) -> bytes:
+    _require_msgpack()
+    rows = []
+    for result, patient_id in zip(results, patient_ids):
+        resources, scores = result.resources, result.scores
+        rows.append([
+            patient_id, int(result.level), CONFIDENCE.index(result.confidence) if result.confidence in CONFIDENCE else 0,
+            [getattr(resources, name) for name in RESOURCE_TYPES],
+            [scores.news2, scores.qsofa, scores.pews],
+            [reason_code(text) for text in result.reasoning if text],
+            [reason_code(text) for text in result.red_flags if text],
+        ])
+    return msgpack.packb(rows, use_bin_type=True)
+
+
+def decode_results(body: bytes) -> List[Dict]:
+    """Response body as dicts (clients, tests, benchmarks)."""
+    _require_msgpack()
+    results = []
+    for patient_id, level, confidence, resources, (news2, qsofa, pews), reasons, red_flags in msgpack.unpackb(body):
+        results.append({
+            "patient_id": patient_id, "level": level, "confidence": CONFIDENCE[confidence],
+            "resources": dict(zip(RESOURCE_TYPES, resources)),
+            "scores": {"news2": news2, "qsofa": qsofa, "pews": pews},
+            "reasons": reasons, "red_flags": red_flags,
+        })
+    return results
+
+
+def code_tables() -> Dict:
+    """What the numeric fields mean, for clients to fetch once."""
+    return {
+        "version": VERSION,
+        "media_type": BINARY_MEDIA_TYPE,
+        "vitals": list(VITALS),
+        "resources": list(RESOURCE_TYPES),
+        "confidence": list(CONFIDENCE),
+        "reasons": {0: {"label_en": "Other", "label_ar": ""}} | {
+            code: {"label_en": label, "label_ar": prefixes[0]} for code, label, prefixes in REASONS},
+    }
@@ -0,0 +1,540 @@
+"""
+SAFE-Triage AI - Bulk Import / Export of Patient History
+Streams the `patients` table to CSV, Parquet or Arrow IPC in fixed-size chunks
+(constant memory) with vitals flattened into columns, and bulk-loads the same
+formats back with executemany. SQLite snapshots use the SQLite backup API.
+
+Usage:
+    python -m backend.bulk_io export history.parquet
+    python -m backend.bulk_io import legacy.csv --retriage
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from sqlalchemy import Text, select, type_coerce
+
+from .database import engine as default_bind
+from .sql_models import Patient
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet / Arrow support is optional
+    pa = None
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+VITAL_FIELDS = ["hr", "rr", "spo2", "temp", "sbp", "dbp", "gcs", "pain_score"]
+
+# Flat export layout: vitals become vitals_<field>, list and object columns stay JSON text
+JSON_COLUMNS = ["triage_reasoning", "triage_red_flags", "triage_evidence", "triage_resources", "score_history"]
+EXPORT_COLUMNS = (
+    ["id", "name", "age", "gender"]
+    + [f"vitals_{f}" for f in VITAL_FIELDS]
+    + ["chief_complaint", "triage_level", "triage_color", "triage_label_en", "triage_label_ar"]
+    + JSON_COLUMNS + ["created_at"]
+)
+
+FORMATS = {
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".ipc": "arrow",
+    ".db": "sqlite",
+    ".sqlite": "sqlite",
+}
+
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported file type '{ext}' (expected one of {', '.join(FORMATS)})")
+    return FORMATS[ext]
+
+
+def _require_pyarrow(fmt: str):
+    if pa is None:
+        raise RuntimeError(f"{fmt} support requires pyarrow (pip install pyarrow)")
+
+
+def _arrow_schema():
+    fields = [("id", pa.int64()), ("name", pa.string()), ("age", pa.float64()), ("gender", pa.string())]
+    fields += [(f"vitals_{f}", pa.float64()) for f in VITAL_FIELDS]
+    fields += [
+        ("chief_complaint", pa.string()), ("triage_level", pa.int64()),
+        ("triage_color", pa.string()), ("triage_label_en", pa.string()),
+        ("triage_label_ar", pa.string()),
+    ]
+    fields += [(name, pa.string()) for name in JSON_COLUMNS]
+    fields += [("created_at", pa.string())]
+    return pa.schema(fields)
+
+
+# ============ EXPORT ============
+
+def _raw_patient_select():
+    # JSON and timestamp columns are selected as raw text: vitals are decoded
+    # once for flattening and the list columns pass through as JSON text,
+    # skipping a decode/re-encode round trip per row.
+    table = Patient.__table__
+    raw = lambda col: type_coerce(col, Text).label(col.name)
+    cols = [table.c.id, table.c.name, table.c.age, table.c.gender, raw(table.c.vitals),
+            table.c.chief_complaint, table.c.triage_level, table.c.triage_color,
+            table.c.triage_label_en, table.c.triage_label_ar]
+    cols += [raw(table.c[name]) for name in JSON_COLUMNS] + [raw(table.c.created_at)]
+    return select(*cols).order_by(table.c.id)
+
+
+def _as_json_text(value):
+    if value is None or isinstance(value, str):
+        return value
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _flatten(row) -> list:
+    vitals = row.vitals
+    if isinstance(vitals, str):
+        vitals = json.loads(vitals)
+    vitals = vitals or {}
+    created = row.created_at
+    if created is not None and not isinstance(created, str):
+        created = created.isoformat()
+    return (
+        [row.id, row.name, row.age, row.gender]
+        + [vitals.get(f) for f in VITAL_FIELDS]
+        + [row.chief_complaint, row.triage_level, row.triage_color,
+           row.triage_label_en, row.triage_label_ar]
+        + [_as_json_text(getattr(row, name)) for name in JSON_COLUMNS] + [created]
+    )
+
+
+def _sqlite_export_sql(present: Optional[Iterable[str]] = None) -> str:
+    """
+    SQLite flattens vitals itself (JSON1 json_extract), so rows come back ready
+    to write and Python never decodes the vitals JSON. Columns outside `present`
+    (an older database read for import) are selected as NULL.
+    """
+    present = set(EXPORT_COLUMNS if present is None else present)
+    plain = [name if name in present else f"NULL AS {name}"
+             for name in EXPORT_COLUMNS[4:] if not name.startswith("vitals_")]
+    return (
+        "SELECT id, name, age, gender, "
+        + ", ".join(f"json_extract(vitals, '$.{f}')" for f in VITAL_FIELDS)
+        + f", {', '.join(plain)} FROM patients ORDER BY id"
+    )
+
+
+def _sqlite_columns(conn, schema: str = "main") -> List[str]:
+    return [row[1] for row in conn.execute(f"PRAGMA {schema}.table_info(patients)")]
+
+
+def _iter_fetchmany(cursor, chunk_size: int) -> Iterator[list]:
+    while True:
+        chunk = cursor.fetchmany(chunk_size)
+        if not chunk:
+            break
+        yield chunk
+
+
+def iter_patient_chunks(bind=None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[list]]:
+    """Yield flattened patient rows in chunks of `chunk_size`, ordered by id."""
+    bind = bind or default_bind
+    with bind.connect() as conn:
+        if bind.dialect.name == "sqlite":
+            cursor = conn.connection.driver_connection.execute(_sqlite_export_sql())
+            yield from _iter_fetchmany(cursor, chunk_size)
+            return
+        result = conn.execution_options(yield_per=chunk_size).execute(_raw_patient_select())
+        for partition in result.partitions(chunk_size):
+            yield [_flatten(row) for row in partition]
+
+
+def iter_csv(bind=None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """CSV text, one chunk at a time (used for HTTP streaming)."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    for chunk in iter_patient_chunks(bind, chunk_size):
+        writer.writerows(chunk)
+        yield buf.getvalue()
+        buf.seek(0)
+        buf.truncate()
+    if buf.tell():
+        yield buf.getvalue()
+
+
+def _chunk_to_batch(chunk: List[list], schema):
+    columns = list(zip(*chunk)) if chunk else [[] for _ in EXPORT_COLUMNS]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(col, type=field.type) for col, field in zip(columns, schema)], schema=schema
+    )
+
+
+def export_patients(path: str, fmt: Optional[str] = None, bind=None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Export the patients table to `path`. Returns the number of rows written."""
+    fmt = fmt or detect_format(path)
+    bind = bind or default_bind
+    rows = 0
+
+    if fmt == "sqlite":
+        return _backup_sqlite(bind, path)
+
+    if fmt == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            for chunk in iter_patient_chunks(bind, chunk_size):
+                writer.writerows(chunk)
+                rows += len(chunk)
+        return rows
+
+    _require_pyarrow(fmt)
+    schema = _arrow_schema()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(path, schema, compression="zstd")
+    elif fmt == "arrow":
+        writer = pa_ipc.new_file(path, schema)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    try:
+        for chunk in iter_patient_chunks(bind, chunk_size):
+            batch = _chunk_to_batch(chunk, schema)
+            if fmt == "parquet":
+                writer.write_batch(batch)
+            else:
+                writer.write(batch)
+            rows += len(chunk)
+    finally:
+        writer.close()
+    return rows
+
+
+def _sqlite_path(bind) -> str:
+    if bind.dialect.name != "sqlite" or not bind.url.database:
+        raise ValueError("SQLite snapshot export requires a file-backed SQLite database")
+    return bind.url.database
+
+
+def _backup_sqlite(bind, path: str) -> int:
+    """Consistent snapshot of the whole database through the SQLite backup API."""
+    src = sqlite3.connect(_sqlite_path(bind))
+    dst = sqlite3.connect(path)
+    try:
+        src.backup(dst)
+        return dst.execute("SELECT COUNT(*) FROM patients").fetchone()[0]
+    finally:
+        dst.close()
+        src.close()
+
+
+# ============ IMPORT ============
+
+def _num(value, cast=float):
+    if value is None or value == "":
+        return None
+    try:
+        return cast(float(value)) if cast is int else cast(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _json_value(value):
+    if value is None or value == "":
+        return None
+    if not isinstance(value, str):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        return None
+
+
+def _json_list(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, list):
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        return [value]
+
+
+def _parse_datetime(value):
+    if not value:
+        return datetime.now()
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        return datetime.now()
+
+
+def _unflatten(record: Dict) -> Dict:
+    """Flat export row -> `patients` insert parameters (ids are re-assigned)."""
+    vitals = {}
+    for f in VITAL_FIELDS:
+        value = _num(record.get(f"vitals_{f}"), int if f not in ("spo2", "temp") else float)
+        if value is not None:
+            vitals[f] = value
+    return {
+        "name": record.get("name") or "Unknown",
+        "age": _num(record.get("age")),
+        "gender": record.get("gender"),
+        "vitals": vitals,
+        "chief_complaint": record.get("chief_complaint") or "",
+        "triage_level": _num(record.get("triage_level"), int),
+        "triage_color": record.get("triage_color"),
+        "triage_label_en": record.get("triage_label_en"),
+        "triage_label_ar": record.get("triage_label_ar"),
+        "triage_reasoning": _json_list(record.get("triage_reasoning")),
+        "triage_red_flags": _json_list(record.get("triage_red_flags")),
+        "triage_evidence": _json_value(record.get("triage_evidence")),
+        "triage_resources": _json_value(record.get("triage_resources")),
+        "score_history": _json_value(record.get("score_history")),
+        "created_at": _parse_datetime(record.get("created_at")),
+    }
+
+
+def _iter_records(path: str, fmt: str, chunk_size: int) -> Iterator[Tuple[List[str], List[Sequence]]]:
+    """Yield (column names, row sequences) chunks from an export file."""
+    if fmt == "csv":
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            columns = next(reader, [])
+            while True:
+                chunk = list(islice(reader, chunk_size))
+                if not chunk:
+                    break
+                yield columns, chunk
+        return
+
+    if fmt == "sqlite":
+        src = sqlite3.connect(path)
+        try:
+            cursor = src.execute(_sqlite_export_sql(_sqlite_columns(src)))
+            for chunk in _iter_fetchmany(cursor, chunk_size):
+                yield EXPORT_COLUMNS, chunk
+        finally:
+            src.close()
+        return
+
+    _require_pyarrow(fmt)
+    with pa.memory_map(path) as source:
+        if fmt == "parquet":
+            batches = pq.ParquetFile(source).iter_batches(batch_size=chunk_size)
+        else:
+            try:
+                reader = pa_ipc.open_file(source)
+                batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+            except pa.ArrowInvalid:
+                source.seek(0)
+                batches = iter(pa_ipc.open_stream(source))
+        for batch in batches:
+            yield batch.schema.names, list(zip(*(col.to_pylist() for col in batch.columns)))
+
+
+def _retriage(rows: List[Dict], triage_engine) -> None:
+    """Re-run the rule engine over imported rows in place (batch path)."""
+    from .logic import early_warning
+    from .models import PatientInput
+
+    patients, targets = [], []
+    for row in rows:
+        try:
+            patients.append(PatientInput(
+                age=row["age"], gender=row["gender"],
+                chief_complaint_text=row["chief_complaint"], vitals=row["vitals"],
+            ))
+            targets.append(row)
+        except (ValueError, TypeError):
+            continue  # Keep the legacy triage for rows the engine cannot read
+    for row, result in zip(targets, triage_engine.evaluate_batch(patients)):
+        row.update({
+            "triage_level": int(result.level),
+            "triage_color": result.color_code,
+            "triage_label_en": result.label_en,
+            "triage_label_ar": result.label_ar,
+            "triage_reasoning": result.reasoning,
+            "triage_red_flags": result.red_flags,
+            "triage_evidence": [span.model_dump() for span in result.evidence],
+            "triage_resources": result.resources.model_dump(),
+            "score_history": early_warning.append_history(None, result.scores.model_dump(), "import"),
+        })
+
+
+def _sqlite_insert_sql(columns: List[str]) -> str:
+    """
+    INSERT for the SQLite fast path. Values are cast and the vitals JSON is
+    assembled inside SQLite (json_patch drops null vitals), so each row is
+    passed to executemany exactly as it was read. Columns missing from the
+    source file become NULL / defaults.
+    """
+    position = {name: i + 1 for i, name in enumerate(columns)}
+
+    def param(name):
+        return f"NULLIF(?{position[name]}, '')" if name in position else "NULL"
+
+    def cast(name, sql_type):
+        return f"CAST({param(name)} AS {sql_type})"
+
+    vitals = ", ".join(
+        f"'{f}', {cast(f'vitals_{f}', 'REAL' if f in ('spo2', 'temp') else 'INTEGER')}"
+        for f in VITAL_FIELDS
+    )
+    json_value = lambda name: f"CASE WHEN json_valid({param(name)}) THEN {param(name)} END"
+    json_text = lambda name: (  # json_valid(NULL) is NULL, which would fall through to json_array -> '[null]'
+        f"CASE WHEN {param(name)} IS NULL THEN NULL WHEN json_valid({param(name)}) THEN {param(name)} "
+        f"ELSE json_array({param(name)}) END"
+    )
+    values = [
+        f"COALESCE({param('name')}, 'Unknown')",
+        cast("age", "REAL"),
+        param("gender"),
+        f"json_patch('{{}}', json_object({vitals}))",
+        f"COALESCE({param('chief_complaint')}, '')",
+        cast("triage_level", "INTEGER"),
+        param("triage_color"),
+        param("triage_label_en"),
+        param("triage_label_ar"),
+        json_text("triage_reasoning"),
+        json_text("triage_red_flags"),
+        json_value("triage_evidence"),
+        json_value("triage_resources"),
+        json_value("score_history"),
+        f"COALESCE(replace({param('created_at')}, 'T', ' '), CURRENT_TIMESTAMP)",
+    ]
+    return (
+        "INSERT INTO patients (name, age, gender, vitals, chief_complaint, triage_level, "
+        "triage_color, triage_label_en, triage_label_ar, triage_reasoning, triage_red_flags, "
+        "triage_evidence, triage_resources, score_history, "
+        f"created_at) VALUES ({', '.join(values)})"
+    )
+
+
+def import_patients(path: str, fmt: Optional[str] = None, bind=None,
+                    chunk_size: int = DEFAULT_CHUNK_SIZE, retriage: bool = False,
+                    triage_engine=None, update_rollups: bool = True) -> int:
+    """
+    Bulk-load patients from a CSV / Parquet / Arrow export or another SQLite
+    patients database. Returns the number of rows inserted (ids are re-assigned).
+    Analytics rollups are extended with the imported rows unless disabled.
+    """
+    fmt = fmt or detect_format(path)
+    bind = bind or default_bind
+    rows, (first_id, last_id) = _import_rows(path, fmt, bind, chunk_size, retriage, triage_engine)
+    if update_rollups and rows:
+        from . import analytics
+        # Only the imported ids: rows triaged live meanwhile are already in the rollups
+        analytics.backfill(bind, min_id=first_id, max_id=last_id)
+    return rows
+
+
+def _sqlite_id_range(conn, rows: int) -> Tuple[int, int]:
+    """
+    Ids of the `rows` just inserted in this transaction. They are the top `rows`
+    ids: SQLite gives new rows max(id) + 1, and the transaction holds the write
+    lock from its first insert, so no other connection can insert in between.
+    """
+    last_id = conn.execute("SELECT max(id) FROM patients").fetchone()[0] or 0
+    return last_id - rows + 1, last_id
+
+
+def _import_rows(path, fmt, bind, chunk_size, retriage, triage_engine) -> Tuple[int, Tuple[int, int]]:
+    """Rows inserted and the (first, last) id range they were given."""
+    if fmt == "sqlite" and not retriage:
+        return _attach_sqlite(bind, path)
+    if retriage and triage_engine is None:
+        from .logic.triage_engine import TriageEngine
+        triage_engine = TriageEngine()
+
+    fast_path = bind.dialect.name == "sqlite" and not retriage
+    insert = Patient.__table__.insert()
+    if bind.dialect.name != "sqlite":
+        # Sequence ids are read back; a row a concurrent writer got between two
+        # of ours would fall inside the range
+        insert = insert.returning(Patient.id)
+    rows_written, id_range = 0, (0, 0)
+    with bind.begin() as conn:
+        for columns, chunk in _iter_records(path, fmt, chunk_size):
+            if fast_path:
+                conn.connection.driver_connection.executemany(_sqlite_insert_sql(columns), chunk)
+            else:
+                rows = [_unflatten(dict(zip(columns, values))) for values in chunk]
+                if retriage:
+                    _retriage(rows, triage_engine)
+                result = conn.execute(insert, rows)  # executemany
+                chunk_ids = result.scalars().all() if bind.dialect.name != "sqlite" else []
+                if chunk_ids:
+                    low, high = min(chunk_ids), max(chunk_ids)
+                    id_range = (low, high) if not id_range[0] else (min(id_range[0], low), max(id_range[1], high))
+            rows_written += len(chunk)
+        if bind.dialect.name == "sqlite":
+            return rows_written, _sqlite_id_range(conn.connection.driver_connection, rows_written)
+    return rows_written, id_range
+
+
+def _attach_sqlite(bind, path: str) -> Tuple[int, Tuple[int, int]]:
+    """Merge another patients.db in a single INSERT ... SELECT inside SQLite."""
+    _sqlite_path(bind)
+    with bind.begin() as conn:
+        raw = conn.connection.driver_connection
+        raw.execute("ATTACH DATABASE ? AS legacy", (path,))
+        try:
+            # Older databases may predate some columns; those are left NULL
+            present = set(_sqlite_columns(raw, "legacy"))
+            columns = ", ".join(c for c in EXPORT_COLUMNS + ["vitals"]
+                                if c != "id" and not c.startswith("vitals_") and c in present)
+            cursor = raw.execute(f"INSERT INTO patients ({columns}) SELECT {columns} FROM legacy.patients")
+            return cursor.rowcount, _sqlite_id_range(raw, cursor.rowcount)
+        finally:
+            raw.commit()
+            raw.execute("DETACH DATABASE legacy")
+
+
+# ============ CLI ============
+
+def main(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description="Bulk import/export of SAFE-Triage patient history")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="Export patients to CSV / Parquet / Arrow / SQLite")
+    exp.add_argument("output")
+    exp.add_argument("--format", choices=sorted(set(FORMATS.values())))
+    exp.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+
+    imp = sub.add_parser("import", help="Import patients from CSV / Parquet / Arrow / SQLite")
+    imp.add_argument("input")
+    imp.add_argument("--format", choices=sorted(set(FORMATS.values())))
+    imp.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    imp.add_argument("--retriage", action="store_true", help="Re-run the rule engine on every row")
+    imp.add_argument("--skip-rollups", action="store_true",
+                     help="Do not add imported rows to analytics rollups (run 'backend.analytics backfill' later)")
+
+    args = parser.parse_args(argv)
+    start = time.perf_counter()
+    if args.command == "export":
+        rows = export_patients(args.output, args.format, chunk_size=args.chunk_size)
+        action = f"Exported {rows} patients to {args.output}"
+    else:
+        rows = import_patients(args.input, args.format, chunk_size=args.chunk_size,
+                               retriage=args.retriage, update_rollups=not args.skip_rollups)
+        action = f"Imported {rows} patients from {args.input}"
+    elapsed = time.perf_counter() - start
+    print(f"{action} in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+SAFE-Triage AI - Circuit Breakers
+Fail fast when an external dependency (Gemini, the n8n alert webhook) is
+down, instead of every request waiting out its own timeout.
+
+closed     calls go through; `failure_threshold` consecutive failures open it
+open       calls are refused with CircuitOpenError for `reset_timeout` seconds
+half_open  up to `half_open_max_calls` probe calls go through; a success
+           closes the circuit, a failure opens it again
+
+Callers already have fallbacks (rule-based triage, logged alert failure),
+so CircuitOpenError is handled exactly like the dependency's own errors.
+"""
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit is open."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 half_open_max_calls: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._last_error: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "successes": 0, "failures": 0, "rejected": 0, "opened": 0}
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        # Caller holds self._lock
+        if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probes = 0
+        return self._state
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = self.clock()
+        self._stats["opened"] += 1
+        print(f"[CIRCUIT] {self.name} open after {self._failures} failure(s): {self._last_error}")
+
+    def _before_call(self):
+        with self._lock:
+            state = self._current_state()
+            if state == OPEN or (state == HALF_OPEN and self._probes >= self.half_open_max_calls):
+                self._stats["rejected"] += 1
+                raise CircuitOpenError(f"{self.name} circuit open")
+            if state == HALF_OPEN:
+                self._probes += 1
+            self._stats["calls"] += 1
+
+    def record_success(self):
+        with self._lock:
+            self._stats["successes"] += 1
+            self._failures = 0
+            if self._state != CLOSED:
+                print(f"[CIRCUIT] {self.name} closed")
+            self._state = CLOSED
+
+    def record_failure(self, error: Optional[BaseException] = None):
+        with self._lock:
+            self._stats["failures"] += 1
+            self._failures += 1
+            self._last_error = repr(error) if error is not None else None
+            # A failed probe reopens; late failures of calls made before opening do not
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._open()
+
+    def call(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Run `fn` through the breaker; its exceptions count as failures and are re-raised."""
+        self._before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        self.record_success()
+        return result
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            state = self._current_state()
+            retry_in = self._opened_at + self.reset_timeout - self.clock() if state == OPEN else None
+            return dict(self._stats, state=state, consecutive_failures=self._failures,
+                        last_error=self._last_error, retry_in=retry_in)
+
+
+class CircuitBreakers:
+    """Named breakers sharing one configuration, created on first use (e.g. one per webhook URL)."""
+
+    def __init__(self, **options):
+        self.options = options
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, prefix: str = "CIRCUIT") -> "CircuitBreakers":
+        """<prefix>_FAILURE_THRESHOLD, <prefix>_RESET_TIMEOUT"""
+        return cls(
+            failure_threshold=int(os.getenv(f"{prefix}_FAILURE_THRESHOLD", "5")),
+            reset_timeout=float(os.getenv(f"{prefix}_RESET_TIMEOUT", "30")),
+        )
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, **self.options)
+            return breaker
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {b.name: b.snapshot() for b in breakers}
+
+
+# Process-wide breakers, one per dependency
+breakers = CircuitBreakers.from_env()
@@ -0,0 +1,87 @@
+"""
+SAFE-Triage AI - Request Coalescing
+Single-flight deduplication: concurrent calls that share a key wait on one
+in-flight call and receive its result instead of starting their own.
+"""
+import threading
+from typing import Any, Callable, Dict, Tuple
+
+
+class _InFlightCall:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class CoalesceTimeout(Exception):
+    """Raised to a waiting caller when the shared in-flight call takes too long."""
+
+
+class SingleFlight:
+    """
+    Collapse concurrent duplicate calls into one.
+
+    The first caller for a key (the leader) runs the function; callers that
+    arrive while it is still running block for at most `wait_timeout` seconds
+    and then share the leader's result (or exception). Nothing is cached once
+    the call completes - a later request with the same key starts a new call.
+    """
+
+    def __init__(self, wait_timeout: float = 30.0):
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _InFlightCall] = {}
+        self._stats = {"calls": 0, "leaders": 0, "coalesced": 0, "wait_timeouts": 0}
+
+    def do(self, key: str, fn: Callable[..., Any], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run `fn(*args, **kwargs)` once per concurrent `key`.
+        Returns (result, shared) where shared is True if the result came from
+        another caller's in-flight call.
+        """
+        with self._lock:
+            self._stats["calls"] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                call.waiters += 1
+                self._stats["coalesced"] += 1
+                leader = False
+            else:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self._stats["leaders"] += 1
+                leader = True
+
+        if not leader:
+            if not call.done.wait(self.wait_timeout):
+                with self._lock:
+                    self._stats["wait_timeouts"] += 1
+                raise CoalesceTimeout(f"Timed out after {self.wait_timeout}s waiting for in-flight call")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot["in_flight"] = len(self._calls)
+        return snapshot
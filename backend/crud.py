@@ -0,0 +1,74 @@
+"""
+SAFE-Triage AI - Patient Record Writes
+Single write path for triage results so that everything derived from a
+triage decision (analytics rollups) commits in the same transaction.
+"""
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from . import analytics
+from .logic import early_warning
+from .models import PatientInput
+from .sql_models import Patient
+
+
+def _patient(patient: PatientInput, result: dict) -> Patient:
+    return Patient(
+        age=patient.age,
+        gender=patient.gender.value,
+        vitals=patient.vitals.model_dump(exclude_none=True),
+        chief_complaint=patient.chief_complaint_text,
+        triage_level=int(result["level"]),
+        triage_color=result.get("color_code"),
+        triage_label_en=result.get("label_en"),
+        triage_label_ar=result.get("label_ar"),
+        triage_reasoning=[r for r in result.get("reasoning") or [] if r],
+        triage_red_flags=_red_flags(result),
+        triage_evidence=result.get("evidence") or [],
+        triage_resources=result.get("resources"),
+        score_history=early_warning.append_history(None, result.get("scores"), "triage"),
+    )
+
+
+def _red_flags(result: dict) -> List[str]:
+    return [flag for flag in result.get("red_flags") or [] if flag]
+
+
+def create_patient_record(db: Session, patient: PatientInput, result: dict,
+                          categories: Iterable[str] = (),
+                          rule_level: Optional[int] = None,
+                          ai_level: Optional[int] = None) -> Patient:
+    """
+    Persist a triaged patient and fold the decision into the rollups.
+    `result` is a TriageResult dump or the /ai-triage response dict.
+    """
+    record = _patient(patient, result)
+    db.add(record)
+    analytics.record_triage(
+        db, record.triage_level, record.triage_red_flags, categories, rule_level=rule_level, ai_level=ai_level
+    )
+    db.commit()
+    db.refresh(record)
+    return record
+
+
+def create_patient_records(db: Session, patients: Sequence[PatientInput], results: Sequence[dict],
+                           categories: Sequence[Iterable[str]], rule_levels: Sequence[Optional[int]]) -> List[Patient]:
+    """
+    create_patient_record for a batch of rule-triaged patients in one
+    transaction: one commit, one upsert per rollup row, one reload query.
+    """
+    records = [_patient(patient, result) for patient, result in zip(patients, results)]
+    db.add_all(records)
+    analytics.record_triages(db, [
+        (record.triage_level, record.triage_red_flags, cats, rule_level, None)
+        for record, cats, rule_level in zip(records, categories, rule_levels)
+    ])
+    db.flush()
+    ids = [record.id for record in records]
+    db.commit()
+    # Expired by the commit; reloaded together instead of one refresh per row
+    loaded = {record.id: record for record in db.scalars(select(Patient).where(Patient.id.in_(ids)))}
+    return [loaded[patient_id] for patient_id in ids]
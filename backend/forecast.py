@@ -0,0 +1,149 @@
+"""
+SAFE-Triage AI - Resource Demand Forecast
+Rolling demand per resource type (labs, ECG, X-ray, CT, IV meds,
+procedures) from the rule engine's per-patient resource estimates, and a
+short-horizon projection from recent arrival rates.
+
+Counts live in a ring of fixed-width time buckets (FORECAST_BUCKET_MINUTES,
+default 5, over FORECAST_WINDOW_HOURS, default 24) plus running totals.
+Recording an arrival adds one row to one bucket; entering a new bucket
+clears the slot it reuses. Work per arrival is O(1) at any arrival volume.
+"""
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from .models import RESOURCE_TYPES
+from .sql_models import Patient
+
+COLUMNS = ("arrivals",) + RESOURCE_TYPES
+Z_90 = 1.2816  # One-sided 90% bound, normal approximation to Poisson counts
+
+
+class ResourceDemand:
+    def __init__(self, bucket_seconds: int = 300, window_hours: float = 24, clock=time.time):
+        self.bucket_seconds = bucket_seconds
+        self.size = max(1, int(window_hours * 3600 // bucket_seconds))
+        self.clock = clock
+        # Plain lists: a handful of int additions beats numpy's per-call overhead
+        self._counts = [[0] * len(COLUMNS) for _ in range(self.size)]
+        self._totals = [0] * len(COLUMNS)
+        self._head = int(clock() // bucket_seconds)  # Newest bucket number
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "ResourceDemand":
+        return cls(
+            bucket_seconds=int(float(os.getenv("FORECAST_BUCKET_MINUTES", "5")) * 60),
+            window_hours=float(os.getenv("FORECAST_WINDOW_HOURS", "24")),
+        )
+
+    @property
+    def window_hours(self) -> float:
+        return self.size * self.bucket_seconds / 3600
+
+    def _advance(self, bucket: int):
+        """Move the head to `bucket`, clearing every slot that falls out of the window."""
+        if bucket <= self._head:
+            return
+        if bucket - self._head >= self.size:
+            self._counts = [[0] * len(COLUMNS) for _ in range(self.size)]
+            self._totals = [0] * len(COLUMNS)
+        else:
+            totals = self._totals
+            for b in range(self._head + 1, bucket + 1):
+                slot = self._counts[b % self.size]
+                for i, count in enumerate(slot):
+                    totals[i] -= count
+                    slot[i] = 0
+        self._head = bucket
+
+    def record(self, resources: Optional[Dict[str, int]] = None, at: Optional[float] = None):
+        """One arrival with its ResourceEstimate dump (None: resources unknown)."""
+        at = self.clock() if at is None else at
+        bucket = int(at // self.bucket_seconds)
+        resources = resources or {}
+        row = [1] + [int(resources.get(name) or 0) for name in RESOURCE_TYPES]
+        with self._lock:
+            self._advance(bucket)
+            if bucket <= self._head - self.size:
+                return  # Older than the window
+            slot, totals = self._counts[bucket % self.size], self._totals
+            for i, count in enumerate(row):
+                slot[i] += count
+                totals[i] += count
+
+    def _recent(self, buckets: int) -> np.ndarray:
+        """Counts of the last `buckets` buckets, oldest first (caller holds the lock)."""
+        return np.array([self._counts[b % self.size] for b in range(self._head - buckets + 1, self._head + 1)],
+                        dtype=np.float64)
+
+    def window(self, hours: float) -> Dict[str, int]:
+        """Totals over the last `hours` (whole buckets, including the current one)."""
+        buckets = min(self.size, max(1, math.ceil(hours * 3600 / self.bucket_seconds)))
+        with self._lock:
+            self._advance(int(self.clock() // self.bucket_seconds))
+            counts = self._totals if buckets == self.size else self._recent(buckets).sum(axis=0)
+            return dict(zip(COLUMNS, (int(c) for c in counts)))
+
+    def forecast(self, horizon_hours: int = 4, lookback_hours: float = 3, half_life_hours: float = 1) -> Dict:
+        """
+        Expected demand per resource for each of the next `horizon_hours`,
+        from an exponentially weighted rate over the last `lookback_hours`
+        (recent buckets weigh more; the current bucket counts for the time
+        it has covered so far).
+        """
+        now = self.clock()
+        buckets = min(self.size, max(1, math.ceil(lookback_hours * 3600 / self.bucket_seconds)))
+        with self._lock:
+            self._advance(int(now // self.bucket_seconds))
+            counts = self._recent(buckets)
+            head = self._head
+        durations = np.full(buckets, float(self.bucket_seconds))
+        durations[-1] = max(1.0, now - head * self.bucket_seconds)
+        ages = (now - (np.arange(head - buckets + 1, head + 1) + 0.5) * self.bucket_seconds) / 3600
+        weights = 0.5 ** (np.maximum(ages, 0) / half_life_hours)
+        rate = (weights[:, None] * counts).sum(axis=0) / (weights * durations).sum() * 3600
+
+        start = datetime.fromtimestamp(now, timezone.utc).replace(minute=0, second=0, microsecond=0)
+        hours = [{
+            "start": (start + timedelta(hours=h + 1)).isoformat(),
+            "expected": _rounded(rate),
+            "upper_90": _rounded(rate + Z_90 * np.sqrt(rate)),
+        } for h in range(horizon_hours)]
+        total = rate * horizon_hours
+        return {
+            "generated_at": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            "lookback_hours": lookback_hours,
+            "rate_per_hour": _rounded(rate),
+            "hours": hours,
+            "horizon_total": {"expected": _rounded(total), "upper_90": _rounded(total + Z_90 * np.sqrt(total))},
+        }
+
+    def load(self, bind) -> int:
+        """Rebuild the window from stored patients (after a restart). Returns rows read."""
+        now = self.clock()
+        since = datetime.fromtimestamp(now - self.window_hours * 3600, timezone.utc)
+        if bind.dialect.name == "sqlite":
+            since = since.replace(tzinfo=None)  # CURRENT_TIMESTAMP is naive UTC
+        rows = 0
+        with bind.connect() as conn:
+            query = select(Patient.created_at, Patient.triage_resources).where(Patient.created_at >= since)
+            for created_at, resources in conn.execute(query):
+                if created_at is None:
+                    continue
+                if created_at.tzinfo is None:
+                    created_at = created_at.replace(tzinfo=timezone.utc)
+                self.record(resources, at=created_at.timestamp())
+                rows += 1
+        return rows
+
+
+def _rounded(values: np.ndarray) -> Dict[str, float]:
+    return {name: round(float(v), 2) for name, v in zip(COLUMNS, values)}
@@ -0,0 +1,99 @@
+"""
+SAFE-Triage AI - Conditional GETs and Fast JSON
+Validators (ETag / Last-Modified) for read endpoints whose content only
+changes on writes, 304 answers for unchanged polls, and orjson encoding of
+plain rows (json fallback when orjson is not installed).
+
+The ETag carries the token of the cache that issued it (tenant id plus a
+random part drawn when the cache is built) and its table version, so a tag
+from another tenant, another process, or a cache rebuilt after eviction or
+restart never matches. Responses vary on X-Tenant-ID, which selects the
+tenant and so the body. Last-Modified has
+one-second resolution; it is only sent once the second of the last write
+has passed, so a later write in that same second cannot hide behind it.
+"""
+import json
+import math
+import secrets
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Any, Dict, NamedTuple, Optional
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; responses fall back to the json module
+    orjson = None
+
+CACHE_CONTROL = "private, no-cache"  # Stored by the browser, revalidated on every poll
+VARY = "X-Tenant-ID"  # tenants.get_tenant picks the database from it
+
+
+class Validators(NamedTuple):
+    etag: str
+    modified_at: float  # Epoch seconds of the last write
+
+
+def new_token(scope: str = "") -> str:
+    """Prefix for the ETags of one cache instance; never reused by another instance."""
+    token = secrets.token_hex(4)
+    return f"{scope}.{token}" if scope else token
+
+
+def validators(token: str, version: int, modified_at: float) -> Validators:
+    return Validators(f'W/"{token}-{version}"', modified_at)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    """JSON bytes; datetimes as ISO 8601 like FastAPI's encoder."""
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(content, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def headers(tags: Optional[Validators], now: Optional[float] = None) -> Dict[str, str]:
+    if tags is None:
+        return {"Vary": VARY}
+    out = {"ETag": tags.etag, "Cache-Control": CACHE_CONTROL, "Vary": VARY}
+    now = time.time() if now is None else now
+    if math.floor(now) > math.floor(tags.modified_at):
+        out["Last-Modified"] = format_datetime(datetime.fromtimestamp(math.floor(tags.modified_at), timezone.utc),
+                                               usegmt=True)
+    return out
+
+
+def not_modified(request: Request, tags: Optional[Validators]) -> bool:
+    """True when the client's copy is current (If-None-Match wins over If-Modified-Since)."""
+    if tags is None:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # Weak comparison: W/ prefixes are ignored
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return "*" in candidates or tags.etag.removeprefix("W/") in candidates
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is None:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        since = since.replace(tzinfo=timezone.utc)
+    return math.floor(tags.modified_at) <= since.timestamp()
+
+
+def json_response(content: Any, tags: Optional[Validators] = None, status_code: int = 200) -> Response:
+    return Response(dumps(content), status_code=status_code, media_type="application/json", headers=headers(tags))
+
+
+def not_modified_response(tags: Validators) -> Response:
+    return Response(status_code=304, headers=headers(tags))
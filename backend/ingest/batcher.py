@@ -0,0 +1,102 @@
+"""
+SAFE-Triage AI - Micro-Batching
+Collects items from many producers and hands them to one handler thread in
+batches: a batch closes when it reaches `max_batch` items or `max_delay`
+seconds after its first item, whichever comes first. Monitors report every
+few seconds per bed, so one database round trip and one evaluate_batch call
+per batch replace thousands of single-patient updates.
+"""
+import threading
+import time
+from typing import Callable, List
+
+
+class MicroBatcher:
+    def __init__(self, handler: Callable[[list], None], max_batch: int = 1000, max_delay: float = 0.05,
+                 max_pending: int = 100_000, name: str = "batcher"):
+        self.handler = handler
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.max_pending = max_pending
+        self._items: list = []
+        self._first_at = 0.0
+        self._submitted = 0
+        self._handled = 0
+        self._urgent = False
+        self._closed = False
+        self._cond = threading.Condition()
+        self.stats = {"submitted": 0, "dropped": 0, "batches": 0, "largest_batch": 0,
+                      "errors": 0, "handler_seconds": 0.0}
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def submit(self, items: List) -> bool:
+        """Queue items; False (nothing queued) when the backlog is full."""
+        if not items:
+            return True
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Batcher is closed")
+            if len(self._items) + len(items) > self.max_pending:
+                self.stats["dropped"] += len(items)
+                return False
+            if not self._items:
+                self._first_at = time.monotonic()
+            self._items.extend(items)
+            self._submitted += len(items)
+            self.stats["submitted"] += len(items)
+            self._cond.notify_all()
+        return True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """Hand everything submitted so far to the handler now and wait for it."""
+        with self._cond:
+            target = self._submitted
+            self._urgent = True
+            self._cond.notify_all()
+            return self._cond.wait_for(lambda: self._handled >= target, timeout)
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._items)
+
+    def _next_batch(self) -> list:
+        with self._cond:
+            while not self._items and not self._closed:
+                self._cond.wait()
+            deadline = self._first_at + self.max_delay
+            while len(self._items) < self.max_batch and not (self._closed or self._urgent):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            batch = self._items[:self.max_batch]
+            del self._items[:self.max_batch]
+            self._first_at = time.monotonic()  # Leftovers start a new window
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return  # Closed and drained
+            start = time.perf_counter()
+            try:
+                self.handler(batch)
+            except Exception as e:
+                self.stats["errors"] += 1
+                print(f"[BATCH] Handler failed for {len(batch)} items: {e}")
+            self.stats["handler_seconds"] += time.perf_counter() - start
+            self.stats["batches"] += 1
+            self.stats["largest_batch"] = max(self.stats["largest_batch"], len(batch))
+            with self._cond:
+                self._handled += len(batch)
+                if self._handled >= self._submitted:
+                    self._urgent = False
+                self._cond.notify_all()
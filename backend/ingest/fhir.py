@@ -0,0 +1,95 @@
+"""
+SAFE-Triage AI - FHIR Observation Parsing
+Vital-sign Observations from a FHIR R4 Observation or Bundle (transaction,
+batch, collection or searchset), including the blood-pressure panel's
+systolic/diastolic components.
+"""
+from typing import Iterable, List, Optional, Tuple
+
+from .observations import VITAL_CODES, Observation, normalize
+
+SKIPPED_STATUS = {"entered-in-error", "cancelled"}
+
+
+class FHIRError(ValueError):
+    pass
+
+
+def _object(value, what: str) -> dict:
+    """A JSON object of the document ({} when absent); anything else is malformed."""
+    if value is None:
+        return {}
+    if not isinstance(value, dict):
+        raise FHIRError(f"{what} must be an object")
+    return value
+
+
+def _array(value, what: str) -> list:
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        raise FHIRError(f"{what} must be an array")
+    return value
+
+
+def _patient_ref(resource: dict) -> Optional[str]:
+    reference = _object(resource.get("subject"), "Observation.subject").get("reference") or ""
+    if isinstance(reference, str) and reference.startswith("Patient/"):
+        return reference[len("Patient/"):] or None
+    return None
+
+
+def _field(concept: dict) -> Optional[str]:
+    for coding in _array(concept.get("coding"), "CodeableConcept.coding"):
+        field = VITAL_CODES.get(str(_object(coding, "Coding").get("code", "")))
+        if field is not None:
+            return field
+    return None
+
+
+def _values(resource: dict) -> Iterable[Tuple[Optional[str], dict]]:
+    """(field, valueQuantity) for the observation and each of its components."""
+    yield (_field(_object(resource.get("code"), "Observation.code")),
+           _object(resource.get("valueQuantity"), "Observation.valueQuantity"))
+    for component in _array(resource.get("component"), "Observation.component"):
+        component = _object(component, "Observation.component")
+        yield (_field(_object(component.get("code"), "Observation.component.code")),
+               _object(component.get("valueQuantity"), "Observation.component.valueQuantity"))
+
+
+def parse_resource(resource: dict) -> Tuple[List[Observation], int]:
+    """Vital-sign observations of one Observation resource, and how many values were rejected."""
+    resource = _object(resource, "resource")
+    if resource.get("resourceType") != "Observation" or resource.get("status") in SKIPPED_STATUS:
+        return [], 0
+    patient_ref = _patient_ref(resource)
+    observations, rejected = [], 0
+    for field, quantity in _values(resource):
+        if field is None or not quantity:
+            continue
+        value = quantity.get("value")
+        if patient_ref is None or not isinstance(value, (int, float)) or isinstance(value, bool):
+            rejected += 1
+            continue
+        unit = quantity.get("code") or quantity.get("unit")
+        value = normalize(field, float(value), unit if isinstance(unit, str) else None)
+        if value is None:
+            rejected += 1
+            continue
+        observations.append(Observation(patient_ref, field, value))
+    return observations, rejected
+
+
+def parse_document(document: dict) -> Tuple[List[Observation], int]:
+    """Observations from a single Observation or a Bundle of them; FHIRError when malformed."""
+    kind = document.get("resourceType") if isinstance(document, dict) else None
+    if kind == "Observation":
+        return parse_resource(document)
+    if kind != "Bundle":
+        raise FHIRError("Expected an Observation or a Bundle")
+    observations, rejected = [], 0
+    for entry in _array(document.get("entry"), "Bundle.entry"):
+        found, bad = parse_resource(_object(entry, "Bundle.entry").get("resource"))
+        observations.extend(found)
+        rejected += bad
+    return observations, rejected
@@ -0,0 +1,159 @@
+"""
+SAFE-Triage AI - Monitor Message Generator
+Synthetic bedside-monitor traffic for testing and load: HL7v2 ORU^R01
+messages (MDC-coded, as monitors send them) and FHIR Observation bundles
+(LOINC-coded, as the HIS sends them), for a ward of patients whose vitals
+drift over time.
+
+Usage:
+    python -m backend.ingest.generator --mllp localhost:2575 --messages 10000 --patients 1-200
+    python -m backend.ingest.generator --http http://localhost:8000/ingest/fhir --messages 1000
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Tuple
+
+from .hl7 import MLLPDecoder, frame
+
+MDC = {"hr": ("147842", "MDC_ECG_HEART_RATE", "/min"), "rr": ("151562", "MDC_RESP_RATE", "/min"),
+       "spo2": ("150456", "MDC_PULS_OXIM_SAT_O2", "%"), "temp": ("150364", "MDC_TEMP_BODY", "Cel"),
+       "sbp": ("150021", "MDC_PRESS_BLD_NONINV_SYS", "mm[Hg]"), "dbp": ("150022", "MDC_PRESS_BLD_NONINV_DIA", "mm[Hg]")}
+LOINC = {"hr": ("8867-4", "/min"), "rr": ("9279-1", "/min"), "spo2": ("59408-5", "%"),
+         "temp": ("8310-5", "Cel"), "sbp": ("8480-6", "mm[Hg]"), "dbp": ("8462-4", "mm[Hg]")}
+BASELINE = {"hr": 80, "rr": 16, "spo2": 97, "temp": 37.0, "sbp": 120, "dbp": 75}
+SPREAD = {"hr": 3, "rr": 1, "spo2": 0.5, "temp": 0.05, "sbp": 3, "dbp": 2}
+LIMITS = {"hr": (35, 190), "rr": (6, 45), "spo2": (75, 100), "temp": (34.5, 41.5), "sbp": (60, 230), "dbp": (35, 130)}
+
+
+class Ward:
+    """Per-patient vitals doing a bounded random walk."""
+
+    def __init__(self, patient_ids: List[int], seed: int = 7):
+        self.rng = random.Random(seed)
+        self.vitals: Dict[int, Dict[str, float]] = {
+            pid: {k: v + self.rng.gauss(0, SPREAD[k] * 3) for k, v in BASELINE.items()} for pid in patient_ids
+        }
+
+    def step(self, patient_id: int) -> Dict[str, float]:
+        vitals = self.vitals[patient_id]
+        for name, value in vitals.items():
+            low, high = LIMITS[name]
+            vitals[name] = min(high, max(low, value + self.rng.gauss(0, SPREAD[name])))
+        return {k: round(v, 1) if k == "temp" else round(v) for k, v in vitals.items()}
+
+    def readings(self, count: int) -> Iterator[Tuple[int, Dict[str, float]]]:
+        ids = list(self.vitals)
+        for i in range(count):
+            patient_id = ids[i % len(ids)]
+            yield patient_id, self.step(patient_id)
+
+
+def oru_message(patient_id: int, vitals: Dict[str, float], control_id: str) -> bytes:
+    now = datetime.now().strftime("%Y%m%d%H%M%S")
+    segments = [
+        f"MSH|^~\\&|MONITOR|ED-BED|SAFE-TRIAGE|ED|{now}||ORU^R01^ORU_R01|{control_id}|P|2.6",
+        f"PID|||{patient_id}^^^SAFE^MR||DOE^JOHN",
+        f"OBR|1|||182777000^monitoring of patient^SCT|||{now}",
+    ]
+    for i, (name, value) in enumerate(vitals.items(), 1):
+        code, ref, unit = MDC[name]
+        segments.append(f"OBX|{i}|NM|{code}^{ref}^MDC|1.1.1.{i}|{value}|{unit}^{unit}^UCUM|||||F|||{now}")
+    return ("\r".join(segments) + "\r").encode("ascii")
+
+
+def fhir_bundle(readings: List[Tuple[int, Dict[str, float]]]) -> dict:
+    now = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    entries = []
+    for patient_id, vitals in readings:
+        for name, value in vitals.items():
+            code, unit = LOINC[name]
+            entries.append({"resource": {
+                "resourceType": "Observation", "status": "final",
+                "category": [{"coding": [{"system": "http://terminology.hl7.org/CodeSystem/observation-category",
+                                          "code": "vital-signs"}]}],
+                "code": {"coding": [{"system": "http://loinc.org", "code": code}]},
+                "subject": {"reference": f"Patient/{patient_id}"},
+                "effectiveDateTime": now,
+                "valueQuantity": {"value": value, "unit": unit, "system": "http://unitsofmeasure.org", "code": unit},
+            }, "request": {"method": "POST", "url": "Observation"}})
+    return {"resourceType": "Bundle", "type": "transaction", "entry": entries}
+
+
+# ============ LOAD ============
+
+async def send_mllp(host: str, port: int, messages: List[bytes], window: int = 200) -> dict:
+    """Pipeline messages over one connection with up to `window` unacknowledged; count ACK codes."""
+    reader, writer = await asyncio.open_connection(host, port)
+    decoder = MLLPDecoder()
+    codes: Dict[str, int] = {}
+    acked = 0
+    start = time.perf_counter()
+
+    async def read_acks(until: int):
+        nonlocal acked
+        while acked < until:
+            data = await reader.read(1 << 16)
+            if not data:
+                raise ConnectionError("Listener closed the connection")
+            for message in decoder.feed(data):
+                msa = message.split(b"MSA|", 1)[1].split(b"|", 1)[0].decode()
+                codes[msa] = codes.get(msa, 0) + 1
+                acked += 1
+
+    for sent, message in enumerate(messages, 1):
+        writer.write(frame(message))
+        if sent - acked >= window:
+            await writer.drain()
+            await read_acks(sent - window // 2)
+    await writer.drain()
+    await read_acks(len(messages))
+    elapsed = time.perf_counter() - start
+    writer.close()
+    await writer.wait_closed()
+    return {"messages": len(messages), "seconds": elapsed, "per_second": len(messages) / elapsed, "acks": codes}
+
+
+def parse_range(value: str) -> List[int]:
+    first, _, last = value.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send synthetic monitor vitals to the ingest service")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--mllp", help="host:port of the MLLP listener")
+    target.add_argument("--http", help="URL of POST /ingest/fhir")
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--patients", default="1-100", help="Patient id range, e.g. 1-200")
+    parser.add_argument("--bundle-size", type=int, default=50, help="--http: readings per bundle")
+    parser.add_argument("--tenant", help="--http: X-Tenant-ID")
+    args = parser.parse_args(argv)
+
+    ward = Ward(parse_range(args.patients))
+    readings = list(ward.readings(args.messages))
+    if args.mllp:
+        host, _, port = args.mllp.rpartition(":")
+        messages = [oru_message(pid, vitals, f"GEN{i}") for i, (pid, vitals) in enumerate(readings)]
+        report = asyncio.run(send_mllp(host or "localhost", int(port), messages))
+    else:
+        import requests
+        headers = {"X-Tenant-ID": args.tenant} if args.tenant else {}
+        start = time.perf_counter()
+        statuses: Dict[int, int] = {}
+        for i in range(0, len(readings), args.bundle_size):
+            body = fhir_bundle(readings[i:i + args.bundle_size])
+            status = requests.post(args.http, data=json.dumps(body), timeout=30,
+                                   headers={"Content-Type": "application/fhir+json", **headers}).status_code
+            statuses[status] = statuses.get(status, 0) + 1
+        elapsed = time.perf_counter() - start
+        report = {"readings": len(readings), "seconds": elapsed, "per_second": len(readings) / elapsed,
+                  "http_status": statuses}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""
+SAFE-Triage AI - HL7v2 Parsing and MLLP Framing
+Incremental MLLP decoder for TCP streams, and an ORU^R01 parser that walks
+segment and field offsets in the raw message bytes: only the handful of
+fields triage needs (MSH-9/10, PID-3, OBX-3/5/6/11) are ever sliced out and
+decoded.
+"""
+import re
+from datetime import datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from .observations import VITAL_CODES, Observation, normalize
+
+MLLP_START = b"\x0b"
+MLLP_END = b"\x1c\r"
+SEGMENT = re.compile(rb"[^\r\n]+")
+MESSAGE_BOUNDARY = re.compile(rb"[\r\n]+(?=MSH)")
+SKIPPED_RESULT_STATUS = {b"X", b"W", b"D"}  # Cannot be obtained / wrong / deleted
+
+
+class HL7Error(ValueError):
+    pass
+
+
+class ORUMessage(NamedTuple):
+    control_id: str
+    message_type: str
+    patient_ref: Optional[str]
+    observations: List[Observation]
+    rejected: int  # Vital-sign OBX values that were implausible or not numeric
+
+
+# ============ MLLP ============
+
+class MLLPDecoder:
+    """Feed raw TCP chunks, get back complete messages (frames may span chunks)."""
+
+    def __init__(self, max_message_bytes: int = 1 << 20):
+        self.max_message_bytes = max_message_bytes
+        self._buf = bytearray()
+        self._scan_from = 0  # Where to resume looking for the end marker
+
+    def feed(self, data: bytes) -> List[bytes]:
+        buf = self._buf
+        buf += data
+        messages = []
+        pos = 0
+        while True:
+            start = buf.find(MLLP_START, pos)
+            if start < 0:
+                pos = len(buf)  # Noise between frames
+                break
+            end = buf.find(MLLP_END, max(start + 1, self._scan_from))
+            if end < 0:
+                # The end marker may be split across chunks: rescan its first byte next time
+                self._scan_from = max(start + 1, len(buf) - 1)
+                pos = start
+                break
+            messages.append(bytes(buf[start + 1:end]))
+            pos = end + len(MLLP_END)
+            self._scan_from = 0
+        del buf[:pos]
+        self._scan_from = max(0, self._scan_from - pos)
+        if len(buf) > self.max_message_bytes:
+            buf.clear()
+            self._scan_from = 0
+            raise HL7Error("MLLP frame exceeds the maximum message size")
+        return messages
+
+
+def frame(message: bytes) -> bytes:
+    return MLLP_START + message + MLLP_END
+
+
+def split_messages(body: bytes) -> List[bytes]:
+    """Messages from an HTTP body: MLLP frames, or bare messages one after another."""
+    if MLLP_START in body:
+        return MLLPDecoder(max_message_bytes=len(body) + 1).feed(body)
+    return [m for m in MESSAGE_BOUNDARY.split(body.strip()) if m]
+
+
+def ack(control_id: str, code: str = "AA", text: str = "") -> bytes:
+    """MLLP-framed original-mode acknowledgement (AA accepted, AE error, AR rejected)."""
+    now = datetime.now().strftime("%Y%m%d%H%M%S")
+    return frame(
+        f"MSH|^~\\&|SAFE-TRIAGE|ED|||{now}||ACK^R01^ACK|ACK{control_id}|P|2.5\r"
+        f"MSA|{code}|{control_id}|{text[:80]}\r".encode("utf-8")
+    )
+
+
+# ============ PARSER ============
+
+def _fields(msg: bytes, start: int, end: int, sep: bytes, limit: int) -> List[Tuple[int, int]]:
+    """(start, end) offsets of the first `limit` fields of msg[start:end]."""
+    spans = []
+    while len(spans) < limit:
+        cut = msg.find(sep, start, end)
+        if cut < 0:
+            spans.append((start, end))
+            break
+        spans.append((start, cut))
+        start = cut + 1
+    return spans
+
+
+def _get(msg: bytes, spans: List[Tuple[int, int]], index: int) -> bytes:
+    if index >= len(spans):
+        return b""
+    start, end = spans[index]
+    return msg[start:end]
+
+
+def _component(value: bytes, sep: bytes, index: int = 0) -> bytes:
+    parts = value.split(sep, index + 1)
+    return parts[index] if index < len(parts) else b""
+
+
+def parse_message(msg: bytes) -> ORUMessage:
+    """Vital-sign observations of one HL7v2 message (other message types yield none)."""
+    if not msg.startswith(b"MSH") or len(msg) < 8:
+        raise HL7Error("Message does not start with an MSH segment")
+    fs, cs, rs = msg[3:4], msg[4:5], msg[5:6]  # Field, component and repetition separators
+    control_id, message_type, patient_ref = "", "", None
+    observations: List[Observation] = []
+    rejected = 0
+
+    for segment in SEGMENT.finditer(msg):
+        start, end = segment.span()
+        kind = msg[start:start + 3]
+        if kind == b"MSH":
+            spans = _fields(msg, start, end, fs, 10)
+            # MSH-1 is the separator itself, so MSH-n is the (n-1)th span
+            message_type = _get(msg, spans, 8).replace(cs, b"^").decode("ascii", "replace")
+            control_id = _get(msg, spans, 9).decode("ascii", "replace")
+        elif kind == b"PID":
+            spans = _fields(msg, start, end, fs, 4)
+            identifier = _component(_component(_get(msg, spans, 3), rs), cs).strip()
+            patient_ref = identifier.decode("ascii", "replace") or None
+        elif kind == b"OBX":
+            spans = _fields(msg, start, end, fs, 12)
+            code = _get(msg, spans, 3)
+            field = (VITAL_CODES.get(_component(code, cs).decode("ascii", "replace"))
+                     or VITAL_CODES.get(_component(code, cs, 1).decode("ascii", "replace")))
+            if field is None or _get(msg, spans, 11) in SKIPPED_RESULT_STATUS:
+                continue
+            try:
+                raw = float(_get(msg, spans, 5))
+            except ValueError:
+                rejected += 1
+                continue
+            unit = _component(_get(msg, spans, 6), cs).decode("utf-8", "replace") or None
+            value = normalize(field, raw, unit)
+            if value is None or patient_ref is None:
+                rejected += 1
+                continue
+            observations.append(Observation(patient_ref, field, value))
+
+    if not control_id:
+        raise HL7Error("MSH-10 (message control id) is missing")
+    if not message_type.startswith("ORU"):
+        observations = []
+    return ORUMessage(control_id, message_type, patient_ref, observations, rejected)
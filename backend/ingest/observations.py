@@ -0,0 +1,46 @@
+"""
+SAFE-Triage AI - Vital-Sign Observation Mapping
+Codes used by bedside monitors (IEEE 11073 MDC) and the hospital
+information system (LOINC) for the vitals the rule engine reads, plus unit
+normalization and plausibility limits shared by the HL7v2 and FHIR parsers.
+"""
+from typing import NamedTuple, Optional
+
+
+class Observation(NamedTuple):
+    patient_ref: str  # SAFE-Triage patient id (PID-3 / Observation.subject)
+    field: str  # models.Vitals attribute
+    value: float
+
+
+# code -> Vitals field. LOINC codes, then MDC numeric codes and their reference ids
+VITAL_CODES = {
+    "8867-4": "hr", "9279-1": "rr", "59408-5": "spo2", "2708-6": "spo2", "2710-2": "spo2",
+    "8310-5": "temp", "8331-1": "temp", "8332-9": "temp", "8480-6": "sbp", "8462-4": "dbp",
+    "9269-2": "gcs", "72514-3": "pain_score",
+    "147842": "hr", "149530": "hr", "151562": "rr", "150456": "spo2",
+    "150344": "temp", "150364": "temp", "150021": "sbp", "150022": "dbp",
+    "MDC_ECG_HEART_RATE": "hr", "MDC_PULS_OXIM_PULS_RATE": "hr", "MDC_RESP_RATE": "rr",
+    "MDC_PULS_OXIM_SAT_O2": "spo2", "MDC_TEMP": "temp", "MDC_TEMP_BODY": "temp",
+    "MDC_PRESS_BLD_NONINV_SYS": "sbp", "MDC_PRESS_BLD_NONINV_DIA": "dbp",
+}
+
+# Values outside these limits are artefacts (lead off, probe on the table), not patients
+PLAUSIBLE = {
+    "hr": (10, 300), "rr": (2, 100), "spo2": (30, 100), "temp": (25, 45),
+    "sbp": (30, 300), "dbp": (10, 200), "gcs": (3, 15), "pain_score": (0, 10),
+}
+INTEGER_FIELDS = {"hr", "rr", "sbp", "dbp", "gcs", "pain_score"}
+FAHRENHEIT_UNITS = {"[degF]", "degF", "°F", "F", "DEGF"}
+
+
+def normalize(field: str, value: float, unit: Optional[str] = None) -> Optional[float]:
+    """Value in the units `Vitals` expects, or None if it is not plausible."""
+    if field == "temp" and unit in FAHRENHEIT_UNITS:
+        value = (value - 32) * 5 / 9
+    elif field == "spo2" and value <= 1.0 and unit in (None, "", "1", "{ratio}"):
+        value *= 100  # Reported as a fraction
+    low, high = PLAUSIBLE[field]
+    if not low <= value <= high:
+        return None
+    return round(value) if field in INTEGER_FIELDS else round(value, 1)
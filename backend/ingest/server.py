@@ -0,0 +1,66 @@
+"""
+SAFE-Triage AI - MLLP Listener
+asyncio TCP server for HL7v2 over MLLP. Each message is parsed, queued for
+re-triage and acknowledged (MSA AA) in arrival order; unparseable messages
+get AR and a full ingest backlog AE, so the sending interface engine keeps
+the message and retries.
+"""
+import asyncio
+from typing import Optional
+
+from .hl7 import HL7Error, MLLPDecoder, ack, parse_message
+from .service import VitalsIngest
+
+
+class MLLPServer:
+    def __init__(self, ingest: VitalsIngest, tenant_id: str = "default"):
+        self.ingest = ingest
+        self.tenant_id = tenant_id
+        self.stats = {"connections": 0, "messages": 0, "errors": 0, "backlog_rejections": 0}
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    def handle(self, message: bytes) -> bytes:
+        """ACK for one message (already unframed)."""
+        self.stats["messages"] += 1
+        try:
+            parsed = parse_message(message)
+        except HL7Error as e:
+            self.stats["errors"] += 1
+            return ack("", "AR", str(e))
+        if not self.ingest.submit(self.tenant_id, parsed.observations, parsed.rejected):
+            self.stats["backlog_rejections"] += 1
+            return ack(parsed.control_id, "AE", "Ingest backlog full, retry later")
+        return ack(parsed.control_id)
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.stats["connections"] += 1
+        decoder = MLLPDecoder()
+        try:
+            while True:
+                data = await reader.read(1 << 16)
+                if not data:
+                    break
+                try:
+                    messages = decoder.feed(data)
+                except HL7Error as e:
+                    self.stats["errors"] += 1
+                    writer.write(ack("", "AR", str(e)))
+                    continue
+                for message in messages:
+                    writer.write(self.handle(message))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "0.0.0.0", port: int = 2575) -> asyncio.base_events.Server:
+        self._server = await asyncio.start_server(self._connection, host, port)
+        addresses = ", ".join(str(s.getsockname()) for s in self._server.sockets)
+        print(f"[INGEST] MLLP listening on {addresses} (tenant '{self.tenant_id}')")
+        return self._server
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
@@ -0,0 +1,132 @@
+"""
+SAFE-Triage AI - Vitals Ingest Service
+Applies monitor and HIS observations to triaged patients and re-runs the
+rule engine on them, one micro-batch at a time: per tenant one SELECT for
+the batch's patients, one evaluate_batch call and one commit.
+
+New vitals always replace the stored ones and every re-evaluation appends
+to the patient's early-warning score history. The stored triage level is
+only ever raised (a deteriorating patient is escalated and alerted on);
+lowering acuity stays a clinician's decision. Committed changes are copied
+into the tenant's recent-patient cache.
+"""
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import select
+
+from ..logic import early_warning
+from ..models import PatientInput, TriageResult
+from ..patient_cache import PatientRecord
+from ..sql_models import Patient
+from .batcher import MicroBatcher
+from .observations import Observation
+
+
+class VitalsIngest:
+    def __init__(self, registry, on_escalation: Optional[Callable] = None, audit=None,
+                 max_batch: int = 1000, max_delay: float = 0.05):
+        """
+        registry: tenants.TenantRegistry; on_escalation(tenant, patient_input,
+        result, previous_level) is called for every escalated patient; audit:
+        an AuditLog receiving each escalation as an "ingest" decision.
+        """
+        self.registry = registry
+        self.on_escalation = on_escalation
+        self.audit = audit
+        self.stats = {"observations": 0, "rejected": 0, "unknown_patients": 0, "patients_updated": 0,
+                      "reevaluated": 0, "escalations": 0}
+        self.batcher = MicroBatcher(self._apply, max_batch=max_batch, max_delay=max_delay, name="vitals-ingest")
+
+    def submit(self, tenant_id: str, observations: List[Observation], rejected: int = 0) -> bool:
+        """Queue observations for re-triage; False when the ingest backlog is full."""
+        if not self.batcher.submit([(tenant_id, obs) for obs in observations]):
+            return False
+        self.stats["rejected"] += rejected
+        return True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        return self.batcher.flush(timeout)
+
+    def close(self):
+        self.batcher.close()
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, batcher=dict(self.batcher.stats, pending=self.batcher.pending()))
+
+    # ============ BATCH HANDLER ============
+
+    def _apply(self, batch: List[Tuple[str, Observation]]):
+        self.stats["observations"] += len(batch)
+        by_tenant: Dict[str, "OrderedDict[int, dict]"] = {}
+        for tenant_id, obs in batch:
+            if not obs.patient_ref.isdigit():
+                self.stats["unknown_patients"] += 1
+                continue
+            # Later observations of the same vital win
+            by_tenant.setdefault(tenant_id, OrderedDict()).setdefault(int(obs.patient_ref), {})[obs.field] = obs.value
+        for tenant_id, updates in by_tenant.items():
+            try:
+                # Held: evicted meanwhile, its pools are disposed after this batch
+                tenant = self.registry.get(tenant_id, acquire=True)
+            except KeyError:
+                self.stats["unknown_patients"] += len(updates)
+                continue
+            try:
+                self._apply_tenant(tenant, updates)
+            finally:
+                tenant.release()
+
+    def _apply_tenant(self, tenant, updates: "OrderedDict[int, dict]"):
+        escalated: List[Tuple[int, PatientInput, TriageResult, int]] = []
+        with tenant.SessionLocal() as db:
+            records = {p.id: p for p in db.scalars(select(Patient).where(Patient.id.in_(list(updates))))}
+            self.stats["unknown_patients"] += len(updates) - len(records)
+            patients, inputs = [], []
+            for patient_id, vitals in updates.items():
+                record = records.get(patient_id)
+                if record is None:
+                    continue
+                record.vitals = {**(record.vitals or {}), **vitals}  # New dict so the JSON column is flagged dirty
+                try:
+                    patient = PatientInput(age=record.age, gender=record.gender,
+                                           chief_complaint_text=record.chief_complaint or "", vitals=record.vitals)
+                except ValidationError:
+                    continue  # Imported record without age/gender: vitals stored, not re-triaged
+                patients.append(record)
+                inputs.append(patient)
+            results = tenant.engine.evaluate_batch(inputs)
+            for record, patient, result in zip(patients, inputs, results):
+                record.score_history = early_warning.append_history(
+                    record.score_history, result.scores.model_dump(), "ingest")
+                previous = record.triage_level
+                if previous is None or int(result.level) < previous:
+                    escalated.append((record.id, patient, result, previous))
+                    record.triage_level = int(result.level)
+                    record.triage_color = result.color_code
+                    record.triage_label_en = result.label_en
+                    record.triage_label_ar = result.label_ar
+                    record.triage_reasoning = [r for r in result.reasoning if r]
+                    record.triage_red_flags = [f for f in result.red_flags if f]
+                    record.triage_evidence = [span.model_dump() for span in result.evidence]
+                    record.triage_resources = result.resources.model_dump()
+            # Copied before the commit expires the loaded attributes
+            cached = [PatientRecord.from_row(record) for record in records.values()] if tenant.patients.enabled else []
+            db.commit()
+        tenant.patients.put(cached)
+        for patient_id, _patient, result, _previous in escalated:
+            tenant.similar.update_level(patient_id, int(result.level))
+        self.stats["patients_updated"] += len(records)
+        self.stats["reevaluated"] += len(inputs)
+        self.stats["escalations"] += len(escalated)
+        for patient_id, patient, result, previous in escalated:
+            if self.audit is not None:
+                self.audit.record_decision(patient.model_dump(mode="json"), result.model_dump(mode="json"),
+                                           patient_id=patient_id, tenant=tenant.id, endpoint="ingest",
+                                           thresholds=tenant.config.thresholds)
+            if self.on_escalation is not None:
+                try:
+                    self.on_escalation(tenant, patient, result, previous)
+                except Exception as e:
+                    print(f"[INGEST] Escalation callback failed: {e}")
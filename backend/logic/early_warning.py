@@ -0,0 +1,180 @@
+"""
+SAFE-Triage AI - Early-Warning Scores
+NEWS2 and qSOFA for adults, PEWS for children, from the same Vitals the
+triage engine reads. Every parameter is a band table scored by bisect (one
+patient) or numpy searchsorted (a whole batch), so the scalar and batch
+forms share one definition.
+
+Scores use the parameters that are present and list the missing ones.
+Score objects are immutable and cached, so equal scores share one instance.
+
+    NEWS2   Royal College of Physicians, 2017 (scale 1 SpO2; patients are
+            assumed to be on room air - oxygen therapy is not captured; GCS
+            below 15 counts as new confusion).
+    qSOFA   Sepsis-3, 2016: RR >= 22, SBP <= 100, altered mentation.
+    PEWS    Vital-sign items of the Bedside PEWS (Parshuram, 2009) by age
+            band: HR, RR, SBP, SpO2. Capillary refill, respiratory effort and
+            oxygen therapy are not captured, so the total is out of 14.
+"""
+from bisect import bisect_right
+from functools import lru_cache
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+from ..models import EarlyWarningScores, Vitals
+
+ADULT_AGE = 16  # NEWS2 and qSOFA are validated from 16 years; PEWS below
+FIELDS = ("hr", "rr", "spo2", "temp", "sbp", "gcs")  # Column order of vitals_matrix
+HISTORY_LIMIT = 48  # Score history entries kept per patient
+
+
+class Band(NamedTuple):
+    """Points for a value: points[i] when edges[i-1] <= value < edges[i]."""
+    edges: Sequence[float]
+    points: Sequence[int]
+
+    def score(self, value: float) -> int:
+        return self.points[bisect_right(self.edges, value)]
+
+    def score_array(self, values: np.ndarray) -> np.ndarray:
+        """Vectorized `score`; NaN (missing) scores 0."""
+        points = np.asarray(self.points, dtype=np.int16)[np.searchsorted(self.edges, values, side="right")]
+        return np.where(np.isnan(values), 0, points)
+
+
+# ============ TABLES ============
+
+NEWS2 = {
+    "rr": Band((9, 12, 21, 25), (3, 1, 0, 2, 3)),
+    "spo2": Band((92, 94, 96), (3, 2, 1, 0)),
+    "sbp": Band((91, 101, 111, 220), (3, 2, 1, 0, 3)),
+    "hr": Band((41, 51, 91, 111, 131), (3, 1, 0, 1, 2, 3)),
+    "temp": Band((35.05, 36.05, 38.05, 39.05), (3, 1, 0, 1, 2)),  # Read to 0.1 degC
+    "gcs": Band((15,), (3, 0)),
+}
+
+QSOFA = {
+    "rr": Band((22,), (0, 1)),
+    "sbp": Band((101,), (1, 0)),
+    "gcs": Band((15,), (1, 0)),
+}
+
+# PEWS age bands (years): < 3 months, 3-12 months, 1-4, 4-12, 12 and over
+PEWS_AGES = (0.25, 1, 4, 12)
+_SYMMETRIC = (4, 2, 1, 0, 1, 2, 4)  # Far low, low, slightly low, normal, slightly high, high, far high
+PEWS = {
+    "hr": [Band(edges, _SYMMETRIC) for edges in (
+        (80, 90, 110, 151, 171, 181), (70, 80, 100, 151, 171, 181), (60, 70, 90, 121, 151, 171),
+        (50, 60, 70, 111, 131, 151), (40, 50, 60, 101, 121, 141))],
+    "rr": [Band(edges, _SYMMETRIC) for edges in (
+        (10, 20, 30, 61, 71, 81), (10, 20, 25, 51, 61, 71), (10, 15, 20, 41, 51, 61),
+        (10, 12, 15, 31, 41, 51), (8, 10, 12, 21, 31, 41))],
+    "sbp": [Band(edges, _SYMMETRIC) for edges in (
+        (45, 50, 60, 81, 101, 131), (60, 70, 80, 101, 121, 131), (65, 75, 90, 111, 126, 141),
+        (70, 80, 90, 121, 141, 151), (75, 85, 100, 131, 151, 161))],
+    "spo2": [Band((91, 95), (2, 1, 0))] * (len(PEWS_AGES) + 1),
+}
+
+
+def news2_risk(total: int, highest: int) -> str:
+    if total >= 7:
+        return "high"
+    if total >= 5:
+        return "medium"
+    return "low-medium" if highest >= 3 else "low"
+
+
+def pews_risk(total: int) -> str:
+    return "high" if total >= 8 else "medium" if total >= 4 else "low"
+
+
+@lru_cache(maxsize=4096)
+def _adult_scores(news2: int, highest: int, qsofa: int, missing: tuple) -> EarlyWarningScores:
+    return EarlyWarningScores(news2=news2, news2_risk=news2_risk(news2, highest),
+                              qsofa=qsofa, qsofa_positive=qsofa >= 2, missing=missing)
+
+
+@lru_cache(maxsize=4096)
+def _child_scores(pews: int, missing: tuple) -> EarlyWarningScores:
+    return EarlyWarningScores(pews=pews, pews_risk=pews_risk(pews), missing=missing)
+
+
+# ============ ONE PATIENT ============
+
+def score(age: float, vitals: Vitals) -> EarlyWarningScores:
+    missing = []
+    if age >= ADULT_AGE:
+        total = highest = qsofa = 0
+        for name, band in NEWS2.items():
+            value = getattr(vitals, name)
+            if value is None:
+                missing.append(name)
+                continue
+            points = band.score(value)
+            total += points
+            highest = max(highest, points)
+            if name in QSOFA:
+                qsofa += QSOFA[name].score(value)
+        return _adult_scores(total, highest, qsofa, tuple(missing))
+    band = bisect_right(PEWS_AGES, age)
+    total = 0
+    for name, bands in PEWS.items():
+        value = getattr(vitals, name)
+        if value is None:
+            missing.append(name)
+        else:
+            total += bands[band].score(value)
+    return _child_scores(total, tuple(missing))
+
+
+# ============ BATCH ============
+
+def vitals_matrix(vitals: Sequence[Vitals]) -> np.ndarray:
+    """(patients x FIELDS) float matrix, NaN where a vital is missing."""
+    rows = [[v.hr, v.rr, v.spo2, v.temp, v.sbp, v.gcs] for v in vitals]
+    return np.array(rows, dtype=np.float64).reshape(-1, len(FIELDS))
+
+
+def score_batch(ages: np.ndarray, vitals: np.ndarray) -> List[EarlyWarningScores]:
+    """`score` for every row of a vitals_matrix, one searchsorted per table."""
+    ages = np.asarray(ages, dtype=np.float64)
+    column = {name: vitals[:, i] for i, name in enumerate(FIELDS)}
+    missing = np.isnan(vitals).tolist()
+    adult = ages >= ADULT_AGE
+
+    news_points = np.stack([band.score_array(column[name]) for name, band in NEWS2.items()])
+    news_total, news_high = news_points.sum(axis=0).tolist(), news_points.max(axis=0).tolist()
+    qsofa = sum(band.score_array(column[name]) for name, band in QSOFA.items()).tolist()
+    age_band = np.searchsorted(PEWS_AGES, ages, side="right")
+    pews = np.zeros(len(ages), dtype=np.int16)
+    for name, bands in PEWS.items():
+        for b, band in enumerate(bands):
+            rows = age_band == b
+            if rows.any():
+                pews[rows] += band.score_array(column[name][rows])
+    pews = pews.tolist()
+
+    news_missing = [FIELDS.index(name) for name in NEWS2]
+    pews_missing = [FIELDS.index(name) for name in PEWS]
+    scores = []
+    for i, is_adult in enumerate(adult.tolist()):
+        if is_adult:
+            scores.append(_adult_scores(news_total[i], news_high[i], qsofa[i],
+                                        tuple(FIELDS[j] for j in news_missing if missing[i][j])))
+        else:
+            scores.append(_child_scores(pews[i], tuple(FIELDS[j] for j in pews_missing if missing[i][j])))
+    return scores
+
+
+# ============ HISTORY ============
+
+def append_history(history: Optional[List[Dict]], scores: Optional[Dict], source: str,
+                   limit: int = HISTORY_LIMIT) -> List[Dict]:
+    """New history list (for a JSON column) with one entry per scoring, newest last."""
+    entry = {"at": datetime.now(timezone.utc).isoformat(timespec="seconds"), "source": source}
+    for key in ("news2", "qsofa", "pews"):
+        if scores and scores.get(key) is not None:
+            entry[key] = scores[key]
+    return (list(history or []) + [entry])[-limit:]
@@ -0,0 +1,132 @@
+"""
+SAFE-Triage AI - Pediatric Vital-Sign Centiles
+Age-specific centiles of heart rate, respiratory rate and systolic blood
+pressure, precomputed for every month of age from birth to 18 years.
+
+Sources:
+    HR, RR  Fleming S et al. Normal ranges of heart rate and respiratory
+            rate in children from birth to 18 years. Lancet 2011;377:1011-8.
+            Centiles per age band, placed at the band midpoints.
+    SBP     5th centile: PALS hypotension limits (60 at birth, 70 for 1-12
+            months, 70 + 2 x age for 1-10 years, 90 from 10 years).
+            50th-99th: NHBPEP Fourth Report (2004), boys at the 50th height
+            centile, 1-17 years; under 1 year from the 1987 Task Force
+            charts (95th/99th extrapolated from the 90th).
+
+Between knots values are linear in age; lookups index the monthly table and
+interpolate within the month, so they cost the same at any age.
+"""
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+MAX_MONTHS = 18 * 12
+
+CENTILES = (1, 10, 25, 50, 75, 90, 99)
+
+# (from month, to month) -> centiles 1, 10, 25, 50, 75, 90, 99
+HEART_RATE_BANDS = [
+    ((0, 3), (107, 123, 133, 143, 154, 164, 181)),
+    ((3, 6), (104, 120, 129, 140, 150, 159, 175)),
+    ((6, 9), (98, 114, 123, 134, 143, 152, 168)),
+    ((9, 12), (93, 109, 118, 128, 137, 145, 161)),
+    ((12, 18), (88, 103, 112, 123, 132, 140, 156)),
+    ((18, 24), (82, 98, 106, 116, 126, 135, 149)),
+    ((24, 36), (76, 92, 100, 110, 119, 128, 142)),
+    ((36, 48), (70, 86, 94, 104, 113, 123, 136)),
+    ((48, 72), (65, 81, 89, 98, 108, 117, 131)),
+    ((72, 96), (59, 74, 82, 91, 101, 111, 123)),
+    ((96, 144), (52, 67, 75, 84, 93, 103, 115)),
+    ((144, 180), (47, 62, 69, 78, 87, 96, 108)),
+    ((180, 216), (43, 58, 65, 73, 83, 92, 104)),
+]
+
+RESP_RATE_BANDS = [
+    ((0, 3), (25, 34, 40, 43, 52, 57, 66)),
+    ((3, 6), (24, 33, 38, 41, 49, 55, 64)),
+    ((6, 9), (23, 31, 36, 39, 47, 52, 61)),
+    ((9, 12), (22, 30, 35, 37, 45, 50, 58)),
+    ((12, 18), (21, 28, 32, 35, 42, 46, 53)),
+    ((18, 24), (19, 25, 29, 31, 36, 40, 46)),
+    ((24, 36), (18, 22, 25, 28, 31, 34, 38)),
+    ((36, 48), (17, 21, 23, 25, 27, 29, 33)),
+    ((48, 72), (17, 20, 21, 23, 25, 27, 29)),
+    ((72, 96), (16, 18, 20, 21, 23, 24, 27)),
+    ((96, 144), (14, 16, 18, 19, 21, 22, 25)),
+    ((144, 180), (12, 15, 16, 18, 19, 21, 23)),
+    ((180, 216), (11, 13, 15, 16, 18, 19, 22)),
+]
+
+SBP_CENTILES = (5, 50, 90, 95, 99)
+
+# month -> centiles 5, 50, 90, 95, 99
+SBP_KNOTS = [
+    (0, (60, 70, 87, 91, 98)),
+    (1, (70, 82, 101, 105, 112)),
+    (3, (70, 88, 106, 110, 117)),
+    (6, (70, 89, 105, 109, 116)),
+    (12, (72, 85, 98, 102, 109)),
+    (24, (74, 87, 101, 106, 113)),
+    (36, (76, 91, 105, 109, 116)),
+    (48, (78, 93, 107, 111, 118)),
+    (60, (80, 95, 108, 112, 120)),
+    (72, (82, 96, 110, 114, 121)),
+    (84, (84, 97, 111, 115, 122)),
+    (96, (86, 99, 112, 116, 123)),
+    (108, (88, 100, 114, 118, 125)),
+    (120, (90, 102, 115, 119, 127)),
+    (132, (90, 104, 117, 121, 129)),
+    (144, (90, 106, 120, 123, 131)),
+    (156, (90, 108, 122, 126, 133)),
+    (168, (90, 111, 125, 128, 136)),
+    (180, (90, 113, 127, 131, 138)),
+    (192, (90, 116, 130, 134, 141)),
+    (204, (90, 118, 132, 136, 143)),
+]
+
+
+def band_midpoints(bands) -> List[Tuple[float, Sequence[float]]]:
+    return [((start + end) / 2, values) for (start, end), values in bands]
+
+
+class CentileTable:
+    """Centiles of one vital sign for each month of age 0..MAX_MONTHS (row = month, column = centile)."""
+
+    def __init__(self, centiles: Sequence[int], knots: List[Tuple[float, Sequence[float]]]):
+        self.centiles = tuple(centiles)
+        months = np.array([month for month, _ in knots], dtype=np.float64)
+        values = np.array([row for _, row in knots], dtype=np.float64)
+        grid = np.arange(MAX_MONTHS + 2, dtype=np.float64)  # One spare row to interpolate the last month
+        # Flat before the first knot and after the last one
+        self.table = np.column_stack([np.interp(grid, months, values[:, j]) for j in range(len(self.centiles))])
+        # Columns as plain lists: scalar lookups avoid numpy's per-call overhead
+        self._columns = {centile: column.tolist() for centile, column in zip(self.centiles, self.table.T)}
+
+    def column(self, centile: int) -> int:
+        try:
+            return self.centiles.index(centile)
+        except ValueError:
+            raise ValueError(f"Centile {centile} is not tabulated (choose from {self.centiles})") from None
+
+    def value(self, centile: int, age_years: float) -> float:
+        """Centile at one age (years; 0.25 = 3 months)."""
+        column = self._columns.get(centile)
+        if column is None:
+            self.column(centile)  # Raises
+        months = min(max(age_years * 12, 0.0), MAX_MONTHS)
+        month = int(months)
+        low = column[month]
+        return low + (months - month) * (column[month + 1] - low)
+
+    def values(self, centile: int, ages_years: np.ndarray) -> np.ndarray:
+        """Vectorized `value` for an array of ages."""
+        column = self.table[:, self.column(centile)]
+        months = np.clip(np.asarray(ages_years, dtype=np.float64) * 12, 0, MAX_MONTHS)
+        month = months.astype(np.intp)
+        low = column[month]
+        return low + (months - month) * (column[month + 1] - low)
+
+
+HEART_RATE = CentileTable(CENTILES, band_midpoints(HEART_RATE_BANDS))
+RESP_RATE = CentileTable(CENTILES, band_midpoints(RESP_RATE_BANDS))
+SYSTOLIC_BP = CentileTable(SBP_CENTILES, SBP_KNOTS)
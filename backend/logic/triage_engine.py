@@ -3,9 +3,70 @@ SAFE-Triage AI - Triage Engine
 Based on ESI (Emergency Severity Index) v5
 Vital signs thresholds follow international standards (used in Egyptian hospitals)
 """
-from ..models import PatientInput, TriageResult, TriageLevel, Vitals
+from ..models import RESOURCE_TYPES, MatchSpan, PatientInput, ResourceEstimate, TriageResult, TriageLevel, Vitals
 from ..nlp.processor import NLPProcessor
-from typing import List, Tuple
+from . import early_warning
+from .pediatric_vitals import HEART_RATE, RESP_RATE, SYSTOLIC_BP
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Vital-sign cut-offs (see the class docstring). Overridable per deployment.
+DEFAULT_THRESHOLDS = {
+    "adult_age": 14,
+    # Level 1 - adults (SpO2, GCS, BP and temperature apply to all ages)
+    "critical_rr_low": 8, "critical_rr_high": 36,
+    "critical_hr_low": 40, "critical_hr_high": 150,
+    "critical_spo2": 90, "critical_gcs": 9,
+    "critical_sbp_low": 80, "critical_sbp_high": 220,
+    "critical_temp_low": 35, "critical_temp_high": 41,
+    # Level 1 - pediatric (HR/RR above the critical centile for age, SBP below the PALS 5th)
+    "peds_critical_rr_low": 10, "peds_critical_hr_low": 60,
+    "peds_critical_centile": 99, "peds_sbp_low_centile": 5,
+    # Level 2 - adults
+    "danger_hr_low": 50, "danger_hr_high": 100,
+    "danger_rr_low": 10, "danger_rr_high": 24,
+    "danger_spo2": 94,
+    "danger_sbp_low": 90, "danger_sbp_high": 180,
+    "danger_temp_low": 36, "danger_temp_high": 39,
+    # Level 2 - pediatric (HR/RR above the danger centile or below the low one, SBP above its centile)
+    "peds_danger_centile": 90, "peds_low_centile": 1, "peds_sbp_high_centile": 99,
+    "peds_danger_spo2": 94, "peds_danger_temp_high": 39,
+    "severe_pain": 7,
+}
+
+# Complaint categories -> resources they usually need (any trigger counts once)
+RESOURCE_RULES = (
+    (("abdominal",), ("labs", "ct")),  # Labs + possible imaging
+    (("chest_pain", "cardiac"), ("ecg", "labs")),  # ECG + Labs/Troponin
+    (("sob",), ("xray", "labs")),  # CXR + Labs/ABG
+    (("trauma",), ("xray", "labs")),  # X-ray + possible labs
+    (("stroke",), ("ct", "labs")),  # CT + Labs
+    (("fever",), ("labs",)),
+    (("laceration",), ("procedure",)),  # Suture supplies
+    (("allergy",), ("iv_meds",)),  # IV/IM Meds
+    (("uti",), ("labs",)),  # UA + possible culture
+    (("burn",), ("procedure",)),  # Wound care
+    (("bite_sting",), ("iv_meds",)),  # Possible antivenom/antibiotics
+)
+
+# Threshold keys that name a centile, and the table that must tabulate it
+CENTILE_THRESHOLDS = {
+    "peds_critical_centile": HEART_RATE, "peds_danger_centile": HEART_RATE, "peds_low_centile": HEART_RATE,
+    "peds_sbp_low_centile": SYSTOLIC_BP, "peds_sbp_high_centile": SYSTOLIC_BP,
+}
+
+
+class PediatricLimits(NamedTuple):
+    """Vital-sign cut-offs for a child of one age (TriageEngine._pediatric_limits)."""
+    hr_critical: float
+    hr_danger: float
+    hr_low: float
+    rr_critical: float
+    rr_danger: float
+    rr_low: float
+    sbp_low: float
+    sbp_high: float
 
 class TriageEngine:
     """
@@ -38,197 +99,267 @@ class TriageEngine:
                         Critical: <9 (Level 1 - Comatose)
                         Abnormal: 9-14 (Level 2 - Altered)
     
-    PEDIATRICS (age-based):
-        See _check_pediatric_vitals method for age-specific ranges
+    PEDIATRICS (< adult_age):
+        HR, RR, SBP:    Age-specific centiles by month of age (pediatric_vitals)
+                        Critical: HR/RR above the 99th centile, SBP below the
+                                  5th (PALS hypotension) (Level 1)
+                        Abnormal: HR/RR above the 90th or below the 1st
+                                  centile, SBP above the 99th (Level 2)
+                        HR/RR limits are never below the adult ones, so they
+                        meet the adult rules at adult_age
     """
     
-    def __init__(self):
-        self.nlp = NLPProcessor()
-        
-    def _check_critical_vitals(self, age: int, vitals: Vitals) -> Tuple[bool, List[str]]:
+    # Bump when thresholds or level logic change (recorded with shadow/replay logs)
+    RULES_VERSION = "1.1"
+
+    def __init__(self, thresholds: Optional[Dict[str, float]] = None, nlp: Optional[NLPProcessor] = None):
+        """
+        `thresholds` overrides entries of DEFAULT_THRESHOLDS (e.g. a hospital's
+        local protocol); `nlp` lets a deployment bring its own lexicon.
+        """
+        unknown = set(thresholds or {}) - DEFAULT_THRESHOLDS.keys()
+        if unknown:
+            raise ValueError(f"Unknown triage thresholds: {', '.join(sorted(unknown))}")
+        self.thresholds = {**DEFAULT_THRESHOLDS, **(thresholds or {})}
+        for key, table in CENTILE_THRESHOLDS.items():
+            table.column(self.thresholds[key])  # ValueError for a centile the tables lack
+        self.nlp = nlp or NLPProcessor()
+
+    def _pediatric_limits(self, age: float) -> PediatricLimits:
+        t = self.thresholds
+        return PediatricLimits(
+            hr_critical=max(HEART_RATE.value(t["peds_critical_centile"], age), t["critical_hr_high"]),
+            hr_danger=max(HEART_RATE.value(t["peds_danger_centile"], age), t["danger_hr_high"]),
+            hr_low=HEART_RATE.value(t["peds_low_centile"], age),
+            rr_critical=max(RESP_RATE.value(t["peds_critical_centile"], age), t["critical_rr_high"]),
+            rr_danger=max(RESP_RATE.value(t["peds_danger_centile"], age), t["danger_rr_high"]),
+            rr_low=RESP_RATE.value(t["peds_low_centile"], age),
+            sbp_low=SYSTOLIC_BP.value(t["peds_sbp_low_centile"], age),
+            sbp_high=SYSTOLIC_BP.value(t["peds_sbp_high_centile"], age),
+        )
+
+    def _pediatric_limits_batch(self, ages: np.ndarray) -> List[PediatricLimits]:
+        """_pediatric_limits for many ages with one table lookup per limit."""
+        t = self.thresholds
+        columns = (
+            np.maximum(HEART_RATE.values(t["peds_critical_centile"], ages), t["critical_hr_high"]),
+            np.maximum(HEART_RATE.values(t["peds_danger_centile"], ages), t["danger_hr_high"]),
+            HEART_RATE.values(t["peds_low_centile"], ages),
+            np.maximum(RESP_RATE.values(t["peds_critical_centile"], ages), t["critical_rr_high"]),
+            np.maximum(RESP_RATE.values(t["peds_danger_centile"], ages), t["danger_rr_high"]),
+            RESP_RATE.values(t["peds_low_centile"], ages),
+            SYSTOLIC_BP.values(t["peds_sbp_low_centile"], ages),
+            SYSTOLIC_BP.values(t["peds_sbp_high_centile"], ages),
+        )
+        return list(map(PediatricLimits._make, zip(*(column.tolist() for column in columns))))
+
+    def _check_critical_vitals(self, age: int, vitals: Vitals,
+                               peds: Optional[PediatricLimits] = None) -> Tuple[bool, List[str]]:
         """
         Check for immediately life-threatening vital signs (Level 1).
         Returns (is_critical, list of reasons)
         
         These thresholds indicate IMMEDIATE need for resuscitation.
+        `peds` are the child's limits when already computed (batch scoring).
         """
+        t = self.thresholds
         reasons = []
+        if age < t["adult_age"]:
+            peds = peds or self._pediatric_limits(age)
+        child = "للرضيع" if age < 1 else "للطفل"
         
         # ===== RESPIRATORY RATE - CRITICAL =====
         if vitals.rr is not None:
-            if age >= 14:  # Adult
-                if vitals.rr < 8:
-                    reasons.append(f"معدل التنفس خطير: {vitals.rr}/دقيقة (< 8 = فشل تنفسي)")
-                elif vitals.rr > 36:
-                    reasons.append(f"معدل التنفس خطير: {vitals.rr}/دقيقة (> 36 = ضيق تنفس شديد)")
+            if age >= t["adult_age"]:  # Adult
+                if vitals.rr < t["critical_rr_low"]:
+                    reasons.append(f"معدل التنفس خطير: {vitals.rr}/دقيقة (< {t['critical_rr_low']} = فشل تنفسي)")
+                elif vitals.rr > t["critical_rr_high"]:
+                    reasons.append(f"معدل التنفس خطير: {vitals.rr}/دقيقة (> {t['critical_rr_high']} = ضيق تنفس شديد)")
             else:  # Pediatric
-                if vitals.rr < 10:
-                    reasons.append(f"معدل التنفس خطير للطفل: {vitals.rr}/دقيقة")
-                elif age < 1 and vitals.rr > 60:
-                    reasons.append(f"معدل التنفس خطير للرضيع: {vitals.rr}/دقيقة (> 60)")
-                elif age < 5 and vitals.rr > 50:
-                    reasons.append(f"معدل التنفس خطير للطفل: {vitals.rr}/دقيقة (> 50)")
+                if vitals.rr < t["peds_critical_rr_low"]:
+                    reasons.append(f"معدل التنفس خطير {child}: {vitals.rr}/دقيقة")
+                elif vitals.rr > peds.rr_critical:
+                    reasons.append(f"معدل التنفس خطير {child}: {vitals.rr}/دقيقة (> {peds.rr_critical:.0f} لعمره)")
         
         # ===== HEART RATE - CRITICAL =====
         if vitals.hr is not None:
-            if age >= 14:  # Adult
-                if vitals.hr < 40:
-                    reasons.append(f"النبض خطير: {vitals.hr}/دقيقة (< 40 = بطء شديد)")
-                elif vitals.hr > 150:
-                    reasons.append(f"النبض خطير: {vitals.hr}/دقيقة (> 150 = تسارع غير مستقر)")
+            if age >= t["adult_age"]:  # Adult
+                if vitals.hr < t["critical_hr_low"]:
+                    reasons.append(f"النبض خطير: {vitals.hr}/دقيقة (< {t['critical_hr_low']} = بطء شديد)")
+                elif vitals.hr > t["critical_hr_high"]:
+                    reasons.append(f"النبض خطير: {vitals.hr}/دقيقة (> {t['critical_hr_high']} = تسارع غير مستقر)")
             else:  # Pediatric
-                if vitals.hr < 60:
-                    reasons.append(f"النبض خطير للطفل: {vitals.hr}/دقيقة (< 60)")
-                elif age < 1 and vitals.hr > 180:
-                    reasons.append(f"النبض خطير للرضيع: {vitals.hr}/دقيقة (> 180)")
-                elif age < 5 and vitals.hr > 160:
-                    reasons.append(f"النبض خطير للطفل: {vitals.hr}/دقيقة (> 160)")
+                if vitals.hr < t["peds_critical_hr_low"]:
+                    reasons.append(f"النبض خطير {child}: {vitals.hr}/دقيقة (< {t['peds_critical_hr_low']})")
+                elif vitals.hr > peds.hr_critical:
+                    reasons.append(f"النبض خطير {child}: {vitals.hr}/دقيقة (> {peds.hr_critical:.0f} لعمره)")
         
         # ===== SpO2 - CRITICAL =====
-        if vitals.spo2 is not None and vitals.spo2 < 90:
-            reasons.append(f"نسبة الأكسجين خطيرة: {vitals.spo2}% (< 90% = نقص أكسجين شديد)")
+        if vitals.spo2 is not None and vitals.spo2 < t["critical_spo2"]:
+            reasons.append(f"نسبة الأكسجين خطيرة: {vitals.spo2}% (< {t['critical_spo2']}% = نقص أكسجين شديد)")
         
         # ===== GCS - CRITICAL =====
-        if vitals.gcs is not None and vitals.gcs < 9:
-            reasons.append(f"مستوى الوعي خطير: GCS {vitals.gcs} (< 9 = غيبوبة)")
+        if vitals.gcs is not None and vitals.gcs < t["critical_gcs"]:
+            reasons.append(f"مستوى الوعي خطير: GCS {vitals.gcs} (< {t['critical_gcs']} = غيبوبة)")
         
         # ===== BLOOD PRESSURE - CRITICAL =====
         if vitals.sbp is not None:
-            if vitals.sbp < 80:
-                reasons.append(f"ضغط الدم خطير: {vitals.sbp} (< 80 = صدمة)")
-            elif vitals.sbp > 220:
-                reasons.append(f"ضغط الدم خطير: {vitals.sbp} (> 220 = أزمة ضغط)")
+            if peds is not None and vitals.sbp < peds.sbp_low:
+                reasons.append(f"ضغط الدم خطير {child}: {vitals.sbp} (< {peds.sbp_low:.0f} = صدمة)")
+            elif peds is None and vitals.sbp < t["critical_sbp_low"]:
+                reasons.append(f"ضغط الدم خطير: {vitals.sbp} (< {t['critical_sbp_low']} = صدمة)")
+            elif vitals.sbp > t["critical_sbp_high"]:
+                reasons.append(f"ضغط الدم خطير: {vitals.sbp} (> {t['critical_sbp_high']} = أزمة ضغط)")
         
         # ===== TEMPERATURE - CRITICAL =====
         if vitals.temp is not None:
-            if vitals.temp < 35:
-                reasons.append(f"درجة الحرارة خطيرة: {vitals.temp}°C (< 35 = انخفاض حرارة)")
-            elif vitals.temp > 41:
-                reasons.append(f"درجة الحرارة خطيرة: {vitals.temp}°C (> 41 = حمى شديدة)")
+            if vitals.temp < t["critical_temp_low"]:
+                reasons.append(f"درجة الحرارة خطيرة: {vitals.temp}°C (< {t['critical_temp_low']} = انخفاض حرارة)")
+            elif vitals.temp > t["critical_temp_high"]:
+                reasons.append(f"درجة الحرارة خطيرة: {vitals.temp}°C (> {t['critical_temp_high']} = حمى شديدة)")
         
         return (len(reasons) > 0, reasons)
         
-    def _check_vitals_danger_zone(self, age: int, vitals: Vitals) -> Tuple[bool, List[str]]:
+    def _check_vitals_danger_zone(self, age: int, vitals: Vitals,
+                                  peds: Optional[PediatricLimits] = None) -> Tuple[bool, List[str]]:
         """
         Check if vitals are in the danger zone (Level 2).
         Not immediately life-threatening but require urgent attention.
         """
+        t = self.thresholds
         reasons = []
         
-        if age >= 14:  # Adults
+        if age >= t["adult_age"]:  # Adults
             # Heart Rate
             if vitals.hr is not None:
-                if vitals.hr > 100:
+                if vitals.hr > t["danger_hr_high"]:
                     reasons.append(f"تسارع النبض: {vitals.hr}/دقيقة")
-                elif vitals.hr < 50:
+                elif vitals.hr < t["danger_hr_low"]:
                     reasons.append(f"بطء النبض: {vitals.hr}/دقيقة")
             
             # Respiratory Rate
             if vitals.rr is not None:
-                if vitals.rr > 24:
+                if vitals.rr > t["danger_rr_high"]:
                     reasons.append(f"سرعة التنفس: {vitals.rr}/دقيقة")
-                elif vitals.rr < 10:
+                elif vitals.rr < t["danger_rr_low"]:
                     reasons.append(f"بطء التنفس: {vitals.rr}/دقيقة")
             
             # SpO2
-            if vitals.spo2 is not None and 90 <= vitals.spo2 < 94:
+            if vitals.spo2 is not None and t["critical_spo2"] <= vitals.spo2 < t["danger_spo2"]:
                 reasons.append(f"نقص الأكسجين: {vitals.spo2}%")
             
             # Blood Pressure
             if vitals.sbp is not None:
-                if vitals.sbp > 180:
+                if vitals.sbp > t["danger_sbp_high"]:
                     reasons.append(f"ارتفاع الضغط: {vitals.sbp}")
-                elif vitals.sbp < 90:
+                elif vitals.sbp < t["danger_sbp_low"]:
                     reasons.append(f"انخفاض الضغط: {vitals.sbp}")
             
             # Temperature
             if vitals.temp is not None:
-                if vitals.temp > 39:
+                if vitals.temp > t["danger_temp_high"]:
                     reasons.append(f"حمى عالية: {vitals.temp}°C")
-                elif vitals.temp < 36:
+                elif vitals.temp < t["danger_temp_low"]:
                     reasons.append(f"انخفاض حرارة: {vitals.temp}°C")
                     
-        else:  # Pediatric
-            # Simplified pediatric danger zone
+        else:  # Pediatric - limits for the child's age in months
+            peds = peds or self._pediatric_limits(age)
+            child = "الرضيع" if age < 1 else "الطفل"
             if vitals.hr is not None:
-                if age < 1 and vitals.hr > 160:
-                    reasons.append(f"تسارع نبض الرضيع: {vitals.hr}")
-                elif age < 5 and vitals.hr > 140:
-                    reasons.append(f"تسارع نبض الطفل: {vitals.hr}")
+                if vitals.hr > peds.hr_danger:
+                    reasons.append(f"تسارع نبض {child}: {vitals.hr} (> {peds.hr_danger:.0f} لعمره)")
+                elif vitals.hr < peds.hr_low:
+                    reasons.append(f"بطء نبض {child}: {vitals.hr} (< {peds.hr_low:.0f} لعمره)")
             
             if vitals.rr is not None:
-                if age < 1 and vitals.rr > 50:
-                    reasons.append(f"سرعة تنفس الرضيع: {vitals.rr}")
-                elif age < 5 and vitals.rr > 40:
-                    reasons.append(f"سرعة تنفس الطفل: {vitals.rr}")
+                if vitals.rr > peds.rr_danger:
+                    reasons.append(f"سرعة تنفس {child}: {vitals.rr} (> {peds.rr_danger:.0f} لعمره)")
+                elif vitals.rr < peds.rr_low:
+                    reasons.append(f"بطء تنفس {child}: {vitals.rr} (< {peds.rr_low:.0f} لعمره)")
             
-            if vitals.spo2 is not None and vitals.spo2 < 94:
+            if vitals.sbp is not None and vitals.sbp > peds.sbp_high:
+                reasons.append(f"ارتفاع ضغط {child}: {vitals.sbp} (> {peds.sbp_high:.0f} لعمره)")
+            
+            if vitals.spo2 is not None and vitals.spo2 < t["peds_danger_spo2"]:
                 reasons.append(f"نقص أكسجين الطفل: {vitals.spo2}%")
             
-            if vitals.temp is not None and vitals.temp > 39:
+            if vitals.temp is not None and vitals.temp > t["peds_danger_temp_high"]:
                 reasons.append(f"حمى الطفل: {vitals.temp}°C")
         
         return (len(reasons) > 0, reasons)
 
-    def _calculate_resources(self, patient: PatientInput, symptoms: List[str]) -> int:
+    def _estimate_resources(self, patient: PatientInput, symptoms: List[str]) -> ResourceEstimate:
         """
-        Estimate resources needed based on complaint and vitals.
-        Resources: Labs, ECG, X-Ray, CT/MRI, IV Fluids, IV Meds, Consult
+        Estimate resources needed based on complaint, by type (RESOURCE_RULES).
+        Resources: Labs, ECG, X-Ray, CT/MRI, IV Meds, Procedures
         """
-        resources = 0
-        
-        if "abdominal" in symptoms:
-            resources += 2  # Labs + possible imaging
-        
-        if "chest_pain" in symptoms or "cardiac" in symptoms:
-            resources += 2  # ECG + Labs/Troponin
-            
-        if "sob" in symptoms:
-            resources += 2  # CXR + Labs/ABG
-            
-        if "trauma" in symptoms:
-            resources += 2  # X-ray + possible labs
-        
-        if "stroke" in symptoms:
-            resources += 2  # CT + Labs
-            
-        if "fever" in symptoms:
-            resources += 1  # Labs
-            
-        if "laceration" in symptoms:
-            resources += 1  # Suture supplies
+        counts = dict.fromkeys(RESOURCE_TYPES, 0)
+        for triggers, needs in RESOURCE_RULES:
+            if any(trigger in symptoms for trigger in triggers):
+                for need in needs:
+                    counts[need] += 1
+        return ResourceEstimate(**counts)
 
-        if "allergy" in symptoms:
-            resources += 1  # IV/IM Meds
-        
-        if "uti" in symptoms:
-            resources += 1  # UA + possible culture
-        
-        if "burn" in symptoms:
-            resources += 1  # Wound care
-            
-        if "bite_sting" in symptoms:
-            resources += 1  # Possible antivenom/antibiotics
-            
-        return resources
+    def _calculate_resources(self, patient: PatientInput, symptoms: List[str]) -> int:
+        return self._estimate_resources(patient, symptoms).total
 
     def evaluate(self, patient: PatientInput) -> TriageResult:
         """
         Main triage evaluation following ESI v5 algorithm
         """
+        # NLP Analysis - one scan yields symptoms, danger keywords and evidence spans
+        analysis = self.nlp.analyze(patient.chief_complaint_text)
+        result = self._evaluate(patient, analysis.symptoms, analysis.danger_keywords)
+        result.scores = early_warning.score(patient.age, patient.vitals)
+        return self._with_evidence(result, analysis)
+
+    def evaluate_batch(self, patients: List[PatientInput]) -> List[TriageResult]:
+        """
+        Evaluate many patients in one call (bulk import, replay, simulation).
+        Complaint text is analyzed once per distinct string - imported and
+        simulated corpora repeat the same complaints heavily. Ages and vitals
+        are read into arrays once for the children's age-specific limits and
+        the early-warning scores.
+        """
+        ages = np.array([patient.age for patient in patients], dtype=np.float64)
+        scores = early_warning.score_batch(ages, early_warning.vitals_matrix([p.vitals for p in patients]))
+        children = np.flatnonzero(ages < self.thresholds["adult_age"]).tolist()
+        peds_limits: List[Optional[PediatricLimits]] = [None] * len(patients)
+        if children:
+            for i, limits in zip(children, self._pediatric_limits_batch(ages[children])):
+                peds_limits[i] = limits
+        nlp_cache = {}
+        results = []
+        for patient, peds, patient_scores in zip(patients, peds_limits, scores):
+            text = patient.chief_complaint_text
+            analysis = nlp_cache.get(text)
+            if analysis is None:
+                analysis = self.nlp.analyze(text)
+                nlp_cache[text] = analysis
+            result = self._evaluate(patient, analysis.symptoms, analysis.danger_keywords, peds)
+            result.scores = patient_scores
+            results.append(self._with_evidence(result, analysis))
+        return results
+
+    @staticmethod
+    def _with_evidence(result: TriageResult, analysis) -> TriageResult:
+        """Attach the matched complaint spans so the UI can highlight them."""
+        result.evidence = [MatchSpan(**span) for span in analysis.spans]
+        return result
+
+    def _evaluate(self, patient: PatientInput, symptoms: List[str], danger_keywords: List[str],
+                  peds: Optional[PediatricLimits] = None) -> TriageResult:
         reasoning = []
         red_flags = []
-        
-        # NLP Analysis
-        symptoms = self.nlp.extract_symptoms(patient.chief_complaint_text)
-        danger_keywords = self.nlp.detect_danger_keywords(patient.chief_complaint_text)
+        # Kept for every level: it feeds resource demand forecasting
+        resources = self._estimate_resources(patient, symptoms)
         
         # ===== LEVEL 1 - RESUSCITATION =====
         # Immediate life-saving intervention required
         is_level_1 = False
         
         # Check critical vital signs FIRST
-        vitals_critical, vitals_reasons = self._check_critical_vitals(patient.age, patient.vitals)
+        vitals_critical, vitals_reasons = self._check_critical_vitals(patient.age, patient.vitals, peds)
         if vitals_critical:
             is_level_1 = True
             reasoning.extend(vitals_reasons)
@@ -251,7 +382,8 @@ class TriageEngine:
                 recommended_action="تفعيل فريق الإنعاش فوراً",
                 time_to_physician="فوري",
                 red_flags=red_flags,
-                reasoning=reasoning
+                reasoning=reasoning,
+                resources=resources
             )
 
         # ===== LEVEL 2 - EMERGENT =====
@@ -259,7 +391,7 @@ class TriageEngine:
         is_level_2 = False
         
         # Severe Pain
-        if patient.vitals.pain_score and patient.vitals.pain_score >= 7:
+        if patient.vitals.pain_score and patient.vitals.pain_score >= self.thresholds["severe_pain"]:
             is_level_2 = True
             reasoning.append(f"ألم شديد: {patient.vitals.pain_score}/10")
             
@@ -269,7 +401,7 @@ class TriageEngine:
             reasoning.append(f"تغير في الوعي: GCS {patient.vitals.gcs}")
             
         # Danger Zone Vitals
-        danger_zone, danger_reasons = self._check_vitals_danger_zone(patient.age, patient.vitals)
+        danger_zone, danger_reasons = self._check_vitals_danger_zone(patient.age, patient.vitals, peds)
         if danger_zone:
             is_level_2 = True
             reasoning.extend(danger_reasons)
@@ -299,11 +431,12 @@ class TriageEngine:
                 recommended_action="غرفة العناية المركزة، مراقبة مستمرة",
                 time_to_physician="< 15 دقيقة",
                 red_flags=red_flags,
-                reasoning=reasoning
+                reasoning=reasoning,
+                resources=resources
             )
 
         # ===== LEVEL 3, 4, 5 - RESOURCE BASED =====
-        resource_count = self._calculate_resources(patient, symptoms)
+        resource_count = resources.total
         
         if resource_count >= 2:
             return TriageResult(
@@ -315,7 +448,8 @@ class TriageEngine:
                 recommended_action="غرفة فحص، طلب تحاليل/أشعة",
                 time_to_physician="< 60 دقيقة",
                 red_flags=red_flags,
-                reasoning=[f"يحتاج تقريباً {resource_count} موارد"]  
+                reasoning=[f"يحتاج تقريباً {resource_count} موارد"],
+                resources=resources
             )
             
         elif resource_count == 1:
@@ -328,7 +462,8 @@ class TriageEngine:
                 recommended_action="العيادة السريعة",
                 time_to_physician="يمكن الانتظار",
                 red_flags=red_flags,
-                reasoning=["يحتاج مورد واحد فقط"]
+                reasoning=["يحتاج مورد واحد فقط"],
+                resources=resources
             )
             
         else:
@@ -341,5 +476,6 @@ class TriageEngine:
                 recommended_action="إعادة الروشتة أو الطمأنينة",
                 time_to_physician="يمكن الانتظار / تحويل للعيادة",
                 red_flags=red_flags,
-                reasoning=["لا يحتاج موارد حادة"]
+                reasoning=["لا يحتاج موارد حادة"],
+                resources=resources
             )
@@ -1,24 +1,56 @@
-from fastapi import FastAPI, HTTPException, Depends, UploadFile, File
+from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, BackgroundTasks, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse, FileResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from contextlib import asynccontextmanager
 from typing import List
+import json
+import math
 import tempfile
+import time
 import os
 import requests
 from datetime import datetime
+from urllib.parse import urlparse
 
 from .models import PatientInput, TriageResult
 from .logic.triage_engine import TriageEngine
-from .database import engine, Base, get_db
 from .sql_models import Patient
 import uvicorn
 from .ai_service import AIService
 from .medasr_service import medasr_service
+from . import analytics, binary_triage, bulk_io, crud, http_cache, search, tenants
+from . import audio as audio_pipeline
+from .admission import AdmissionController, Rejected
+from .audit_log import AuditLog
+from .circuit_breaker import CircuitOpenError, breakers
+from .ingest.fhir import FHIRError, parse_document
+from .ingest.hl7 import HL7Error, parse_message, split_messages
+from .ingest.server import MLLPServer
+from .ingest.service import VitalsIngest
+from .patient_cache import PatientRecord
+from .shadow import ShadowMode
+from .similar_cases import few_shot_examples
+from .tenants import Tenant, get_db, get_tenant
 
-# Create Tables
-Base.metadata.create_all(bind=engine)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Optional MLLP listener for bedside monitors (INGEST_MLLP_PORT)"""
+    mllp = None
+    if os.getenv("INGEST_MLLP_PORT"):
+        mllp = MLLPServer(vitals_ingest, os.getenv("INGEST_MLLP_TENANT", tenants.DEFAULT_TENANT))
+        await mllp.start(os.getenv("INGEST_MLLP_HOST", "0.0.0.0"), int(os.getenv("INGEST_MLLP_PORT")))
+    app.state.mllp = mllp
+    yield
+    if mllp is not None:
+        await mllp.stop()
+    vitals_ingest.flush()
 
-app = FastAPI(title="SAFE-Triage AI System", version="2.0.0")
+app = FastAPI(title="SAFE-Triage AI System", version="2.0.0", lifespan=lifespan)
 
 # CORS Setup
 app.add_middleware(
@@ -27,14 +59,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified"],
 )
+# Patient lists and analytics are several KB of repetitive JSON; small bodies are sent as is
+app.add_middleware(GZipMiddleware, minimum_size=int(os.getenv("GZIP_MIN_BYTES", "1024")), compresslevel=6)
 
 engine_logic = TriageEngine()
 ai_service = AIService()
+shadow = ShadowMode.from_env()
+# Append-only record of every decision (AUDIT_LOG_DIR); writes happen on a background thread
+audit_log = AuditLog.from_env()
+# Backpressure for the Gemini-backed endpoints; /triage is never limited
+ai_admission = AdmissionController.from_env("ai-triage", "AI")
+transcribe_admission = AdmissionController.from_env(
+    "transcribe", "TRANSCRIBE", client_rate=0.2, client_burst=3, global_rate=2.0, global_burst=10,
+    max_in_flight=4, max_latency=20.0,
+)
+# Similar past cases (complaint and final level) added to the Gemini prompt; 0 disables
+AI_FEW_SHOT_EXAMPLES = int(os.getenv("AI_FEW_SHOT_EXAMPLES", "0"))
+# Per-hospital engines/databases (X-Tenant-ID); building the default tenant
+# (DATABASE_URL) applies pending schema migrations
+tenants.init_registry(engine_logic)
 
 # ============ TELEGRAM ALERT FUNCTION ============
-def send_critical_alert(patient_data: dict, level: int):
-    """Send Telegram alert for critical patients (Level 1 or 2) via n8n"""
+ALERT_TIMEOUT_SECONDS = float(os.getenv("ALERT_WEBHOOK_TIMEOUT", "5"))
+
+def post_alert(webhook_url: str, payload: dict):
+    response = requests.post(webhook_url, json=payload, timeout=ALERT_TIMEOUT_SECONDS)
+    if response.status_code >= 500:
+        raise requests.HTTPError(f"Webhook returned {response.status_code}")
+    return response
+
+def send_critical_alert(patient_data: dict, level: int, webhook_url: str = tenants.DEFAULT_WEBHOOK_URL):
+    """Send Telegram alert for critical patients (Level 1 or 2) via the tenant's n8n webhook"""
     if level <= 2:
         try:
             vitals = patient_data.get("vitals", {})
@@ -47,66 +104,246 @@ def send_critical_alert(patient_data: dict, level: int):
                 "chief_complaint": patient_data.get("chief_complaint_text", "")[:100],
                 "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
-            response = requests.post(
-                "https://drahmedzayed.app.n8n.cloud/webhook/critical-alert",
-                json=payload,
-                timeout=5
-            )
+            # One breaker per webhook host: while n8n is down, alerts fail fast instead of waiting out the timeout
+            breaker = breakers.get(f"webhook:{urlparse(webhook_url).netloc}")
+            response = breaker.call(post_alert, webhook_url, payload)
             print(f"[ALERT] Critical patient alert sent to Telegram: {response.status_code}")
+        except CircuitOpenError as e:
+            print(f"[ALERT] Alert not sent, {e}")
         except Exception as e:
             print(f"[ALERT] Failed to send alert: {e}")
 
+# ============ VITALS INGEST ============
+
+def alert_escalation(tenant: Tenant, patient: PatientInput, result: TriageResult, previous_level: int):
+    """A monitored patient's new vitals raised their acuity"""
+    send_critical_alert(patient.model_dump(), int(result.level), tenant.webhook_url)
+
+vitals_ingest = VitalsIngest(
+    tenants.registry, on_escalation=alert_escalation, audit=audit_log,
+    max_batch=int(os.getenv("INGEST_MAX_BATCH", "1000")),
+    max_delay=float(os.getenv("INGEST_MAX_DELAY_MS", "50")) / 1000,
+)
+
 @app.get("/")
 def read_root():
     return {"message": "SAFE-Triage AI System Active", "version": "2.0.0", "features": ["Voice Input", "AI Triage", "ESI v5", "Telegram Alerts"]}
 
+def client_id(request: Request, tenant_id: str = tenants.DEFAULT_TENANT) -> str:
+    """Rate-limit key: the calling host within a tenant"""
+    return f"{tenant_id}:{request.client.host if request.client else 'unknown'}"
+
 @app.post("/transcribe")
-async def transcribe_audio(audio: UploadFile = File(...)):
+async def transcribe_audio(request: Request, audio: UploadFile = File(...)):
     """🎤 Voice Input: Convert speech to medical text via Gemini"""
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".wav") as tmp:
-            content = await audio.read()
-            tmp.write(content)
+        transcribe_admission.admit(client_id(request, request.headers.get("X-Tenant-ID") or tenants.DEFAULT_TENANT))
+    except Rejected as e:
+        raise HTTPException(status_code=429, detail=f"Transcription over capacity ({e.reason})",
+                            headers={"Retry-After": str(max(1, math.ceil(e.retry_after)))})
+    start = transcribe_admission.clock()
+    tmp_path = prepared = None
+    try:
+        suffix = os.path.splitext(audio.filename or "")[1] or ".wav"
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
             tmp_path = tmp.name
-        
-        result = medasr_service.transcribe(tmp_path)
-        os.unlink(tmp_path)
+            while chunk := await audio.read(1 << 20):
+                tmp.write(chunk)
+
+        # Mono 16 kHz, silence trimmed: a much smaller upload to Gemini
+        if audio_pipeline.PREPROCESS:
+            try:
+                prepared = await run_in_threadpool(audio_pipeline.preprocess, tmp_path, audio_pipeline.CODEC)
+            except Exception as e:
+                print(f"[AUDIO] Preprocessing failed, sending original: {e}")
+        if prepared is not None:
+            audio_pipeline.stats.record_preprocess(prepared)
+            upload_path, mime_type, content_hash = prepared.path, prepared.mime_type, prepared.content_hash
+        else:
+            upload_path, mime_type = tmp_path, audio_pipeline.sniff_mime(tmp_path)
+            content_hash = await run_in_threadpool(audio_pipeline.file_hash, tmp_path, mime_type)
+
+        # Off the event loop, so a slow transcription does not stall other requests
+        asr_start = time.perf_counter()
+        result = await run_in_threadpool(medasr_service.transcribe, upload_path, mime_type, content_hash)
+        if result["success"] and not result.get("cached"):
+            audio_pipeline.stats.record_transcription(
+                "preprocessed" if prepared is not None else "raw", time.perf_counter() - asr_start
+            )
         
         if result["success"]:
-            return {"success": True, "transcription": result["transcription"]}
+            response = {"success": True, "transcription": result["transcription"],
+                        "cached": result.get("cached", False)}
+            if prepared is not None:
+                response["audio"] = {
+                    "input_bytes": prepared.input_bytes, "output_bytes": prepared.output_bytes,
+                    "bytes_saved": prepared.bytes_saved, "input_seconds": round(prepared.input_seconds, 2),
+                    "output_seconds": round(prepared.output_seconds, 2),
+                }
+            return response
         else:
             raise HTTPException(status_code=500, detail=result["error"])
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        for path in (tmp_path, prepared.path if prepared is not None else None):
+            if path and os.path.exists(path):
+                os.unlink(path)
+        transcribe_admission.release(transcribe_admission.clock() - start)
+
+def save_triage(db: Session, tenant: Tenant, patient: PatientInput, result: dict,
+                rule_level: int = None, ai_level: int = None, endpoint: str = "triage",
+                ai_output: dict = None):
+    """Persist the triaged patient, count its resources and audit the decision; a storage failure must not block triage."""
+    record = None
+    try:
+        categories = tenant.engine.nlp.extract_symptoms(patient.chief_complaint_text)
+        record = crud.create_patient_record(
+            db, patient, result, categories, rule_level=rule_level, ai_level=ai_level
+        )
+    except Exception as e:
+        db.rollback()
+        print(f"[DB] Failed to save patient: {e}")
+    if record is not None:
+        tenant.patients.put([record])
+        tenant.similar.add(record)
+    tenant.demand.record(result.get("resources"))
+    if audit_log is not None:
+        try:
+            audit_log.record_decision(
+                patient.model_dump(mode="json"), result, patient_id=record.id if record is not None else None,
+                tenant=tenant.id, endpoint=endpoint, ai_output=ai_output, thresholds=tenant.config.thresholds,
+            )
+        except Exception as e:
+            print(f"[AUDIT] Failed to record decision: {e}")
+    return record
+
+def save_triages(db: Session, tenant: Tenant, patients: List[PatientInput], results: List[dict],
+                 endpoint: str) -> list:
+    """save_triage for rule-triaged batches: one transaction, cache and index updates once; None where not stored"""
+    records = [None] * len(patients)
+    try:
+        categories = [tenant.engine.nlp.extract_symptoms(patient.chief_complaint_text) for patient in patients]
+        records = crud.create_patient_records(db, patients, results, categories,
+                                              [int(result["level"]) for result in results])
+    except Exception as e:
+        db.rollback()
+        print(f"[DB] Failed to save patients: {e}")
+    stored = [record for record in records if record is not None]
+    if stored:
+        tenant.patients.put(stored)
+        tenant.similar.add_many(stored)
+    for patient, result, record in zip(patients, results, records):
+        tenant.demand.record(result.get("resources"))
+        if audit_log is not None:
+            try:
+                audit_log.record_decision(
+                    patient.model_dump(mode="json"), result, patient_id=record.id if record is not None else None,
+                    tenant=tenant.id, endpoint=endpoint, thresholds=tenant.config.thresholds,
+                )
+            except Exception as e:
+                print(f"[AUDIT] Failed to record decision: {e}")
+    return records
 
 @app.post("/triage", response_model=TriageResult)
-def triage_patient(patient: PatientInput, db: Session = Depends(get_db)):
+def triage_patient(patient: PatientInput, background_tasks: BackgroundTasks,
+                   tenant: Tenant = Depends(get_tenant), db: Session = Depends(get_db)):
     try:
-        result = engine_logic.evaluate(patient)
-        # Send alert for critical patients
-        send_critical_alert(patient.model_dump(), result.level)
+        result = tenant.engine.evaluate(patient)
+        # Alert for critical patients after the response is sent: the webhook can take up to its timeout
+        background_tasks.add_task(send_critical_alert, patient.model_dump(), result.level, tenant.webhook_url)
+        save_triage(db, tenant, patient, result.model_dump(), rule_level=int(result.level))
+        if shadow.should_shadow():
+            # Runs after the response is sent - no added latency for clinicians
+            background_tasks.add_task(
+                shadow.shadow_ai, ai_service, patient.model_dump(mode="json"), result.model_dump(), ai_admission,
+                tenant.id
+            )
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def triage_records(patients: List[PatientInput], background_tasks: BackgroundTasks, tenant: Tenant,
+                   db: Session) -> bytes:
+    """/triage for each decoded patient (alert, save, shadow), results encoded compactly"""
+    results = tenant.engine.evaluate_batch(patients) if len(patients) > 1 else [tenant.engine.evaluate(patients[0])]
+    records = save_triages(db, tenant, patients, [result.model_dump() for result in results], "triage-binary")
+    for patient, result in zip(patients, results):
+        background_tasks.add_task(send_critical_alert, patient.model_dump(), result.level, tenant.webhook_url)
+        if shadow.should_shadow():
+            background_tasks.add_task(
+                shadow.shadow_ai, ai_service, patient.model_dump(mode="json"), result.model_dump(), ai_admission,
+                tenant.id
+            )
+    return binary_triage.encode_results(results, [record.id if record is not None else None for record in records])
+
+@app.post("/triage/binary")
+async def triage_binary(request: Request, background_tasks: BackgroundTasks,
+                        tenant: Tenant = Depends(get_tenant), db: Session = Depends(get_db)):
+    """⚡ /triage for kiosks and integrations: up to 256 patients per request as compact msgpack records (binary_triage)"""
+    if not binary_triage.available():
+        raise HTTPException(status_code=501, detail="Binary triage requires msgpack on the server")
+    if request.headers.get("content-type", "").split(";")[0].strip() != binary_triage.BINARY_MEDIA_TYPE:
+        raise HTTPException(status_code=415, detail=f"Content-Type must be {binary_triage.BINARY_MEDIA_TYPE}")
+    try:
+        patients = binary_triage.decode_patients(await request.body())
+    except binary_triage.BinaryFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        body = await run_in_threadpool(triage_records, patients, background_tasks, tenant, db)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return Response(body, media_type=binary_triage.BINARY_MEDIA_TYPE)
+
+@app.get("/triage/binary/codes")
+def triage_binary_codes():
+    """Meaning of the binary result's numeric fields: reason codes, resource and vital order"""
+    return binary_triage.code_tables()
+
 @app.post("/ai-triage")
-def ai_triage_patient(patient: PatientInput, db: Session = Depends(get_db)):
+def ai_triage_patient(patient: PatientInput, background_tasks: BackgroundTasks, request: Request,
+                      response: Response, tenant: Tenant = Depends(get_tenant),
+                      db: Session = Depends(get_db)):
     try:
-        ai_result = ai_service.analyze_triage(patient.model_dump())
+        # Rule result is the fallback and the reference for AI/rule agreement
+        std_result = tenant.engine.evaluate(patient)
+        degraded = False
+        try:
+            with ai_admission.slot(client_id(request, tenant.id)):
+                examples = None
+                if AI_FEW_SHOT_EXAMPLES and tenant.similar.enabled:
+                    tenant.similar.ensure_loaded(tenant.bind)
+                    examples = few_shot_examples(
+                        tenant.similar.query(patient.chief_complaint_text, AI_FEW_SHOT_EXAMPLES))
+                ai_result = ai_service.analyze_triage(patient.model_dump(), examples=examples, tenant=tenant.id)
+        except Rejected as e:
+            # Over capacity: answer now with the rule result instead of queueing for Gemini
+            degraded = True
+            response.headers["X-Triage-Degraded"] = e.reason
+            ai_result = {"error": e.reason, "reasoning": f"AI triage over capacity ({e.reason})"}
+        if shadow.should_shadow() and not degraded:
+            background_tasks.add_task(
+                shadow.shadow_rules, patient.model_dump(mode="json"), std_result.model_dump(), ai_result, tenant.id
+            )
         
         if "error" in ai_result:
-             std_result = engine_logic.evaluate(patient)
              # Send alert for critical patients
-             send_critical_alert(patient.model_dump(), std_result.level)
-             return {
+             background_tasks.add_task(send_critical_alert, patient.model_dump(), std_result.level, tenant.webhook_url)
+             response = {
                  "level": std_result.level,
                  "color_code": std_result.color_code,
                  "label_en": std_result.label_en,
                  "label_ar": std_result.label_ar,
                  "reasoning": [ai_result.get("reasoning"), "Fallback to Standard Protocol"],
                  "red_flags": std_result.red_flags,
+                 "evidence": std_result.model_dump()["evidence"],
+                 "resources": std_result.resources.model_dump(),
+                 "scores": std_result.scores.model_dump(mode="json"),
                  "ai_data": None
              }
+             save_triage(db, tenant, patient, response, rule_level=int(std_result.level),
+                         endpoint="ai-triage", ai_output=ai_result)
+             return response
 
         level = ai_result.get("triage_level", 3)
         colors = {1:"#ef4444", 2:"#f97316", 3:"#eab308", 4:"#22c55e", 5:"#3b82f6"}
@@ -114,9 +351,9 @@ def ai_triage_patient(patient: PatientInput, db: Session = Depends(get_db)):
         labels_ar = {1:"إنعاش", 2:"طوارئ", 3:"عاجل", 4:"أقل إلحاحاً", 5:"غير عاجل"}
 
         # Send alert for critical patients (Level 1 or 2)
-        send_critical_alert(patient.model_dump(), level)
+        background_tasks.add_task(send_critical_alert, patient.model_dump(), level, tenant.webhook_url)
 
-        return {
+        response = {
             "level": level,
             "color_code": colors.get(level, "#eab308"),
             "label_en": f"{labels_en.get(level)} (Level {level})",
@@ -126,6 +363,11 @@ def ai_triage_patient(patient: PatientInput, db: Session = Depends(get_db)):
             "time_to_physician": "Based on acuity",
             "red_flags": ai_result.get("red_flags", []),
             "reasoning": [ai_result.get("reasoning")],
+            # Rule-engine matches, so the complaint can be highlighted in AI mode too
+            "evidence": std_result.model_dump()["evidence"],
+            # Rule-engine estimate; the AI does not predict resources
+            "resources": std_result.resources.model_dump(),
+            "scores": std_result.scores.model_dump(mode="json"),
             "ai_data": {
                 "reasoning_ar": ai_result.get("reasoning_ar"),
                 "followup_question": ai_result.get("followup_question"),
@@ -134,20 +376,219 @@ def ai_triage_patient(patient: PatientInput, db: Session = Depends(get_db)):
             },
             "confidence": "AI-Generated"
         }
+        save_triage(db, tenant, patient, response, rule_level=int(std_result.level), ai_level=level,
+                    endpoint="ai-triage", ai_output=ai_result)
+        return response
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/ingest/hl7", status_code=202)
+async def ingest_hl7(request: Request, tenant: Tenant = Depends(get_tenant)):
+    """🩺 HL7v2 ORU^R01 vitals from monitors / the HIS (bare messages or MLLP frames)"""
+    acks, observations, rejected = [], [], 0
+    for message in split_messages(await request.body()):
+        try:
+            parsed = parse_message(message)
+        except HL7Error as e:
+            acks.append({"control_id": None, "code": "AR", "error": str(e)})
+            continue
+        observations += parsed.observations
+        rejected += parsed.rejected
+        acks.append({"control_id": parsed.control_id, "code": "AA"})
+    # One submit for the whole body: queued entirely or not at all, so a retried body is not applied twice
+    if not vitals_ingest.submit(tenant.id, observations, rejected):
+        raise HTTPException(status_code=503, detail="Ingest backlog full", headers={"Retry-After": "1"})
+    return {"messages": len(acks), "observations": len(observations), "acks": acks}
+
+@app.post("/ingest/fhir", status_code=202)
+async def ingest_fhir(request: Request, tenant: Tenant = Depends(get_tenant)):
+    """🩺 FHIR R4 vital-sign Observations (single resource or Bundle)"""
+    try:
+        observations, rejected = parse_document(json.loads(await request.body()))
+    except (ValueError, FHIRError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if not vitals_ingest.submit(tenant.id, observations, rejected):
+        raise HTTPException(status_code=503, detail="Ingest backlog full", headers={"Retry-After": "1"})
+    return {"observations": len(observations), "rejected": rejected}
+
+@app.get("/analytics")
+def get_analytics(hours: int = 24, top: int = 5, db: Session = Depends(get_db)):
+    """📊 Department dashboard: counts by ESI level, red-flag rate, AI/rule agreement"""
+    if not 1 <= hours <= 24 * 90:
+        raise HTTPException(status_code=400, detail="hours must be between 1 and 2160")
+    if not 1 <= top <= 50:
+        raise HTTPException(status_code=400, detail="top must be between 1 and 50")
+    return analytics.dashboard(db, hours=hours, top=top)
+
+@app.get("/forecast")
+def get_forecast(hours: int = 4, lookback: float = 3.0, tenant: Tenant = Depends(get_tenant)):
+    """📈 Expected labs/ECG/imaging/IV/procedure demand for the next hours, from recent arrivals"""
+    if not 1 <= hours <= 24:
+        raise HTTPException(status_code=400, detail="hours must be between 1 and 24")
+    if not 0.25 <= lookback <= tenant.demand.window_hours:
+        raise HTTPException(status_code=400, detail=f"lookback must be between 0.25 and {tenant.demand.window_hours:g}")
+    return dict(
+        tenant.demand.forecast(horizon_hours=hours, lookback_hours=lookback),
+        last_hour=tenant.demand.window(1),
+        last_24h=tenant.demand.window(24),
+    )
+
+@app.get("/health")
+def get_health():
+    """Liveness plus the circuit state of each external dependency (fallbacks keep triage working) and the audit writer"""
+    circuits = breakers.snapshot()
+    degraded = sorted(name for name, c in circuits.items() if c["state"] != "closed")
+    audit = audit_log.health() if audit_log is not None else {"ok": True, "enabled": False}
+    if not audit["ok"]:
+        degraded.append("audit_log")
+    return {"status": "degraded" if degraded else "ok", "degraded": degraded, "circuits": circuits,
+            "audit_log": audit}
+
+@app.get("/metrics")
+def get_metrics():
+    """Operational counters (AI call coalescing, shadow mode, admission, circuit breakers, audio, caches, recent patients, ingest, audit log)"""
+    return {
+        "circuit_breakers": breakers.snapshot(),
+        "audio": audio_pipeline.stats.snapshot(),
+        "transcription_cache": medasr_service.cache.stats(),
+        "ai_coalescing": ai_service.coalescer.stats(),
+        "shadow": dict(shadow.stats, enabled=shadow.enabled),
+        "ingest": dict(vitals_ingest.snapshot(),
+                       mllp=app.state.mllp.stats if getattr(app.state, "mllp", None) else None),
+        "audit_log": audit_log.snapshot() if audit_log is not None else {"enabled": False},
+        "tenants": dict(tenants.registry.stats, cached=tenants.registry.cached()),
+        "patient_cache": {tenant_id: tenant.patients.snapshot() for tenant_id, tenant in tenants.registry.built().items()},
+        "similar_cases": {tenant_id: tenant.similar.snapshot() for tenant_id, tenant in tenants.registry.built().items()},
+        "admission": {"ai_triage": ai_admission.snapshot(), "transcribe": transcribe_admission.snapshot()},
+    }
+
 @app.get("/patients")
-def get_patients(skip: int = 0, limit: int = 50, db: Session = Depends(get_db)):
-    patients = db.query(Patient).order_by(Patient.created_at.desc()).offset(skip).limit(limit).all()
-    return patients
+async def get_patients(request: Request, skip: int = 0, limit: int = 50, tenant: Tenant = Depends(get_tenant)):
+    """Newest patients first; pages within the last day come from the recent-patient cache, unchanged polls get 304"""
+    # Taken before reading: a write in between only costs the client one extra full response
+    tags = tenant.patients.validators()
+    if http_cache.not_modified(request, tags):
+        return http_cache.not_modified_response(tags)
+    page = tenant.patients.page(skip, limit)
+    if page is None:
+        async with tenants.read_session(tenant) as db:
+            patients = await db.scalars(
+                select(Patient).order_by(Patient.created_at.desc(), Patient.id.desc()).offset(skip).limit(limit)
+            )
+            page = [PatientRecord.from_row(patient).as_dict() for patient in patients.all()]
+    return http_cache.json_response(page, tags)
+
+@app.get("/patients/export")
+def export_patients(format: str = "csv", chunk_size: int = bulk_io.DEFAULT_CHUNK_SIZE,
+                    tenant: Tenant = Depends(get_tenant)):
+    """📦 Stream patient history as CSV, Parquet or Arrow IPC (vitals flattened)"""
+    if format == "csv":
+        return StreamingResponse(
+            bulk_io.iter_csv(tenant.bind, chunk_size),
+            media_type="text/csv",
+            headers={"Content-Disposition": "attachment; filename=patients.csv"},
+        )
+    if format not in ("parquet", "arrow"):
+        raise HTTPException(status_code=400, detail="format must be csv, parquet or arrow")
+    with tempfile.NamedTemporaryFile(delete=False, suffix=f".{format}") as tmp:
+        tmp_path = tmp.name
+    try:
+        bulk_io.export_patients(tmp_path, format, bind=tenant.bind, chunk_size=chunk_size)
+    except RuntimeError as e:
+        os.unlink(tmp_path)
+        raise HTTPException(status_code=501, detail=str(e))
+    return FileResponse(
+        tmp_path,
+        media_type="application/octet-stream",
+        filename=f"patients.{format}",
+        background=BackgroundTask(os.unlink, tmp_path),
+    )
+
+@app.post("/patients/import")
+async def import_patients(file: UploadFile = File(...), retriage: bool = False,
+                          tenant: Tenant = Depends(get_tenant)):
+    """📥 Bulk-load legacy records (CSV / Parquet / Arrow / SQLite), optionally re-triaged"""
+    try:
+        fmt = bulk_io.detect_format(file.filename or "")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    with tempfile.NamedTemporaryFile(delete=False, suffix=os.path.splitext(file.filename)[1]) as tmp:
+        while chunk := await file.read(1 << 20):
+            tmp.write(chunk)
+        tmp_path = tmp.name
+    try:
+        rows = await run_in_threadpool(
+            bulk_io.import_patients,
+            tmp_path, fmt, bind=tenant.bind, retriage=retriage, triage_engine=tenant.engine,
+        )
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    finally:
+        os.unlink(tmp_path)
+    # Imported rows may carry recent created_at values
+    await run_in_threadpool(tenant.patients.load, tenant.bind)
+    tenant.similar.invalidate()
+    return {"imported": rows, "retriaged": retriage}
+
+@app.get("/patients/search")
+def search_patients(q: str, days: float = None, level: int = None, limit: int = 20, offset: int = 0,
+                    db: Session = Depends(get_db)):
+    """🔎 Full-text search over chief complaints (Arabic spelling variants folded), best matches first"""
+    if not 1 <= limit <= 200:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 200")
+    try:
+        return http_cache.json_response(search.search_patients(db, q, days=days, level=level, limit=limit, offset=offset))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def similar_response(tenant: Tenant, complaint: str, k: int, exclude: int = None):
+    cases = tenant.similar.query(complaint, k, exclude=exclude)
+    levels = {}
+    for case in cases:
+        if case["triage_level"] is not None:
+            levels[case["triage_level"]] = levels.get(case["triage_level"], 0) + 1
+    return http_cache.json_response({"complaint": complaint, "cases": cases, "levels": levels})
+
+def check_similar(tenant: Tenant, k: int):
+    if not tenant.similar.enabled:
+        raise HTTPException(status_code=501, detail="Similar-case index disabled (SIMILAR_CASES=0)")
+    if not 1 <= k <= 50:
+        raise HTTPException(status_code=400, detail="k must be between 1 and 50")
+    tenant.similar.ensure_loaded(tenant.bind)
+
+@app.get("/patients/similar")
+def similar_cases(q: str, k: int = 5, tenant: Tenant = Depends(get_tenant)):
+    """🧭 Past patients with the most similar chief complaints and the level they were given"""
+    check_similar(tenant, k)
+    return similar_response(tenant, q, k)
+
+@app.get("/patients/{patient_id}/similar")
+def similar_to_patient(patient_id: int, k: int = 5, tenant: Tenant = Depends(get_tenant),
+                       db: Session = Depends(get_db)):
+    """🧭 Past patients whose complaint reads like this patient's (the patient itself excluded)"""
+    check_similar(tenant, k)
+    complaint = tenant.similar.complaint_of(patient_id)
+    if complaint is None:
+        record = db.get(Patient, patient_id)
+        if record is None:
+            raise HTTPException(status_code=404, detail="Patient not found")
+        complaint = record.chief_complaint or ""
+    return similar_response(tenant, complaint, k, exclude=patient_id)
 
 @app.get("/patients/{patient_id}")
-def get_patient(patient_id: int, db: Session = Depends(get_db)):
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
-    if not patient:
-         raise HTTPException(status_code=404, detail="Patient not found")
-    return patient
+async def get_patient(request: Request, patient_id: int, tenant: Tenant = Depends(get_tenant)):
+    tags = tenant.patients.validators()
+    # Resolved before the validators are compared: an unknown id is a 404, never a 304
+    patient = tenant.patients.get(patient_id)
+    if patient is None:
+        async with tenants.read_session(tenant) as db:
+            record = await db.get(Patient, patient_id)
+            if not record:
+                raise HTTPException(status_code=404, detail="Patient not found")
+            patient = PatientRecord.from_row(record).as_dict()
+    if http_cache.not_modified(request, tags):
+        return http_cache.not_modified_response(tags)
+    return http_cache.json_response(patient, tags)
 
 if __name__ == "__main__":
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
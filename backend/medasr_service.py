@@ -1,6 +1,10 @@
 import google.generativeai as genai
 import os
 
+from .circuit_breaker import breakers
+from .coalescing import SingleFlight
+from .transcription_cache import TranscriptionCache
+
 # Configure API key at module load
 api_key = os.getenv("GEMINI_API_KEY")
 if api_key:
@@ -13,28 +17,48 @@ class MedASRService:
     def __init__(self):
         self.available = True
         self.model = genai.GenerativeModel('gemini-3-flash-preview')
+        self.timeout = float(os.getenv("TRANSCRIBE_TIMEOUT_SECONDS", "60"))
+        self.breaker = breakers.get("gemini-transcribe")
+        # Same recording (by content hash) is transcribed once: cached, and concurrent repeats share the call
+        self.cache = TranscriptionCache.from_env()
+        self.coalescer = SingleFlight(wait_timeout=self.timeout + 10)
         print("[Gemini] Transcription service ready")
     
-    def transcribe(self, audio_path: str) -> dict:
+    def transcribe(self, audio_path: str, mime_type: str = "audio/wav", content_hash: str = None) -> dict:
         try:
+            if content_hash:
+                # Checked before anything is uploaded
+                cached = self.cache.get(content_hash)
+                if cached is not None:
+                    print(f"[Gemini] Cache hit: {content_hash[:12]}")
+                    return {"success": True, "transcription": cached, "cached": True}
             print(f"[Gemini] Transcribing: {audio_path}")
-            
-            # Upload file to Gemini
-            audio_file = genai.upload_file(audio_path, mime_type="audio/wav")
-            print(f"[Gemini] File uploaded: {audio_file.name}")
-            
-            # Generate transcription
-            response = self.model.generate_content([
-                audio_file,
-                "Transcribe this audio exactly. If Arabic, write Arabic. If English, write English. Return ONLY the transcription."
-            ])
-            
-            transcription = response.text.strip()
+            # Fails fast (CircuitOpenError) while Gemini is known to be down
+            if content_hash:
+                transcription, shared = self.coalescer.do(
+                    content_hash, self.breaker.call, self._transcribe, audio_path, mime_type
+                )
+                if not shared:
+                    self.cache.put(content_hash, transcription)
+            else:
+                transcription = self.breaker.call(self._transcribe, audio_path, mime_type)
             print(f"[Gemini] Result: {transcription}")
-            return {"success": True, "transcription": transcription}
+            return {"success": True, "transcription": transcription, "cached": False}
             
         except Exception as e:
             print(f"[Gemini] ERROR: {str(e)}")
             return {"success": False, "error": str(e)}
 
+    def _transcribe(self, audio_path: str, mime_type: str) -> str:
+        # Upload file to Gemini
+        audio_file = genai.upload_file(audio_path, mime_type=mime_type)
+        print(f"[Gemini] File uploaded: {audio_file.name}")
+        
+        # Generate transcription
+        response = self.model.generate_content([
+            audio_file,
+            "Transcribe this audio exactly. If Arabic, write Arabic. If English, write English. Return ONLY the transcription."
+        ], request_options={"timeout": self.timeout})
+        return response.text.strip()
+
 medasr_service = MedASRService()
@@ -0,0 +1,158 @@
+"""
+SAFE-Triage AI - Schema Migrations
+Ordered, numbered schema steps recorded in a `schema_migrations` table, so
+every database (the default SQLite file, tenant databases, a shared
+PostgreSQL) is brought to the same version on startup. On PostgreSQL the
+upgrade holds an advisory lock, so API nodes starting together apply each
+step once.
+
+Add a step by appending to MIGRATIONS; never edit or reorder applied ones.
+Steps carry their own DDL instead of reading the current models: step 1
+creates the frozen BASELINE schema, and later steps add exactly their own
+columns, so a database migrated today ends up like one migrated step by
+step as the models changed.
+
+Usage:
+    python -m backend.migrations upgrade            # DATABASE_URL or ./patients.db
+    python -m backend.migrations current --url postgresql://triage@db/triage
+"""
+import argparse
+from typing import Callable, List, NamedTuple, Optional
+
+from sqlalchemy import JSON, Column, DateTime, Float, Integer, MetaData, String, Table, Text, func, inspect, select, text
+
+from . import database
+
+ADVISORY_LOCK_KEY = 727_001  # pg_advisory_xact_lock key for migrations
+
+version_table = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable  # apply(connection)
+
+
+# ============ BASELINE (version 1) ============
+# The schema as it stood when migrations were introduced, less the columns of
+# steps 2-4. Frozen: later model changes get their own steps.
+
+BASELINE = MetaData()
+
+Table(
+    "patients", BASELINE,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String),
+    Column("age", Float),
+    Column("gender", String),
+    Column("vitals", JSON),
+    Column("chief_complaint", Text),
+    Column("triage_level", Integer),
+    Column("triage_color", String),
+    Column("triage_label_en", String),
+    Column("triage_label_ar", String),
+    Column("triage_reasoning", JSON),
+    Column("triage_red_flags", JSON),
+    Column("created_at", DateTime(timezone=True), server_default=func.now()),
+)
+
+Table(
+    "triage_hourly_rollups", BASELINE,
+    Column("hour", DateTime, primary_key=True),
+    Column("triage_level", Integer, primary_key=True),
+    Column("patient_count", Integer, nullable=False),
+    Column("red_flag_count", Integer, nullable=False),
+    Column("ai_count", Integer, nullable=False),
+    Column("compared_count", Integer, nullable=False),
+    Column("agree_count", Integer, nullable=False),
+)
+
+Table(
+    "complaint_category_rollups", BASELINE,
+    Column("hour", DateTime, primary_key=True),
+    Column("category", String, primary_key=True),
+    Column("patient_count", Integer, nullable=False),
+)
+
+
+# ============ STEPS ============
+
+def _create_tables(conn):
+    # Only creates what is missing, so it also adopts databases from before migrations
+    BASELINE.create_all(bind=conn)
+
+
+def _add_column(table: str, name: str, column_type) -> Callable:
+    """Step adding one nullable column; a no-op where an adopted database already has it."""
+    def apply(conn):
+        if name in {c["name"] for c in inspect(conn).get_columns(table)}:
+            return
+        conn.execute(text(f'ALTER TABLE {table} ADD COLUMN "{name}" {column_type.compile(dialect=conn.dialect)}'))
+    return apply
+
+
+def _create_search_index(conn):
+    from .search import create_index
+    create_index(conn)
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "patients and analytics rollup tables", _create_tables),
+    Migration(2, "patients.triage_evidence on pre-evidence databases", _add_column("patients", "triage_evidence", JSON())),
+    Migration(3, "patients.triage_resources", _add_column("patients", "triage_resources", JSON())),
+    Migration(4, "patients.score_history", _add_column("patients", "score_history", JSON())),
+    Migration(5, "patients_fts complaint search index (SQLite)", _create_search_index),
+]
+
+
+def current(bind=None) -> int:
+    """Highest applied version (0 for a database without the version table)."""
+    bind = bind or database.engine
+    with bind.connect() as conn:
+        if not bind.dialect.has_table(conn, version_table.name):
+            return 0
+        return conn.execute(select(func.max(version_table.c.version))).scalar() or 0
+
+
+def upgrade(bind=None, target: Optional[int] = None) -> List[int]:
+    """Apply pending migrations up to `target` (default: all) in one transaction; returns their versions."""
+    bind = bind or database.engine
+    applied = []
+    with bind.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": ADVISORY_LOCK_KEY})
+        version_table.create(conn, checkfirst=True)
+        done = set(conn.execute(select(version_table.c.version)).scalars())
+        for migration in MIGRATIONS:
+            if migration.version in done or (target is not None and migration.version > target):
+                continue
+            migration.apply(conn)
+            conn.execute(version_table.insert().values(
+                version=migration.version, description=migration.description))
+            applied.append(migration.version)
+            print(f"[DB] Migration {migration.version}: {migration.description}")
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SAFE-Triage schema migrations")
+    parser.add_argument("command", choices=["upgrade", "current"])
+    parser.add_argument("--url", help="Database URL (default: DATABASE_URL)")
+    parser.add_argument("--target", type=int, help="Stop at this version (upgrade only)")
+    args = parser.parse_args(argv)
+
+    bind = database.create_bind(args.url) if args.url else database.engine
+    if args.command == "upgrade":
+        applied = upgrade(bind, target=args.target)
+        print(f"Applied {len(applied)} migration(s)")
+    print(f"Schema version: {current(bind)} (latest {MIGRATIONS[-1].version})")
+
+
+if __name__ == "__main__":
+    main()
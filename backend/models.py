@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional, List, Dict
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List, Dict, Tuple
 from enum import Enum
 
 class Gender(str, Enum):
@@ -45,6 +45,42 @@ class PatientInput(BaseModel):
     history_stroke: bool = False
     immuno_compromised: bool = False
     
+class MatchSpan(BaseModel):
+    """Complaint text that triggered a concept or danger keyword (for highlighting)."""
+    start: int = Field(..., description="Character offset in chief_complaint_text")
+    end: int = Field(..., description="End offset (exclusive)")
+    text: str = Field(..., description="Matched text as typed")
+    term: str = Field(..., description="Lexicon term it matched")
+    category: str = Field(..., description="Concept key, or 'danger' for Level 1 keywords")
+    fuzzy: bool = False
+
+class ResourceEstimate(BaseModel):
+    """ED resources the patient is expected to need (ESI resource count, by type)."""
+    labs: int = 0
+    ecg: int = 0
+    xray: int = 0
+    ct: int = 0
+    iv_meds: int = 0
+    procedure: int = 0  # Suturing, wound care
+
+    @property
+    def total(self) -> int:
+        return self.labs + self.ecg + self.xray + self.ct + self.iv_meds + self.procedure
+
+RESOURCE_TYPES = tuple(ResourceEstimate.model_fields)
+
+class EarlyWarningScores(BaseModel):
+    """Early-warning scores from the same vitals (logic.early_warning): NEWS2/qSOFA for adults, PEWS for children."""
+    model_config = ConfigDict(frozen=True)  # Instances are shared between results with the same scores
+
+    news2: Optional[int] = None
+    news2_risk: Optional[str] = None  # low, low-medium, medium, high
+    qsofa: Optional[int] = None
+    qsofa_positive: Optional[bool] = None  # qSOFA >= 2: screen for sepsis
+    pews: Optional[int] = None
+    pews_risk: Optional[str] = None  # low, medium, high
+    missing: Tuple[str, ...] = ()  # Score parameters not measured (scored as normal)
+
 class TriageResult(BaseModel):
     level: TriageLevel
     color_code: str
@@ -56,3 +92,6 @@ class TriageResult(BaseModel):
     red_flags: List[str] = []
     reasoning: List[str] = []
     confidence: str = "High"  # High, Medium, Low
+    evidence: List[MatchSpan] = []
+    resources: ResourceEstimate = ResourceEstimate()
+    scores: EarlyWarningScores = EarlyWarningScores()
@@ -0,0 +1,199 @@
+"""
+SAFE-Triage AI - Franco-Arabic (Arabizi) Transliteration
+Maps Latin-script Egyptian Arabic ("3andi da2 fe sedri", "mesh 2ader atnafes")
+to Arabic script before concept matching, in one left-to-right pass per token:
+a word table for common (mostly medical) words, then digit/digraph/letter
+tables with positional vowel rules.
+
+English complaints take a fast path: a text with no digit-as-letter and no
+known Arabizi word is returned as None after one regex scan; per-token
+results are memoized for the rest.
+"""
+import re
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+TOKEN_RE = re.compile(r"[A-Za-z0-9']+")
+
+# Common Egyptian Arabizi words, matched whole (after lowercasing)
+WORD_TABLE = {
+    # pronouns / particles
+    "ana": "انا", "enta": "انت", "enti": "انتي", "howa": "هو", "heya": "هي",
+    "3andi": "عندي", "3ndi": "عندي", "3andy": "عندي", "3ndy": "عندي",
+    "3ando": "عنده", "3andaha": "عندها",
+    "mesh": "مش", "msh": "مش", "mish": "مش", "mafeesh": "مافيش", "mafish": "مافيش",
+    "fe": "في", "fi": "في", "mn": "من", "3ala": "على", "ala": "على", "wa": "و",
+    "3aleh": "عليه", "3aleha": "عليها", "3alayh": "عليه",
+    "gamed": "جامد", "gamda": "جامدة", "awy": "اوي", "awi": "اوي", "shedid": "شديد", "shdeed": "شديد",
+    # body
+    "sedri": "صدري", "sidri": "صدري", "sedry": "صدري", "sadri": "صدري",
+    "2alby": "قلبي", "2albi": "قلبي", "alby": "قلبي", "albi": "قلبي",
+    "batni": "بطني", "batny": "بطني", "ba6ni": "بطني",
+    "dahri": "ضهري", "dahry": "ضهري", "da7ri": "ضهري",
+    "rasi": "راسي", "rasy": "راسي", "ragli": "رجلي", "rigli": "رجلي", "eidi": "ايدي", "edi": "ايدي",
+    "nafasi": "نفسي", "nafsi": "نفسي", "gesmi": "جسمي", "gismi": "جسمي",
+    # verbs / symptoms
+    "2ader": "قادر", "2adra": "قادرة", "ader": "قادر", "a2dar": "اقدر",
+    "atnafes": "اتنفس", "atnafas": "اتنفس",
+    "da2": "دق", "da2at": "دقات",
+    "waga3": "وجع", "wag3": "وجع", "wa8a3": "وجع",
+    "bywga3ni": "بيوجعني", "beywga3ni": "بيوجعني", "biywga3ni": "بيوجعني",
+    "btwga3ni": "بتوجعني", "betwga3ni": "بتوجعني", "bitwga3ni": "بتوجعني",
+    "ta3ban": "تعبان", "ta3bana": "تعبانة",
+    "so5onia": "سخونية", "sokhonia": "سخونية", "so5oneya": "سخونية", "sokhoneya": "سخونية",
+    "sodaa3": "صداع", "suda3": "صداع", "soda3": "صداع",
+    "dow5a": "دوخة", "dokha": "دوخة", "dayekh": "دايخ", "day5": "دايخ",
+    "maghas": "مغص", "ma8as": "مغص", "ma3'as": "مغص",
+    "targee3": "ترجيع", "targi3": "ترجيع", "baraga3": "برجع", "barga3": "برجع",
+    "nazif": "نزيف", "nazeef": "نزيف", "benazef": "بينزف", "beynzef": "بينزف", "btnzef": "بتنزف",
+    "we2e3": "وقع", "wa2a3": "وقع", "we2e3t": "وقعت", "wa2a3t": "وقعت",
+    "etkhabat": "اتخبط", "et5abat": "اتخبط",
+    "7amel": "حامل", "7amla": "حامل",
+    "mo8ma": "مغمى", "moghma": "مغمى", "ma8ma": "مغمى",
+    "beyetshanag": "بيتشنج", "bytshanag": "بيتشنج", "tashanog": "تشنج", "tashnogat": "تشنجات",
+    "etkahrab": "اتكهرب", "kahraba": "كهربا",
+    "7asasseya": "حساسية", "7asasia": "حساسية", "7arara": "حرارة", "7rara": "حرارة",
+    "sokkar": "السكر", "daght": "ضغط", "da8t": "ضغط",
+}
+
+DIGRAPHS = {
+    "sh": "ش", "ch": "ش", "kh": "خ", "gh": "غ", "th": "ث", "dh": "ذ",
+    "3'": "غ", "7'": "خ", "aa": "ا", "ee": "ي", "ii": "ي", "oo": "و", "ou": "و",
+}
+LETTERS = {
+    "2": "ء", "3": "ع", "5": "خ", "6": "ط", "7": "ح", "8": "غ", "9": "ص",
+    "b": "ب", "p": "ب", "t": "ت", "g": "ج", "j": "ج", "d": "د", "r": "ر", "z": "ز",
+    "s": "س", "c": "ك", "k": "ك", "q": "ق", "f": "ف", "v": "ف", "l": "ل", "m": "م",
+    "n": "ن", "h": "ه", "w": "و", "y": "ي", "x": "كس",
+    "i": "ي", "o": "و", "u": "و",
+}
+VOWELS = set("aeiou")
+ARABIZI_DIGITS = set("235678")
+ARABIZI_DIGIT_RE = re.compile(r"[a-z][235678]|[235678][a-z]")
+
+# Unit/ordinal suffixes after a leading number: "3days", "5am", "10mg"
+NUMBER_SUFFIXES = {
+    "am", "pm", "d", "h", "hr", "hrs", "hour", "hours", "day", "days", "wk", "wks", "week", "weeks",
+    "m", "min", "mins", "mo", "month", "months", "y", "yr", "yrs", "yo", "year", "years",
+    "mg", "ml", "g", "kg", "cm", "x", "st", "nd", "rd", "th", "s",
+}
+
+# English words that never go through transliteration (in addition to the
+# English lexicon tokens passed in by the NLP processor)
+ENGLISH_WORDS = frozenset({
+    "a", "and", "at", "for", "from", "had", "has", "have", "he", "her", "his", "i", "in",
+    "is", "it", "my", "no", "not", "of", "on", "since", "she", "the", "to", "very", "was",
+    "with", "pain", "ago", "today", "yesterday", "pt", "patient", "male", "female",
+    "day", "days", "hour", "hours", "minutes", "week", "weeks", "month", "months", "year", "years",
+})
+
+
+def transliterate_word(word: str) -> str:
+    """Letter-by-letter transliteration of one lowercase Arabizi token."""
+    out = []
+    i, n = 0, len(word)
+    while i < n:
+        pair = word[i:i + 2]
+        if len(pair) == 2 and pair in DIGRAPHS:
+            out.append(DIGRAPHS[pair])
+            i += 2
+            continue
+        ch = word[i]
+        if ch in VOWELS:
+            if i == 0:
+                out.append("ا")
+            elif i == n - 1:
+                # final -a is usually feminine ة, final -e/-i is ي
+                out.append({"a": "ة", "e": "ي", "i": "ي"}.get(ch, "و"))
+            elif ch in "iou":
+                out.append(LETTERS[ch])
+            # medial a/e are short vowels: not written
+        elif ch != "'":
+            out.append(LETTERS.get(ch, ch))
+        i += 1
+    return "".join(out)
+
+
+class Transliteration(NamedTuple):
+    text: str
+    # (output start, output end, source start, source end, copied verbatim)
+    segments: List[Tuple[int, int, int, int, bool]]
+
+    def to_source(self, start: int, end: int) -> Tuple[int, int]:
+        """Map an [start, end) span of the transliterated text back to the original."""
+        starts = [seg[0] for seg in self.segments]
+
+        def locate(pos):
+            return self.segments[max(0, bisect_right(starts, pos) - 1)]
+
+        out_s, _, src_s, src_e, copied = locate(start)
+        src_start = src_s + (start - out_s) if copied else src_s
+        out_s, _, src_s, src_e, copied = locate(max(start, end - 1))
+        src_end = src_s + (end - out_s) if copied else src_e
+        return src_start, src_end
+
+
+class ArabiziTransliterator:
+    def __init__(self, keep_words: Iterable[str] = (), cache_size: int = 65_536):
+        self.keep_words = ENGLISH_WORDS | {w.lower() for w in keep_words}
+        self._token = lru_cache(maxsize=cache_size)(self._transliterate_token)
+
+    def is_arabizi_token(self, token: str) -> bool:
+        if token in WORD_TABLE:
+            return True
+        if token in self.keep_words or not any(ch in ARABIZI_DIGITS for ch in token):
+            return False
+        if token.isdigit():
+            return False
+        digits = token[:len(token) - len(token.lstrip("0123456789"))]
+        if digits and (len(digits) > 1 or token[len(digits):] in NUMBER_SUFFIXES):
+            return False  # a quantity: "3days", "12h", "2x"
+        # Arabizi uses single digits as letters; "b12", "covid19" are English
+        return not re.search(r"\d\d", token)
+
+    def _transliterate_token(self, token: str) -> Tuple[bool, Optional[str]]:
+        """(is Arabizi, Arabic script or None to copy the token as-is)."""
+        lower = token.lower()
+        if self.is_arabizi_token(lower):
+            return True, WORD_TABLE.get(lower) or transliterate_word(lower)
+        if lower in self.keep_words or lower.isdigit():
+            return False, None
+        # Other Latin words are transliterated only if the text turns out to be Arabizi
+        return False, WORD_TABLE.get(lower) or transliterate_word(lower)
+
+    def transliterate(self, text: str) -> Optional[Transliteration]:
+        """Arabic-script rendering of an Arabizi complaint, or None if there is nothing to do."""
+        if not text.isascii():
+            return None
+        lowered = text.lower()
+        if not ARABIZI_DIGIT_RE.search(lowered) and WORD_TABLE.keys().isdisjoint(TOKEN_RE.findall(lowered)):
+            return None  # plain English: no digit-letters, no known Arabizi word
+        tokens = []
+        arabizi = False
+        for m in TOKEN_RE.finditer(text):
+            is_arabizi, arabic = self._token(m.group())
+            arabizi = arabizi or is_arabizi
+            tokens.append((m.start(), m.end(), arabic))
+        if not arabizi:
+            return None
+
+        parts, segments = [], []
+        out_pos = src_pos = 0
+
+        def emit(piece, src_start, src_end, copied):
+            nonlocal out_pos
+            if piece:
+                parts.append(piece)
+                segments.append((out_pos, out_pos + len(piece), src_start, src_end, copied))
+                out_pos += len(piece)
+
+        for start, end, arabic in tokens:
+            emit(text[src_pos:start], src_pos, start, True)
+            if arabic is None:
+                emit(text[start:end], start, end, True)
+            else:
+                emit(arabic, start, end, False)
+            src_pos = end
+        emit(text[src_pos:], src_pos, len(text), True)
+        return Transliteration("".join(parts), segments)
@@ -0,0 +1,310 @@
+"""
+SAFE-Triage AI - Lexicon Matcher
+Precomputed index over the triage lexicon so a complaint is matched in
+O(tokens) instead of one regex search per lexicon term.
+
+Two passes over the complaint:
+  1. Exact: a character trie walked from each position of the lowercased text.
+     Same rule as the original per-term regex check - a term matches when it
+     occurs on word boundaries, or anywhere as a raw substring (Arabic
+     clitics such as و/ب/ال attach to the word).
+  2. Fuzzy: each token is looked up in a SymSpell-style deletion dictionary
+     over the lexicon's tokens, then multi-word terms are matched token by
+     token. Only plausible typos count as one edit: insertions, deletions,
+     transpositions and neighbouring-key substitutions. Arabic spelling
+     variants (hamza/alef, ى/ي, ة/ه, tashkeel) are folded before lookup, and
+     in Arabic words only commonly swapped letters and transpositions count
+     as typos - a missing or extra letter is usually a different conjugation
+     or clitic (بنزف vs بتنزف), not a slip.
+"""
+import re
+from typing import Dict, Iterable, List, NamedTuple, Sequence, Tuple
+
+WORD_RE = re.compile(r"\w+")
+
+# (max term length, allowed edits); longer terms get DEFAULT_LONG_TERM_EDITS
+DEFAULT_MAX_EDITS = ((4, 0), (8, 1))
+DEFAULT_ARABIC_MAX_EDITS = ((3, 0), (8, 1))
+DEFAULT_LONG_TERM_EDITS = 2
+
+_TOKEN_CACHE_SIZE = 50_000
+
+# Real words one plausible typo away from a lexicon term; never corrected
+DEFAULT_PROTECTED_WORDS = frozenset({"strike", "stoke", "spin"})
+
+# ============ ARABIC ORTHOGRAPHIC FOLDING ============
+
+_FOLD_MAP = {
+    "أ": "ا", "إ": "ا", "آ": "ا", "ٱ": "ا",
+    "ى": "ي", "ئ": "ي", "ؤ": "و", "ة": "ه",
+    "ـ": None,  # tatweel
+}
+_FOLD_MAP.update({chr(c): None for c in range(0x064B, 0x0653)})  # tashkeel
+_FOLD_TABLE = str.maketrans(_FOLD_MAP)
+
+
+def fold(token: str) -> str:
+    return token.translate(_FOLD_TABLE)
+
+
+# ============ TYPO MODEL ============
+
+_QWERTY_ROWS = ["1234567890", "qwertyuiop", "asdfghjkl", "zxcvbnm"]
+# Letters Egyptian typists commonly swap (phonetic or near on the keyboard)
+_ARABIC_SWAPS = ["ضظ", "ذز", "ثس", "صس", "طت", "قء", "قك", "هح", "دض", "اع", "ةه", "يى"]
+
+
+def _build_near_pairs():
+    pairs = set()
+    for r, row in enumerate(_QWERTY_ROWS):
+        for c, ch in enumerate(row):
+            for dr, dc in ((0, -1), (0, 1), (-1, 0), (-1, 1), (1, 0), (1, -1)):
+                rr, cc = r + dr, c + dc
+                if 0 <= rr < len(_QWERTY_ROWS) and 0 <= cc < len(_QWERTY_ROWS[rr]):
+                    pairs.add((ch, _QWERTY_ROWS[rr][cc]))
+    for a, b in _ARABIC_SWAPS:
+        pairs.add((a, b))
+        pairs.add((b, a))
+    return frozenset(pairs)
+
+
+_NEAR_PAIRS = _build_near_pairs()
+
+
+def is_arabic(word: str) -> bool:
+    return bool(word) and "\u0600" <= word[0] <= "\u06ff"
+
+
+def typo_distance(a: str, b: str, limit: int, indel: int = 1) -> int:
+    """
+    Optimal-string-alignment distance where a substitution costs 1 only for
+    neighbouring keys / swappable letters (2 otherwise) and an insertion or
+    deletion costs `indel`. Returns limit + 1 as soon as the distance is
+    known to exceed `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev_prev = None
+    prev = [j * indel for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        cur = [i * indel] + [0] * len(b)
+        ca = a[i - 1]
+        for j in range(1, len(b) + 1):
+            cb = b[j - 1]
+            if ca == cb:
+                sub = prev[j - 1]
+            else:
+                sub = prev[j - 1] + (1 if (ca, cb) in _NEAR_PAIRS else 2)
+            best = min(prev[j] + indel, cur[j - 1] + indel, sub)
+            if prev_prev is not None and i > 1 and j > 1 and ca == b[j - 2] and a[i - 2] == cb:
+                best = min(best, prev_prev[j - 2] + 1)
+            cur[j] = best
+        if min(cur) > limit:
+            return limit + 1
+        prev_prev, prev = prev, cur
+    return prev[-1]
+
+
+def _deletes(word: str, depth: int) -> set:
+    out = {word}
+    frontier = {word}
+    for _ in range(depth):
+        nxt = set()
+        for w in frontier:
+            if len(w) <= 1:
+                continue
+            for i in range(len(w)):
+                nxt.add(w[:i] + w[i + 1:])
+        out |= nxt
+        frontier = nxt
+    return out
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+class Match(NamedTuple):
+    start: int
+    end: int
+    term: str
+    labels: Tuple[str, ...]
+    fuzzy: bool = False
+
+
+class LexiconMatcher:
+    """
+    Index over {label: [terms]}. `match(text)` returns every term occurrence
+    (exact and fuzzy) with character offsets into `text`.
+    """
+
+    def __init__(self, lexicon: Dict[str, Sequence[str]], fuzzy: bool = True,
+                 max_edits_by_length: Sequence[Tuple[int, int]] = DEFAULT_MAX_EDITS,
+                 arabic_max_edits_by_length: Sequence[Tuple[int, int]] = DEFAULT_ARABIC_MAX_EDITS,
+                 long_term_edits: int = DEFAULT_LONG_TERM_EDITS,
+                 protected_words: Iterable[str] = DEFAULT_PROTECTED_WORDS):
+        self.fuzzy = fuzzy
+        self.protected_words = frozenset(fold(w.lower()) for w in protected_words)
+        self.max_edits_by_length = tuple(sorted(max_edits_by_length))
+        self.arabic_max_edits_by_length = tuple(sorted(arabic_max_edits_by_length))
+        self.long_term_edits = long_term_edits
+
+        # term (as written) -> labels, in first-seen order
+        labels_by_term: Dict[str, List[str]] = {}
+        for label, terms in lexicon.items():
+            for term in terms:
+                labels = labels_by_term.setdefault(term, [])
+                if label not in labels:
+                    labels.append(label)
+        self.terms: List[Tuple[str, str, Tuple[str, ...]]] = [
+            (term, term.lower(), tuple(labels)) for term, labels in labels_by_term.items()
+        ]
+
+        # Exact pass: character trie of lowercased terms; None key = term ids ending here
+        self._trie: dict = {}
+        for tid, (_, lowered, _) in enumerate(self.terms):
+            node = self._trie
+            for ch in lowered:
+                node = node.setdefault(ch, {})
+            node.setdefault(None, []).append(tid)
+
+        # Fuzzy pass: folded token vocabulary, deletion dictionary, phrases by first token
+        self._phrases: Dict[str, List[Tuple[Tuple[str, ...], int]]] = {}
+        self._vocab = set()
+        for tid, (_, lowered, _) in enumerate(self.terms):
+            tokens = tuple(fold(t) for t in WORD_RE.findall(lowered))
+            if not tokens:
+                continue
+            self._vocab.update(tokens)
+            self._phrases.setdefault(tokens[0], []).append((tokens, tid))
+        self._delete_index: Dict[str, List[str]] = {}
+        for word in self._vocab:
+            edits = self.max_edits(len(word), is_arabic(word))
+            if edits == 0:
+                continue
+            for variant in _deletes(word, edits):
+                self._delete_index.setdefault(variant, []).append(word)
+        self._token_cache: Dict[str, Tuple[str, ...]] = {}
+
+    def max_edits(self, term_length: int, arabic: bool = False) -> int:
+        table = self.arabic_max_edits_by_length if arabic else self.max_edits_by_length
+        for max_len, edits in table:
+            if term_length <= max_len:
+                return edits
+        return self.long_term_edits
+
+    # ---------- exact ----------
+
+    def _exact(self, text: str, lowered: str) -> List[Match]:
+        matches = []
+        trie = self._trie
+        n = len(lowered)
+        for start in range(n):
+            node = trie.get(lowered[start])
+            if node is None:
+                continue
+            pos = start + 1
+            while True:
+                ids = node.get(None)
+                if ids is not None:
+                    bounded = (
+                        (start == 0 or not _is_word_char(lowered[start - 1]) or not _is_word_char(lowered[start]))
+                        and (pos == n or not _is_word_char(lowered[pos]) or not _is_word_char(lowered[pos - 1]))
+                    )
+                    for tid in ids:
+                        term = self.terms[tid][0]
+                        if bounded or text.startswith(term, start):
+                            matches.append(Match(start, pos, term, self.terms[tid][2]))
+                if pos == n:
+                    break
+                node = node.get(lowered[pos])
+                if node is None:
+                    break
+                pos += 1
+        return matches
+
+    def _exact_legacy(self, text: str, lowered: str) -> List[Match]:
+        # str.lower() changed the length (rare non-Arabic/Latin input) - offsets
+        # cannot be shared, so fall back to one search per term.
+        matches = []
+        for term, term_lower, labels in self.terms:
+            m = re.search(r"\b" + re.escape(term_lower) + r"\b", lowered)
+            if m:
+                matches.append(Match(m.start(), m.end(), term, labels))
+                continue
+            idx = text.find(term)
+            if idx >= 0:
+                matches.append(Match(idx, idx + len(term), term, labels))
+        return matches
+
+    # ---------- fuzzy ----------
+
+    def _candidates(self, token: str) -> Tuple[str, ...]:
+        """Lexicon tokens this text token may stand for (cached per token)."""
+        cached = self._token_cache.get(token)
+        if cached is not None:
+            return cached
+        folded = fold(token)
+        if folded in self._vocab:
+            result = (folded,)
+        elif folded in self.protected_words:
+            result = ()
+        else:
+            found = set()
+            arabic = is_arabic(folded)
+            indel = 2 if arabic else 1
+            depth = self.max_edits(len(folded) + self.long_term_edits, arabic)
+            if depth:
+                for variant in _deletes(folded, depth):
+                    for word in self._delete_index.get(variant, ()):
+                        if word in found:
+                            continue
+                        # Typos rarely hit the first letter (Arabic letter swaps aside)
+                        if word[0] != folded[0] and not (arabic and (word[0], folded[0]) in _NEAR_PAIRS):
+                            continue
+                        limit = self.max_edits(len(word), arabic)
+                        if typo_distance(folded, word, limit, indel) <= limit:
+                            found.add(word)
+            result = tuple(found)
+        if len(self._token_cache) >= _TOKEN_CACHE_SIZE:
+            self._token_cache.clear()
+        self._token_cache[token] = result
+        return result
+
+    def _fuzzy(self, lowered: str, exact_terms: set) -> List[Match]:
+        spans = [(m.start(), m.end(), m.group()) for m in WORD_RE.finditer(lowered)]
+        candidates = [self._candidates(tok) for _, _, tok in spans]
+        matches = []
+        seen = set()
+        for i, cands in enumerate(candidates):
+            for cand in cands:
+                for tokens, tid in self._phrases.get(cand, ()):
+                    term, term_lower, labels = self.terms[tid]
+                    if term in exact_terms or tid in seen:
+                        continue
+                    end_i = i + len(tokens) - 1
+                    if end_i >= len(candidates):
+                        continue
+                    if all(tokens[k] in candidates[i + k] for k in range(1, len(tokens))):
+                        start, end = spans[i][0], spans[end_i][1]
+                        if lowered[start:end] == term_lower:
+                            continue  # exact, already reported by the exact pass
+                        seen.add(tid)
+                        matches.append(Match(start, end, term, labels, fuzzy=True))
+        return matches
+
+    # ---------- public ----------
+
+    def match(self, text: str) -> List[Match]:
+        lowered = text.lower()
+        if len(lowered) == len(text):
+            matches = self._exact(text, lowered)
+        else:
+            matches = self._exact_legacy(text, lowered)
+        if self.fuzzy:
+            matches.extend(self._fuzzy(lowered, {m.term for m in matches}))
+        return matches
+
+    def vocabulary(self) -> set:
+        """Lowercased tokens of all lexicon terms."""
+        return {t for _, lowered, _ in self.terms for t in WORD_RE.findall(lowered)}
@@ -1,12 +1,36 @@
-from typing import List, Dict
-import re
+from types import MappingProxyType
+from typing import List, Dict, Mapping, NamedTuple, Optional, Tuple
+
+from .arabizi import ArabiziTransliterator
+from .matcher import DEFAULT_ARABIC_MAX_EDITS, DEFAULT_MAX_EDITS, LexiconMatcher, Match
+
+DANGER = "danger"
+
+
+class Analysis(NamedTuple):
+    """Immutable: the same Analysis is handed to every caller asking about the same text."""
+    symptoms: Tuple[str, ...]
+    danger_keywords: Tuple[str, ...]
+    # Read-only {start, end, text, term, category, fuzzy} per matched category, by offset
+    spans: Tuple[Mapping, ...]
+
 
 class NLPProcessor:
     """
     NLP Processor for Egyptian Emergency Triage
     Includes Egyptian Arabic (Masri) slang and medical terms
     """
-    def __init__(self):
+    # Bump when concept or danger term lists change
+    LEXICON_VERSION = "1.2"
+
+    def __init__(self, fuzzy: bool = True, max_edits_by_length=DEFAULT_MAX_EDITS,
+                 arabic_max_edits_by_length=DEFAULT_ARABIC_MAX_EDITS, arabizi: bool = True,
+                 extra_concepts: Optional[Dict[str, List[str]]] = None,
+                 extra_danger_terms: Optional[List[str]] = None):
+        """
+        `extra_concepts` / `extra_danger_terms` add local slang on top of the
+        built-in lexicon (per-hospital deployments); new concept keys are allowed.
+        """
         # Arabic and English keywords mapping to clinical concepts
         # Egyptian Arabic (عامية مصرية) included
         self.concepts = {
@@ -177,7 +201,7 @@ class NLPProcessor:
                 "خفقان", "عدم انتظام ضربات القلب",
                 # Egyptian Slang
                 "قلبي بيدق جامد", "قلبي بيخبط", "قلبي بيرفرف",
-                "حاسس بدقات قلبي", "قلبي واقف"
+                "حاسس بدقات قلبي", "قلبي واقف", "دق في صدري"
             ],
             "hypertension": [
                 # English
@@ -272,33 +296,8 @@ class NLPProcessor:
             ]
         }
         
-        # Negation terms
-        self.negations = [
-            "no ", "not ", "denies ", "without ", "never ",
-            "لا ", "بدون ", "مافيش ", "مش ", "ما عنديش "
-        ]
-
-    def extract_symptoms(self, text: str) -> List[str]:
-        """
-        Analyze text and return a list of identified symptom keys.
-        """
-        text_lower = text.lower()
-        detected = []
-        
-        for category, keywords in self.concepts.items():
-            for kw in keywords:
-                # Check both lowercase match and original (for Arabic)
-                if re.search(r'\b' + re.escape(kw.lower()) + r'\b', text_lower) or kw in text:
-                    detected.append(category)
-                    break
-        
-        return detected
-
-    def detect_danger_keywords(self, text: str) -> List[str]:
-        """
-        Specific check for Life-Threatening keywords (Level 1).
-        """
-        danger_terms = [
+        # Life-threatening keywords (Level 1)
+        self.danger_terms = [
             # English - Critical/Life-threatening
             "cardiac arrest", "unresponsive", "unconscious", "not conscious", 
             "blue", "cyanotic", "not breathing", "stopped breathing", "apnea",
@@ -331,11 +330,82 @@ class NLPProcessor:
             "كهربا كهربته", "اتكهرب",
             "حامل وبتنزف", "حامل ونزيف"
         ]
-        
-        matches = []
-        text_lower = text.lower()
-        for term in danger_terms:
-            if re.search(r'\b' + re.escape(term.lower()) + r'\b', text_lower) or term in text:
-                matches.append(term)
-                
+
+        # Negation terms
+        self.negations = [
+            "no ", "not ", "denies ", "without ", "never ",
+            "لا ", "بدون ", "مافيش ", "مش ", "ما عنديش "
+        ]
+
+        for category, terms in (extra_concepts or {}).items():
+            known = self.concepts.setdefault(category, [])
+            known.extend(t for t in terms if t not in known)
+        self.danger_terms.extend(t for t in extra_danger_terms or [] if t not in self.danger_terms)
+
+        # Precomputed exact + typo-tolerant index over concepts and danger terms
+        self.matcher = LexiconMatcher(
+            {**self.concepts, DANGER: self.danger_terms},
+            fuzzy=fuzzy, max_edits_by_length=max_edits_by_length,
+            arabic_max_edits_by_length=arabic_max_edits_by_length,
+        )
+        # Franco-Arabic (Arabizi) is transliterated before matching; English
+        # lexicon words are never transliterated
+        self.arabizi = ArabiziTransliterator(
+            t for t in self.matcher.vocabulary() if t.isascii()
+        ) if arabizi else None
+        self._last_analysis = (None, None)
+
+    def match(self, text: str) -> List[Match]:
+        """All lexicon hits in the text (exact and fuzzy), with offsets into `text`."""
+        translit = self.arabizi.transliterate(text) if self.arabizi else None
+        if translit is None:
+            matches = self.matcher.match(text)
+        else:
+            matches = []
+            for m in self.matcher.match(translit.text):
+                start, end = translit.to_source(m.start, m.end)
+                matches.append(m._replace(start=start, end=end))
         return matches
+
+    def analyze(self, text: str) -> Analysis:
+        """
+        Symptoms, danger keywords and the evidence spans behind them from a
+        single scan. The last result is kept so callers asking for the same
+        complaint again (extract_symptoms, then detect_danger_keywords) do
+        not rescan it.
+        """
+        last_text, last_analysis = self._last_analysis
+        if text == last_text:
+            return last_analysis
+        matches = self.match(text)
+        labels = set()
+        danger = set()
+        spans = []
+        for m in sorted(matches, key=lambda m: (m.start, m.end)):
+            for label in m.labels:
+                labels.add(label)
+                spans.append(MappingProxyType({
+                    "start": m.start, "end": m.end, "text": text[m.start:m.end],
+                    "term": m.term, "category": label, "fuzzy": m.fuzzy,
+                }))
+            if DANGER in m.labels:
+                danger.add(m.term)
+        analysis = Analysis(
+            tuple(category for category in self.concepts if category in labels),
+            tuple(term for term in self.danger_terms if term in danger),
+            tuple(spans),
+        )
+        self._last_analysis = (text, analysis)
+        return analysis
+
+    def extract_symptoms(self, text: str) -> List[str]:
+        """
+        Analyze text and return a list of identified symptom keys.
+        """
+        return list(self.analyze(text).symptoms)
+
+    def detect_danger_keywords(self, text: str) -> List[str]:
+        """
+        Specific check for Life-Threatening keywords (Level 1).
+        """
+        return list(self.analyze(text).danger_keywords)
@@ -0,0 +1,192 @@
+"""
+SAFE-Triage AI - Recent Patient Cache
+The patients triaged in the last PATIENT_CACHE_HOURS (default 24), kept in
+memory so dashboard polls of /patients and /patients/{id} do not run an ORM
+query and hydrate full objects for every call.
+
+Records are filled in on every write in this process (triage, vitals
+ingest, bulk import) and warm-loaded from the database when the tenant is
+built, so the cache holds every patient created since the cutoff. A page of
+/patients is served from it when the whole page falls inside the window; any
+other read goes to the database. Records older than the window are evicted
+from the oldest end as reads and writes happen.
+
+Each record is a __slots__ object (no per-instance dict). Every write also
+bumps a table version, the validator behind the ETags of both endpoints.
+The cache and the version are only complete for a single writer: with
+several worker processes on one database, set PATIENT_CACHE_HOURS=0 to read
+from the database only (conditional GETs are then disabled too).
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+
+from sqlalchemy import select
+
+from . import http_cache
+from .sql_models import Patient
+
+COLUMNS = tuple(column.name for column in Patient.__table__.columns)
+
+
+class PatientRecord:
+    """One cached patients row: the table's columns, plus created_at as epoch seconds for eviction."""
+    __slots__ = COLUMNS + ("created_ts",)
+
+    @classmethod
+    def from_row(cls, row) -> "PatientRecord":
+        """From a Patient object or a Core row with the same column names."""
+        record = cls()
+        for name in COLUMNS:
+            setattr(record, name, getattr(row, name))
+        created = record.created_at
+        if created is None:
+            record.created_ts = time.time()
+        else:
+            if created.tzinfo is None:
+                created = created.replace(tzinfo=timezone.utc)  # SQLite CURRENT_TIMESTAMP is naive UTC
+            record.created_ts = created.timestamp()
+        return record
+
+    def as_dict(self) -> Dict:
+        """Same fields as the serialized ORM object."""
+        return {name: getattr(self, name) for name in COLUMNS}
+
+
+class RecentPatients:
+    def __init__(self, hours: float = 24, max_records: int = 100_000, clock=time.time, tenant_id: str = ""):
+        self.hours = hours
+        self.max_records = max_records
+        self.clock = clock
+        # id -> record in creation order, oldest first
+        self._records: "OrderedDict[int, PatientRecord]" = OrderedDict()
+        # Oldest creation time the cache is complete from; None: nothing loaded yet
+        self._complete_since: Optional[float] = None
+        self._lock = threading.Lock()
+        # Bumped on every write to the patients table seen by this process; the
+        # token keeps tags of other tenants and of earlier instances from matching
+        self.token = http_cache.new_token(tenant_id)
+        self.version = 0
+        self.modified_at = clock()
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    @classmethod
+    def from_env(cls, tenant_id: str = "") -> "RecentPatients":
+        return cls(
+            hours=float(os.getenv("PATIENT_CACHE_HOURS", "24")),
+            max_records=int(os.getenv("PATIENT_CACHE_MAX", "100000")),
+            tenant_id=tenant_id,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.hours > 0 and self.max_records > 0
+
+    def _bump(self):
+        """Caller holds the lock."""
+        self.version += 1
+        self.modified_at = self.clock()
+
+    def validators(self) -> Optional[http_cache.Validators]:
+        """ETag / Last-Modified for reads of the patients table; None when disabled."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            return http_cache.validators(self.token, self.version, self.modified_at)
+
+    def _evict(self, now: float):
+        """Drop records older than the window, and the oldest beyond max_records (caller holds the lock)."""
+        cutoff = now - self.hours * 3600
+        records = self._records
+        while records:
+            oldest = next(iter(records.values()))
+            if oldest.created_ts >= cutoff and len(records) <= self.max_records:
+                break
+            records.popitem(last=False)
+            self.stats["evictions"] += 1
+            # Complete only for patients newer than the evicted one
+            self._complete_since = max(self._complete_since, oldest.created_ts + 1e-6)
+        self._complete_since = max(self._complete_since, cutoff)
+
+    # ============ WRITES ============
+
+    def put(self, rows: Iterable) -> int:
+        """Add or replace records from committed Patient objects or PatientRecords. Returns records cached."""
+        if not self.enabled:
+            return 0
+        records = [row if isinstance(row, PatientRecord) else PatientRecord.from_row(row) for row in rows]
+        if not records:
+            return 0
+        cached = 0
+        with self._lock:
+            self._bump()  # Rows older than the window changed too
+            if self._complete_since is None:
+                return 0  # Not loaded: reads go to the database anyway
+            for record in records:
+                # Updates keep their place; new patients are the newest
+                if record.id in self._records or record.created_ts >= self._complete_since:
+                    self._records[record.id] = record
+                    cached += 1
+            self.stats["writes"] += cached
+            self._evict(self.clock())
+        return cached
+
+    def load(self, bind) -> int:
+        """(Re)build the cache from the patients created within the window. Returns rows read."""
+        if not self.enabled:
+            return 0
+        now = self.clock()
+        since = datetime.fromtimestamp(now - self.hours * 3600, timezone.utc)
+        if bind.dialect.name == "sqlite":
+            since = since.replace(tzinfo=None)
+        query = (select(*Patient.__table__.columns).where(Patient.created_at >= since)
+                 .order_by(Patient.created_at, Patient.id))
+        with bind.connect() as conn:
+            records = [PatientRecord.from_row(row) for row in conn.execute(query)]
+        with self._lock:
+            self._records = OrderedDict((record.id, record) for record in records)
+            self._complete_since = now - self.hours * 3600
+            self._bump()
+            self._evict(now)
+        return len(records)
+
+    def clear(self):
+        """Forget everything; reads go to the database until the next load."""
+        with self._lock:
+            self._records.clear()
+            self._complete_since = None
+            self._bump()
+
+    # ============ READS ============
+
+    def get(self, patient_id: int) -> Optional[Dict]:
+        """The cached record, or None (not recent, unknown, or the cache is not loaded)."""
+        with self._lock:
+            if self._complete_since is not None:
+                self._evict(self.clock())
+            record = self._records.get(patient_id)
+            self.stats["hits" if record is not None else "misses"] += 1
+        return record.as_dict() if record is not None else None
+
+    def page(self, skip: int, limit: int) -> Optional[List[Dict]]:
+        """Newest-first page like the /patients query, or None when it reaches past the window."""
+        with self._lock:
+            if self._complete_since is None:
+                self.stats["misses"] += 1
+                return None
+            self._evict(self.clock())
+            if skip < 0 or limit < 0 or skip + limit > len(self._records):
+                # Older patients may follow in the database
+                self.stats["misses"] += 1
+                return None
+            records = list(islice(reversed(self._records.values()), skip, skip + limit))
+            self.stats["hits"] += 1
+        return [record.as_dict() for record in records]
+
+    def snapshot(self) -> Dict:
+        return dict(self.stats, enabled=self.enabled, hours=self.hours, records=len(self._records),
+                    version=self.version)
@@ -0,0 +1,228 @@
+"""
+SAFE-Triage AI - Offline Replay
+Re-scores a recorded corpus (shadow log JSONL) with the current - or any
+other - rule engine across CPU cores and prints a confusion matrix against
+the recorded AI or rule levels. One tenant is replayed at a time, with that
+tenant's lexicon and thresholds from the tenants config.
+
+Usage:
+    python -m backend.replay shadow_log.jsonl --against ai
+    python -m backend.replay shadow_log.jsonl --against rules --engine mypkg.rules:CandidateEngine
+    python -m backend.replay shadow_log.jsonl --tenant cairo-general
+"""
+import argparse
+import importlib
+import json
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+from .models import PatientInput
+
+DEFAULT_ENGINE = "backend.logic.triage_engine:TriageEngine"
+DEFAULT_TENANT = "default"  # tenants.DEFAULT_TENANT; not imported so workers stay light
+LEVELS = [1, 2, 3, 4, 5]
+
+# Per-process engine, built once by the pool initializer
+_ENGINE = None
+
+
+def load_engine(spec: str = DEFAULT_ENGINE, tenant_config=None):
+    """Instantiate an engine from 'package.module:ClassName', with a TenantConfig's lexicon and thresholds."""
+    module_name, _, attr = spec.partition(":")
+    if not attr:
+        raise ValueError(f"Engine spec must look like 'module:Class', got '{spec}'")
+    cls = getattr(importlib.import_module(module_name), attr)
+    return cls(**tenant_config.engine_options()) if tenant_config is not None else cls()
+
+
+def _init_worker(engine_spec: str, tenant_config=None):
+    global _ENGINE
+    _ENGINE = load_engine(engine_spec, tenant_config)
+
+
+def _score_chunk(inputs: List[dict]) -> List[Optional[int]]:
+    """Worker: evaluate one chunk of PatientInput dicts; None for unreadable inputs."""
+    patients, positions = [], []
+    for i, data in enumerate(inputs):
+        try:
+            patients.append(PatientInput(**data))
+            positions.append(i)
+        except (ValueError, TypeError):
+            continue
+    levels: List[Optional[int]] = [None] * len(inputs)
+    for i, result in zip(positions, _ENGINE.evaluate_batch(patients)):
+        levels[i] = int(result.level)
+    return levels
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bounded_map(executor, fn: Callable, jobs: Iterable, max_pending: int) -> Iterator:
+    """
+    Like Executor.map over (tag, payload) jobs, yielding (tag, result) in
+    order, but with at most `max_pending` jobs in flight so a large corpus is
+    streamed instead of being submitted all at once.
+    """
+    pending = deque()
+    for tag, payload in jobs:
+        pending.append((tag, executor.submit(fn, payload)))
+        if len(pending) >= max_pending:
+            tag, future = pending.popleft()
+            yield tag, future.result()
+    while pending:
+        tag, future = pending.popleft()
+        yield tag, future.result()
+
+
+def parallel_score(chunks: Iterable[list], input_of: Callable[[dict], dict],
+                   engine_spec: str = DEFAULT_ENGINE, workers: Optional[int] = None,
+                   tenant_config=None) -> Iterator:
+    """
+    Yield (record, replayed_level) for every record, in input order. Work is
+    spread across `workers` processes (default: all cores); workers=1 runs in
+    this process.
+    """
+    workers = workers or os.cpu_count() or 1
+    jobs = ((chunk, [input_of(r) for r in chunk]) for chunk in chunks)
+
+    if workers == 1:
+        _init_worker(engine_spec, tenant_config)
+        for chunk, inputs in jobs:
+            yield from zip(chunk, _score_chunk(inputs))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(engine_spec, tenant_config)) as pool:
+        for chunk, levels in bounded_map(pool, _score_chunk, jobs, workers * 4):
+            yield from zip(chunk, levels)
+
+
+# ============ CONFUSION MATRIX ============
+
+class ConfusionMatrix:
+    """Reference level (rows) vs replayed level (columns) over ESI 1-5."""
+
+    def __init__(self):
+        self.counts = {ref: {new: 0 for new in LEVELS} for ref in LEVELS}
+        self.skipped = 0
+
+    def add(self, reference: Optional[int], replayed: Optional[int]):
+        if reference not in self.counts or replayed not in LEVELS:
+            self.skipped += 1
+            return
+        self.counts[reference][replayed] += 1
+
+    @property
+    def total(self) -> int:
+        return sum(sum(row.values()) for row in self.counts.values())
+
+    @property
+    def agreement(self) -> float:
+        total = self.total
+        return sum(self.counts[l][l] for l in LEVELS) / total if total else 0.0
+
+    def under_triage(self) -> int:
+        """Replayed level less urgent (higher number) than the reference."""
+        return sum(n for ref, row in self.counts.items() for new, n in row.items() if new > ref)
+
+    def over_triage(self) -> int:
+        return sum(n for ref, row in self.counts.items() for new, n in row.items() if new < ref)
+
+    def to_dict(self) -> Dict:
+        return {
+            "matrix": {str(ref): {str(new): n for new, n in row.items()} for ref, row in self.counts.items()},
+            "total": self.total,
+            "skipped": self.skipped,
+            "agreement": round(self.agreement, 4),
+            "under_triage": self.under_triage(),
+            "over_triage": self.over_triage(),
+        }
+
+    def format(self, reference_label: str, replay_label: str) -> str:
+        lines = [f"{reference_label} (rows) vs {replay_label} (columns)",
+                 "       " + "".join(f"{l:>8}" for l in LEVELS)]
+        for ref in LEVELS:
+            lines.append(f"  L{ref}   " + "".join(f"{self.counts[ref][new]:>8}" for new in LEVELS))
+        lines.append(
+            f"Agreement {self.agreement:.1%} of {self.total} | "
+            f"under-triage {self.under_triage()} | over-triage {self.over_triage()} | "
+            f"skipped {self.skipped}"
+        )
+        return "\n".join(lines)
+
+
+# ============ CLI ============
+
+def iter_jsonl(path: str) -> Iterator[dict]:
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def replay_shadow_log(path: str, against: str = "ai", engine_spec: str = DEFAULT_ENGINE,
+                      workers: Optional[int] = None, chunk_size: int = 500,
+                      tenant: str = DEFAULT_TENANT, tenant_config=None) -> ConfusionMatrix:
+    """Records of `tenant` only (records without one are the default tenant's), scored with its config."""
+    matrix = ConfusionMatrix()
+    key = "ai_level" if against == "ai" else "rule_level"
+    records = chunked((r for r in iter_jsonl(path) if (r.get("tenant") or DEFAULT_TENANT) == tenant), chunk_size)
+    for record, level in parallel_score(records, lambda r: r["input"], engine_spec, workers, tenant_config):
+        matrix.add(record.get(key), level)
+    return matrix
+
+
+def load_tenant_config(tenant: str, path: str):
+    """The TenantConfig of `tenant` from a tenants config file; None for the default tenant."""
+    from .tenants import TenantRegistry
+
+    configs = TenantRegistry.from_file(path).configs
+    if tenant in configs:
+        return configs[tenant]
+    if tenant != DEFAULT_TENANT:
+        raise SystemExit(f"Unknown tenant '{tenant}' in {path}")
+    return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a recorded triage corpus against a rule engine")
+    parser.add_argument("corpus", help="Shadow log (JSONL) written in shadow mode")
+    parser.add_argument("--against", choices=["ai", "rules"], default="ai",
+                        help="Recorded level to compare with (default: AI)")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE, help="Engine to replay, as module:Class")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--tenant", default=DEFAULT_TENANT, help="Tenant whose records are replayed")
+    parser.add_argument("--tenants-config", default=os.getenv("TENANTS_CONFIG", "tenants.json"),
+                        help="Tenants config file with the tenant's lexicon and thresholds")
+    parser.add_argument("--json", action="store_true", help="Print the matrix as JSON")
+    args = parser.parse_args(argv)
+
+    tenant_config = load_tenant_config(args.tenant, args.tenants_config)
+    start = time.perf_counter()
+    matrix = replay_shadow_log(args.corpus, args.against, args.engine, args.workers, args.chunk_size,
+                               args.tenant, tenant_config)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(matrix.to_dict(), indent=2))
+    else:
+        reference = "Recorded AI" if args.against == "ai" else "Recorded rules"
+        print(matrix.format(reference, f"Replayed {args.engine}"))
+        print(f"{matrix.total + matrix.skipped} records in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
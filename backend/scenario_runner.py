@@ -0,0 +1,215 @@
+"""
+SAFE-Triage AI - Scenario Corpus Runner
+Validates scenario corpora in-process across a process pool (engine built
+once per worker) instead of posting them one by one to a live server.
+Reports accuracy per expected level and per language, failures and
+throughput, and can diff against a previous run.
+
+Scenario files are JSON Lines, one scenario per line:
+    {"id": "...", "description": "...", "expected": 2,
+     "input": {"age": 55, "gender": "male", "chief_complaint_text": "...", "vitals": {...}}}
+`expected` may also be a list of acceptable levels. Lines in the
+validate_scenarios.py shape ({"name", "data", "expected"}) are accepted too.
+
+Usage:
+    python -m backend.scenario_runner corpus/*.jsonl --output run.json
+    python -m backend.scenario_runner --builtin --baseline run.json
+"""
+import argparse
+import hashlib
+import json
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from . import replay
+
+ARABIC_SCRIPT = re.compile(r"[؀-ۿ]")
+
+
+def detect_language(text: str) -> str:
+    return "ar" if ARABIC_SCRIPT.search(text or "") else "en"
+
+
+def normalize_scenario(raw: dict, source: str = "", line: int = 0) -> dict:
+    """Bring any supported scenario shape to {id, description, input, expected, language}."""
+    data = raw.get("input") or raw.get("data") or {}
+    expected = raw.get("expected", raw.get("expected_level"))
+    expected = [int(l) for l in expected] if isinstance(expected, (list, tuple)) else [int(expected)]
+    description = raw.get("description") or raw.get("name") or ""
+    scenario_id = raw.get("id")
+    if not scenario_id:
+        digest = hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8"))
+        scenario_id = f"{description or source}#{digest.hexdigest()[:10]}"
+    data = dict(data, vitals=data.get("vitals") or {})
+    return {
+        "id": scenario_id,
+        "description": description,
+        "input": data,
+        "expected": expected,
+        "language": raw.get("language") or detect_language(data.get("chief_complaint_text", "")),
+        "source": f"{source}:{line}" if source else "",
+    }
+
+
+def iter_scenario_files(paths: Iterable[str]) -> Iterator[dict]:
+    """Stream scenarios line by line; the corpus is never loaded as a whole."""
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    yield normalize_scenario(json.loads(line), path, line_no)
+
+
+def iter_builtin_scenarios() -> Iterator[dict]:
+    """The scenario banks shipped with the repo (backend/scenarios.py)."""
+    from .scenarios import API_SCENARIOS, SCENARIOS
+    for description, data, expected in SCENARIOS:
+        yield normalize_scenario({"description": description, "data": data, "expected": expected}, "scenarios")
+    for s in API_SCENARIOS:
+        yield normalize_scenario(s, "api_scenarios")
+
+
+class RunReport:
+    def __init__(self):
+        self.total = 0
+        self.passed = 0
+        self.by_level = defaultdict(Counter)
+        self.by_language = defaultdict(Counter)
+        self.failures: List[dict] = []
+        self.results: Dict[str, Optional[int]] = {}
+        self.elapsed = 0.0
+
+    def add(self, scenario: dict, actual: Optional[int]):
+        ok = actual in scenario["expected"]
+        self.total += 1
+        self.passed += ok
+        self.results[scenario["id"]] = actual
+        for bucket in (self.by_level[scenario["expected"][0]], self.by_language[scenario["language"]]):
+            bucket["total"] += 1
+            bucket["passed"] += ok
+        if not ok:
+            self.failures.append({
+                "id": scenario["id"],
+                "description": scenario["description"],
+                "complaint": scenario["input"].get("chief_complaint_text"),
+                "expected": scenario["expected"],
+                "actual": actual,
+                "source": scenario["source"],
+            })
+
+    @staticmethod
+    def _accuracy(counter) -> float:
+        return counter["passed"] / counter["total"] if counter["total"] else 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total,
+            "passed": self.passed,
+            "accuracy": round(self._accuracy({"passed": self.passed, "total": self.total}), 4),
+            "by_level": {str(k): {**v, "accuracy": round(self._accuracy(v), 4)} for k, v in sorted(self.by_level.items())},
+            "by_language": {k: {**v, "accuracy": round(self._accuracy(v), 4)} for k, v in sorted(self.by_language.items())},
+            "failures": self.failures,
+            "elapsed_s": round(self.elapsed, 3),
+            "scenarios_per_s": round(self.total / self.elapsed, 1) if self.elapsed else None,
+            "results": self.results,
+        }
+
+
+def run(scenarios: Iterable[dict], engine_spec: str = replay.DEFAULT_ENGINE,
+        workers: Optional[int] = None, chunk_size: int = 500) -> RunReport:
+    report = RunReport()
+    start = time.perf_counter()
+    chunks = replay.chunked(scenarios, chunk_size)
+    for scenario, level in replay.parallel_score(chunks, lambda s: s["input"], engine_spec, workers):
+        report.add(scenario, level)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def diff_runs(current: Dict[str, Optional[int]], previous: Dict[str, Optional[int]],
+              current_failed: Iterable[str], previous_failed: Iterable[str]) -> dict:
+    """Level changes and pass/fail transitions between two runs, keyed by scenario id."""
+    current_failed, previous_failed = set(current_failed), set(previous_failed)
+    common = current.keys() & previous.keys()
+    return {
+        "changed_levels": {sid: {"before": previous[sid], "after": current[sid]}
+                           for sid in sorted(common) if previous[sid] != current[sid]},
+        "newly_failing": sorted((current_failed - previous_failed) & common),
+        "newly_passing": sorted((previous_failed - current_failed) & common),
+        "added": len(current.keys() - previous.keys()),
+        "removed": len(previous.keys() - current.keys()),
+    }
+
+
+def print_report(report: dict, diff: Optional[dict] = None):
+    print("=" * 70)
+    print("SAFE-Triage AI - Scenario Corpus Run (تشغيل السيناريوهات)")
+    print("=" * 70)
+    print(f"Accuracy: {report['passed']}/{report['total']} ({report['accuracy']:.1%}) | "
+          f"{report['scenarios_per_s']} scenarios/s in {report['elapsed_s']}s")
+    print("\nBy expected level:")
+    for level, stats in report["by_level"].items():
+        print(f"  Level {level}: {stats['passed']}/{stats['total']} ({stats['accuracy']:.1%})")
+    print("\nBy language:")
+    for language, stats in report["by_language"].items():
+        print(f"  {language}: {stats['passed']}/{stats['total']} ({stats['accuracy']:.1%})")
+    if report["failures"]:
+        print(f"\n❌ FAILED SCENARIOS ({len(report['failures'])}):")
+        for f in report["failures"][:50]:
+            print(f"  {f['description'] or f['id']} | expected {f['expected']} got {f['actual']}")
+            print(f"    Complaint: {f['complaint']}")
+        if len(report["failures"]) > 50:
+            print(f"  ... {len(report['failures']) - 50} more (see --output)")
+    if diff is not None:
+        print(f"\nDiff vs baseline: {len(diff['changed_levels'])} level changes, "
+              f"{len(diff['newly_failing'])} newly failing, {len(diff['newly_passing'])} newly passing, "
+              f"{diff['added']} added, {diff['removed']} removed")
+        for sid in diff["newly_failing"][:20]:
+            change = diff["changed_levels"].get(sid, {})
+            print(f"  ↓ {sid}: {change.get('before')} → {change.get('after')}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate scenario corpora against the rule engine")
+    parser.add_argument("files", nargs="*", help="Scenario JSONL files")
+    parser.add_argument("--builtin", action="store_true", help="Include the scenarios shipped with the repo")
+    parser.add_argument("--engine", default=replay.DEFAULT_ENGINE, help="Engine to validate, as module:Class")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--output", help="Write the full run (JSON) for later --baseline diffs")
+    parser.add_argument("--baseline", help="Previous --output file to diff against")
+    args = parser.parse_args(argv)
+
+    if not args.files and not args.builtin:
+        parser.error("give scenario files and/or --builtin")
+
+    def scenarios():
+        if args.builtin:
+            yield from iter_builtin_scenarios()
+        yield from iter_scenario_files(args.files)
+
+    report = run(scenarios(), args.engine, args.workers, args.chunk_size).to_dict()
+
+    diff = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            previous = json.load(f)
+        diff = diff_runs(
+            report["results"], previous["results"],
+            (f["id"] for f in report["failures"]), (f["id"] for f in previous["failures"]),
+        )
+        report["diff"] = diff
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+
+    print_report(report, diff)
+    return report["passed"] == report["total"]
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,205 @@
+"""
+SAFE-Triage AI - Complaint Search
+Full-text search over patients' chief complaints ("snake bite",
+"ضربة شمس") through a SQLite FTS5 index instead of a LIKE scan.
+
+The index is a contentless FTS5 table, patients_fts, keyed by patient id
+and kept in sync by triggers on patients. Python's sqlite3 cannot register
+FTS5 tokenizers, so the Arabic handling happens before tokenizing: the
+triggers index arabic_normalize(chief_complaint), a Python SQL function,
+and queries go through the same normalization. It lowercases, folds hamza/alef, ى/ي and ة/ه, drops tashkeel
+and tatweel, and also indexes each word without a leading article
+(الصدر -> صدر, بالبطن -> بطن).
+
+Query words are ANDed and prefix-matched ("bites" finds "bite", "bitten"
+needs its own word); a few
+filler words ("all", "cases", "كل", "حالات") are ignored. Results are
+ranked by bm25, with highlight spans over the original complaint text.
+Other databases fall back to a case-insensitive LIKE per word as typed
+(tashkeel dropped, wildcards escaped): the stored text is not normalized
+there, so hamza and ة/ه variants do not match each other.
+
+Every connection that inserts, updates or deletes patients therefore needs
+arabic_normalize, or SQLite fails the write with "no such function".
+Engines from database.create_bind register it on connect; other Python
+writers call register_functions(conn) on their sqlite3 connection first.
+Tools that cannot register functions (the sqlite3 shell) should write
+through the API or bulk import instead.
+"""
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from sqlalchemy import column, literal_column, select, table, text
+from sqlalchemy.orm import Session
+
+from .nlp.matcher import fold
+from .patient_cache import PatientRecord
+from .sql_models import Patient
+
+WORD_RE = re.compile(r"\w+")
+# Words with tashkeel / tatweel inside, for highlight spans over the original text
+TEXT_WORD_RE = re.compile(r"[\w\u0640\u064B-\u0652]+")
+DIACRITICS_RE = re.compile(r"[\u0640\u064B-\u0652]")
+ARTICLES = ("وال", "بال", "فال", "كال", "لل", "ال")
+STOPWORDS = frozenset({
+    "a", "all", "an", "and", "case", "cases", "for", "in", "of", "patient", "patients", "the", "with",
+    "كل", "حاله", "حالات", "في", "فى", "مع", "من", "عيان", "مريض", "مرضي",
+})
+MAX_TERMS = 16
+
+fts = table("patients_fts", column("rowid"), column("complaint"))
+
+SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS patients_fts USING fts5("
+    "complaint, content='', prefix='2 3', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS patients_fts_insert AFTER INSERT ON patients BEGIN "
+    "INSERT INTO patients_fts(rowid, complaint) VALUES (new.id, arabic_normalize(new.chief_complaint)); END",
+    # Contentless tables delete by re-sending the indexed text
+    "CREATE TRIGGER IF NOT EXISTS patients_fts_delete AFTER DELETE ON patients BEGIN "
+    "INSERT INTO patients_fts(patients_fts, rowid, complaint) "
+    "VALUES ('delete', old.id, arabic_normalize(old.chief_complaint)); END",
+    "CREATE TRIGGER IF NOT EXISTS patients_fts_update AFTER UPDATE OF chief_complaint ON patients BEGIN "
+    "INSERT INTO patients_fts(patients_fts, rowid, complaint) "
+    "VALUES ('delete', old.id, arabic_normalize(old.chief_complaint)); "
+    "INSERT INTO patients_fts(rowid, complaint) VALUES (new.id, arabic_normalize(new.chief_complaint)); END",
+]
+
+
+# ============ NORMALIZATION ============
+
+def strip_article(word: str) -> str:
+    for article in ARTICLES:
+        if word.startswith(article) and len(word) - len(article) >= 2:
+            return word[len(article):]
+    return word
+
+
+def normalize(complaint: Optional[str]) -> str:
+    """The text indexed for a complaint (arabic_normalize in SQL)."""
+    if not complaint:
+        return ""
+    words = []
+    for word in WORD_RE.findall(fold(complaint.lower())):
+        words.append(word)
+        stem = strip_article(word)
+        if stem != word:
+            words.append(stem)
+    return " ".join(words)
+
+
+def strip_plural(word: str) -> str:
+    """English plural ending, so the prefix match also finds the singular (bites -> bite, injuries -> injur)."""
+    if not word.isascii() or len(word) <= 3 or word.endswith("ss"):
+        return word
+    if word.endswith("ies"):
+        return word[:-3]
+    return word[:-1] if word.endswith("s") else word
+
+
+def query_terms(query: str) -> List[str]:
+    """Normalized search words: filler words dropped, articles and plurals stripped, duplicates removed."""
+    terms = []
+    for word in WORD_RE.findall(fold(query.lower())):
+        term = strip_plural(strip_article(word))
+        if word not in STOPWORDS and term not in STOPWORDS and term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def like_filters(query: str) -> list:
+    """
+    ILIKE per query word for databases without the index. Words are matched as
+    typed, not folded, since the column is not; LIKE wildcards are escaped.
+    """
+    terms = []
+    for word in WORD_RE.findall(DIACRITICS_RE.sub("", query.lower())):
+        term = strip_plural(strip_article(word))
+        if fold(word) not in STOPWORDS and fold(term) not in STOPWORDS and term not in terms:
+            terms.append(term)
+    # \w words hold no % or backslash; _ is the one wildcard they can contain
+    return [Patient.chief_complaint.ilike("%" + term.replace("_", "\\_") + "%", escape="\\")
+            for term in terms[:MAX_TERMS]]
+
+
+def match_expression(terms: List[str]) -> str:
+    """FTS5 MATCH string: every term quoted (no query syntax from users) and prefix-matched."""
+    return " AND ".join(f'"{term}"*' for term in terms)
+
+
+def highlights(complaint: Optional[str], terms: List[str]) -> List[Dict[str, int]]:
+    """Character spans of the complaint's words that match a search term."""
+    spans = []
+    for match in TEXT_WORD_RE.finditer(complaint or ""):
+        word = fold(match.group().lower())
+        if any(word.startswith(term) or strip_article(word).startswith(term) for term in terms):
+            spans.append({"start": match.start(), "end": match.end()})
+    return spans
+
+
+# ============ INDEX ============
+
+def register_functions(dbapi_connection) -> None:
+    """arabic_normalize on a sqlite3 connection, for the index triggers."""
+    dbapi_connection.create_function("arabic_normalize", 1, normalize, deterministic=True)
+
+
+def create_index(conn):
+    """Create the FTS table and triggers and index existing patients (SQLite only)."""
+    if conn.dialect.name != "sqlite":
+        return
+    register_functions(conn.connection.driver_connection)
+    for statement in SCHEMA:
+        conn.execute(text(statement))
+    conn.execute(text("INSERT INTO patients_fts(patients_fts) VALUES ('delete-all')"))
+    conn.execute(text("INSERT INTO patients_fts(rowid, complaint) "
+                      "SELECT id, arabic_normalize(chief_complaint) FROM patients"))
+
+
+def rebuild(bind):
+    """Re-index every patient, e.g. after the normalization rules change."""
+    with bind.begin() as conn:
+        create_index(conn)
+
+
+# ============ QUERIES ============
+
+def search_patients(db: Session, query: str, days: Optional[float] = None, level: Optional[int] = None,
+                    limit: int = 20, offset: int = 0) -> Dict:
+    """Best matches first: patient fields plus `rank` (lower is better) and `highlights`."""
+    terms = query_terms(query)
+    if not terms:
+        raise ValueError("Query has no searchable words")
+    filters = []
+    if days is not None:
+        since = datetime.now(timezone.utc) - timedelta(days=days)
+        filters.append(Patient.created_at >= (since.replace(tzinfo=None) if db.bind.dialect.name == "sqlite" else since))
+    if level is not None:
+        filters.append(Patient.triage_level == level)
+
+    columns = Patient.__table__.columns
+    if db.bind.dialect.name == "sqlite":
+        # Rank on the index first and fetch full rows only for the page: a common
+        # word matches a large share of the table
+        rank = literal_column("bm25(patients_fts)")
+        ranked = select(fts.c.rowid.label("id"), rank.label("rank")).where(text("patients_fts MATCH :match"))
+        if filters:
+            ranked = ranked.join(Patient.__table__, Patient.id == fts.c.rowid).where(*filters)
+        ranked = ranked.order_by(rank, fts.c.rowid.desc()).limit(limit).offset(offset).subquery()
+        statement = (select(*columns, ranked.c.rank).join(ranked, Patient.id == ranked.c.id)
+                     .order_by(ranked.c.rank, Patient.id.desc()))
+        params = {"match": match_expression(terms)}
+    else:
+        statement = (select(*columns, literal_column("NULL").label("rank"))
+                     .where(*like_filters(query), *filters).order_by(Patient.created_at.desc(), Patient.id.desc())
+                     .limit(limit).offset(offset))
+        params = {}
+    rows = db.execute(statement, params).all()
+
+    results = []
+    for row in rows:
+        result = PatientRecord.from_row(row).as_dict()
+        result["rank"] = round(row.rank, 4) if row.rank is not None else None
+        result["highlights"] = highlights(row.chief_complaint, terms)
+        results.append(result)
+    return {"terms": terms, "results": results}
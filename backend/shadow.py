@@ -0,0 +1,119 @@
+"""
+SAFE-Triage AI - Shadow Mode
+After a triage response has been sent, the non-primary engine is run in the
+background and both outcomes are appended to a compact JSONL log. The log is
+the corpus for `python -m backend.replay`.
+
+Shadow AI calls spend the same Gemini quota as /ai-triage, so they go
+through its admission controller as one client (SHADOW_CLIENT_ID) and are
+skipped, not queued, when it refuses them.
+
+Enable with SHADOW_MODE=1 (optional SHADOW_SAMPLE_RATE, SHADOW_LOG_PATH).
+"""
+import json
+import os
+import random
+import threading
+import time
+from typing import Optional
+
+from .admission import Rejected
+from .logic.triage_engine import TriageEngine
+from .nlp.processor import NLPProcessor
+
+SHADOW_CLIENT_ID = "shadow"  # Admission client: all shadow calls share one client rate limit
+
+
+def ai_level(value) -> Optional[int]:
+    """The AI's triage level as an int in 1-5, or None for anything else it answered."""
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    elif isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return value if type(value) is int and 1 <= value <= 5 else None
+
+
+class ShadowLog:
+    """Append-only JSON Lines file, one compact record per comparison."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def append(self, record: dict):
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+
+
+class ShadowMode:
+    """Runs the non-primary engine off the request path and records both results."""
+
+    def __init__(self, enabled: bool = False, sample_rate: float = 1.0, log_path: str = "shadow_log.jsonl"):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.log = ShadowLog(log_path)
+        self.stats = {"recorded": 0, "errors": 0, "skipped": 0}
+        self._stats_lock = threading.Lock()  # Background tasks run on the threadpool
+
+    @classmethod
+    def from_env(cls) -> "ShadowMode":
+        return cls(
+            enabled=os.getenv("SHADOW_MODE", "0").lower() in ("1", "true", "yes"),
+            sample_rate=float(os.getenv("SHADOW_SAMPLE_RATE", "1.0")),
+            log_path=os.getenv("SHADOW_LOG_PATH", "shadow_log.jsonl"),
+        )
+
+    def should_shadow(self) -> bool:
+        return self.enabled and (self.sample_rate >= 1.0 or random.random() < self.sample_rate)
+
+    def _count(self, stat: str):
+        with self._stats_lock:
+            self.stats[stat] += 1
+
+    def _record(self, primary: str, patient_input: dict, rule_level: Optional[int],
+                ai_result: Optional[dict], rule_red_flags=None, tenant_id: Optional[str] = None):
+        ai_ok = ai_result is not None and "error" not in ai_result
+        self.log.append({
+            "t": round(time.time(), 3),
+            "tenant": tenant_id,
+            "primary": primary,
+            "input": patient_input,
+            "rule_level": rule_level,
+            "rule_red_flags": rule_red_flags or [],
+            "ai_level": ai_level(ai_result.get("triage_level")) if ai_ok else None,
+            "ai_error": ai_result.get("error") if ai_result and not ai_ok else None,
+            "rules_version": TriageEngine.RULES_VERSION,
+            "lexicon_version": NLPProcessor.LEXICON_VERSION,
+        })
+        self._count("recorded")
+
+    def shadow_ai(self, ai_service, patient_input: dict, rule_result: dict, admission=None,
+                  tenant_id: Optional[str] = None):
+        """Background task for /triage: rules were primary, run the AI now if `admission` allows."""
+        try:
+            if admission is None:
+                ai_result = ai_service.analyze_triage(patient_input, tenant=tenant_id)
+            else:
+                try:
+                    with admission.slot(SHADOW_CLIENT_ID):
+                        ai_result = ai_service.analyze_triage(patient_input, tenant=tenant_id)
+                except Rejected:
+                    self._count("skipped")  # Over capacity: live /ai-triage calls come first
+                    return
+            self._record("rules", patient_input, int(rule_result["level"]), ai_result,
+                         rule_result.get("red_flags"), tenant_id)
+        except Exception as e:
+            self._count("errors")
+            print(f"[SHADOW] Failed to record AI shadow result: {e}")
+
+    def shadow_rules(self, patient_input: dict, rule_result: dict, ai_result: dict,
+                     tenant_id: Optional[str] = None):
+        """Background task for /ai-triage: the AI was primary; the rule result is already known."""
+        try:
+            self._record("ai", patient_input, int(rule_result["level"]), ai_result,
+                         rule_result.get("red_flags"), tenant_id)
+        except Exception as e:
+            self._count("errors")
+            print(f"[SHADOW] Failed to record rule shadow result: {e}")
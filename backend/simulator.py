@@ -0,0 +1,389 @@
+"""
+SAFE-Triage AI - ED Simulator
+Discrete-event simulation of an emergency department for staffing plans
+and for testing rule changes: patients arrive, are triaged by the real rule
+engine (through evaluate_batch), wait for a bed and a physician in ESI
+priority order, are assessed and then hold the bed for the rest of their
+stay. Reports door-to-physician waits per ESI level against the targets.
+
+Patients are synthetic (a weighted case mix with vitals drawn per case) or
+resampled from a recorded corpus (shadow log JSONL or audit log directory);
+arrival times come from a Poisson process with an hour-of-day profile.
+Replications run in parallel, one process per core.
+
+Usage:
+    python -m backend.simulator --days 30 --arrivals-per-day 350 --beds 50 --physicians 6 --replications 8
+    python -m backend.simulator --corpus shadow_log.jsonl --engine mypkg.rules:CandidateEngine
+    python -m backend.simulator --physicians 4,4,4,4,4,4,4,5,6,7,7,7,7,7,7,7,7,7,7,7,6,6,5,5
+"""
+import argparse
+import heapq
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from .models import Gender, PatientInput, Vitals
+from .replay import DEFAULT_ENGINE, LEVELS, iter_jsonl, load_engine
+
+# Door-to-physician targets (minutes), as the engine's time_to_physician text states them
+TARGET_MINUTES = {1: 0, 2: 15, 3: 60, 4: 120, 5: 240}
+
+# Relative arrival rate by hour of day (ED arrivals peak late morning to evening)
+DIURNAL = [0.55, 0.45, 0.40, 0.35, 0.33, 0.35, 0.45, 0.65, 0.95, 1.25, 1.40, 1.45,
+           1.40, 1.35, 1.30, 1.30, 1.30, 1.35, 1.35, 1.30, 1.20, 1.05, 0.90, 0.70]
+
+# Mean minutes with a physician, then in the bed afterwards (plus per expected resource)
+ASSESS_MINUTES = {1: 60, 2: 30, 3: 20, 4: 12, 5: 8}
+STAY_MINUTES = {1: 240, 2: 180, 3: 120, 4: 45, 5: 20}
+MINUTES_PER_RESOURCE = 25
+SERVICE_CV = 0.5  # Coefficient of variation of the lognormal service times
+
+# ============ CONFIG ============
+
+class EDConfig(BaseModel):
+    days: float = 30
+    warmup_days: float = 1  # Arrivals before this are simulated but not reported
+    arrivals_per_day: float = 350
+    beds: int = Field(50, ge=1)
+    physicians: Union[int, List[int]] = 6  # Constant, or 24 values (physicians on duty per hour)
+    diurnal: List[float] = DIURNAL
+
+    def physician_schedule(self) -> List[int]:
+        if isinstance(self.physicians, int):
+            schedule = [self.physicians] * 24
+        elif len(self.physicians) != 24:
+            raise ValueError("A physician schedule needs one value per hour (24)")
+        else:
+            schedule = list(self.physicians)
+        if min(schedule) < 0:
+            raise ValueError("Physicians on duty cannot be negative")
+        if not any(schedule):
+            raise ValueError("A physician schedule needs at least one physician on duty at some hour")
+        return schedule
+
+
+# ============ PATIENTS ============
+
+# (share, complaint, vitals profile), tuned so the engine yields a typical ESI mix
+# (about 1% level 1, 20% level 2, 43% level 3, 25% level 4, 10% level 5)
+CASE_MIX = [
+    (0.005, "unconscious not responding", "critical"),
+    (0.005, "seizure", "critical"),
+    (0.05, "chest pain radiating to left arm", "unwell"),
+    (0.03, "ألم في الصدر من الصبح", "normal"),
+    (0.03, "ضيق في التنفس", "unwell"),
+    (0.04, "abdominal pain", "normal"),
+    (0.02, "vomiting blood", "unwell"),
+    (0.10, "ألم في البطن", "normal"),
+    (0.05, "مغص شديد في البطن", "normal"),
+    (0.05, "fell and cut my hand, bleeding wound", "normal"),
+    (0.05, "burning urination", "normal"),
+    (0.03, "حرقان في البول", "normal"),
+    (0.04, "nausea", "normal"),
+    (0.04, "wrist pain after fall", "normal"),
+    (0.04, "وقعت ورجلي وارمة", "normal"),
+    (0.05, "ترجيع واسهال", "normal"),
+    (0.05, "fever", "febrile"),
+    (0.07, "سخونية", "febrile"),
+    (0.06, "sore throat and fever", "febrile"),
+    (0.05, "rash", "normal"),
+    (0.05, "cut finger", "normal"),
+    (0.03, "runny nose", "normal"),
+    (0.02, "headache", "normal"),
+    (0.02, "back pain", "normal"),
+    (0.01, "toothache", "normal"),
+    (0.01, "eye redness", "normal"),
+]
+
+GENDERS = (Gender.MALE, Gender.FEMALE)
+
+# Mean and standard deviation per vital sign
+VITALS_PROFILES = {
+    "normal": {"hr": (82, 10), "rr": (16, 2), "spo2": (98, 1), "temp": (36.9, 0.3), "sbp": (125, 14)},
+    "febrile": {"hr": (90, 8), "rr": (18, 2), "spo2": (97, 1), "temp": (38.3, 0.4), "sbp": (122, 12)},
+    "unwell": {"hr": (98, 12), "rr": (20, 3), "spo2": (95, 2), "temp": (37.2, 0.5), "sbp": (128, 18)},
+    "critical": {"hr": (130, 25), "rr": (28, 6), "spo2": (86, 6), "temp": (37.0, 1.0), "sbp": (85, 20)},
+}
+
+
+def synthetic_patients(rng: np.random.Generator, count: int) -> List[PatientInput]:
+    shares = np.array([share for share, _, _ in CASE_MIX])
+    cases = rng.choice(len(CASE_MIX), size=count, p=shares / shares.sum()).tolist()
+    children = rng.random(count) < 0.2
+    ages = np.where(children, rng.uniform(0.5, 16, count), rng.uniform(16, 90, count)).round(1).tolist()
+    # Indices, not rng.choice over the enum: numpy turns str-enum members into plain strings
+    genders = [GENDERS[i] for i in rng.integers(0, 2, count)]
+    draws = {name: rng.standard_normal(count).tolist() for name in ("hr", "rr", "spo2", "temp", "sbp")}
+    patients = []
+    for i in range(count):
+        _, complaint, profile = CASE_MIX[cases[i]]
+        stats = VITALS_PROFILES[profile]
+        vitals = {name: mean + sd * draws[name][i] for name, (mean, sd) in stats.items()}
+        # Values are in range by construction: skip validation, it costs as much as triage itself
+        patients.append(PatientInput.model_construct(
+            age=ages[i], gender=genders[i], chief_complaint_text=complaint,
+            vitals=Vitals.model_construct(
+                hr=round(vitals["hr"]), rr=round(vitals["rr"]), spo2=round(min(vitals["spo2"], 100.0), 1),
+                temp=round(vitals["temp"], 1), sbp=round(vitals["sbp"])),
+        ))
+    return patients
+
+
+def load_corpus(path: str) -> List[PatientInput]:
+    """Patient inputs from a shadow log (JSONL) or an audit log directory; unreadable records are skipped."""
+    if os.path.isdir(path):
+        from .audit_log import AuditReader
+        records = [record["input"] for record in AuditReader(path).iter_records()]
+    else:
+        records = [record.get("input", record) for record in iter_jsonl(path)]
+    patients = []
+    for data in records:
+        try:
+            patients.append(PatientInput(**data))
+        except (ValueError, TypeError):
+            continue
+    return patients
+
+
+def triage(engine, patients: List[PatientInput]) -> Tuple[np.ndarray, np.ndarray]:
+    """ESI level and expected resource count per patient, through the engine's batch path."""
+    results = engine.evaluate_batch(patients)
+    levels = np.fromiter((int(r.level) for r in results), dtype=np.int8, count=len(results))
+    resources = np.fromiter((r.resources.total for r in results), dtype=np.int8, count=len(results))
+    return levels, resources
+
+
+# ============ SIMULATION ============
+
+def arrival_times(rng: np.random.Generator, config: EDConfig) -> np.ndarray:
+    """Sorted arrival minutes from a Poisson process whose rate follows the diurnal profile (thinning)."""
+    profile = np.asarray(config.diurnal, dtype=np.float64)
+    profile = profile / profile.mean()
+    horizon = config.days * 1440
+    peak = config.arrivals_per_day / 1440 * profile.max()
+    candidates = np.sort(rng.uniform(0, horizon, rng.poisson(peak * horizon)))
+    hours = (candidates // 60 % 24).astype(np.intp)
+    return candidates[rng.random(len(candidates)) < profile[hours] / profile.max()]
+
+
+def _lognormal(rng: np.random.Generator, means: np.ndarray) -> np.ndarray:
+    sigma = np.sqrt(np.log1p(SERVICE_CV ** 2))
+    return rng.lognormal(np.log(means) - sigma ** 2 / 2, sigma)
+
+
+def simulate(arrivals: np.ndarray, levels: np.ndarray, resources: np.ndarray, config: EDConfig,
+             rng: np.random.Generator) -> Dict:
+    """
+    Run one replication. Each patient needs a bed and a physician at the same
+    time to be seen; the waiting room is served by ESI level, then arrival.
+    The physician is released after the assessment, the bed at departure.
+    Returns per-patient waits (minutes) plus bed and physician busy time.
+    Patients still waiting when no event is left (no physician on duty in
+    the final hours) are not seen: their wait is censored at the horizon
+    and `seen` is False for them.
+    """
+    count = len(arrivals)
+    assess = _lognormal(rng, np.array([ASSESS_MINUTES[l] for l in LEVELS], dtype=np.float64)[levels - 1])
+    stay_means = np.array([STAY_MINUTES[l] for l in LEVELS], dtype=np.float64)[levels - 1]
+    stay = _lognormal(rng, stay_means + MINUTES_PER_RESOURCE * resources)
+    assess, stay = assess.tolist(), stay.tolist()
+    priority = levels.tolist()
+
+    # Events are (minute, kind, payload); at equal times capacity is freed before arrivals queue
+    departed, assessed, shift, arrived = 0, 1, 2, 3
+    events = [(t, arrived, i) for i, t in enumerate(arrivals.tolist())]
+    schedule = config.physician_schedule()
+    free_physicians = schedule[0]
+    for hour in range(1, int(np.ceil(config.days * 24))):
+        change = schedule[hour % 24] - schedule[(hour - 1) % 24]
+        if change:
+            events.append((hour * 60.0, shift, change))
+    heapq.heapify(events)
+    free_beds = config.beds
+    waiting: List[Tuple[int, float, int]] = []
+    waits = [0.0] * count
+    seen = [False] * count
+    bed_minutes = physician_minutes = 0.0
+    pop, push = heapq.heappop, heapq.heappush
+    now = 0.0
+
+    while events:
+        now, kind, payload = pop(events)
+        if kind == arrived:
+            push(waiting, (priority[payload], now, payload))
+        elif kind == assessed:
+            free_physicians += 1
+        elif kind == departed:
+            free_beds += 1
+        else:
+            free_physicians += payload  # May go negative: leaving physicians finish their patient first
+        while waiting and free_beds > 0 and free_physicians > 0:
+            _, since, i = pop(waiting)
+            free_beds -= 1
+            free_physicians -= 1
+            waits[i] = now - since
+            seen[i] = True
+            done = now + assess[i]
+            push(events, (done, assessed, i))
+            push(events, (done + stay[i], departed, i))
+            physician_minutes += assess[i]
+            bed_minutes += assess[i] + stay[i]
+
+    horizon = config.days * 1440
+    for _, since, i in waiting:
+        waits[i] = max(horizon, now) - since  # A lower bound: never seen within the simulation
+    return {
+        "waits": np.array(waits, dtype=np.float32),
+        "seen": np.array(seen, dtype=bool),
+        "bed_utilization": bed_minutes / (config.beds * horizon),
+        "physician_utilization": physician_minutes / (sum(schedule) / 24 * horizon),
+    }
+
+
+# ============ REPLICATIONS ============
+
+# Per-process engine, built once by the pool initializer
+_ENGINE = None
+
+
+def _init_worker(engine_spec: str):
+    global _ENGINE
+    _ENGINE = load_engine(engine_spec)
+
+
+def _replicate(job) -> Dict:
+    """Worker: one replication. `cases` is None (synthetic) or (levels, resources) of a triaged corpus."""
+    seed, config, cases = job
+    rng = np.random.default_rng(seed)
+    arrivals = arrival_times(rng, config)
+    if cases is None:
+        levels, resources = triage(_ENGINE, synthetic_patients(rng, len(arrivals)))
+    else:
+        picks = rng.integers(0, len(cases[0]), len(arrivals))
+        levels, resources = cases[0][picks], cases[1][picks]
+    run = simulate(arrivals, levels, resources, config, rng)
+    reported = arrivals >= config.warmup_days * 1440
+    run["waits"] = {level: run["waits"][reported & (levels == level)] for level in LEVELS}
+    run["seen"] = {level: run["seen"][reported & (levels == level)] for level in LEVELS}
+    return run
+
+
+def run_replications(config: EDConfig, replications: int = 8, seed: int = 0, engine_spec: str = DEFAULT_ENGINE,
+                     corpus: Optional[Sequence[PatientInput]] = None, workers: Optional[int] = None) -> Dict:
+    """
+    Independent replications (seeds spawned from `seed`, so results do not
+    depend on the worker count). A corpus is triaged once up front and
+    resampled per replication; synthetic patients are triaged per replication.
+    """
+    cases = None
+    if corpus is not None:
+        if not corpus:
+            raise ValueError("The corpus has no readable patients")
+        cases = triage(load_engine(engine_spec), list(corpus))
+    seeds = np.random.SeedSequence(seed).spawn(replications)
+    jobs = [(s, config, cases) for s in seeds]
+    workers = min(workers or os.cpu_count() or 1, replications)
+    if workers <= 1:
+        _init_worker(engine_spec)
+        runs = [_replicate(job) for job in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(engine_spec,)) as pool:
+            runs = list(pool.map(_replicate, jobs))
+    return summarize(runs, config)
+
+
+def summarize(runs: List[Dict], config: EDConfig) -> Dict:
+    """Wait distribution per level pooled over replications, with a 95% interval on the mean wait."""
+    levels = {}
+    for level in LEVELS:
+        per_run = [run["waits"][level] for run in runs]
+        waits = np.concatenate(per_run).astype(np.float64)
+        seen = np.concatenate([run["seen"][level] for run in runs])
+        if not len(waits):
+            levels[level] = {"patients": 0}
+            continue
+        means = np.array([w.mean() for w in per_run if len(w)])
+        half_width = 1.96 * means.std(ddof=1) / np.sqrt(len(means)) if len(means) > 1 else 0.0
+        p50, p90, p95 = np.percentile(waits, [50, 90, 95])
+        levels[level] = {
+            "patients": int(len(waits)),
+            "per_day": round(len(waits) / len(runs) / max(config.days - config.warmup_days, 1e-9), 1),
+            "mean": round(float(waits.mean()), 1),
+            "mean_ci95": round(float(half_width), 1),
+            "p50": round(float(p50), 1),
+            "p90": round(float(p90), 1),
+            "p95": round(float(p95), 1),
+            "max": round(float(waits.max()), 1),
+            "target": TARGET_MINUTES[level],
+            # Unseen patients waited at least their censored wait and never count as within target
+            "within_target": round(float(((waits <= TARGET_MINUTES[level] + 1e-9) & seen).mean()), 4),
+            "unseen": int((~seen).sum()),
+        }
+    return {
+        "replications": len(runs),
+        "config": config.model_dump(exclude={"diurnal"}),
+        "levels": levels,
+        "bed_utilization": round(float(np.mean([r["bed_utilization"] for r in runs])), 3),
+        "physician_utilization": round(float(np.mean([r["physician_utilization"] for r in runs])), 3),
+    }
+
+
+# ============ CLI ============
+
+def format_report(report: Dict) -> str:
+    lines = [f"{'Level':<6}{'Patients':>10}{'/day':>8}{'Mean':>8}{'±95%':>7}{'p50':>8}{'p90':>8}{'p95':>8}"
+             f"{'Max':>8}{'Target':>8}{'Within':>8}"]
+    for level, row in report["levels"].items():
+        if not row["patients"]:
+            lines.append(f"ESI {level:<2}{0:>10}")
+            continue
+        lines.append(f"ESI {level:<2}{row['patients']:>10,}{row['per_day']:>8}{row['mean']:>8}{row['mean_ci95']:>7}"
+                     f"{row['p50']:>8}{row['p90']:>8}{row['p95']:>8}{row['max']:>8}{row['target']:>8}"
+                     f"{row['within_target']:>8.1%}")
+    lines.append(f"Waits in minutes (door to physician), {report['replications']} replications. "
+                 f"Utilization: beds {report['bed_utilization']:.0%}, physicians {report['physician_utilization']:.0%}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate ED arrivals through the triage engine")
+    parser.add_argument("--days", type=float, default=30)
+    parser.add_argument("--warmup-days", type=float, default=1)
+    parser.add_argument("--arrivals-per-day", type=float, default=350)
+    parser.add_argument("--beds", type=int, default=50)
+    parser.add_argument("--physicians", default="6", help="Physicians on duty, or 24 comma-separated hourly values")
+    parser.add_argument("--replications", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus", help="Resample patients from a shadow log (JSONL) or audit log directory")
+    parser.add_argument("--engine", default=DEFAULT_ENGINE, help="Engine to triage with, as module:Class")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument("--json", action="store_true", help="Print the report as JSON")
+    args = parser.parse_args(argv)
+
+    physicians = [int(p) for p in args.physicians.split(",")]
+    config = EDConfig(days=args.days, warmup_days=args.warmup_days, arrivals_per_day=args.arrivals_per_day,
+                      beds=args.beds, physicians=physicians[0] if len(physicians) == 1 else physicians)
+    try:
+        config.physician_schedule()
+    except ValueError as e:
+        parser.error(str(e))
+    corpus = load_corpus(args.corpus) if args.corpus else None
+
+    start = time.perf_counter()
+    report = run_replications(config, args.replications, args.seed, args.engine, corpus, args.workers)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print(format_report(report))
+        print(f"{args.replications} x {args.days:g} days simulated in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
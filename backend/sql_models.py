@@ -22,5 +22,33 @@ class Patient(Base):
     triage_label_ar = Column(String)
     triage_reasoning = Column(JSON) # Store list of strings as JSON
     triage_red_flags = Column(JSON)
+    triage_evidence = Column(JSON)  # Matched complaint spans (models.MatchSpan)
+    triage_resources = Column(JSON)  # Expected resources by type (models.ResourceEstimate)
+    score_history = Column(JSON)  # Early-warning scores per (re)assessment (logic.early_warning)
     
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+# ============ ANALYTICS ROLLUPS ============
+# Maintained incrementally by analytics.record_triage on every triage write
+
+class TriageHourlyRollup(Base):
+    __tablename__ = "triage_hourly_rollups"
+
+    hour = Column(DateTime, primary_key=True)  # UTC, truncated to the hour
+    triage_level = Column(Integer, primary_key=True)
+
+    patient_count = Column(Integer, nullable=False, default=0)
+    red_flag_count = Column(Integer, nullable=False, default=0)
+    ai_count = Column(Integer, nullable=False, default=0)  # Level came from the AI
+    compared_count = Column(Integer, nullable=False, default=0)  # Both AI and rule level known
+    agree_count = Column(Integer, nullable=False, default=0)
+
+
+class ComplaintCategoryRollup(Base):
+    __tablename__ = "complaint_category_rollups"
+
+    hour = Column(DateTime, primary_key=True)
+    category = Column(String, primary_key=True)  # NLPProcessor concept key
+
+    patient_count = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,275 @@
+"""
+SAFE-Triage AI - Multi-Tenant Deployment
+One process serves several hospitals. Each tenant can extend the lexicon,
+override vital-sign thresholds, use its own alert webhook and its own
+patients database. A tenant's compiled lexicon, rule engine and connection
+pool are built on first use and kept in a bounded LRU cache. Cache hits take
+no lock; a build holds only that tenant's build lock. An evicted tenant's
+pools are disposed once the last request using it has finished.
+
+Requests select a tenant with the X-Tenant-ID header; without it the
+default tenant (the original single-hospital setup) is used.
+
+Tenants are configured in a JSON file (TENANTS_CONFIG, default tenants.json):
+    {
+      "cairo-general": {
+        "database_url": "sqlite:///./tenants/cairo-general.db",
+        "webhook_url": "https://example.org/webhook/critical-alert",
+        "concepts": {"chest_pain": ["صدري مقبوض"]},
+        "danger_terms": ["وقع من الدور"],
+        "thresholds": {"danger_hr_high": 110}
+      }
+    }
+"""
+import itertools
+import json
+import os
+import re
+import threading
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Union
+
+from fastapi import Depends, Header, HTTPException
+from pydantic import BaseModel
+from sqlalchemy.orm import Session, sessionmaker
+
+from . import database, migrations
+from .forecast import ResourceDemand
+from .logic.triage_engine import TriageEngine
+from .nlp.processor import NLPProcessor
+from .patient_cache import RecentPatients
+from .similar_cases import SimilarCases
+
+DEFAULT_TENANT = "default"
+DEFAULT_WEBHOOK_URL = os.getenv(
+    "ALERT_WEBHOOK_URL", "https://drahmedzayed.app.n8n.cloud/webhook/critical-alert"
+)
+TENANT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+
+class TenantConfig(BaseModel):
+    database_url: Optional[str] = None  # None: sqlite:///./tenants/<id>.db
+    webhook_url: Optional[str] = None  # None: ALERT_WEBHOOK_URL
+    concepts: Dict[str, List[str]] = {}
+    danger_terms: List[str] = []
+    thresholds: Dict[str, Union[int, float]] = {}  # TriageEngine DEFAULT_THRESHOLDS keys
+
+    def engine_options(self) -> Dict:
+        """TriageEngine keyword arguments for this tenant's lexicon and thresholds."""
+        nlp = None
+        if self.concepts or self.danger_terms:
+            nlp = NLPProcessor(extra_concepts=self.concepts, extra_danger_terms=self.danger_terms)
+        return {"thresholds": self.thresholds, "nlp": nlp}
+
+
+class Tenant:
+    """Everything built once per tenant: rule engine (with compiled lexicon), DB pool, demand window, recent patients, similar-case index."""
+
+    def __init__(self, tenant_id: str, config: TenantConfig, bind=None,
+                 engine: Optional[TriageEngine] = None, async_bind=None):
+        self.id = tenant_id
+        self.config = config
+        self.webhook_url = config.webhook_url or DEFAULT_WEBHOOK_URL
+        if engine is None:
+            engine = TriageEngine(**config.engine_options())
+        self.engine = engine
+        self._owns_bind = bind is None
+        if bind is None:
+            url = config.database_url
+            if url is None:
+                os.makedirs("tenants", exist_ok=True)
+                url = f"sqlite:///./tenants/{tenant_id}.db"
+            bind, async_bind = database.create_bind(url), database.create_async_bind(url)
+        self.bind = bind
+        self.async_bind = async_bind
+        migrations.upgrade(self.bind)
+        self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.bind)
+        # Rolling resource demand for /forecast, rebuilt from the last day's patients
+        self.demand = ResourceDemand.from_env()
+        self.demand.load(self.bind)
+        # Last day's patients for the dashboard reads, kept current by every write
+        self.patients = RecentPatients.from_env(tenant_id)
+        self.patients.load(self.bind)
+        # Complaint vectors for similar-case lookups, loaded on the first lookup
+        self.similar = SimilarCases.from_env()
+        self.AsyncSessionLocal = None
+        if async_bind is not None:
+            from sqlalchemy.ext.asyncio import async_sessionmaker
+            self.AsyncSessionLocal = async_sessionmaker(async_bind, expire_on_commit=False)
+        self.last_used = 0  # TenantRegistry recency tick
+        self._users = 0
+        self._retired = False
+        self._users_lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Hold the tenant until release(); False once it has been retired (look it up again)."""
+        with self._users_lock:
+            if self._retired:
+                return False
+            self._users += 1
+            return True
+
+    def release(self):
+        with self._users_lock:
+            self._users -= 1
+            idle = self._retired and self._users == 0
+        if idle:
+            self.close()
+
+    def retire(self):
+        """Evicted from the cache: close now if unused, else when the last user releases it."""
+        with self._users_lock:
+            self._retired = True
+            idle = self._users == 0
+        if idle:
+            self.close()
+
+    def close(self):
+        if self._owns_bind:
+            self.bind.dispose()
+            if self.async_bind is not None:
+                # Closing async connections needs their event loop; let them be collected
+                self.async_bind.sync_engine.dispose(close=False)
+
+
+class TenantRegistry:
+    """Tenant configs plus a bounded LRU of built tenants."""
+
+    def __init__(self, configs: Optional[Dict[str, TenantConfig]] = None, max_cached: int = 16,
+                 default: Optional[Tenant] = None):
+        self.configs = dict(configs or {})
+        self.max_cached = max_cached
+        self._default = default
+        self._cache: Dict[str, Tenant] = {}
+        self._lock = threading.Lock()  # Guards cache membership and _build_locks
+        self._build_locks: Dict[str, threading.Lock] = {}
+        self._clock = itertools.count(1)  # next() is atomic: recency ticks without a lock
+        self.stats = {"hits": 0, "builds": 0, "evictions": 0}
+
+    @classmethod
+    def from_file(cls, path: str, max_cached: int = 16, default: Optional[Tenant] = None) -> "TenantRegistry":
+        configs = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                raw = json.load(f)
+            for tenant_id, cfg in raw.items():
+                if not TENANT_ID_PATTERN.match(tenant_id):
+                    raise ValueError(f"Invalid tenant id in {path}: '{tenant_id}'")
+                configs[tenant_id] = TenantConfig(**cfg)
+        return cls(configs, max_cached=max_cached, default=default)
+
+    def get(self, tenant_id: Optional[str] = None, acquire: bool = False) -> Tenant:
+        """
+        The tenant, built on first use. With acquire=True it comes back held
+        (Tenant.acquire), so no eviction can dispose it before the caller's
+        release().
+        """
+        tenant_id = tenant_id or DEFAULT_TENANT
+        if tenant_id == DEFAULT_TENANT and self._default is not None and DEFAULT_TENANT not in self.configs:
+            if acquire:
+                self._default.acquire()
+            return self._default
+        if tenant_id not in self.configs:
+            raise KeyError(tenant_id)
+        tenant = self._cache.get(tenant_id)
+        # A hit retired since the lookup is out of the cache already: build it again below
+        if tenant is not None and (not acquire or tenant.acquire()):
+            tenant.last_used = next(self._clock)
+            self.stats["hits"] += 1  # Unlocked: may undercount under contention
+            return tenant
+        with self._lock:
+            build_lock = self._build_locks.setdefault(tenant_id, threading.Lock())
+        # One build per tenant at a time; other tenants' hits and builds go on meanwhile
+        with build_lock:
+            tenant = self._cache.get(tenant_id)
+            if tenant is not None and (not acquire or tenant.acquire()):
+                tenant.last_used = next(self._clock)
+                return tenant
+            tenant = Tenant(tenant_id, self.configs[tenant_id])
+            if acquire:
+                tenant.acquire()  # Held before any other thread can see it, let alone evict it
+            tenant.last_used = next(self._clock)
+            with self._lock:
+                self.stats["builds"] += 1
+                self._cache[tenant_id] = tenant
+                evicted = []
+                while len(self._cache) > self.max_cached:
+                    oldest = min(self._cache, key=lambda key: self._cache[key].last_used)
+                    evicted.append(self._cache.pop(oldest))
+                    self.stats["evictions"] += 1
+        for old in evicted:
+            old.retire()
+        return tenant
+
+    def cached(self) -> List[str]:
+        """Built tenants, least recently used first."""
+        tenants = dict(self._cache)
+        return sorted(tenants, key=lambda key: tenants[key].last_used)
+
+    def built(self) -> Dict[str, Tenant]:
+        """Tenants currently built, the default one included."""
+        tenants = dict(self._cache)
+        if self._default is not None and DEFAULT_TENANT not in tenants:
+            tenants = {DEFAULT_TENANT: self._default, **tenants}
+        return tenants
+
+
+def default_tenant(engine: TriageEngine) -> Tenant:
+    """The single-hospital setup: shared rule engine and the DATABASE_URL pools."""
+    return Tenant(DEFAULT_TENANT, TenantConfig(), bind=database.engine, engine=engine,
+                  async_bind=database.async_engine)
+
+
+registry: Optional[TenantRegistry] = None
+
+
+def init_registry(engine: TriageEngine) -> TenantRegistry:
+    global registry
+    registry = TenantRegistry.from_file(
+        os.getenv("TENANTS_CONFIG", "tenants.json"),
+        max_cached=int(os.getenv("TENANT_CACHE_SIZE", "16")),
+        default=default_tenant(engine),
+    )
+    return registry
+
+
+# ============ FASTAPI DEPENDENCIES ============
+
+def get_tenant(x_tenant_id: Optional[str] = Header(None)) -> Iterator[Tenant]:
+    """The requesting tenant, held for the request so an eviction cannot dispose its pools mid-request."""
+    if x_tenant_id is not None and not TENANT_ID_PATTERN.match(x_tenant_id):
+        raise HTTPException(status_code=400, detail="Invalid X-Tenant-ID")
+    try:
+        tenant = registry.get(x_tenant_id, acquire=True)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown tenant '{x_tenant_id}'")
+    try:
+        yield tenant
+    finally:
+        tenant.release()
+
+
+def get_db(tenant: Tenant = Depends(get_tenant)) -> Iterator[Session]:
+    """Session on the requesting tenant's database."""
+    db = tenant.SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+@asynccontextmanager
+async def read_session(tenant: Tenant) -> AsyncIterator:
+    """
+    Session for read-only async handlers on a tenant's database: an
+    AsyncSession when an async driver is installed, else a ThreadedSession.
+    """
+    if tenant.AsyncSessionLocal is not None:
+        async with tenant.AsyncSessionLocal() as db:
+            yield db
+        return
+    db = database.ThreadedSession(tenant.SessionLocal())
+    try:
+        yield db
+    finally:
+        await db.close()
@@ -0,0 +1,20 @@
+"""
+SAFE-Triage AI - Shared Test Fixtures
+"""
+import importlib
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+
+@pytest.fixture(scope="session")
+def main(tmp_path_factory):
+    """Import the app with the default database and audit log in a temp dir (not ./patients.db)."""
+    from backend import database
+    path = tmp_path_factory.mktemp("default") / "patients.db"
+    bind = database.create_bind(f"sqlite:///{path}")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("AUDIT_LOG_DIR", str(tmp_path_factory.mktemp("audit")))
+        mp.setattr(database, "engine", bind)
+        mp.setattr(database, "SessionLocal", sessionmaker(bind=bind))
+        return importlib.import_module("backend.main")
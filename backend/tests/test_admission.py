@@ -0,0 +1,111 @@
+"""
+SAFE-Triage AI - Admission Control Tests
+Token buckets, load shedding, and /ai-triage degrading to the rule result
+while /triage is never limited.
+"""
+import pytest
+
+from backend.admission import AdmissionController, Rejected, TokenBucket
+
+PATIENT = {"age": 60, "gender": "male", "chief_complaint_text": "chest pain", "vitals": {"hr": 125}}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def _reason(controller, client):
+    try:
+        controller.admit(client)
+    except Rejected as e:
+        return e.reason
+    controller.release(0.1)
+    return None
+
+
+def test_token_bucket_refills_at_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2, burst=3, clock=clock)
+    assert [bucket.try_acquire() for _ in range(4)] == [True, True, True, False]
+    assert bucket.retry_after() == pytest.approx(0.5)
+    clock.now += 0.5
+    assert bucket.try_acquire() and not bucket.try_acquire()
+    clock.now += 60
+    assert sum(bucket.try_acquire() for _ in range(10)) == 3  # never more than the burst
+
+
+def test_per_client_and_global_limits():
+    clock = FakeClock()
+    controller = AdmissionController("t", client_rate=1, client_burst=2, global_rate=1, global_burst=3, clock=clock)
+    assert [_reason(controller, "a") for _ in range(3)] == [None, None, "client_rate"]
+    assert [_reason(controller, "b") for _ in range(2)] == [None, "global_rate"]
+    # The global refusal did not cost client b its token
+    clock.now += 1
+    assert _reason(controller, "b") is None
+    assert controller.stats["rejected_client_rate"] == 1 and controller.stats["rejected_global_rate"] == 1
+
+
+def test_sheds_on_queue_depth_and_latency_then_recovers():
+    clock = FakeClock()
+    controller = AdmissionController("t", client_rate=100, client_burst=100, global_rate=100,
+                                     global_burst=100, max_in_flight=2, max_latency=5, latency_window=30,
+                                     clock=clock)
+    controller.admit("a")
+    controller.admit("b")
+    assert _reason(controller, "c") == "queue_full"
+    clock.now += 9
+    controller.release(9)
+    controller.release(9)
+    assert _reason(controller, "c") == "slow"
+    clock.now += 31  # Slow samples age out of the window
+    assert _reason(controller, "c") is None
+    assert controller.snapshot()["in_flight"] == 0
+
+
+@pytest.fixture
+def client(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main.requests, "post", lambda url, json, timeout: type("R", (), {"status_code": 200})())
+    return TestClient(main.app), main
+
+
+def test_ai_triage_degrades_to_rules_when_over_capacity(client, monkeypatch):
+    client, main = client
+    monkeypatch.setattr(main, "ai_admission", AdmissionController("ai-triage", max_in_flight=0))
+    monkeypatch.setattr(main.ai_service, "analyze_triage", lambda patient, **kwargs: pytest.fail("Gemini called"))
+
+    response = client.post("/ai-triage", json=PATIENT)
+    assert response.status_code == 200
+    assert response.headers["X-Triage-Degraded"] == "queue_full"
+    body = response.json()
+    assert body["level"] == client.post("/triage", json=PATIENT).json()["level"] == 2
+    assert body["ai_data"] is None and "Fallback to Standard Protocol" in body["reasoning"]
+
+
+def test_ai_triage_uses_gemini_within_limits(client, monkeypatch):
+    client, main = client
+    monkeypatch.setattr(main, "ai_admission", AdmissionController("ai-triage"))
+    monkeypatch.setattr(main.ai_service, "analyze_triage",
+                        lambda patient, **kwargs: {"triage_level": 1, "reasoning": "STEMI pattern", "red_flags": []})
+    response = client.post("/ai-triage", json=PATIENT)
+    assert response.json()["level"] == 1 and "X-Triage-Degraded" not in response.headers
+    assert main.ai_admission.snapshot()["admitted"] == 1
+
+
+def test_transcribe_is_refused_with_retry_after(client, monkeypatch):
+    client, main = client
+    monkeypatch.setattr(main, "transcribe_admission",
+                        AdmissionController("transcribe", client_rate=0.1, client_burst=1))
+    monkeypatch.setattr(main.medasr_service, "transcribe",
+                        lambda path, mime_type, content_hash=None: {"success": True, "transcription": "chest pain"})
+    audio = {"audio": ("a.wav", b"RIFF....", "audio/wav")}
+    assert client.post("/transcribe", files=audio).json()["transcription"] == "chest pain"
+    refused = client.post("/transcribe", files=audio)
+    assert refused.status_code == 429 and int(refused.headers["Retry-After"]) >= 1
+    # The deterministic path is never limited
+    assert all(client.post("/triage", json=PATIENT).status_code == 200 for _ in range(5))
@@ -0,0 +1,113 @@
+"""
+SAFE-Triage AI - Analytics Rollup Tests
+Incremental rollups must match a full backfill over the same patients.
+"""
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend import analytics, crud
+from backend.database import Base
+from backend.logic.triage_engine import TriageEngine
+from backend.models import PatientInput, Vitals
+
+engine = TriageEngine()
+
+PATIENTS = [
+    ("chest pain radiating to arm", {"hr": 90}),
+    ("صدري بيوجعني جامد", {}),
+    ("stomach pain and fever", {"temp": 38.5}),
+    ("cut on hand, needs stitches", {}),
+    ("unconscious, found on floor", {}),
+    ("runny nose for 3 days", {}),
+]
+
+
+@pytest.fixture
+def db(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path / 'analytics.db'}")
+    Base.metadata.create_all(bind)
+    session = sessionmaker(bind=bind)()
+    yield session
+    session.close()
+
+
+def _triage_all(db, ai_levels=None):
+    for i, (complaint, vitals) in enumerate(PATIENTS):
+        patient = PatientInput(age=40, gender="male", chief_complaint_text=complaint, vitals=Vitals(**vitals))
+        result = engine.evaluate(patient)
+        crud.create_patient_record(
+            db, patient, result.model_dump(),
+            categories=engine.nlp.extract_symptoms(complaint),
+            rule_level=int(result.level),
+            ai_level=ai_levels[i] if ai_levels else None,
+        )
+
+
+def test_incremental_rollups(db):
+    _triage_all(db, ai_levels=[2, 2, 4, 4, 1, 5])
+    summary = analytics.dashboard(db, hours=24)
+
+    assert summary["total_patients"] == 6
+    assert summary["by_level"] == {"1": 1, "2": 2, "3": 1, "4": 1, "5": 1}
+    assert summary["ai_rule_agreement"] == {"compared": 6, "agree": 5, "rate": round(5 / 6, 4)}
+    assert summary["red_flag_rate"] == round(1 / 6, 4)
+    top = {c["category"]: c["count"] for c in summary["top_complaint_categories"]}
+    assert top["chest_pain"] == 2
+
+
+def test_backfill_matches_incremental(db):
+    _triage_all(db)
+    incremental = analytics.dashboard(db, hours=24)
+
+    analytics.backfill(db.get_bind())
+    db.expire_all()
+    rebuilt = analytics.dashboard(db, hours=24)
+
+    for key in ("total_patients", "by_level", "red_flag_rate", "top_complaint_categories"):
+        assert rebuilt[key] == incremental[key]
+
+
+def test_rebuild_keeps_triages_committed_during_the_scan(db):
+    _triage_all(db)
+    analytics.record_triage(db, 3, [], ["abdominal"], at=datetime.now(timezone.utc) - timedelta(hours=2))
+    db.commit()  # A rollup hour without patients: dropped by the rebuild
+    bind = db.get_bind()
+    writer = threading.Thread(target=lambda: _triage_all(sessionmaker(bind=bind)()))
+
+    class ScanningNLP:
+        def extract_symptoms(self, text):
+            if writer.ident is None:
+                writer.start()  # Live triage while backfill is mid-scan
+                time.sleep(0.3)
+            return engine.nlp.extract_symptoms(text)
+
+    analytics.backfill(bind, nlp=ScanningNLP())
+    writer.join(10)
+    db.expire_all()
+    summary = analytics.dashboard(db, hours=24)
+    assert summary["total_patients"] == 2 * len(PATIENTS)
+    assert summary["by_level"] == {"1": 2, "2": 4, "3": 2, "4": 2, "5": 2}
+    assert all(set(hour["by_level"].values()) != {0} for hour in summary["hourly"])
+
+
+def test_window_excludes_old_hours(db):
+    analytics.record_triage(db, 3, [], ["abdominal"], at=datetime.now(timezone.utc) - timedelta(hours=30))
+    analytics.record_triage(db, 3, [], ["abdominal"])
+    db.commit()
+
+    assert analytics.dashboard(db, hours=24)["total_patients"] == 1
+    assert analytics.dashboard(db, hours=48)["total_patients"] == 2
+
+
+def test_dashboard_parameters_are_bounded(main):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(main.app)
+    assert client.get("/analytics", params={"top": 50}).status_code == 200
+    for params in ({"top": 0}, {"top": 51}, {"hours": 0}):
+        assert client.get("/analytics", params=params).status_code == 400
@@ -0,0 +1,44 @@
+"""
+SAFE-Triage AI - Franco-Arabic (Arabizi) Transliteration Tests
+"""
+import json
+import os
+
+import pytest
+
+from backend.nlp.arabizi import ArabiziTransliterator, transliterate_word
+from backend.nlp.processor import NLPProcessor
+
+CORPUS = os.path.join(os.path.dirname(__file__), "data", "arabizi_corpus.jsonl")
+
+nlp = NLPProcessor()
+
+
+def _corpus():
+    with open(CORPUS, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+@pytest.mark.parametrize("case", _corpus(), ids=lambda c: c["text"])
+def test_corpus(case):
+    assert nlp.extract_symptoms(case["text"]) == case["symptoms"]
+    assert nlp.detect_danger_keywords(case["text"]) == case["danger"]
+
+
+def test_english_takes_the_fast_path():
+    translit = ArabiziTransliterator(["chest"])
+    for text in ["chest pain since 3days", "45 yo male, b12 deficiency", "fell 2 days ago"]:
+        assert translit.transliterate(text) is None
+
+
+def test_word_rules():
+    assert transliterate_word("sa5na") == "سخنة"  # final -a -> ة
+    assert transliterate_word("shabab") == "شبب"  # digraph, medial short vowels dropped
+    assert transliterate_word("3ayez") == "عيز"
+
+
+def test_spans_map_back_to_the_original_text():
+    text = "ana 3andi da2 fe sedri"
+    [match] = nlp.match(text)
+    assert text[match.start:match.end] == "da2 fe sedri"
+    assert match.term == "دق في صدري"
@@ -0,0 +1,130 @@
+"""
+SAFE-Triage AI - Audio Preprocessing Tests
+Resampling, silence trimming and the /transcribe upload path, on synthetic
+WAV recordings.
+"""
+import wave
+
+import numpy as np
+import pytest
+
+from backend import audio
+
+RATE = 48_000
+
+
+def _tone(seconds, freq=440.0, level=0.3, rate=RATE):
+    t = np.arange(int(seconds * rate)) / rate
+    return (level * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def _noise(seconds, level=0.001, rate=RATE, seed=0):
+    return (level * np.random.default_rng(seed).standard_normal(int(seconds * rate))).astype(np.float32)
+
+
+def write_wav(path, samples, rate=RATE, channels=2):
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.repeat(pcm, channels).tobytes())
+    return str(path)
+
+
+def _resample(samples, chunk, src=RATE):
+    resampler = audio.StreamingResampler(src)
+    return np.concatenate([resampler.process(samples[i:i + chunk]) for i in range(0, len(samples), chunk)])
+
+
+def _level_db(samples):
+    return 10 * np.log10(np.mean(samples[200:-200].astype(np.float64) ** 2) + 1e-12)
+
+
+def test_resampler_keeps_speech_band_and_removes_aliases():
+    out = _resample(_tone(1.0, 1000), 4800)
+    assert abs(len(out) - 16_000) <= 1
+    spectrum = np.abs(np.fft.rfft(out))
+    assert np.argmax(spectrum) * 16_000 / len(out) == pytest.approx(1000, abs=2)
+    assert _level_db(out) == pytest.approx(_level_db(_tone(1.0, 1000)), abs=0.5)
+    # 12 kHz cannot be represented at 16 kHz: filtered out instead of folding to 4 kHz
+    assert _level_db(_resample(_tone(1.0, 12_000), 4800)) < _level_db(_tone(1.0, 12_000)) - 40
+
+
+def test_resampler_output_does_not_depend_on_chunking():
+    samples = _tone(0.5, 700) + _noise(0.5, 0.05)
+    whole = _resample(samples, len(samples), src=44_100)
+    for chunk in (441, 1000, 7919):
+        np.testing.assert_allclose(_resample(samples, chunk, src=44_100), whole, atol=1e-5)
+
+
+def test_vad_trims_leading_trailing_and_long_silences():
+    rate = audio.TARGET_RATE
+    recording = np.concatenate([_noise(2, rate=rate), _tone(1, rate=rate), _noise(3, rate=rate, seed=1),
+                                _tone(0.5, rate=rate), _noise(2, rate=rate, seed=2)])
+    trimmer = audio.VoiceActivityTrimmer(rate)
+    kept = np.concatenate([trimmer.process(recording[i:i + rate]) for i in range(0, len(recording), rate)]
+                          + [trimmer.flush()])
+    pad = audio.PAD_MS / 1000
+    assert len(kept) / rate == pytest.approx(1.5 + 4 * pad, abs=0.1)
+
+
+def test_vad_keeps_speech_from_the_first_sample():
+    rate = audio.TARGET_RATE
+    recording = np.concatenate([_tone(2, rate=rate), _noise(2, rate=rate), _tone(1, 600, rate=rate)])
+    trimmer = audio.VoiceActivityTrimmer(rate)
+    kept = np.concatenate([trimmer.process(recording[i:i + rate]) for i in range(0, len(recording), rate)]
+                          + [trimmer.flush()])
+    np.testing.assert_array_equal(kept[:2 * rate], recording[:2 * rate])
+    assert len(kept) / rate == pytest.approx(3 + 2 * audio.PAD_MS / 1000, abs=0.1)
+
+
+def test_preprocess_wav(tmp_path):
+    samples = np.concatenate([_noise(3), _tone(2, 300) + _tone(2, 1200, 0.1), _noise(3, seed=1)])
+    source = write_wav(tmp_path / "in.wav", samples)
+    result = audio.preprocess(source, codec="wav", out_dir=str(tmp_path))
+
+    assert result.mime_type == "audio/wav" and result.trimmed
+    assert result.input_seconds == pytest.approx(8.0)
+    assert result.output_seconds == pytest.approx(2.0 + 2 * audio.PAD_MS / 1000, abs=0.1)
+    # Stereo 48 kHz -> mono 16 kHz is 6x smaller before trimming
+    assert result.output_bytes < result.input_bytes / 6 * (result.output_seconds / result.input_seconds) + 1000
+    with wave.open(result.path) as w:
+        assert (w.getnchannels(), w.getframerate(), w.getsampwidth()) == (1, 16_000, 2)
+
+
+def test_silent_recording_is_kept_whole(tmp_path):
+    source = write_wav(tmp_path / "silence.wav", _noise(2), channels=1)
+    result = audio.preprocess(source, codec="wav", out_dir=str(tmp_path))
+    assert not result.trimmed and result.output_seconds == pytest.approx(2.0, abs=0.01)
+
+
+def test_browser_webm_without_ffmpeg_is_sent_as_is(tmp_path, monkeypatch):
+    monkeypatch.setattr(audio, "ffmpeg_available", lambda: False)
+    source = tmp_path / "recording.webm"
+    source.write_bytes(b"\x1aE\xdf\xa3" + bytes(64))
+    assert audio.sniff_mime(str(source)) == "audio/webm"
+    assert audio.preprocess(str(source)) is None
+
+
+def test_transcribe_uploads_preprocessed_audio(main, tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    uploads = []
+
+    def fake_transcribe(path, mime_type, content_hash=None):
+        with wave.open(path) as w:
+            uploads.append((mime_type, w.getframerate(), w.getnchannels()))
+        return {"success": True, "transcription": "chest pain"}
+
+    monkeypatch.setattr(main.medasr_service, "transcribe", fake_transcribe)
+    monkeypatch.setattr(audio, "CODEC", "wav")
+    source = write_wav(tmp_path / "in.wav", np.concatenate([_noise(2), _tone(1), _noise(2, seed=1)]))
+    with open(source, "rb") as f:
+        body = TestClient(main.app).post("/transcribe", files={"audio": ("in.wav", f, "audio/wav")}).json()
+
+    assert body["transcription"] == "chest pain" and uploads == [("audio/wav", 16_000, 1)]
+    assert body["audio"]["bytes_saved"] > 0.9 * body["audio"]["input_bytes"]
+    metrics = main.audio_pipeline.stats.snapshot()
+    assert metrics["bytes_saved"] >= body["audio"]["bytes_saved"]
+    assert metrics["transcription_latency"]["preprocessed"]["count"] >= 1
@@ -0,0 +1,174 @@
+"""
+SAFE-Triage AI - Audit Log Tests
+Round trips through live and compressed segments, the patient index,
+crash tolerance, append latency and the /triage integration.
+"""
+import os
+import statistics
+import struct
+import threading
+import time
+
+import pytest
+
+from backend import audit_log
+from backend.audit_log import AuditCorruption, AuditLog, AuditReader
+
+
+def _decision(i, patient_id=None):
+    return {"patient_id": patient_id, "tenant": "default", "endpoint": "triage",
+            "input": {"chief_complaint_text": f"chest pain {i}", "age": 40 + i % 40},
+            "result": {"level": 1 + i % 5, "reasoning": ["ألم في الصدر"]}}
+
+
+def _segments(directory):
+    return sorted(n for n in os.listdir(directory) if n.startswith("segment-"))
+
+
+def test_round_trip_keeps_order_and_content(tmp_path):
+    log = AuditLog(str(tmp_path), fsync_interval=0.05)
+    for i in range(100):
+        log.append(_decision(i, patient_id=i))
+    assert log.flush()
+    records = list(AuditReader(str(tmp_path)).iter_records())
+    assert [r["seq"] for r in records] == list(range(1, 101))
+    assert records[7]["input"]["chief_complaint_text"] == "chest pain 7"
+    assert records[7]["result"]["reasoning"] == ["ألم في الصدر"]
+    log.close()
+
+
+def test_rotated_segments_are_compressed_and_still_readable(tmp_path):
+    log = AuditLog(str(tmp_path), segment_bytes=4096, fsync_interval=0.05)
+    for i in range(300):
+        log.append(_decision(i, patient_id=i % 7))
+    log.close()
+
+    names = _segments(tmp_path)
+    assert len(names) > 3 and all(n.endswith(".gz") for n in names)
+    reader = AuditReader(str(tmp_path))
+    assert [r["seq"] for r in reader.iter_records()] == list(range(1, 301))
+    history = reader.for_patient(3)
+    assert [r["seq"] for r in history] == [i + 1 for i in range(300) if i % 7 == 3]
+
+
+def test_restart_continues_sequence_in_a_new_segment(tmp_path):
+    log = AuditLog(str(tmp_path), compress=False)
+    log.append(_decision(0, patient_id=1))
+    log.close()
+    log = AuditLog(str(tmp_path), compress=False)
+    log.append(_decision(1, patient_id=1))
+    log.close()
+
+    assert _segments(tmp_path) == ["segment-00000001.log", "segment-00000002.log"]
+    assert [r["seq"] for r in AuditReader(str(tmp_path)).for_patient(1)] == [1, 2]
+
+
+def test_time_range_and_patient_lookup(tmp_path):
+    log = AuditLog(str(tmp_path), compress=False)
+    for i in range(10):
+        log.append(dict(_decision(i, patient_id=i % 2), ts=1000.0 + i))
+    log.close()
+    reader = AuditReader(str(tmp_path))
+    assert [r["ts"] for r in reader.iter_records(since=1003, until=1006)] == [1003, 1004, 1005]
+    assert [r["ts"] for r in reader.for_patient(1)] == [1001, 1003, 1005, 1007, 1009]
+    assert reader.for_patient(1, tenant="other") == []
+
+
+def test_torn_tail_is_skipped_but_corruption_is_reported(tmp_path):
+    log = AuditLog(str(tmp_path), compress=False)
+    for i in range(5):
+        log.append(_decision(i))
+    log.close()
+    path = tmp_path / "segment-00000001.log"
+    data = path.read_bytes()
+
+    path.write_bytes(data[:-3])  # Crash in the middle of the last record
+    assert len(list(AuditReader(str(tmp_path)).iter_records())) == 4
+
+    corrupt = bytearray(data)
+    length = struct.unpack_from("<I", corrupt, len(audit_log.MAGIC))[0]
+    corrupt[len(audit_log.MAGIC) + audit_log.RECORD_HEADER.size + length // 2] ^= 0xFF
+    path.write_bytes(bytes(corrupt))
+    with pytest.raises(AuditCorruption):
+        list(AuditReader(str(tmp_path)).iter_records())
+
+
+def test_append_does_not_wait_for_disk(tmp_path):
+    log = AuditLog(str(tmp_path), fsync_interval=0.05)
+    latencies = []
+    for i in range(2000):
+        start = time.perf_counter()
+        log.append(_decision(i))
+        latencies.append(time.perf_counter() - start)
+    log.close()
+    assert statistics.median(latencies) < 1e-3
+    assert log.snapshot()["written"] == 2000
+
+
+def test_triage_decisions_are_audited(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "send_critical_alert", lambda *args: None)
+    patient = {"age": 60, "gender": "male", "chief_complaint_text": "ألم في الصدر", "vitals": {"hr": 130}}
+    body = TestClient(main.app).post("/triage", json=patient).json()
+    assert main.audit_log.flush()
+
+    last = list(AuditReader(main.audit_log.directory).iter_records())[-1]
+    assert last["endpoint"] == "triage" and last["result"]["level"] == body["level"]
+    assert last["input"]["chief_complaint_text"] == "ألم في الصدر"
+    assert last["rules_version"] == main.TriageEngine.RULES_VERSION and last["lexicon_version"]
+    assert AuditReader(main.audit_log.directory).for_patient(last["patient_id"])[-1]["seq"] == last["seq"]
+
+
+class _FullDisk:
+    """Segment file whose writes fail with ENOSPC."""
+    def __init__(self, file):
+        self._file = file
+
+    def write(self, data):
+        raise OSError(28, "No space left on device")
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+
+def test_write_failures_are_counted_and_the_writer_keeps_going(tmp_path, monkeypatch):
+    log = AuditLog(str(tmp_path), fsync_interval=0.05, compress=False)
+    log.append(_decision(0, patient_id=1))
+    assert log.flush()
+
+    # A failed write: reported, retried on a fresh segment
+    log._file = _FullDisk(log._file)
+    log.append(_decision(1, patient_id=2))
+    assert log.flush()
+    assert log.stats["errors"] == 1 and "No space left" in log.last_error and log._thread.is_alive()
+    assert len(_segments(tmp_path)) == 2
+
+    # A failed fsync: the segment's unsynced records leave the index, the log reports degraded until the next fsync
+    real_fsync = os.fsync
+    monkeypatch.setattr(audit_log.os, "fsync", lambda fd: (_ for _ in ()).throw(OSError(5, "I/O error")))
+    log.append(_decision(2, patient_id=3))
+    assert log.flush()
+    assert log.stats["lost"] == 1 and not log.health()["ok"] and log._thread.is_alive()
+    monkeypatch.setattr(audit_log.os, "fsync", real_fsync)
+    log.append(_decision(3, patient_id=4))
+    assert log.flush() and log.health()["ok"]
+    log.close()
+    seqs = [r["seq"] for r in AuditReader(str(tmp_path)).iter_records()]
+    assert 1 in seqs and 2 in seqs and 4 in seqs
+
+
+def test_full_queue_falls_back_to_stderr_instead_of_blocking(tmp_path, monkeypatch, capsys):
+    release = threading.Event()
+    real_write = AuditLog._write
+    monkeypatch.setattr(AuditLog, "_write", lambda self, *args: release.wait() and real_write(self, *args))
+    log = AuditLog(str(tmp_path), fsync_interval=0.05, queue_size=2, queue_timeout=0.05, compress=False)
+    start = time.perf_counter()
+    for i in range(6):
+        log.append(_decision(i, patient_id=i))
+    assert time.perf_counter() - start < 2
+    assert log.stats["stderr_fallbacks"] >= 1 and not log.health()["ok"]
+    assert log.stats["appended"] + log.stats["stderr_fallbacks"] == 6
+    assert capsys.readouterr().err.count('{"audit":') == log.stats["stderr_fallbacks"]
+    release.set()
+    log.close()
@@ -0,0 +1,144 @@
+"""
+SAFE-Triage AI - Binary Triage Tests
+Binary records decode to the same patients and triage to the same results
+as JSON /triage, every engine reason string has a code, and malformed
+bodies are rejected.
+"""
+import math
+
+import pytest
+
+from backend import binary_triage
+from backend.logic.triage_engine import TriageEngine
+from backend.models import PatientInput
+from backend.scenarios import SCENARIOS, random_patients
+
+msgpack = pytest.importorskip("msgpack")
+
+
+def test_records_match_pydantic_and_every_reason_has_a_code():
+    engine = TriageEngine()
+    patients = [data for _, data, _ in SCENARIOS] + random_patients(400)
+    decoded = binary_triage.decode_patients(binary_triage.encode_patients(patients[:256])) + \
+        binary_triage.decode_patients(binary_triage.encode_patients(patients[256:]))
+    for data, compact in zip(patients, decoded):
+        assert compact == PatientInput(**data)
+    results = engine.evaluate_batch(decoded)
+
+    codes = set()
+    for result in results:
+        for text in result.reasoning + result.red_flags:
+            assert binary_triage.reason_code(text) != 0, text
+            codes.add(binary_triage.reason_code(text))
+    assert len(codes) >= 18
+
+    body = binary_triage.encode_results(results, list(range(1, len(results) + 1)))
+    for i, (result, row) in enumerate(zip(results, binary_triage.decode_results(body))):
+        assert row["patient_id"] == i + 1 and row["level"] == int(result.level)
+        assert row["resources"] == result.resources.model_dump()
+        assert row["scores"] == {"news2": result.scores.news2, "qsofa": result.scores.qsofa, "pews": result.scores.pews}
+        assert row["reasons"] == [binary_triage.reason_code(text) for text in result.reasoning]
+
+
+def _body(*records):
+    return msgpack.packb(list(records))
+
+
+PATIENT = [30, 0, 0, [None] * 8, "صداع"]
+
+
+@pytest.mark.parametrize("body, message", [
+    (b"\xc1", "not valid msgpack"),
+    (_body(PATIENT)[:-2], "not valid msgpack"),
+    (_body(PATIENT) + b"\x00", "trailing"),
+    (msgpack.packb({"age": 30}), "array of records"),
+    (_body(), "record count"),
+    (_body(*[PATIENT] * 257), "record count"),
+    (_body(PATIENT[:4]), "expected \\[age"),
+    (_body([30, 2, 0, [None] * 8, "x"]), "invalid gender"),
+    (_body([30, 0, 8, [None] * 8, "x"]), "history flags"),
+    (_body([30, 0, 0, [None] * 7, "x"]), "expected 8 vitals"),
+    (_body([30, 0, 0, [None] * 8, b"x"]), "complaint must be a string"),
+    (binary_triage.encode_patients([{"age": 30, "gender": "male", "chief_complaint_text": "x", "vitals": {"gcs": 2}}]),
+     "gcs must be between"),
+    (binary_triage.encode_patients([{"age": 30, "gender": "male", "chief_complaint_text": "x", "vitals": {"hr": 80.5}}]),
+     "hr must be a whole number"),
+    (_body([30, 0, 0, ["80"] + [None] * 7, "x"]), "hr must be a finite number"),
+    (_body([math.nan, 0, 0, [None] * 8, "x"]), "invalid age"),
+])
+def test_malformed_bodies(body, message):
+    with pytest.raises(binary_triage.BinaryFormatError, match=message):
+        binary_triage.decode_patients(body)
+
+
+def test_binary_endpoint(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    alerts = []
+    monkeypatch.setattr(main, "send_critical_alert", lambda patient, level, url: alerts.append((patient["age"], level)))
+    client = TestClient(main.app)
+    patients = [
+        {"age": 62, "gender": "male", "chief_complaint_text": "ألم في الصدر وعرق", "vitals": {"hr": 118, "spo2": 93}},
+        {"age": 4, "gender": "female", "chief_complaint_text": "سخونية", "vitals": {"temp": 38.2}},
+    ]
+    headers = {"Content-Type": binary_triage.BINARY_MEDIA_TYPE}
+    response = client.post("/triage/binary", content=binary_triage.encode_patients(patients), headers=headers)
+    assert response.status_code == 200 and response.headers["content-type"] == binary_triage.BINARY_MEDIA_TYPE
+    rows = binary_triage.decode_results(response.content)
+
+    for patient, row in zip(patients, rows):
+        expected = client.post("/triage", json=patient).json()
+        assert row["level"] == expected["level"] and row["resources"] == expected["resources"]
+        assert row["reasons"] == [binary_triage.reason_code(text) for text in expected["reasoning"]]
+        assert client.get(f"/patients/{row['patient_id']}").json()["chief_complaint"] == patient["chief_complaint_text"]
+    assert alerts[0] == (62, rows[0]["level"]) and len(alerts) == 4
+
+    codes = client.get("/triage/binary/codes").json()
+    assert codes["reasons"]["20"]["label_en"] == "High-risk symptoms" and codes["vitals"][0] == "hr"
+    assert client.post("/triage/binary", content=b"\xc1", headers=headers).status_code == 400
+    assert client.post("/triage/binary", json=patients[0]).status_code == 415
+    monkeypatch.setattr(binary_triage, "msgpack", None)
+    assert client.post("/triage/binary", content=b"\x91", headers=headers).status_code == 501
+
+
+def test_alerts_are_sent_after_the_response(main, monkeypatch):
+    import asyncio
+
+    from fastapi import BackgroundTasks
+
+    alerts = []
+    monkeypatch.setattr(main, "send_critical_alert", lambda patient, level, url: alerts.append(level))
+    tasks, tenant = BackgroundTasks(), main.tenants.registry.get()
+    patients = binary_triage.decode_patients(binary_triage.encode_patients(random_patients(3, seed=1)))
+    with tenant.SessionLocal() as db:
+        main.triage_records(patients, tasks, tenant, db)
+    assert alerts == []  # Queued: a slow webhook no longer holds up the batch
+    asyncio.run(tasks())
+    assert len(alerts) == 3
+
+
+def test_batch_is_stored_in_one_transaction(main, monkeypatch):
+    from fastapi.testclient import TestClient
+    from sqlalchemy import event
+
+    monkeypatch.setattr(main, "send_critical_alert", lambda *args: None)
+    client = TestClient(main.app)
+    tenant = main.tenants.registry.get()
+    before = client.get("/analytics").json()["total_patients"]
+    commits = []
+
+    def on_commit(conn):
+        commits.append(conn)
+
+    event.listen(tenant.bind, "commit", on_commit)
+    try:
+        body = binary_triage.encode_patients(random_patients(20, seed=3))
+        response = client.post("/triage/binary", content=body,
+                               headers={"Content-Type": binary_triage.BINARY_MEDIA_TYPE})
+    finally:
+        event.remove(tenant.bind, "commit", on_commit)
+    rows = binary_triage.decode_results(response.content)
+    assert len(commits) == 1
+    assert client.get("/analytics").json()["total_patients"] == before + 20
+    ids = [row["patient_id"] for row in rows]
+    assert ids == sorted(ids) and [p["id"] for p in client.get("/patients", params={"limit": 20}).json()] == ids[::-1]
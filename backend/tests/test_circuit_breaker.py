@@ -0,0 +1,193 @@
+"""
+SAFE-Triage AI - Circuit Breaker Tests
+Breaker state machine, plus Gemini and the alert webhook against a local fake
+server that can be switched between healthy, slow and failing.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from backend.ai_service import AIService
+from backend.circuit_breaker import CircuitBreaker, CircuitBreakers, CircuitOpenError
+
+PATIENT = {"age": 60, "gender": "male", "chief_complaint_text": "chest pain", "vitals": {"hr": 125}}
+
+
+class FakeServer:
+    """HTTP server on localhost; `mode` is "healthy", "slow" or "failing"."""
+
+    def __init__(self, slow_seconds: float = 1.0):
+        self.mode = "healthy"
+        self.slow_seconds = slow_seconds
+        self.hits = 0
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                server.hits += 1
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if server.mode == "slow":
+                    time.sleep(server.slow_seconds)
+                status = 500 if server.mode == "failing" else 200
+                body = json.dumps({"triage_level": 1, "reasoning": "STEMI pattern", "red_flags": []}).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except OSError:
+                    pass  # Client already timed out
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}/hook"
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+class FakeGeminiModel:
+    """generate_content over HTTP to the fake server, honouring the request timeout."""
+
+    def __init__(self, url):
+        self.url = url
+
+    def generate_content(self, prompt, request_options=None):
+        response = requests.post(self.url, data=prompt.encode(), timeout=request_options["timeout"])
+        response.raise_for_status()
+        return type("R", (), {"text": response.text})()
+
+
+@pytest.fixture
+def server():
+    server = FakeServer()
+    yield server
+    server.close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_state_machine():
+    clock = FakeClock()
+    breaker = CircuitBreaker("dep", failure_threshold=2, reset_timeout=10, clock=clock)
+
+    def fail():
+        raise ConnectionError("down")
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(fail)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "never called")
+
+    clock.now += 10
+    assert breaker.state == "half_open"
+    with pytest.raises(ConnectionError):
+        breaker.call(fail)  # Failed probe reopens at once
+    assert breaker.state == "open" and breaker.snapshot()["retry_in"] == 10
+
+    clock.now += 10
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+    snapshot = breaker.snapshot()
+    assert (snapshot["opened"], snapshot["rejected"], snapshot["consecutive_failures"]) == (2, 1, 0)
+
+
+def test_half_open_allows_one_probe_at_a_time():
+    clock = FakeClock()
+    breaker = CircuitBreaker("dep", failure_threshold=1, reset_timeout=1, clock=clock)
+    breaker.record_failure()
+    clock.now += 1
+    entered, release = threading.Event(), threading.Event()
+
+    def probe():
+        entered.set()
+        release.wait(5)
+
+    thread = threading.Thread(target=breaker.call, args=(probe,))
+    thread.start()
+    entered.wait(5)
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: None)
+    release.set()
+    thread.join()
+    assert breaker.state == "closed"
+
+
+def test_gemini_fails_fast_then_recovers(server):
+    service = AIService()
+    service.model = FakeGeminiModel(server.url)
+    service.timeout = 0.3
+    service.breaker = CircuitBreaker("gemini-triage", failure_threshold=2, reset_timeout=0.5)
+
+    assert service.analyze_triage(PATIENT)["triage_level"] == 1
+    server.mode = "slow"
+    for _ in range(2):
+        assert service.analyze_triage(PATIENT)["error"] == "AI Analysis Failed"  # Timed out
+    hits = server.hits
+    start = time.perf_counter()
+    result = service.analyze_triage(PATIENT)
+    assert result["error"] == "AI Service Unavailable" and time.perf_counter() - start < 0.25
+    assert server.hits == hits  # Not called while open
+
+    server.mode = "healthy"
+    time.sleep(0.5)
+    assert service.analyze_triage(PATIENT)["triage_level"] == 1  # Half-open probe succeeded
+    assert service.breaker.state == "closed"
+
+
+@pytest.fixture
+def app(main, server, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    registry = CircuitBreakers(failure_threshold=2, reset_timeout=60)
+    monkeypatch.setattr(main, "breakers", registry)
+    monkeypatch.setattr(main, "ALERT_TIMEOUT_SECONDS", 0.3)
+    monkeypatch.setattr(main.tenants.registry.get(), "webhook_url", server.url)
+    return TestClient(main.app), main, registry
+
+
+def test_webhook_breaker_and_health(app, server):
+    client, main, registry = app
+    server.mode = "failing"
+    for _ in range(2):
+        main.send_critical_alert(PATIENT, 1, server.url)
+    assert server.hits == 2
+    start = time.perf_counter()
+    main.send_critical_alert(PATIENT, 1, server.url)
+    assert server.hits == 2 and time.perf_counter() - start < 0.25
+
+    webhook = f"webhook:{server.url.split('/')[2]}"
+    health = client.get("/health").json()
+    assert health["status"] == "degraded" and health["degraded"] == [webhook]
+    assert health["circuits"][webhook]["state"] == "open"
+    assert client.get("/metrics").json()["circuit_breakers"][webhook]["failures"] == 2
+    # Triage itself is unaffected by the dead webhook
+    start = time.perf_counter()
+    assert client.post("/triage", json=PATIENT).json()["level"] == 2
+    assert server.hits == 2 and time.perf_counter() - start < 1
+
+
+def test_slow_webhook_opens_breaker(app, server):
+    _, main, registry = app
+    server.mode = "slow"
+    for _ in range(3):
+        main.send_critical_alert(PATIENT, 2, server.url)
+    assert server.hits == 2
+    assert registry.snapshot()[f"webhook:{server.url.split('/')[2]}"]["state"] == "open"
@@ -0,0 +1,138 @@
+"""
+SAFE-Triage AI - Request Coalescing Tests
+Concurrent identical /ai-triage requests must share a single Gemini call.
+"""
+import threading
+import time
+
+from backend.ai_service import AIService, canonical_patient_key
+from backend.coalescing import SingleFlight, CoalesceTimeout
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class SlowFakeModel:
+    """Stands in for the Gemini model; counts calls and sleeps to simulate latency."""
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt, request_options=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return FakeResponse('```json\n{"triage_level": 2, "reasoning": "chest pain", "red_flags": []}\n```')
+
+
+PATIENT = {
+    "age": 55, "gender": "male",
+    "chief_complaint_text": "Chest pain radiating to arm",
+    "vitals": {"hr": 110, "rr": 22, "spo2": 95, "temp": None},
+}
+
+
+def _run_concurrently(fn, n):
+    results = [None] * n
+    def worker(i):
+        results[i] = fn()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def test_concurrent_duplicates_share_one_call():
+    sf = SingleFlight(wait_timeout=5)
+    counter = {"n": 0}
+    def slow():
+        counter["n"] += 1
+        time.sleep(0.2)
+        return "ok"
+
+    results = _run_concurrently(lambda: sf.do("same", slow), 8)
+
+    assert counter["n"] == 1
+    assert all(r[0] == "ok" for r in results)
+    assert sum(1 for r in results if r[1]) == 7
+    stats = sf.stats()
+    assert stats["leaders"] == 1 and stats["coalesced"] == 7 and stats["in_flight"] == 0
+
+
+def test_sequential_calls_are_not_cached():
+    sf = SingleFlight()
+    counter = {"n": 0}
+    def fn():
+        counter["n"] += 1
+        return counter["n"]
+
+    assert sf.do("k", fn) == (1, False)
+    assert sf.do("k", fn) == (2, False)
+
+
+def test_leader_error_is_shared_with_waiters():
+    sf = SingleFlight(wait_timeout=5)
+    def boom():
+        time.sleep(0.1)
+        raise ValueError("upstream down")
+
+    def call():
+        try:
+            sf.do("k", boom)
+        except ValueError as e:
+            return str(e)
+
+    assert _run_concurrently(call, 4) == ["upstream down"] * 4
+
+
+def test_waiters_give_up_after_bounded_wait():
+    sf = SingleFlight(wait_timeout=0.05)
+    release = threading.Event()
+    leader = threading.Thread(target=lambda: sf.do("k", release.wait))
+    leader.start()
+    while sf.in_flight() == 0:
+        time.sleep(0.001)
+
+    try:
+        sf.do("k", lambda: "never")
+        assert False, "expected CoalesceTimeout"
+    except CoalesceTimeout:
+        pass
+    finally:
+        release.set()
+        leader.join()
+    assert sf.stats()["wait_timeouts"] == 1
+
+
+def test_ai_service_coalesces_identical_patients():
+    service = AIService()
+    service.model = SlowFakeModel()
+
+    variant = dict(PATIENT, chief_complaint_text="  chest pain   RADIATING to arm ")
+    inputs = [PATIENT, variant] * 3
+    results = _run_concurrently(lambda: service.analyze_triage(inputs.pop()), 6)
+
+    assert service.model.calls == 1
+    assert all(r["triage_level"] == 2 for r in results)
+    assert service.coalescer.stats()["coalesced"] == 5
+
+
+def test_canonical_key_distinguishes_different_patients():
+    assert canonical_patient_key(PATIENT) != canonical_patient_key(dict(PATIENT, age=56))
+    assert canonical_patient_key(PATIENT) != canonical_patient_key(
+        dict(PATIENT, vitals={"hr": 120, "rr": 22, "spo2": 95})
+    )
+
+
+def test_canonical_key_includes_tenant_and_examples():
+    examples = [{"complaint": "ألم في الصدر", "age": 60, "triage_level": 2}]
+    key = canonical_patient_key(PATIENT, "cairo", examples)
+    assert key == canonical_patient_key(dict(PATIENT), "cairo", [dict(examples[0])])
+    assert key != canonical_patient_key(PATIENT, "giza", examples)
+    assert key != canonical_patient_key(PATIENT, "cairo")
+    assert key != canonical_patient_key(PATIENT, "cairo", [dict(examples[0], triage_level=3)])
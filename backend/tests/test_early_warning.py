@@ -0,0 +1,83 @@
+"""
+SAFE-Triage AI - Early-Warning Score Tests
+NEWS2, qSOFA and PEWS bands, the batch form against the scalar one, and
+score history across repeat vitals.
+"""
+import numpy as np
+
+from backend.logic import early_warning
+from backend.logic.triage_engine import TriageEngine
+from backend.models import PatientInput, Vitals
+
+
+def test_news2_and_qsofa_for_adults():
+    septic = early_warning.score(70, Vitals(hr=118, rr=24, spo2=93, temp=38.9, sbp=98, gcs=14))
+    assert (septic.news2, septic.news2_risk) == (2 + 2 + 2 + 2 + 1 + 3, "high")
+    assert (septic.qsofa, septic.qsofa_positive, septic.pews) == (3, True, None)
+
+    well = early_warning.score(30, Vitals(hr=72, rr=14, spo2=98, temp=36.8, sbp=125))
+    assert (well.news2, well.news2_risk, well.qsofa, well.missing) == (0, "low", 0, ())
+    assert early_warning.score(30, Vitals(hr=72, rr=14, spo2=98, temp=36.8, sbp=125, gcs=13)).news2_risk == "low-medium"
+    assert early_warning.score(30, Vitals(hr=105, rr=22, spo2=95, temp=38.3, sbp=125)).news2_risk == "medium"
+    # Band edges: 90 -> 0 points, 91 -> 1; 35.0 -> 3, 35.1 -> 1
+    assert early_warning.NEWS2["hr"].score(90) == 0 and early_warning.NEWS2["hr"].score(91) == 1
+    assert early_warning.NEWS2["temp"].score(35.0) == 3 and early_warning.NEWS2["temp"].score(35.1) == 1
+
+    partial = early_warning.score(50, Vitals(hr=135))
+    assert partial.news2 == 3 and set(partial.missing) == {"rr", "spo2", "temp", "sbp"}
+
+
+def test_pews_uses_the_age_band():
+    infant = early_warning.score(0.5, Vitals(hr=175, rr=62, spo2=93))
+    assert (infant.pews, infant.pews_risk, infant.news2) == (2 + 2 + 1, "medium", None)
+    assert infant.missing == ("sbp",)
+    # The same heart rate is normal for a newborn and far too fast for a ten-year-old
+    assert early_warning.score(0.1, Vitals(hr=145)).pews == 0
+    assert early_warning.score(10, Vitals(hr=145)).pews == 2
+    assert early_warning.score(10, Vitals(hr=160, rr=55, sbp=65, spo2=88)).pews_risk == "high"
+
+
+def test_batch_scores_match_scalar_scores():
+    rng = np.random.default_rng(11)
+    vitals = []
+    for _ in range(3000):
+        values = {"hr": int(rng.normal(100, 35)), "rr": max(4, int(rng.normal(24, 12))),
+                  "spo2": round(min(100.0, rng.normal(95, 4)), 1), "temp": round(rng.normal(37.5, 1.2), 1),
+                  "sbp": max(40, int(rng.normal(110, 30))), "gcs": int(rng.choice([15, 15, 15, 14, 9]))}
+        vitals.append(Vitals(**{k: v for k, v in values.items() if rng.random() > 0.15}))
+    ages = rng.choice([0.1, 0.5, 2, 8, 13, 15.9, 16, 45, 80], size=len(vitals))
+    batch = early_warning.score_batch(ages, early_warning.vitals_matrix(vitals))
+    assert batch == [early_warning.score(age, v) for age, v in zip(ages.tolist(), vitals)]
+    assert {s.news2_risk for s in batch} >= {"low", "low-medium", "medium", "high"}
+
+
+def test_engine_attaches_scores_on_both_paths():
+    engine = TriageEngine()
+    patients = [PatientInput(age=age, gender="male", chief_complaint_text="fever", vitals=vitals)
+                for age, vitals in ((67, {"hr": 125, "rr": 26, "sbp": 95}), (1.5, {"hr": 160}), (30, {}))]
+    single = [engine.evaluate(p).scores for p in patients]
+    assert single == [r.scores for r in engine.evaluate_batch(patients)]
+    assert single[0].qsofa_positive and single[1].pews is not None and single[2].news2 == 0
+    assert engine.evaluate(patients[0]).model_dump(mode="json")["scores"]["missing"] == ["spo2", "temp"]
+
+
+def test_score_history_follows_repeat_vitals(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from backend.ingest import generator
+
+    monkeypatch.setattr(main, "send_critical_alert", lambda *args: None)
+    client = TestClient(main.app)
+    body = {"age": 58, "gender": "male", "chief_complaint_text": "cough",
+            "vitals": {"hr": 88, "rr": 18, "spo2": 97, "temp": 37.4, "sbp": 130}}
+    result = client.post("/triage", json=body).json()
+    assert result["scores"]["news2"] == 0 and result["scores"]["qsofa"] == 0
+    patient_id = client.get("/patients", params={"limit": 1}).json()[0]["id"]
+
+    client.post("/ingest/fhir", json=generator.fhir_bundle([(patient_id, {"rr": 26, "sbp": 96, "spo2": 92})]))
+    assert main.vitals_ingest.flush()
+    history = client.get(f"/patients/{patient_id}").json()["score_history"]
+    assert [(h["source"], h["news2"]) for h in history] == [("triage", 0), ("ingest", 3 + 2 + 2)]
+    assert history[-1]["qsofa"] == 2
+
+    assert len(early_warning.append_history(history, {"news2": 1}, "ingest", limit=2)) == 2
@@ -0,0 +1,61 @@
+"""
+SAFE-Triage AI - Match Evidence Tests
+Spans come from the same scan as the symptoms and are stored with the patient.
+"""
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import sessionmaker
+
+from backend import crud, migrations
+from backend.logic.triage_engine import TriageEngine
+from backend.models import PatientInput, Vitals
+from backend.sql_models import Patient
+
+engine = TriageEngine()
+
+
+def _patient(complaint):
+    return PatientInput(age=40, gender="male", chief_complaint_text=complaint, vitals=Vitals())
+
+
+def test_spans_explain_every_category_and_red_flag():
+    complaint = "Unconscious after fall, chets pain"
+    result = engine.evaluate(_patient(complaint))
+
+    by_category = {span.category: span for span in result.evidence}
+    assert set(by_category) == {"danger", "trauma", "chest_pain"}
+    for span in result.evidence:
+        assert complaint[span.start:span.end] == span.text
+    assert by_category["danger"].term == "unconscious"
+    assert by_category["chest_pain"].fuzzy and by_category["chest_pain"].text == "chets pain"
+    assert [s.start for s in result.evidence] == sorted(s.start for s in result.evidence)
+
+
+def test_arabic_spans():
+    complaint = "عندي وجع في صدري"
+    [span] = engine.evaluate(_patient(complaint)).evidence
+    assert (span.text, span.category) == ("وجع في صدري", "chest_pain")
+
+
+def test_batch_matches_single_evaluation():
+    complaints = ["chest pain", "cut on hand", "chest pain"]
+    batch = engine.evaluate_batch([_patient(c) for c in complaints])
+    assert [r.evidence for r in batch] == [engine.evaluate(_patient(c)).evidence for c in complaints]
+
+
+def test_evidence_is_stored_and_old_tables_are_upgraded(tmp_path):
+    bind = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    with bind.begin() as conn:  # patients table from before the evidence column
+        conn.execute(text("CREATE TABLE patients (id INTEGER PRIMARY KEY, name VARCHAR, age FLOAT, "
+                          "gender VARCHAR, vitals JSON, chief_complaint TEXT, triage_level INTEGER, "
+                          "triage_color VARCHAR, triage_label_en VARCHAR, triage_label_ar VARCHAR, "
+                          "triage_reasoning JSON, triage_red_flags JSON, created_at DATETIME)"))
+    migrations.upgrade(bind)
+    assert "triage_evidence" in {c["name"] for c in inspect(bind).get_columns("patients")}
+
+    db = sessionmaker(bind=bind)()
+    patient = _patient("stabbed in the chest")
+    result = engine.evaluate(patient)
+    record = crud.create_patient_record(db, patient, result.model_dump())
+    stored = db.get(Patient, record.id).triage_evidence
+    assert stored == result.model_dump()["evidence"] and stored[0]["category"] == "danger"
+    db.close()
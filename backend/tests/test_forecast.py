@@ -0,0 +1,98 @@
+"""
+SAFE-Triage AI - Resource Demand Forecast Tests
+Per-type resource estimates, the rolling bucket ring, projections from
+recent arrival rates, and the /forecast endpoint.
+"""
+import pytest
+from sqlalchemy.orm import Session
+
+from backend import database, migrations
+from backend.forecast import ResourceDemand
+from backend.logic.triage_engine import TriageEngine
+from backend.models import PatientInput
+from backend.sql_models import Patient
+
+
+class Clock:
+    def __init__(self, now=1_000_000 * 300.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _patient(text, **vitals):
+    return PatientInput(age=40, gender="male", chief_complaint_text=text, vitals=vitals)
+
+
+def test_resource_breakdown_matches_resource_count():
+    engine = TriageEngine()
+    chest = engine.evaluate(_patient("chest pain", hr=80))
+    assert (chest.resources.ecg, chest.resources.labs, chest.resources.total) == (1, 1, 2)
+    fall = engine.evaluate(_patient("fell and cut my hand, bleeding wound"))
+    assert fall.resources.model_dump() == {"labs": 1, "ecg": 0, "xray": 1, "ct": 0, "iv_meds": 0, "procedure": 1}
+    for text in ("chest pain", "fell and cut my hand, bleeding wound", "runny nose", "fever and cough"):
+        symptoms = engine.nlp.extract_symptoms(text)
+        assert engine.evaluate(_patient(text)).resources.total == engine._calculate_resources(None, symptoms)
+
+
+def test_ring_keeps_exactly_the_window():
+    clock = Clock()
+    demand = ResourceDemand(bucket_seconds=300, window_hours=1, clock=clock)
+    for minute in range(0, 120, 5):  # One arrival with 2 labs every 5 minutes for 2 hours
+        clock.now += 300
+        demand.record({"labs": 2, "ecg": 0})
+    assert demand.window(1) == {"arrivals": 12, "labs": 24, "ecg": 0, "xray": 0, "ct": 0, "iv_meds": 0, "procedure": 0}
+    assert demand.window(0.25)["arrivals"] == 3
+
+    demand.record({"ct": 1}, at=clock.now - 2 * 3600)  # Older than the window: ignored
+    clock.now += 45 * 60
+    assert demand.window(1)["arrivals"] == 3
+    clock.now += 10 * 3600  # A quiet night clears everything
+    assert demand.window(1)["arrivals"] == 0
+
+
+def test_forecast_follows_recent_arrival_rate():
+    clock = Clock()
+    demand = ResourceDemand(clock=clock)
+    for _ in range(3 * 60):  # Steady 20 patients/hour, half of them need an ECG
+        clock.now += 180
+        demand.record({"ecg": 1 if int(clock.now / 180) % 2 else 0, "labs": 1})
+    steady = demand.forecast(horizon_hours=3)
+    assert steady["rate_per_hour"]["arrivals"] == pytest.approx(20, rel=0.1)
+    assert steady["rate_per_hour"]["ecg"] == pytest.approx(10, rel=0.15)
+    assert len(steady["hours"]) == 3 and steady["hours"][0]["upper_90"]["labs"] > steady["hours"][0]["expected"]["labs"]
+    assert steady["horizon_total"]["expected"]["arrivals"] == pytest.approx(60, rel=0.1)
+
+    for _ in range(60):  # A surge: 60 patients in the last 20 minutes
+        clock.now += 20
+        demand.record({"labs": 1})
+    assert demand.forecast()["rate_per_hour"]["arrivals"] > 1.5 * steady["rate_per_hour"]["arrivals"]
+
+
+def test_window_is_rebuilt_from_stored_patients(tmp_path):
+    bind = database.create_bind(f"sqlite:///{tmp_path / 'p.db'}")
+    migrations.upgrade(bind)
+    with Session(bind) as db:
+        db.add_all([Patient(age=40, gender="male", triage_level=3, triage_resources={"labs": 1, "xray": 1}),
+                    Patient(age=50, gender="female", triage_level=5)])
+        db.commit()
+    demand = ResourceDemand()
+    assert demand.load(bind) == 2
+    assert demand.window(1)["arrivals"] == 2 and demand.window(1)["xray"] == 1
+
+
+def test_forecast_endpoint(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "send_critical_alert", lambda *args: None)
+    client = TestClient(main.app)
+    before = client.get("/forecast").json()["last_hour"]
+    result = client.post("/triage", json={"age": 40, "gender": "male", "chief_complaint_text": "chest pain",
+                                          "vitals": {"hr": 80}}).json()
+    assert result["resources"]["ecg"] == 1
+    body = client.get("/forecast", params={"hours": 2, "lookback": 1}).json()
+    assert body["last_hour"]["arrivals"] == before["arrivals"] + 1
+    assert body["last_hour"]["ecg"] == before["ecg"] + 1
+    assert len(body["hours"]) == 2 and body["rate_per_hour"]["arrivals"] > 0
+    assert client.get("/forecast", params={"hours": 0}).status_code == 400
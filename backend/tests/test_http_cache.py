@@ -0,0 +1,83 @@
+"""
+SAFE-Triage AI - Conditional GET Tests
+Validator headers, If-None-Match / If-Modified-Since handling, JSON
+encoding, and 304 / gzip behaviour of the patient endpoints across writes.
+"""
+import json
+from datetime import datetime
+
+from starlette.requests import Request
+
+from backend import http_cache
+
+
+def _request(**headers):
+    raw = [(name.replace("_", "-").lower().encode(), value.encode()) for name, value in headers.items()]
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": raw})
+
+
+def test_validators_and_conditions():
+    tags = http_cache.validators("tok", 7, 1_700_000_000.4)
+    assert tags.etag.startswith('W/"') and tags.etag.endswith('-7"')
+    # Last-Modified only once the second of the last write is over
+    assert "Last-Modified" not in http_cache.headers(tags, now=1_700_000_000.9)
+    last_modified = http_cache.headers(tags, now=1_700_000_001.0)["Last-Modified"]
+    assert last_modified == "Tue, 14 Nov 2023 22:13:20 GMT"
+
+    bare = tags.etag.removeprefix("W/")
+    assert http_cache.not_modified(_request(if_none_match=tags.etag), tags)
+    assert http_cache.not_modified(_request(if_none_match=f'"other", {bare}'), tags)
+    assert http_cache.not_modified(_request(if_none_match="*"), tags)
+    assert not http_cache.not_modified(_request(if_none_match=http_cache.validators("tok", 8, 0).etag), tags)
+    # If-None-Match wins; If-Modified-Since alone compares whole seconds
+    assert not http_cache.not_modified(_request(if_none_match='"other"', if_modified_since=last_modified), tags)
+    assert http_cache.not_modified(_request(if_modified_since=last_modified), tags)
+    assert not http_cache.not_modified(_request(if_modified_since="Tue, 14 Nov 2023 22:13:19 GMT"), tags)
+    assert not http_cache.not_modified(_request(if_modified_since="yesterday"), tags)
+    assert not http_cache.not_modified(_request(if_none_match=tags.etag), None)
+
+
+def test_dumps_matches_the_default_encoder():
+    from fastapi.encoders import jsonable_encoder
+
+    row = {"id": 1, "age": 62.0, "created_at": datetime(2026, 3, 1, 12, 0, 5, 120),
+           "vitals": {"hr": 96}, "triage_label_ar": "طوارئ (مستوى ٢)", "score_history": None}
+    assert json.loads(http_cache.dumps([row])) == jsonable_encoder([row])
+
+
+def test_unchanged_polls_get_304_until_a_write(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from backend.ingest import generator
+
+    monkeypatch.setattr(main, "send_critical_alert", lambda *args: None)
+    client = TestClient(main.app)
+    body = {"age": 35, "gender": "male", "chief_complaint_text": "ankle sprain",
+            "vitals": {"hr": 78, "rr": 14, "spo2": 99, "temp": 36.7, "sbp": 124}}
+    for _ in range(12):
+        client.post("/triage", json=body)
+
+    first = client.get("/patients", params={"limit": 10})
+    etag = first.headers["ETag"]
+    assert first.headers["Content-Encoding"] == "gzip" and first.headers["Cache-Control"] == "private, no-cache"
+    assert int(first.headers["Content-Length"]) < len(first.content) / 3
+    unchanged = client.get("/patients", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert unchanged.status_code == 304 and unchanged.content == b"" and unchanged.headers["ETag"] == etag
+
+    patient_id = first.json()[0]["id"]
+    detail = client.get(f"/patients/{patient_id}", headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in detail.headers and detail.json()["id"] == patient_id
+    assert client.get(f"/patients/{patient_id}", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/patients/999999").status_code == 404
+    assert client.get("/patients/999999", headers={"If-None-Match": etag}).status_code == 404
+
+    client.post("/triage", json=body)
+    changed = client.get("/patients", params={"limit": 10}, headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
+    assert changed.json()[0]["id"] == patient_id + 1
+
+    etag = changed.headers["ETag"]
+    client.post("/ingest/fhir", json=generator.fhir_bundle([(patient_id, {"hr": 120})]))
+    assert main.vitals_ingest.flush()
+    assert client.get(f"/patients/{patient_id}", headers={"If-None-Match": etag}).json()["vitals"]["hr"] == 120
+    assert client.get("/patients", headers={"If-Modified-Since": "Sat, 01 Jan 2000 00:00:00 GMT"}).status_code == 200
@@ -0,0 +1,183 @@
+"""
+SAFE-Triage AI - Vitals Ingest Tests
+MLLP framing, HL7v2 and FHIR mapping to Vitals, micro-batching, and
+re-triage of stored patients over HTTP and MLLP.
+"""
+import asyncio
+import time
+
+import pytest
+
+from backend.ingest import generator
+from backend.ingest.batcher import MicroBatcher
+from backend.ingest.fhir import FHIRError, parse_document
+from backend.ingest.hl7 import HL7Error, MLLPDecoder, frame, parse_message, split_messages
+from backend.ingest.observations import Observation
+from backend.ingest.server import MLLPServer
+
+PATIENT = {"age": 45, "gender": "female", "chief_complaint_text": "headache",
+           "vitals": {"hr": 80, "rr": 16, "spo2": 98, "temp": 37.0, "sbp": 120}}
+
+
+def _oru(*obx, pid="42"):
+    segments = ["MSH|^~\\&|MON|ED|SAFE|ED|20260101120000||ORU^R01|MSG1|P|2.5", f"PID|||{pid}^^^H^MR~999^^^X"]
+    segments += [f"OBX|{i}|NM|{o}" for i, o in enumerate(obx, 1)]
+    return "\r".join(segments).encode()
+
+
+def test_mllp_decoder_handles_any_chunking():
+    messages = [_oru("8867-4^HR^LN||120|/min|||||F", pid=str(i)) for i in range(3)]
+    stream = b"noise" + b"".join(frame(m) for m in messages)
+    for size in (1, 2, 7, len(stream)):
+        decoder = MLLPDecoder()
+        out = []
+        for i in range(0, len(stream), size):
+            out += decoder.feed(stream[i:i + size])
+        assert out == messages
+    with pytest.raises(HL7Error):
+        MLLPDecoder(max_message_bytes=10).feed(b"\x0b" + b"x" * 20)
+
+
+def test_oru_observations_are_mapped_and_normalized():
+    parsed = parse_message(_oru(
+        "150456^MDC_PULS_OXIM_SAT_O2^MDC||0.91|1|||||F",
+        "8310-5^Body temp^LN||102.2|[degF]|||||F",
+        "0000^MDC_ECG_HEART_RATE^MDC||130|/min|||||F",  # Unknown code, known MDC reference id
+        "8480-6^SBP^LN||95|mm[Hg]|||||X",  # Result could not be obtained
+        "9279-1^RR^LN||400|/min|||||F",  # Artefact
+        "8462-4^DBP^LN||abc|mm[Hg]|||||F",
+        "1234-5^Glucose^LN||180|mg/dL|||||F",
+    ))
+    assert (parsed.control_id, parsed.message_type, parsed.patient_ref) == ("MSG1", "ORU^R01", "42")
+    assert parsed.observations == [Observation("42", "spo2", 91.0), Observation("42", "temp", 39.0),
+                                   Observation("42", "hr", 130)]
+    assert parsed.rejected == 2
+
+
+def test_other_messages_and_bad_input():
+    adt = _oru("8867-4^HR^LN||120|/min|||||F").replace(b"ORU^R01", b"ADT^A01")
+    assert parse_message(adt).observations == []
+    with pytest.raises(HL7Error):
+        parse_message(b"PID|||42")
+    body = _oru("8867-4^HR^LN||120") + b"\n" + _oru("8867-4^HR^LN||121").replace(b"\r", b"\n")
+    assert [parse_message(m).observations[0].value for m in split_messages(body)] == [120, 121]
+
+
+def test_fhir_bundle_with_blood_pressure_panel():
+    bundle = generator.fhir_bundle([(7, {"hr": 110})])
+    bundle["entry"].append({"resource": {
+        "resourceType": "Observation", "status": "final", "subject": {"reference": "Patient/7"},
+        "code": {"coding": [{"system": "http://loinc.org", "code": "85354-9"}]},
+        "component": [
+            {"code": {"coding": [{"code": "8480-6"}]}, "valueQuantity": {"value": 85, "code": "mm[Hg]"}},
+            {"code": {"coding": [{"code": "8462-4"}]}, "valueQuantity": {"value": 50, "code": "mm[Hg]"}},
+        ]}})
+    bundle["entry"].append({"resource": dict(bundle["entry"][0]["resource"], status="entered-in-error")})
+    observations, rejected = parse_document(bundle)
+    assert observations == [Observation("7", "hr", 110), Observation("7", "sbp", 85), Observation("7", "dbp", 50)]
+    assert rejected == 0
+    with pytest.raises(FHIRError):
+        parse_document({"resourceType": "Patient"})
+
+
+@pytest.mark.parametrize("document", [
+    {"resourceType": "Bundle", "entry": [1]},
+    {"resourceType": "Bundle", "entry": {"resource": {}}},
+    {"resourceType": "Bundle", "entry": [{"resource": "Observation/1"}]},
+    {"resourceType": "Observation", "subject": "Patient/1"},
+    {"resourceType": "Observation", "code": {"coding": "8867-4"}},
+    {"resourceType": "Observation", "component": [[]]},
+])
+def test_malformed_fhir_is_a_fhir_error(document):
+    with pytest.raises(FHIRError):
+        parse_document(document)
+
+
+def test_micro_batcher_closes_batches_on_size_and_delay():
+    batches = []
+    batcher = MicroBatcher(batches.append, max_batch=100, max_delay=0.05)
+    batcher.submit(list(range(250)))
+    assert batcher.flush()
+    assert [len(b) for b in batches] == [100, 100, 50]
+
+    batches.clear()
+    start = time.monotonic()
+    batcher.submit([1])
+    while not batches:
+        time.sleep(0.005)
+    assert 0.04 <= time.monotonic() - start < 0.5
+
+    full = MicroBatcher(lambda b: time.sleep(1), max_pending=5)
+    assert full.submit([1, 2, 3]) and not full.submit([4, 5, 6]) and full.stats["dropped"] == 3
+    batcher.close()
+
+
+def _triage(client, **vitals):
+    return client.post("/triage", json=dict(PATIENT, vitals=dict(PATIENT["vitals"], **vitals))).json()
+
+
+def test_deteriorating_vitals_escalate_stored_patient(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    alerts = []
+    monkeypatch.setattr(main, "send_critical_alert", lambda data, level, url=None: alerts.append(level))
+    client = TestClient(main.app)
+    stable = _triage(client)
+    assert stable["level"] >= 3
+    alerts.clear()
+    patient_id = client.get("/patients", params={"limit": 1}).json()[0]["id"]
+
+    reply = client.post("/ingest/hl7", content=frame(_oru(
+        "150456^MDC_PULS_OXIM_SAT_O2^MDC||84|%", "147842^MDC_ECG_HEART_RATE^MDC||155|/min", pid=str(patient_id))))
+    assert reply.status_code == 202 and reply.json()["observations"] == 2
+    assert main.vitals_ingest.flush()
+
+    stored = client.get(f"/patients/{patient_id}").json()
+    assert stored["vitals"]["spo2"] == 84 and stored["vitals"]["hr"] == 155
+    assert stored["triage_level"] <= 2 and alerts == [stored["triage_level"]]
+
+    # Recovery updates the vitals but never lowers acuity on its own
+    client.post("/ingest/fhir", json=generator.fhir_bundle([(patient_id, {"spo2": 98, "hr": 80})]))
+    assert main.vitals_ingest.flush()
+    recovered = client.get(f"/patients/{patient_id}").json()
+    assert recovered["vitals"]["spo2"] == 98 and recovered["triage_level"] == stored["triage_level"]
+    assert client.post("/ingest/fhir", content=b"{").status_code == 400
+    assert client.post("/ingest/fhir", json={"resourceType": "Bundle", "entry": [1]}).status_code == 400
+
+
+def test_hl7_body_is_queued_whole_or_not_at_all(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    client = TestClient(main.app)
+    batcher = main.vitals_ingest.batcher
+    assert main.vitals_ingest.flush()
+    body = frame(_oru("8867-4^HR^LN||120")) + frame(_oru("8867-4^HR^LN||121"))
+    monkeypatch.setattr(batcher, "max_pending", 1)  # Room for the first message only
+    submitted = batcher.stats["submitted"]
+    reply = client.post("/ingest/hl7", content=body)
+    assert reply.status_code == 503 and batcher.stats["submitted"] == submitted
+    monkeypatch.setattr(batcher, "max_pending", 100)
+    assert client.post("/ingest/hl7", content=body).json()["observations"] == 2
+    assert batcher.stats["submitted"] == submitted + 2
+
+
+def test_mllp_listener_acknowledges_generated_traffic(main, monkeypatch):
+    monkeypatch.setattr(main, "send_critical_alert", lambda *args: None)
+    server = MLLPServer(main.vitals_ingest)
+    ward = generator.Ward([1, 2, 3])
+    messages = [generator.oru_message(pid, vitals, f"T{i}") for i, (pid, vitals) in enumerate(ward.readings(300))]
+    messages.append(b"garbage")
+
+    async def scenario():
+        listener = await server.start("127.0.0.1", 0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            return await generator.send_mllp("127.0.0.1", port, messages, window=50)
+        finally:
+            await server.stop()
+
+    before = main.vitals_ingest.stats["observations"]
+    report = asyncio.run(scenario())
+    assert report["acks"] == {"AA": 300, "AR": 1}
+    assert main.vitals_ingest.flush()
+    assert main.vitals_ingest.stats["observations"] - before == 300 * len(generator.MDC)
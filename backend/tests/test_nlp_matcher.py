@@ -0,0 +1,82 @@
+"""
+SAFE-Triage AI - Lexicon Matcher Tests
+"""
+
+import pytest
+
+from backend.benchmarks.bench_nlp import legacy_scan
+from backend.nlp.matcher import LexiconMatcher, typo_distance
+from backend.nlp.processor import NLPProcessor
+from backend.scenario_runner import iter_builtin_scenarios
+
+nlp = NLPProcessor()
+
+
+def test_exact_pass_matches_legacy_scan():
+    exact = NLPProcessor(fuzzy=False)
+    texts = [s["input"]["chief_complaint_text"] for s in iter_builtin_scenarios()]
+    texts += ["CHEST PAIN", "vomiting", "وبسكينة في بطنه", "stabbed, no pulse", "Chest Pain and MI"]
+    for text in texts:
+        assert (exact.extract_symptoms(text), exact.detect_danger_keywords(text)) == legacy_scan(exact, text), text
+
+
+def test_typos_are_matched():
+    assert nlp.extract_symptoms("chets pain") == ["chest_pain"]
+    assert nlp.extract_symptoms("shortnes of breath") == ["sob"]
+    assert nlp.detect_danger_keywords("he is unconsious") == ["unconscious"]
+    assert nlp.detect_danger_keywords("siezure at home") == ["seizure"]
+
+
+def test_arabic_spelling_variants_are_folded():
+    assert nlp.extract_symptoms("وجع فى صدرى") == ["chest_pain"]
+    assert nlp.detect_danger_keywords("مغمي عليه") == ["مغمى عليه"]
+    assert nlp.detect_danger_keywords("ظربة شمس") == ["ضربة شمس"]  # ض/ظ swap
+
+
+def test_arabic_missing_letter_is_not_a_typo():
+    # بنزف (I bleed) is not بتنزف (she bleeds): no escalation to "حامل وبتنزف"
+    assert nlp.detect_danger_keywords("انا حامل وبنزف") == []
+
+
+def test_implausible_substitutions_are_not_typos():
+    # h->o and l->n are far apart on the keyboard: real words, not typos
+    assert nlp.detect_danger_keywords("burned hand while cooking") == []
+    assert nlp.extract_symptoms("i would like a checkup") == []
+    assert nlp.extract_symptoms("strike") == []
+
+
+def test_short_terms_need_exact_match():
+    assert nlp.detect_danger_keywords("stap") == []  # "stab" is 4 letters: no edits allowed
+
+
+def test_edit_distance_is_configurable_per_length():
+    strict = LexiconMatcher({"sob": ["shortness of breath"]}, max_edits_by_length=((100, 0),))
+    assert strict.match("shortnes of breath") == []
+    loose = LexiconMatcher({"sob": ["shortness of breath"]})
+    [match] = loose.match("shortnes of breath")
+    assert match.fuzzy and (match.start, match.end) == (0, 18)
+
+
+def test_match_offsets():
+    text = "Pt with Chest Pain"
+    [match] = LexiconMatcher({"chest_pain": ["chest pain"]}).match(text)
+    assert text[match.start:match.end] == "Chest Pain" and not match.fuzzy
+
+
+def test_typo_distance():
+    assert typo_distance("chets", "chest", 1) == 1  # transposition
+    assert typo_distance("chesr", "chest", 1) == 1  # neighbouring key
+    assert typo_distance("chesx", "chest", 1) == 2  # far key
+
+
+def test_cached_analysis_cannot_be_corrupted_by_callers():
+    text = "chest pain, unconscious"
+    processor = NLPProcessor()
+    processor.extract_symptoms(text).append("sob")
+    processor.detect_danger_keywords(text).clear()
+    assert processor.extract_symptoms(text) == ["chest_pain"]
+    assert processor.detect_danger_keywords(text) == ["unconscious"]
+    span = processor.analyze(text).spans[0]
+    with pytest.raises(TypeError):
+        span["category"] = "sob"
+    assert span["category"] == "chest_pain"
@@ -0,0 +1,100 @@
+"""
+SAFE-Triage AI - Recent Patient Cache Tests
+Warm load and age-based eviction, pages that reach past the window, and
+cache reads matching database reads after triage, vitals ingest and import.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.orm import Session
+
+from backend import database, migrations
+from backend.patient_cache import PatientRecord, RecentPatients
+from backend.sql_models import Patient
+
+NOW = datetime(2026, 3, 1, 12, 0)
+
+
+class Clock:
+    def __init__(self, now=NOW):
+        self.now = now.replace(tzinfo=timezone.utc).timestamp()  # Stored created_at is naive UTC
+
+    def __call__(self):
+        return self.now
+
+
+def _stored(tmp_path, hours_ago):
+    bind = database.create_bind(f"sqlite:///{tmp_path / 'p.db'}")
+    migrations.upgrade(bind)
+    with Session(bind) as db:
+        db.add_all([Patient(age=30 + i, gender="male", triage_level=3, vitals={"hr": 80 + i},
+                            created_at=NOW - timedelta(hours=h)) for i, h in enumerate(hours_ago)])
+        db.commit()
+    return bind
+
+
+def test_record_has_no_instance_dict():
+    record = PatientRecord()
+    assert not hasattr(record, "__dict__")
+    with pytest.raises(AttributeError):
+        record.extra = 1
+
+
+def test_warm_load_pages_and_eviction(tmp_path):
+    bind = _stored(tmp_path, [30, 20, 5, 1])  # ids 1-4, oldest first
+    clock = Clock()
+    cache = RecentPatients(hours=24, clock=clock)
+    assert cache.page(0, 1) is None and cache.get(4) is None  # Not loaded yet
+    assert cache.load(bind) == 3
+
+    assert [p["id"] for p in cache.page(0, 3)] == [4, 3, 2]
+    assert cache.page(1, 3) is None  # Patient 1 may come next, from the database
+    assert cache.get(4)["vitals"] == {"hr": 83} and cache.get(1) is None
+
+    clock.now += 6 * 3600  # Patient 2 is now 26 hours old
+    assert [p["id"] for p in cache.page(0, 2)] == [4, 3]
+    assert cache.get(2) is None and cache.stats["evictions"] == 1
+    old = Patient(id=2, age=31, gender="male", triage_level=1, created_at=NOW - timedelta(hours=20))
+    assert cache.put([old]) == 0  # Stale write for an evicted patient is not re-cached
+
+    capped = RecentPatients(hours=24, max_records=2, clock=Clock())
+    capped.load(bind)
+    assert [p["id"] for p in capped.page(0, 2)] == [4, 3] and capped.page(0, 3) is None
+    assert RecentPatients(hours=0).load(bind) == 0
+
+
+def test_reads_match_the_database_after_writes(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from backend import tenants
+    from backend.ingest import generator
+
+    monkeypatch.setattr(main, "send_critical_alert", lambda *args: None)
+    client = TestClient(main.app)
+    cache = tenants.registry.get().patients
+    body = {"age": 62, "gender": "female", "chief_complaint_text": "shortness of breath",
+            "vitals": {"hr": 96, "rr": 20, "spo2": 95, "sbp": 128}}
+    for _ in range(3):
+        client.post("/triage", json=body)
+    patient_id = client.get("/patients", params={"limit": 1}).json()[0]["id"]
+    client.post("/ingest/fhir", json=generator.fhir_bundle([(patient_id, {"spo2": 86, "rr": 30})]))
+    assert main.vitals_ingest.flush()
+
+    hits = cache.stats["hits"]
+    cached_page = client.get("/patients", params={"limit": 3}).json()
+    cached_patient = client.get(f"/patients/{patient_id}").json()
+    assert cache.stats["hits"] == hits + 2
+    assert cached_patient["vitals"]["spo2"] == 86 and cached_patient["triage_level"] == 1
+    assert [h["source"] for h in cached_patient["score_history"]] == ["triage", "ingest"]
+
+    cache.clear()  # Same requests, answered by the database
+    assert client.get("/patients", params={"limit": 3}).json() == cached_page
+    assert client.get(f"/patients/{patient_id}").json() == cached_patient
+    assert cache.load(tenants.registry.get().bind) >= 3
+    assert client.get("/patients", params={"limit": 3}).json() == cached_page
+
+    csv = "age,gender,chief_complaint,triage_level,created_at\n40,male,imported cough,4,\n"
+    client.post("/patients/import", files={"file": ("legacy.csv", csv.encode(), "text/csv")})
+    newest = client.get("/patients", params={"limit": 1}).json()[0]
+    assert newest["chief_complaint"] == "imported cough"
+    assert client.get("/metrics").json()["patient_cache"]["default"]["records"] == len(cache._records)
@@ -0,0 +1,69 @@
+"""
+SAFE-Triage AI - Pediatric Vital-Sign Centile Tests
+Monthly centile tables, scalar and vectorized lookups, and how the triage
+engine applies them to infants and children.
+"""
+import numpy as np
+import pytest
+
+from backend.logic.pediatric_vitals import HEART_RATE, RESP_RATE, SYSTOLIC_BP, MAX_MONTHS
+from backend.logic.triage_engine import TriageEngine
+from backend.models import PatientInput
+
+
+def _child(age, text="runny nose", **vitals):
+    return PatientInput(age=age, gender="female", chief_complaint_text=text, vitals=vitals)
+
+
+def test_tables_hit_the_published_values_and_interpolate_between():
+    assert HEART_RATE.value(50, 15 / 12) == 123  # Band 12-18 months, at its midpoint
+    assert RESP_RATE.value(99, 30 / 12) == 38  # Band 2-3 years
+    assert HEART_RATE.value(99, 18 / 12) == pytest.approx((156 + 149) / 2)  # Halfway between two midpoints
+    assert HEART_RATE.value(99, 16.5 / 12) == pytest.approx(156 - 1.5 / 6 * 7)  # Within a month
+    assert SYSTOLIC_BP.value(5, 5) == 80 and SYSTOLIC_BP.value(5, 0) == 60  # PALS 70 + 2 x age; neonate
+    assert SYSTOLIC_BP.value(99, 10) == 127
+    assert HEART_RATE.value(50, 40) == HEART_RATE.value(50, MAX_MONTHS / 12) == 73  # Clamped past 18 years
+    assert HEART_RATE.value(50, -1) == HEART_RATE.value(50, 0)
+    with pytest.raises(ValueError):
+        HEART_RATE.value(95, 1)
+
+
+def test_vectorized_lookup_matches_scalar():
+    ages = np.random.default_rng(4).uniform(0, 19, 2000)
+    for table, centile in ((HEART_RATE, 90), (RESP_RATE, 1), (SYSTOLIC_BP, 5)):
+        expected = [table.value(centile, age) for age in ages]
+        assert np.allclose(table.values(centile, ages), expected)
+
+
+def test_limits_follow_age_in_months():
+    engine = TriageEngine()
+    two_months, eleven_months = engine.evaluate(_child(2 / 12, hr=170)), engine.evaluate(_child(11 / 12, hr=170))
+    assert int(two_months.level) == 2  # Fast but within range for a young infant
+    assert int(eleven_months.level) == 1  # Above the 99th centile at 11 months
+    assert int(engine.evaluate(_child(0.1, rr=20)).level) == 2  # Slow breathing for a newborn
+    assert int(engine.evaluate(_child(0.5, sbp=75)).level) == 5  # Normal infant pressure, below the adult limit
+    assert int(engine.evaluate(_child(12, sbp=85)).level) == 1  # Hypotensive by PALS from 10 years
+    # HR and RR limits never drop below the adult ones, so the rules meet at adult_age
+    assert engine._pediatric_limits(13.99).hr_danger == engine.thresholds["danger_hr_high"]
+    assert engine._pediatric_limits(13.99).rr_critical == engine.thresholds["critical_rr_high"]
+
+
+def test_batch_scoring_matches_single_evaluation():
+    engine = TriageEngine()
+    rng = np.random.default_rng(8)
+    patients = [_child(float(age), "fever and cough", hr=int(hr), rr=int(rr), sbp=int(sbp))
+                for age, hr, rr, sbp in zip(rng.uniform(0, 20, 400), rng.normal(130, 30, 400),
+                                            rng.normal(30, 12, 400).clip(4), rng.normal(95, 15, 400))]
+    batch = engine.evaluate_batch(patients)
+    single = [engine.evaluate(p) for p in patients]
+    assert [(b.level, b.reasoning) for b in batch] == [(s.level, s.reasoning) for s in single]
+    assert {int(r.level) for r in batch} >= {1, 2}
+
+
+def test_centile_thresholds_are_validated():
+    assert TriageEngine(thresholds={"peds_danger_centile": 99})._pediatric_limits(1).hr_danger == \
+        HEART_RATE.value(99, 1)
+    with pytest.raises(ValueError):
+        TriageEngine(thresholds={"peds_danger_centile": 95})
+    with pytest.raises(ValueError):
+        TriageEngine(thresholds={"infant_danger_hr_high": 160})  # Replaced by the centile tables
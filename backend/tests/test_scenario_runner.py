@@ -0,0 +1,60 @@
+"""
+SAFE-Triage AI - Scenario Corpus Runner Tests
+"""
+import json
+
+from backend import scenario_runner
+
+CORPUS = [
+    {"id": "ar-unconscious", "expected": 1,
+     "input": {"age": 50, "gender": "male", "chief_complaint_text": "فاقد الوعي مش بيرد", "vitals": {}}},
+    {"id": "en-chest", "expected": [1, 2],
+     "input": {"age": 55, "gender": "male", "chief_complaint_text": "chest pain", "vitals": {"hr": 90}}},
+    {"name": "validate_scenarios shape", "expected": [4],
+     "data": {"age": 30, "gender": "male", "chief_complaint_text": "cut on hand, needs stitches", "vitals": {}}},
+    {"id": "en-wrong", "expected": 5,
+     "input": {"age": 40, "gender": "female", "chief_complaint_text": "severe back pain", "vitals": {"pain_score": 8}}},
+]
+
+
+def _write_corpus(tmp_path, rows):
+    path = tmp_path / "corpus.jsonl"
+    path.write_text("\n".join(json.dumps(r, ensure_ascii=False) for r in rows) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_report_by_level_and_language(tmp_path):
+    path = _write_corpus(tmp_path, CORPUS)
+    report = scenario_runner.run(scenario_runner.iter_scenario_files([path]), workers=1).to_dict()
+
+    assert report["total"] == 4 and report["passed"] == 3
+    assert report["by_language"]["ar"] == {"total": 1, "passed": 1, "accuracy": 1.0}
+    assert report["by_language"]["en"]["passed"] == 2
+    assert report["by_level"]["5"]["passed"] == 0
+    assert [f["id"] for f in report["failures"]] == ["en-wrong"]
+    assert report["results"]["en-wrong"] == 2
+
+
+def test_pool_matches_in_process(tmp_path):
+    path = _write_corpus(tmp_path, CORPUS * 5)
+    scenarios = lambda: scenario_runner.iter_scenario_files([path])
+    single = scenario_runner.run(scenarios(), workers=1, chunk_size=3).to_dict()
+    pooled = scenario_runner.run(scenarios(), workers=2, chunk_size=3).to_dict()
+    assert single["results"] == pooled["results"]
+    assert single["passed"] == pooled["passed"] == 15
+
+
+def test_diff_against_previous_run():
+    previous = {"a": 2, "b": 3, "c": 1}
+    current = {"a": 2, "b": 4, "d": 5}
+    diff = scenario_runner.diff_runs(current, previous, current_failed=["b"], previous_failed=[])
+    assert diff["changed_levels"] == {"b": {"before": 3, "after": 4}}
+    assert diff["newly_failing"] == ["b"]
+    assert diff["added"] == 1 and diff["removed"] == 1
+
+
+def test_builtin_scenarios_load():
+    from backend.scenarios import API_SCENARIOS, SCENARIOS
+    scenarios = list(scenario_runner.iter_builtin_scenarios())
+    assert len(scenarios) == len(SCENARIOS) + len(API_SCENARIOS) >= 50
+    assert {s["language"] for s in scenarios} == {"ar", "en"}
@@ -0,0 +1,115 @@
+"""
+SAFE-Triage AI - Complaint Search Tests
+Arabic normalization of indexed text and queries, the FTS index kept in
+sync by triggers, ranking, filters and highlight spans, and the endpoint.
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import delete, select, text, update
+from sqlalchemy.orm import Session
+
+from backend import database, migrations, search
+from backend.sql_models import Patient
+
+
+def test_normalization_and_query_terms():
+    assert search.normalize("ضَرْبةُ شمس بالصدر") == "ضربه شمس بالصدر صدر"
+    assert search.normalize("أُغماء وإرهاق") == search.normalize("اغماء وارهاق")
+    assert search.normalize("Snake BITE") == "snake bite" and search.normalize(None) == ""
+    assert search.query_terms("كل حالات ضربة الشمس") == ["ضربه", "شمس"]
+    assert search.query_terms("all snake bites, snakes") == ["snake", "bite"]
+    assert search.query_terms("injuries glass") == ["injur", "glass"]
+    # Quotes and FTS operators from users never reach the MATCH syntax
+    assert search.match_expression(search.query_terms('chest" OR pain*')) == '"chest"* AND "or"* AND "pain"*'
+
+    complaint = "لدغة ثعبان فى الرِّجل - snake bite"
+    spans = search.highlights(complaint, search.query_terms("لدغه رجل bite"))
+    assert [complaint[s["start"]:s["end"]] for s in spans] == ["لدغة", "الرِّجل", "bite"]
+
+
+@pytest.fixture
+def bind(tmp_path):
+    bind = database.create_bind(f"sqlite:///{tmp_path / 'p.db'}")
+    migrations.upgrade(bind)
+    return bind
+
+
+def _ids(bind, query, **filters):
+    with Session(bind) as db:
+        return [r["id"] for r in search.search_patients(db, query, **filters)["results"]]
+
+
+def test_index_follows_inserts_updates_and_deletes(bind):
+    now = datetime.utcnow()
+    with Session(bind) as db:
+        db.add_all([
+            Patient(id=1, chief_complaint="ضربة شمس ودوخة", triage_level=3, created_at=now - timedelta(days=2)),
+            Patient(id=2, chief_complaint="snake bite on the left foot", triage_level=2, created_at=now),
+            Patient(id=3, chief_complaint="Dog bite", triage_level=4, created_at=now - timedelta(days=60)),
+            Patient(id=4, chief_complaint="bite bite bite, bitten by a snake", triage_level=2, created_at=now),
+            Patient(id=5, chief_complaint=None, triage_level=5, created_at=now),
+        ] + [Patient(chief_complaint=complaint, triage_level=4, created_at=now)  # Rare terms need a corpus to rank
+             for complaint in ["headache", "كحة وسخونية", "chest pain", "abdominal pain", "وجع في الضهر"] * 2])
+        db.commit()
+
+    assert _ids(bind, "كل حالات ضربه الشّمس") == [1]
+    assert _ids(bind, "snake bites") == [4, 2]  # More occurrences rank higher
+    assert set(_ids(bind, "bite")) == {2, 3, 4}
+    assert _ids(bind, "bite", days=30, level=4) == [] and _ids(bind, "bite", days=90, level=4) == [3]
+    with pytest.raises(ValueError):
+        _ids(bind, "all cases")
+
+    with Session(bind) as db:
+        db.execute(update(Patient).where(Patient.id == 2).values(chief_complaint="scorpion sting"))
+        db.execute(delete(Patient).where(Patient.id == 4))
+        db.commit()
+    assert _ids(bind, "snake") == [] and _ids(bind, "عقرب scorpion") == [] and _ids(bind, "scorpion") == [2]
+
+    search.rebuild(bind)  # Re-indexing gives the same answers
+    assert _ids(bind, "scorpion") == [2] and _ids(bind, "شمس") == [1]
+    with bind.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM patients_fts WHERE patients_fts MATCH 'bite'")).scalar() == 1
+
+
+def test_like_fallback_matches_words_as_typed(bind):
+    with Session(bind) as db:
+        db.add_all([Patient(id=1, chief_complaint="إغماء بعد ضربة شمس"), Patient(id=2, chief_complaint="Snake bite"),
+                    Patient(id=3, chief_complaint="code_red"), Patient(id=4, chief_complaint="codexred")])
+        db.commit()
+
+        def like(query):
+            return db.scalars(select(Patient.id).where(*search.like_filters(query)).order_by(Patient.id)).all()
+
+        # Folded query terms ("اغماء", "ضربه") would miss the unfolded column
+        assert like("كل حالات إغماء ضربة الشّمس") == [1]
+        assert like("snake BITES") == [2]
+        assert like("code_red") == [3]  # _ is literal, not a one-character wildcard
+
+
+def test_writers_outside_the_app_register_the_index_function(bind):
+    conn = sqlite3.connect(bind.url.database)
+    with pytest.raises(sqlite3.OperationalError, match="arabic_normalize"):
+        conn.execute("INSERT INTO patients (chief_complaint) VALUES ('ضربة شمس')")
+    search.register_functions(conn)
+    with conn:
+        conn.execute("INSERT INTO patients (chief_complaint) VALUES ('ضربة شمس')")
+    conn.close()
+    assert len(_ids(bind, "ضربه شمس")) == 1
+
+
+def test_search_endpoint(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "send_critical_alert", lambda *args: None)
+    client = TestClient(main.app)
+    client.post("/triage", json={"age": 9, "gender": "male", "chief_complaint_text": "لدغة عقرب في الإيد",
+                                 "vitals": {"hr": 110}})
+    body = client.get("/patients/search", params={"q": "لدغه عقرب", "days": 1}).json()
+    assert body["terms"] == ["لدغه", "عقرب"]
+    hit = body["results"][0]
+    assert hit["chief_complaint"] == "لدغة عقرب في الإيد" and hit["rank"] <= 0
+    assert hit["highlights"] == [{"start": 0, "end": 4}, {"start": 5, "end": 9}]
+    assert client.get("/patients/search", params={"q": "!!"}).status_code == 400
+    assert client.get("/patients/search", params={"q": "x", "limit": 0}).status_code == 400
@@ -0,0 +1,111 @@
+"""
+SAFE-Triage AI - Shadow Mode and Offline Replay Tests
+"""
+
+from backend import replay
+from backend.admission import AdmissionController
+from backend.logic.triage_engine import TriageEngine
+from backend.models import PatientInput
+from backend.shadow import ShadowMode
+
+INPUTS = [
+    {"age": 55, "gender": "male", "chief_complaint_text": "chest pain", "vitals": {}},
+    {"age": 30, "gender": "female", "chief_complaint_text": "cut on hand, needs stitches", "vitals": {}},
+    {"age": 40, "gender": "male", "chief_complaint_text": "unconscious", "vitals": {}},
+    {"age": 25, "gender": "female", "chief_complaint_text": "runny nose", "vitals": {}},
+]
+
+
+class FakeAIService:
+    """AI that always answers level 3, or fails for complaints containing 'nose'."""
+    def __init__(self, level=3):
+        self.level = level
+        self.tenants = []
+
+    def analyze_triage(self, patient_data, tenant=None):
+        self.tenants.append(tenant)
+        if "nose" in patient_data["chief_complaint_text"]:
+            return {"error": "AI Analysis Failed"}
+        return {"triage_level": self.level}
+
+
+def _write_shadow_log(tmp_path):
+    shadow = ShadowMode(enabled=True, log_path=str(tmp_path / "shadow.jsonl"))
+    engine = TriageEngine()
+    for data in INPUTS:
+        result = engine.evaluate(PatientInput(**data))
+        shadow.shadow_ai(FakeAIService(), data, result.model_dump())
+    return shadow
+
+
+def test_shadow_ai_calls_go_through_admission(tmp_path):
+    shadow = ShadowMode(enabled=True, log_path=str(tmp_path / "shadow.jsonl"))
+    admission = AdmissionController("ai-triage", client_rate=0.0, client_burst=2)
+    result = TriageEngine().evaluate(PatientInput(**INPUTS[0])).model_dump()
+    for _ in range(3):
+        shadow.shadow_ai(FakeAIService(), INPUTS[0], result, admission)
+    assert (shadow.stats["recorded"], shadow.stats["skipped"]) == (2, 1)
+    assert admission.stats["admitted"] == 2 and admission.stats["rejected_client_rate"] == 1
+
+
+def test_shadow_log_records_both_engines(tmp_path):
+    shadow = _write_shadow_log(tmp_path)
+    records = list(replay.iter_jsonl(shadow.log.path))
+
+    assert [r["rule_level"] for r in records] == [2, 4, 1, 5]
+    assert [r["ai_level"] for r in records] == [3, 3, 3, None]
+    assert records[3]["ai_error"] == "AI Analysis Failed"
+    assert records[0]["rules_version"] == TriageEngine.RULES_VERSION
+    assert shadow.stats["recorded"] == 4
+
+
+def test_sampling_disabled_by_default():
+    assert not ShadowMode().should_shadow()
+    assert not ShadowMode(enabled=True, sample_rate=0.0).should_shadow()
+
+
+def test_replay_confusion_matrix(tmp_path):
+    shadow = _write_shadow_log(tmp_path)
+
+    in_process = replay.replay_shadow_log(shadow.log.path, against="ai", workers=1, chunk_size=2)
+    pooled = replay.replay_shadow_log(shadow.log.path, against="ai", workers=2, chunk_size=1)
+
+    assert in_process.to_dict() == pooled.to_dict()
+    assert in_process.counts[3] == {1: 1, 2: 1, 3: 0, 4: 1, 5: 0}
+    assert in_process.skipped == 1  # AI failed, nothing to compare
+    assert in_process.under_triage() == 1 and in_process.over_triage() == 2
+
+
+def test_replay_against_recorded_rules_is_identity_for_same_engine(tmp_path):
+    shadow = _write_shadow_log(tmp_path)
+    matrix = replay.replay_shadow_log(shadow.log.path, against="rules", workers=1)
+    assert matrix.agreement == 1.0 and matrix.total == 4
+
+
+def test_shadow_records_are_per_tenant_and_replayed_with_its_config(tmp_path):
+    from backend.tenants import TenantConfig
+
+    shadow = ShadowMode(enabled=True, log_path=str(tmp_path / "shadow.jsonl"))
+    alex = TenantConfig(thresholds={"danger_hr_high": 130})
+    patient = {"age": 40, "gender": "male", "chief_complaint_text": "runny eyes", "vitals": {"hr": 115}}
+    ai = FakeAIService(level="5")
+    for tenant_id, engine in (("alex", TriageEngine(**alex.engine_options())), (None, TriageEngine())):
+        shadow.shadow_ai(ai, patient, engine.evaluate(PatientInput(**patient)).model_dump(), tenant_id=tenant_id)
+    shadow.shadow_rules(patient, {"level": 2}, {"triage_level": 9}, tenant_id="alex")
+
+    records = list(replay.iter_jsonl(shadow.log.path))
+    assert ai.tenants == ["alex", None] and [r["tenant"] for r in records] == ["alex", None, "alex"]
+    assert [r["ai_level"] for r in records] == [5, 5, None]  # Coerced, or dropped when out of range
+    assert records[0]["rule_level"] != records[1]["rule_level"] == 2  # HR 115 is only danger zone by default
+    alex_matrix = replay.replay_shadow_log(shadow.log.path, against="rules", workers=1, tenant="alex",
+                                           tenant_config=alex)
+    assert alex_matrix.total == 2 and alex_matrix.counts[records[0]["rule_level"]][records[0]["rule_level"]] == 1
+    default = replay.replay_shadow_log(shadow.log.path, against="rules", workers=1)
+    assert default.total == 1 and default.agreement == 1.0
+
+
+def test_bounded_map_preserves_order():
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(2) as pool:
+        out = list(replay.bounded_map(pool, lambda x: x * 2, ((i, i) for i in range(20)), 3))
+    assert out == [(i, i * 2) for i in range(20)]
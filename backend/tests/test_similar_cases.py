@@ -0,0 +1,100 @@
+"""
+SAFE-Triage AI - Similar Case Tests
+Hashed n-gram TF-IDF neighbours (Arabic spelling variants included), the
+index kept current by writes and escalations, the endpoints, and the
+few-shot block in the AI prompt.
+"""
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from backend import database, migrations
+from backend.ai_service import AIService
+from backend.similar_cases import SimilarCases, few_shot_examples
+from backend.sql_models import Patient
+
+COMPLAINTS = [
+    "chest pain radiating to left arm", "لدغة عقرب في الرجل", "ضربة شمس ودوخة", "headache since morning",
+    "كحة وسخونية", "cut on hand needs stitches", "وجع في الضهر", "stomach pain and vomiting",
+]
+
+
+def _complaints(index, query, k=3, **kwargs):
+    return [case["chief_complaint"] for case in index.query(query, k, **kwargs)]
+
+
+def test_neighbours_writes_and_eviction(tmp_path):
+    bind = database.create_bind(f"sqlite:///{tmp_path / 'p.db'}")
+    migrations.upgrade(bind)
+    with Session(bind) as db:
+        db.add_all([Patient(chief_complaint=c, triage_level=1 + i % 5, age=30) for i, c in enumerate(COMPLAINTS)])
+        db.add(Patient(chief_complaint="ضربة شمس ودوخة", triage_level=2, age=70))
+        db.commit()
+
+    index = SimilarCases(dim=256)
+    index.add(Patient(id=100, chief_complaint="ignored until loaded"))
+    assert index.load(bind) == 9 and len(index) == 8  # Same text, one vector
+    assert _complaints(index, "لدغه عقرب فى الرِّجل", 1) == ["لدغة عقرب في الرجل"]
+    assert _complaints(index, "pain in the chest", 1) == ["chest pain radiating to left arm"]
+    # Both heat-stroke patients, newest first, with their own levels
+    heat = index.query("ضربه الشمس", 2)
+    assert [(c["patient_id"], c["triage_level"], c["age"]) for c in heat] == [(9, 2, 70), (3, 3, 30)]
+    assert heat[0]["similarity"] == heat[1]["similarity"] > 0.5
+    assert [c["patient_id"] for c in index.query("ضربة شمس", 2, exclude=9)][0] == 3
+
+    index.add(Patient(id=10, chief_complaint="لدغة عقرب في الإيد", triage_level=2, age=9,
+                      created_at=datetime(2026, 1, 1)))
+    index.add(Patient(id=10, chief_complaint="لدغة عقرب في الإيد", triage_level=2))  # Duplicate write ignored
+    index.update_level(10, 1)
+    best = index.query("عقرب", 2)
+    assert [c["patient_id"] for c in best] == [10, 2] and best[0]["triage_level"] == 1
+    assert best[0]["created_at"].tzinfo is not None
+    assert few_shot_examples(best) == [{"complaint": "لدغة عقرب في الإيد", "age": 9, "triage_level": 1},
+                                       {"complaint": "لدغة عقرب في الرجل", "age": 30, "triage_level": 2}]
+
+    # Over capacity the least recently seen complaints go
+    small = SimilarCases(dim=256, max_texts=4)
+    small.load(bind)
+    assert len(small) <= 4 and small.query("stomach pain vomiting", 1)[0]["patient_id"] == 8
+    assert small.complaint_of(1) is None and small.complaint_of(9) == "ضربة شمس ودوخة"
+    assert SimilarCases().query("anything") == [] and index.query("!!") == []
+
+
+def test_similar_endpoints(main, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "send_critical_alert", lambda *args: None)
+    client = TestClient(main.app)
+    ids = []
+    for complaint in ["تسمم غذائي بعد أكلة سمك", "تسمم غذائى وترجيع", "knee sprain playing football"]:
+        client.post("/triage", json={"age": 40, "gender": "female", "chief_complaint_text": complaint,
+                                     "vitals": {"hr": 95}})
+        ids.append(client.get("/patients", params={"limit": 1}).json()[0]["id"])
+
+    body = client.get("/patients/similar", params={"q": "تسمم غذائي", "k": 2}).json()
+    assert {c["patient_id"] for c in body["cases"]} == {ids[0], ids[1]}
+    assert sum(body["levels"].values()) == 2
+    body = client.get(f"/patients/{ids[1]}/similar", params={"k": 1}).json()
+    assert body["complaint"] == "تسمم غذائى وترجيع" and body["cases"][0]["patient_id"] == ids[0]
+    assert client.get("/patients/999999/similar").status_code == 404
+    assert client.get("/patients/similar", params={"q": "x", "k": 0}).status_code == 400
+    assert client.get("/metrics").json()["similar_cases"]["default"]["loaded"]
+
+
+def test_few_shot_block_in_prompt():
+    class RecordingModel:
+        prompts = []
+
+        def generate_content(self, prompt, request_options=None):
+            self.prompts.append(prompt)
+            return type("Response", (), {"text": '{"triage_level": 2}'})()
+
+    service = AIService()
+    service.model = RecordingModel()
+    patient = {"age": 9, "gender": "male", "chief_complaint_text": "لدغة عقرب", "vitals": {"hr": 120}}
+    assert service.analyze_triage(patient, examples=[{"complaint": "لدغة عقرب في الرجل", "age": 30,
+                                                      "triage_level": 2}]) == {"triage_level": 2}
+    service.analyze_triage(dict(patient, age=10))
+    with_examples, without = RecordingModel.prompts
+    assert "Similar past cases" in with_examples and "- Age 30: لدغة عقرب في الرجل -> Level 2" in with_examples
+    assert "Similar past cases" not in without
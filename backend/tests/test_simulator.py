@@ -0,0 +1,102 @@
+"""
+SAFE-Triage AI - ED Simulator Tests
+Arrival process, the event loop's priority and capacity handling, and
+replications with synthetic and replayed patients.
+"""
+import json
+
+import numpy as np
+import pytest
+
+from backend import simulator
+from backend.models import PatientInput
+from backend.simulator import EDConfig, arrival_times, run_replications, simulate
+
+
+def test_arrivals_follow_rate_and_diurnal_profile():
+    config = EDConfig(days=60, arrivals_per_day=300)
+    arrivals = arrival_times(np.random.default_rng(1), config)
+    assert len(arrivals) == pytest.approx(60 * 300, rel=0.03)
+    assert np.all(np.diff(arrivals) >= 0) and arrivals[-1] < 60 * 1440
+    hours = np.bincount((arrivals // 60 % 24).astype(int), minlength=24)
+    assert hours[11] > 3 * hours[4]  # Late morning is much busier than the small hours
+
+
+def test_synthetic_patients_are_valid_inputs():
+    patients = simulator.synthetic_patients(np.random.default_rng(3), 200)
+    assert {p.gender for p in patients} == {"male", "female"}
+    for p in patients[:20]:
+        assert PatientInput.model_validate(p.model_dump()) == p
+
+
+def test_waiting_room_is_served_by_level_then_arrival():
+    config = EDConfig(days=1, beds=1, physicians=1)
+    arrivals = np.array([0.0, 1.0, 2.0, 3.0])
+    levels = np.array([5, 4, 1, 4], dtype=np.int8)
+    waits = simulate(arrivals, levels, np.zeros(4, dtype=np.int8), config, np.random.default_rng(2))["waits"]
+    assert waits[0] == 0
+    # The level-1 patient who arrived third is seen next, then the level 4s in arrival order
+    assert waits[2] + 2 < waits[1] + 1 < waits[3] + 3
+
+    roomy = EDConfig(days=1, beds=10, physicians=10)
+    assert not simulate(arrivals, levels, np.zeros(4, dtype=np.int8), roomy, np.random.default_rng(2))["waits"].any()
+
+
+def test_physician_schedule_changes_capacity_on_the_hour():
+    schedule = [0] + [2] * 23  # Nobody on duty until 01:00
+    config = EDConfig(days=1, beds=5, physicians=schedule)
+    run = simulate(np.array([10.0, 20.0]), np.array([3, 2], dtype=np.int8), np.zeros(2, dtype=np.int8),
+                   config, np.random.default_rng(3))
+    assert run["waits"].tolist() == [50.0, 40.0]
+    with pytest.raises(ValueError):
+        EDConfig(physicians=[1, 2]).physician_schedule()
+
+
+
+def test_schedules_without_physicians_are_rejected():
+    for physicians in (0, [0] * 24, [2] * 23 + [-1]):
+        with pytest.raises(ValueError):
+            EDConfig(physicians=physicians).physician_schedule()
+    with pytest.raises(SystemExit):
+        simulator.main(["--physicians", "0"])
+
+
+def test_patients_never_seen_are_censored_at_the_horizon():
+    schedule = [1] * 23 + [0]  # Nobody on duty in the last hour
+    config = EDConfig(days=1, warmup_days=0, beds=5, physicians=schedule)
+    arrivals = np.array([60.0, 23 * 60 + 10.0])
+    levels = np.array([3, 3], dtype=np.int8)
+    run = simulate(arrivals, levels, np.zeros(2, dtype=np.int8), config, np.random.default_rng(4))
+    assert run["seen"].tolist() == [True, False]
+    assert run["waits"].tolist() == [0.0, 50.0]
+
+    run["waits"] = {level: run["waits"][levels == level] for level in simulator.LEVELS}
+    run["seen"] = {level: run["seen"][levels == level] for level in simulator.LEVELS}
+    row = simulator.summarize([run], config)["levels"][3]
+    assert row["unseen"] == 1 and row["within_target"] == 0.5
+
+def test_replications_are_reproducible_across_worker_counts():
+    config = EDConfig(days=2, warmup_days=0.5, arrivals_per_day=200, beds=15, physicians=2)
+    serial = run_replications(config, replications=2, seed=7, workers=1)
+    parallel = run_replications(config, replications=2, seed=7, workers=2)
+    assert serial == parallel
+    levels = serial["levels"]
+    assert sum(row["patients"] for row in levels.values()) == pytest.approx(2 * 1.5 * 200, rel=0.15)
+    assert levels[2]["mean"] < levels[4]["mean"] and levels[3]["p90"] <= levels[5]["p90"]
+    assert 0 < serial["physician_utilization"] < 1.5 and "ESI 3" in simulator.format_report(serial)
+
+
+def test_replayed_corpus_drives_the_case_mix(tmp_path):
+    corpus = tmp_path / "shadow.jsonl"
+    records = [{"input": {"age": 60, "gender": "male", "chief_complaint_text": "chest pain radiating to left arm",
+                          "vitals": {"hr": 100}}, "ai_level": 2},
+               {"input": {"age": 30, "gender": "female", "chief_complaint_text": "runny nose", "vitals": {}}},
+               {"input": {"gender": "nobody"}}]
+    corpus.write_text("\n".join(json.dumps(r) for r in records))
+    patients = simulator.load_corpus(str(corpus))
+    assert len(patients) == 2
+
+    report = run_replications(EDConfig(days=1, warmup_days=0, arrivals_per_day=100), replications=1,
+                              corpus=patients, workers=1)
+    counts = {level: row["patients"] for level, row in report["levels"].items()}
+    assert counts[1] == counts[3] == counts[4] == 0 and counts[2] > 0 and counts[5] > 0
@@ -0,0 +1,152 @@
+"""
+SAFE-Triage AI - Storage Tests
+Pool options, migrations and the read sessions, on SQLite and - when the
+PostgreSQL server binaries and psycopg2 are installed - on a throwaway
+PostgreSQL cluster started by the tests.
+"""
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+
+import pytest
+from sqlalchemy import inspect, select, text
+
+from backend import crud, database, migrations
+from backend.models import PatientInput, Vitals
+from backend.sql_models import Patient
+from backend.tenants import Tenant, TenantConfig, read_session
+
+PATIENT = PatientInput(age=58, gender="male", chief_complaint_text="chest pain",
+                       vitals=Vitals(hr=112, spo2=93))
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture(scope="module")
+def postgres_url():
+    """A local PostgreSQL cluster for this module (initdb + pg_ctl), torn down afterwards."""
+    pytest.importorskip("psycopg2")
+    if not (shutil.which("initdb") and shutil.which("pg_ctl")):
+        pytest.skip("PostgreSQL server binaries (initdb, pg_ctl) not installed")
+    if hasattr(os, "geteuid") and os.geteuid() == 0:
+        pytest.skip("initdb refuses to run as root")
+    data_dir = tempfile.mkdtemp(prefix="triage-pg-")
+    port = _free_port()
+    subprocess.run(["initdb", "-D", data_dir, "-U", "triage", "--auth=trust", "-E", "UTF8"],
+                   check=True, capture_output=True)
+    options = f"-p {port} -c listen_addresses=127.0.0.1 -c unix_socket_directories=''"
+    subprocess.run(["pg_ctl", "-D", data_dir, "-o", options, "-w", "start"],
+                   check=True, capture_output=True)
+    try:
+        yield f"postgresql://triage@127.0.0.1:{port}/postgres"
+    finally:
+        subprocess.run(["pg_ctl", "-D", data_dir, "-m", "immediate", "stop"], capture_output=True)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+
+@pytest.fixture(params=["sqlite", "postgresql"])
+def url(request, tmp_path):
+    if request.param == "sqlite":
+        return f"sqlite:///{tmp_path / 'triage.db'}"
+    pg_url = request.getfixturevalue("postgres_url")
+    bind = database.create_bind(pg_url)
+    with bind.begin() as conn:  # Fresh schema per test
+        conn.execute(text("DROP SCHEMA public CASCADE"))
+        conn.execute(text("CREATE SCHEMA public"))
+    bind.dispose()
+    return pg_url
+
+
+def test_engine_options():
+    assert database.engine_options("sqlite:///./x.db") == {"connect_args": {"check_same_thread": False}}
+    options = database.engine_options("postgres://u:p@db/triage")
+    assert options["pool_pre_ping"] and options["pool_size"] == 10 and options["max_overflow"] == 20
+    assert database.async_url("postgres://u:p@db/triage").drivername == "postgresql+asyncpg"
+    assert database.async_url("sqlite:///./x.db").drivername == "sqlite+aiosqlite"
+    assert database.async_url("mysql://u@db/triage") is None
+
+
+def test_pool_size_from_environment(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "3")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    options = database.engine_options("postgresql://u@db/triage")
+    assert (options["pool_size"], options["max_overflow"]) == (3, 0)
+
+
+def test_migrations_apply_once(url):
+    bind = database.create_bind(url)
+    latest = migrations.MIGRATIONS[-1].version
+    assert migrations.current(bind) == 0
+    assert migrations.upgrade(bind) == [m.version for m in migrations.MIGRATIONS]
+    assert migrations.current(bind) == latest
+    assert migrations.upgrade(bind) == []
+    assert {"patients", "triage_hourly_rollups", "schema_migrations"} <= set(inspect(bind).get_table_names())
+    bind.dispose()
+
+
+def test_each_step_adds_its_own_columns_and_ends_at_the_models(url):
+    bind = database.create_bind(url)
+
+    def columns(table):
+        return {c["name"] for c in inspect(bind).get_columns(table)}
+
+    migrations.upgrade(bind, target=1)
+    assert not {"triage_evidence", "triage_resources", "score_history"} & columns("patients")
+    migrations.upgrade(bind, target=3)
+    assert {"triage_evidence", "triage_resources"} <= columns("patients") and "score_history" not in columns("patients")
+    migrations.upgrade(bind)
+    for table in database.Base.metadata.sorted_tables:
+        assert columns(table.name) == {c.name for c in table.columns}, table.name
+    bind.dispose()
+
+
+def test_concurrent_startup_applies_each_migration_once(url):
+    """API nodes starting together (one engine each) against the same database."""
+    binds = [database.create_bind(url) for _ in range(4)]
+    migrations.upgrade(binds[0], target=1)
+    results, errors = [], []
+
+    def start(bind):
+        try:
+            results.append(migrations.upgrade(bind))
+        except Exception as e:  # SQLite may report "database is locked" instead of waiting
+            errors.append(e)
+
+    threads = [threading.Thread(target=start, args=(b,)) for b in binds]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert sum(len(r) for r in results) == len(migrations.MIGRATIONS) - 1
+    if binds[0].dialect.name == "postgresql":
+        assert not errors
+    assert migrations.current(binds[0]) == migrations.MIGRATIONS[-1].version
+    for b in binds:
+        b.dispose()
+
+
+def test_tenant_write_and_async_read(url):
+    tenant = Tenant("storage-test", TenantConfig(database_url=url))
+    db = tenant.SessionLocal()
+    result = tenant.engine.evaluate(PATIENT).model_dump()
+    record_id = crud.create_patient_record(db, PATIENT, result, categories=["chest_pain"]).id
+    db.close()
+
+    async def read():
+        async with read_session(tenant) as session:
+            patient = await session.get(Patient, record_id)
+            listed = (await session.scalars(select(Patient).order_by(Patient.id))).all()
+        return patient, listed
+
+    patient, listed = asyncio.run(read())
+    assert patient.chief_complaint == "chest pain" and patient.triage_level == result["level"]
+    assert [p.id for p in listed] == [record_id]
+    tenant.close()
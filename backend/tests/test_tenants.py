@@ -0,0 +1,164 @@
+"""
+SAFE-Triage AI - Multi-Tenant Tests
+Several local hospitals served from one app, each with its own lexicon,
+thresholds, webhook and SQLite database.
+"""
+import threading
+
+import pytest
+
+from backend.tenants import TenantConfig, TenantRegistry
+
+TENANTS = {
+    "cairo": TenantConfig(
+        database_url=None, webhook_url="http://alerts.cairo.test/hook",
+        concepts={"chest_pain": ["صدري مقبوض"]},
+    ),
+    "alex": TenantConfig(
+        webhook_url="http://alerts.alex.test/hook",
+        thresholds={"danger_hr_high": 120}, danger_terms=["غرق في البحر"],
+    ),
+    "aswan": TenantConfig(),
+}
+
+PATIENT = {"age": 40, "gender": "male", "vitals": {"hr": 110}}
+
+
+@pytest.fixture
+def client(main, tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+    from backend import tenants
+
+    configs = {tid: cfg.model_copy(update={"database_url": f"sqlite:///{tmp_path / tid}.db"})
+               for tid, cfg in TENANTS.items()}
+    default = tenants.Tenant("default", TenantConfig(database_url=f"sqlite:///{tmp_path}/default.db"),
+                             engine=main.engine_logic)
+    monkeypatch.setattr(tenants, "registry", TenantRegistry(configs, max_cached=2, default=default))
+
+    alerts = []
+    monkeypatch.setattr(main.requests, "post", lambda url, json, timeout: alerts.append(url) or
+                        type("R", (), {"status_code": 200})())
+    yield TestClient(main.app), alerts, tenants.registry
+
+
+def _triage(client, tenant, complaint, **extra):
+    headers = {"X-Tenant-ID": tenant} if tenant else {}
+    return client.post("/triage", json=dict(PATIENT, chief_complaint_text=complaint, **extra), headers=headers)
+
+
+def test_tenant_lexicon_and_thresholds(client):
+    client, _, _ = client
+    # Local slang only known to Cairo
+    assert _triage(client, "cairo", "صدري مقبوض").json()["level"] == 2
+    assert _triage(client, "aswan", "صدري مقبوض").json()["level"] == 2  # HR 110 is danger zone by default
+    # Alexandria tolerates HR up to 120 before Level 2
+    assert _triage(client, "alex", "runny nose").json()["level"] == 5
+    assert _triage(client, "aswan", "runny nose").json()["level"] == 2
+    assert _triage(client, "alex", "غرق في البحر").json()["level"] == 1
+
+
+def test_separate_databases_and_webhooks(client):
+    client, alerts, _ = client
+    _triage(client, "cairo", "chest pain")
+    _triage(client, "cairo", "runny nose", vitals={})
+    _triage(client, "alex", "unconscious")
+
+    cairo = client.get("/patients", headers={"X-Tenant-ID": "cairo"}).json()
+    alex = client.get("/patients", headers={"X-Tenant-ID": "alex"}).json()
+    assert sorted(p["chief_complaint"] for p in cairo) == ["chest pain", "runny nose"]
+    assert [p["chief_complaint"] for p in alex] == ["unconscious"]
+    assert client.get("/patients", headers={"X-Tenant-ID": "aswan"}).json() == []
+    first = client.get(f"/patients/{cairo[0]['id']}", headers={"X-Tenant-ID": "cairo"})
+    assert first.json()["chief_complaint"] == cairo[0]["chief_complaint"]
+    assert client.get(f"/patients/{cairo[0]['id'] + 99}", headers={"X-Tenant-ID": "cairo"}).status_code == 404
+    assert alerts == ["http://alerts.cairo.test/hook", "http://alerts.alex.test/hook"]
+
+
+def test_unknown_and_default_tenants(client):
+    client, _, _ = client
+    assert _triage(client, "nowhere", "chest pain").status_code == 404
+    assert _triage(client, "../etc", "chest pain").status_code == 400
+    assert _triage(client, None, "chest pain").status_code == 200
+
+
+def test_bounded_cache(client):
+    client, _, registry = client
+    for tenant in ["cairo", "alex", "cairo", "aswan", "cairo"]:
+        _triage(client, tenant, "runny nose")
+    assert registry.cached() == ["aswan", "cairo"]  # LRU order, alex evicted
+    assert registry.stats["evictions"] == 1
+    assert registry.stats["builds"] == 3 and registry.stats["hits"] >= 2
+
+
+
+def test_etags_differ_across_tenants_and_rebuilds(client):
+    client, _, registry = client
+    _triage(client, "cairo", "chest pain")
+    _triage(client, "alex", "chest pain")
+    cairo = client.get("/patients", headers={"X-Tenant-ID": "cairo"})
+    alex = client.get("/patients", headers={"X-Tenant-ID": "alex"})
+    assert cairo.headers["Vary"].startswith("X-Tenant-ID") and cairo.headers["ETag"] != alex.headers["ETag"]
+    etag = cairo.headers["ETag"]
+    assert client.get("/patients", headers={"X-Tenant-ID": "alex", "If-None-Match": etag}).status_code == 200
+
+    # Evicted and rebuilt with the same number of writes since: the old tag must not match
+    client.get("/patients", headers={"X-Tenant-ID": "aswan"})
+    assert "cairo" not in registry.cached()
+    assert client.get("/patients", headers={"X-Tenant-ID": "cairo", "If-None-Match": etag}).status_code == 200
+
+def test_hits_do_not_wait_for_another_tenants_build(tmp_path, monkeypatch):
+    from backend import tenants
+
+    configs = {tid: TenantConfig(database_url=f"sqlite:///{tmp_path / tid}.db") for tid in ("cairo", "alex")}
+    registry = TenantRegistry(configs)
+    cairo = registry.get("cairo")
+    building, release = threading.Event(), threading.Event()
+    real_tenant = tenants.Tenant
+
+    def slow_tenant(tenant_id, config):
+        building.set()
+        release.wait(5)
+        return real_tenant(tenant_id, config)
+
+    monkeypatch.setattr(tenants, "Tenant", slow_tenant)
+    builder = threading.Thread(target=registry.get, args=("alex",))
+    builder.start()
+    assert building.wait(5)
+    assert registry.get("cairo") is cairo and builder.is_alive()  # Answered while alex is still building
+    release.set()
+    builder.join(5)
+    assert registry.cached() == ["cairo", "alex"] and registry.stats["builds"] == 2
+
+
+def test_evicted_tenant_is_closed_after_its_last_user(tmp_path, monkeypatch):
+    from backend import tenants
+
+    closed = []
+    monkeypatch.setattr(tenants.Tenant, "close", lambda self: closed.append(self.id))
+    configs = {tid: TenantConfig(database_url=f"sqlite:///{tmp_path / tid}.db") for tid in ("cairo", "alex")}
+    registry = TenantRegistry(configs, max_cached=1)
+    cairo = registry.get("cairo")
+    cairo.acquire()  # A request in flight
+    registry.get("alex")
+    assert registry.cached() == ["alex"] and closed == []
+    cairo.release()
+    assert closed == ["cairo"]
+
+
+def test_get_never_hands_out_a_tenant_evicted_before_it_was_held(tmp_path, monkeypatch):
+    from backend import tenants
+
+    closed = []
+    monkeypatch.setattr(tenants.Tenant, "close", lambda self: closed.append(self.id))
+    configs = {tid: TenantConfig(database_url=f"sqlite:///{tmp_path / tid}.db") for tid in ("cairo", "alex")}
+    registry = TenantRegistry(configs, max_cached=1)
+    cairo = registry.get("cairo")
+    # Another request builds alex, evicting cairo, between the cache lookup and the acquire
+    cairo.acquire = lambda: registry.get("alex") and tenants.Tenant.acquire(cairo)
+    held = registry.get("cairo", acquire=True)  # Rebuilt, which evicts alex in turn
+    assert held is not cairo and registry.cached() == ["cairo"] and closed == ["cairo", "alex"]
+
+    registry.get("alex")  # Evicts the held cairo: disposed only on release
+    assert closed == ["cairo", "alex"]
+    held.release()
+    assert closed == ["cairo", "alex", "cairo"]
@@ -0,0 +1,146 @@
+"""
+SAFE-Triage AI - Transcription Cache Tests
+Byte-bounded LRU in memory and on disk, content hashes of normalized PCM,
+and repeat uploads answered without calling Gemini.
+"""
+import hashlib
+import os
+import threading
+import time
+import wave
+
+import numpy as np
+
+from backend import audio
+from backend.medasr_service import MedASRService
+from backend.transcription_cache import TranscriptionCache
+
+
+def _key(n):
+    return hashlib.sha256(str(n).encode()).hexdigest()
+
+
+def _write_wav(path, samples, channels=1, rate=48_000):
+    pcm = (np.clip(samples, -1, 1) * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(np.repeat(pcm, channels).tobytes())
+    return str(path)
+
+
+def _speech(seconds=1.0, freq=220.0, rate=48_000):
+    t = np.arange(int(seconds * rate)) / rate
+    return (0.3 * np.sin(2 * np.pi * freq * t)).astype(np.float32)
+
+
+def test_memory_lru_is_bounded_in_bytes():
+    cache = TranscriptionCache(max_memory_bytes=30)
+    for i in range(3):
+        cache.put(_key(i), "x" * 10)
+    assert cache.get(_key(0)) == "x" * 10  # Now most recently used
+    cache.put(_key(3), "y" * 10)
+    assert cache.get(_key(1)) is None and cache.get(_key(0)) is not None
+    stats = cache.stats()
+    assert (stats["memory_bytes"], stats["evictions_memory"], stats["hits_memory"], stats["misses"]) == (30, 1, 2, 1)
+
+
+def test_disk_survives_restart_and_is_bounded(tmp_path):
+    cache = TranscriptionCache(disk_dir=str(tmp_path))
+    cache.put(_key(1), "صدري بيوجعني")
+    restarted = TranscriptionCache(disk_dir=str(tmp_path))
+    assert restarted.get(_key(1)) == "صدري بيوجعني"
+    assert restarted.stats()["hits_disk"] == 1
+    assert restarted.get(_key(1)) == "صدري بيوجعني" and restarted.stats()["hits_memory"] == 1
+
+    small = TranscriptionCache(max_memory_bytes=0, disk_dir=str(tmp_path / "small"), max_disk_bytes=100)
+    for i in range(5):
+        small.put(_key(i), "chest pain radiating to the left arm")
+    assert small.stats()["disk_bytes"] <= 100 and small.stats()["evictions_disk"] >= 2
+    assert small.get(_key(4)) is not None and small.get(_key(0)) is None
+    assert len(os.listdir(tmp_path / "small")) == small.stats()["disk_entries"]
+
+
+def test_workers_share_the_disk_directory_and_its_bound(tmp_path):
+    worker_a = TranscriptionCache(max_memory_bytes=0, disk_dir=str(tmp_path), max_disk_bytes=150)
+    worker_b = TranscriptionCache(max_memory_bytes=0, disk_dir=str(tmp_path), max_disk_bytes=150)
+    worker_a.put(_key(1), "chest pain radiating to the left arm")
+    assert worker_b.get(_key(1)) == "chest pain radiating to the left arm"  # Written after b started
+
+    for i in range(2, 6):
+        (worker_a if i % 2 else worker_b).put(_key(i), "chest pain radiating to the left arm")
+    sizes = [os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path)]
+    assert sum(sizes) <= 150 and len(sizes) == worker_b.stats()["disk_entries"]
+    assert worker_a.get(_key(5)) is not None and worker_a.get(_key(2)) is None
+
+def test_corrupt_disk_entry_is_a_miss(tmp_path):
+    cache = TranscriptionCache(max_memory_bytes=0, disk_dir=str(tmp_path))
+    cache.put(_key(1), "cough")
+    (tmp_path / f"{_key(1)}.json").write_text("{not json")
+    assert cache.get(_key(1)) is None
+    assert not (tmp_path / f"{_key(1)}.json").exists()
+
+
+def test_content_hash_ignores_container_details(tmp_path):
+    recording = np.concatenate([np.zeros(48_000, np.float32), _speech(), np.zeros(48_000, np.float32)])
+    mono = audio.preprocess(_write_wav(tmp_path / "mono.wav", recording), codec="wav", out_dir=str(tmp_path))
+    stereo = audio.preprocess(_write_wav(tmp_path / "stereo.wav", recording, channels=2),
+                              codec="wav", out_dir=str(tmp_path))
+    other = audio.preprocess(_write_wav(tmp_path / "other.wav", _speech(freq=330.0)),
+                             codec="wav", out_dir=str(tmp_path))
+    assert mono.content_hash == stereo.content_hash != other.content_hash
+
+
+def _service(tmp_path, monkeypatch, delay=0.0):
+    service = MedASRService()
+    service.cache = TranscriptionCache(disk_dir=str(tmp_path / "cache"))
+    uploads = []
+
+    def fake_upload_and_transcribe(path, mime_type):
+        uploads.append(path)
+        time.sleep(delay)
+        return "chest pain since morning"
+
+    monkeypatch.setattr(service, "_transcribe", fake_upload_and_transcribe)
+    return service, uploads
+
+
+def test_repeat_recording_is_not_uploaded_again(tmp_path, monkeypatch):
+    service, uploads = _service(tmp_path, monkeypatch)
+    first = service.transcribe("a.wav", "audio/wav", content_hash=_key("rec"))
+    again = service.transcribe("b.flac", "audio/flac", content_hash=_key("rec"))
+    assert (first["cached"], again["cached"]) == (False, True)
+    assert again["transcription"] == first["transcription"] and uploads == ["a.wav"]
+
+
+def test_concurrent_resubmits_share_one_upload(tmp_path, monkeypatch):
+    service, uploads = _service(tmp_path, monkeypatch, delay=0.2)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        service.transcribe("a.wav", "audio/wav", content_hash=_key("rec")))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(uploads) == 1 and all(r["success"] for r in results)
+
+
+def test_transcribe_endpoint_reports_cache_hits(main, tmp_path, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    service = main.medasr_service
+    monkeypatch.setattr(service, "cache", TranscriptionCache())
+    uploads = []
+    monkeypatch.setattr(service, "_transcribe", lambda path, mime_type: uploads.append(path) or "cough")
+    monkeypatch.setattr(audio, "CODEC", "wav")
+    source = _write_wav(tmp_path / "in.wav", np.concatenate([np.zeros(48_000, np.float32), _speech()]))
+    client = TestClient(main.app)
+
+    bodies = []
+    for _ in range(2):
+        with open(source, "rb") as f:
+            bodies.append(client.post("/transcribe", files={"audio": ("in.wav", f, "audio/wav")}).json())
+    assert [b["cached"] for b in bodies] == [False, True] and len(uploads) == 1
+    stats = client.get("/metrics").json()["transcription_cache"]
+    assert (stats["hits_memory"], stats["misses"], stats["stores"]) == (1, 1, 1)
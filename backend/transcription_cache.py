@@ -0,0 +1,168 @@
+"""
+SAFE-Triage AI - Transcription Cache
+Content-addressed cache of Gemini transcriptions, keyed by the hash of the
+normalized (16 kHz mono, trimmed) PCM, so a retried or re-submitted
+recording is answered without uploading it again - even if the browser
+re-encoded it.
+
+Two levels, both least-recently-used and bounded in bytes:
+- memory (TRANSCRIPTION_CACHE_MB, default 8);
+- optional disk directory shared across restarts and workers
+  (TRANSCRIPTION_CACHE_DIR, TRANSCRIPTION_CACHE_DISK_MB, default 256),
+  one JSON file per recording, written atomically. The directory itself is
+  the index: a memory miss looks for the file, whoever wrote it, and each
+  store trims the directory's real total, oldest modification time first
+  (a disk hit touches its file).
+
+File reads and writes happen outside the lock, so a slow disk never holds
+up memory hits.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
+
+class TranscriptionCache:
+    def __init__(self, max_memory_bytes: int = 8 << 20, disk_dir: Optional[str] = None,
+                 max_disk_bytes: int = 256 << 20):
+        self.max_memory_bytes = max_memory_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = disk_dir
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_usage = (0, 0)  # Entries and bytes in the directory at its last scan
+        self._lock = threading.Lock()
+        self._stats = {"hits_memory": 0, "hits_disk": 0, "misses": 0, "stores": 0,
+                       "evictions_memory": 0, "evictions_disk": 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._evict_disk()
+
+    @classmethod
+    def from_env(cls) -> "TranscriptionCache":
+        return cls(
+            max_memory_bytes=int(float(os.getenv("TRANSCRIPTION_CACHE_MB", "8")) * (1 << 20)),
+            disk_dir=os.getenv("TRANSCRIPTION_CACHE_DIR") or None,
+            max_disk_bytes=int(float(os.getenv("TRANSCRIPTION_CACHE_DISK_MB", "256")) * (1 << 20)),
+        )
+
+    def _count(self, stat: str, n: int = 1):
+        with self._lock:
+            self._stats[stat] += n
+
+    # ============ DISK (no lock held) ============
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                transcription = json.load(f)["transcription"]
+            os.utime(self._path(key))  # Recency for every worker's eviction, and across restarts
+            return transcription
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError):
+            self._drop_disk(key)
+            return None
+
+    def _write_disk(self, key: str, transcription: str):
+        data = json.dumps({"transcription": transcription}, ensure_ascii=False).encode("utf-8")
+        fd, tmp = tempfile.mkstemp(dir=self.disk_dir, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, self._path(key))
+        self._evict_disk()
+
+    def _drop_disk(self, key: str):
+        try:
+            os.unlink(self._path(key))
+        except OSError:
+            pass  # Already evicted by another worker
+
+    def _evict_disk(self):
+        """Trim the directory, every worker's entries included, to max_disk_bytes."""
+        entries, total = [], 0
+        with os.scandir(self.disk_dir) as it:
+            for entry in it:
+                key, ext = os.path.splitext(entry.name)
+                if ext != ".json" or not KEY_PATTERN.match(key):
+                    continue
+                try:
+                    st = entry.stat()
+                except OSError:
+                    continue
+                entries.append((st.st_mtime_ns, key, st.st_size))
+                total += st.st_size
+        evicted = 0
+        for _, key, size in sorted(entries):  # Least recently used first
+            if total <= self.max_disk_bytes:
+                break
+            self._drop_disk(key)
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_usage = (len(entries) - evicted, total)
+            self._stats["evictions_disk"] += evicted
+
+    # ============ MEMORY (lock held) ============
+
+    def _remember(self, key: str, transcription: str):
+        size = len(transcription.encode("utf-8"))
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key).encode("utf-8"))
+        self._memory[key] = transcription
+        self._memory_bytes += size
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted.encode("utf-8"))
+            self._stats["evictions_memory"] += 1
+
+    # ============ API ============
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            transcription = self._memory.get(key)
+            if transcription is not None:
+                self._memory.move_to_end(key)
+                self._stats["hits_memory"] += 1
+                return transcription
+        if self.disk_dir and KEY_PATTERN.match(key):
+            transcription = self._read_disk(key)
+            if transcription is not None:
+                with self._lock:
+                    self._remember(key, transcription)
+                    self._stats["hits_disk"] += 1
+                return transcription
+        self._count("misses")
+        return None
+
+    def put(self, key: str, transcription: str):
+        if not KEY_PATTERN.match(key):
+            raise ValueError("Cache keys are SHA-256 hex digests")
+        with self._lock:
+            self._remember(key, transcription)
+            self._stats["stores"] += 1
+        if self.disk_dir:
+            try:
+                self._write_disk(key, transcription)
+            except OSError as e:
+                print(f"[CACHE] Could not persist transcription: {e}")
+
+    def stats(self) -> dict:
+        with self._lock:
+            snapshot = dict(self._stats)
+            lookups = snapshot["hits_memory"] + snapshot["hits_disk"] + snapshot["misses"]
+            snapshot.update(
+                hit_rate=(snapshot["hits_memory"] + snapshot["hits_disk"]) / lookups if lookups else None,
+                memory_entries=len(self._memory), memory_bytes=self._memory_bytes,
+                disk_entries=self._disk_usage[0], disk_bytes=self._disk_usage[1],
+            )
+        return snapshot